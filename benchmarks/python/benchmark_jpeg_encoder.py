@@ -0,0 +1,53 @@
+"""Measures the CPU JPEG encoding time and the output size for the qualities, the subsamplings and the Huffman tables.
+
+Usage: PYTHONPATH=src/python python benchmarks/python/benchmark_jpeg_encoder.py [--width 2000] [--height 1500]
+"""
+
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+from app.io.codec_options import ChromaSubsampling, JPEGOptions
+from app.io.jpeg_encoder import encode_jpeg
+
+
+def measure(pixels: np.ndarray, options: JPEGOptions, repeats: int) -> tuple[float, int]:
+    """Returns the best encoding time in seconds and the size of the encoded image"""
+
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        size = len(encode_jpeg(pixels, options))
+        timings.append(time.perf_counter() - start)
+
+    return min(timings), size
+
+
+def main() -> None:
+    """Benchmark entrypoint"""
+
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=2000)
+    parser.add_argument('--height', type=int, default=1500)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    # Smooth gradients with mild noise compress like photographs, unlike the uniform noise
+    rows, columns = np.mgrid[0:args.height, 0:args.width]
+    gradient = np.stack([rows * 255 // args.height, columns * 255 // args.width, (rows + columns) % 256], axis=2)
+    noise = np.random.default_rng(0).integers(-8, 9, gradient.shape)
+    pixels = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+
+    print(f'{"quality":>8} {"subsampling":>12} {"optimized":>10} {"time [s]":>10} {"size [B]":>10}')
+    for quality in [50, 75, 90]:
+        for subsampling in ChromaSubsampling:
+            for optimize_huffman in [False, True]:
+                options = JPEGOptions(quality=quality, subsampling=subsampling, optimize_huffman=optimize_huffman)
+                elapsed, size = measure(pixels, options, args.repeats)
+                print(f'{quality:>8} {subsampling.value:>12} {optimize_huffman!s:>10} {elapsed:>10.3f} {size:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Measures the decoding of a JPEG image at every scale: the entropy decoding to the coefficients, the transform of the
+coefficients to the samples and the whole decoding. The entropy decoding has to parse every Huffman code of the scans,
+so it stays close to the one of the full scale and bounds the speedup of the reduced scales.
+
+Usage: PYTHONPATH=src/python python benchmarks/python/benchmark_jpeg_scale.py [--input tests/resources/3.jpg]
+"""
+
+import time
+from argparse import ArgumentParser
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from app.io.codec_options import DecodeScale, JPEGOptions
+from app.io.jpeg_decoder import decode_jpeg, read_coefficients, to_rgb
+from app.io.jpeg_encoder import encode_jpeg
+
+
+def measure(function: Callable[[], Any], repeats: int) -> float:
+    """Returns the best time of the function in seconds"""
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def generate_image(width: int, height: int) -> bytes:
+    """Returns a noisy gradient encoded with the default options"""
+
+    rows, columns = np.mgrid[0:height, 0:width]
+    gradient = np.stack([rows * 255 // height, columns * 255 // width, (rows + columns) % 256], axis=2)
+    noise = np.random.default_rng(0).integers(-8, 9, gradient.shape)
+
+    return encode_jpeg(np.clip(gradient + noise, 0, 255).astype(np.uint8), JPEGOptions())
+
+
+def main() -> None:
+    """Benchmark entrypoint"""
+
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--input', type=str, default=None, help='JPEG image, a generated one by default')
+    parser.add_argument('--width', type=int, default=2000)
+    parser.add_argument('--height', type=int, default=1504)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.input is None:
+        data = generate_image(args.width, args.height)
+    else:
+        with open(args.input, mode='rb') as file:
+            data = file.read()
+
+    print(f'{"scale":>6} {"entropy [s]":>12} {"samples [s]":>12} {"total [s]":>10} {"speedup":>8}')
+    full = None
+    for scale in DecodeScale:
+        coefficients = read_coefficients(data, scale)
+        entropy = measure(lambda x=scale: read_coefficients(data, x), args.repeats)
+        samples = measure(lambda x=scale: to_rgb(coefficients, x), args.repeats)
+        total = measure(lambda x=scale: decode_jpeg(data, x), args.repeats)
+        full = total if full is None else full
+        print(f'{scale.value:>6} {entropy:>12.3f} {samples:>12.3f} {total:>10.3f} {full / total:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
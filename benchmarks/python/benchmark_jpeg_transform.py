@@ -0,0 +1,66 @@
+"""Compares the lossless rotations and flips of the JPEG coefficients with the decoding, the transform and the encoding
+of the samples.
+
+Usage: PYTHONPATH=src/python python benchmarks/python/benchmark_jpeg_transform.py [--width 2000] [--height 1504]
+"""
+
+import time
+from argparse import ArgumentParser
+from collections.abc import Callable
+
+import numpy as np
+
+from app.io.codec_options import JPEGOptions
+from app.io.jpeg_decoder import decode_jpeg, read_coefficients
+from app.io.jpeg_encoder import encode_jpeg, write_coefficients
+from app.io.jpeg_transform import JPEGTransform
+
+
+def measure(function: Callable[[], bytes], repeats: int) -> float:
+    """Returns the best time of the function in seconds"""
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def transform_samples(data: bytes, transform: JPEGTransform) -> bytes:
+    """Decodes, transforms and encodes the samples again, like the operations on the other formats"""
+
+    samples = decode_jpeg(data)
+    if transform.is_transposed():
+        samples = samples.transpose(1, 0, 2)
+
+    vertical, horizontal = transform.is_mirrored()
+    samples = samples[::-1 if vertical else 1, ::-1 if horizontal else 1]
+
+    return encode_jpeg(np.ascontiguousarray(samples))
+
+
+def main() -> None:
+    """Benchmark entrypoint"""
+
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=2000)
+    parser.add_argument('--height', type=int, default=1504)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rows, columns = np.mgrid[0:args.height, 0:args.width]
+    gradient = np.stack([rows * 255 // args.height, columns * 255 // args.width, (rows + columns) % 256], axis=2)
+    noise = np.random.default_rng(0).integers(-8, 9, gradient.shape)
+    data = encode_jpeg(np.clip(gradient + noise, 0, 255).astype(np.uint8), JPEGOptions())
+
+    print(f'{"transform":>16} {"coefficients [s]":>17} {"samples [s]":>12}')
+    for transform in [JPEGTransform.ROTATE_90, JPEGTransform.ROTATE_180, JPEGTransform.FLIP_HORIZONTAL]:
+        lossless = measure(lambda x=transform: write_coefficients(x.apply(read_coefficients(data))), args.repeats)
+        samples = measure(lambda x=transform: transform_samples(data, x), args.repeats)
+        print(f'{transform.name:>16} {lossless:>17.3f} {samples:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Measures the PNG reading time for every CRC verification policy on a large image split into many IDAT chunks.
+
+Usage: PYTHONPATH=src/python python benchmarks/python/benchmark_png_crc.py [--width 4000] [--height 3000]
+"""
+
+import io
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+from app.image.image import Image
+from app.io.codec_options import CRCVerification, FilterSelection, PNGOptions
+from app.io.png import PNG, PNGReader, PNGWriter
+
+
+def measure(png: bytes, verification: CRCVerification, repeats: int) -> tuple[float, float]:
+    """Returns the best times of parsing the chunks and of decoding the whole image in seconds"""
+
+    parse_timings = []
+    read_timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        PNG.from_file(io.BytesIO(png), verification)
+        parse_timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        PNGReader(verification).read_format(io.BytesIO(png))
+        read_timings.append(time.perf_counter() - start)
+
+    return min(parse_timings), min(read_timings)
+
+
+def main() -> None:
+    """Benchmark entrypoint"""
+
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--chunk-size', type=int, default=1 << 13)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    # Unfiltered noise keeps the image data close to its raw size and the decoding cheap, so the checksums of tens of
+    # megabytes are a visible part of the reading time
+    data = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    options = PNGOptions(filter_selection=FilterSelection.NONE, level=1, chunk_size=args.chunk_size)
+    PNGWriter(options).write_format(buffer, Image(data=data))
+    png = buffer.getvalue()
+
+    print(f'{len(png) / 1e6:.1f} MB in {len(png) // args.chunk_size} IDAT chunks')
+    for verification in CRCVerification:
+        parse_seconds, read_seconds = measure(png, verification, args.repeats)
+        name = verification.name.lower().replace('_', '-')
+        print(f'{name:>9}: parse {parse_seconds * 1e3:8.1f} ms  read {read_seconds * 1e3:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
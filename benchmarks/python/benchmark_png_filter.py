@@ -0,0 +1,51 @@
+"""Measures the PNG size and the encoding throughput for every filter selection on a photographic image.
+
+Usage: PYTHONPATH=src/python python benchmarks/python/benchmark_png_filter.py [--input tests/resources/3_cat.png]
+"""
+
+import io
+import time
+from argparse import ArgumentParser
+
+from app.image.image import Image
+from app.io.codec_options import FilterSelection, PNGOptions
+from app.io.png import PNGReader, PNGWriter
+
+
+def measure(image: Image, selection: FilterSelection, repeats: int) -> tuple[float, int]:
+    """Returns the best time of encoding the image in seconds and the size of the encoded file in bytes"""
+
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        PNGWriter(PNGOptions(filter_selection=selection)).write_format(buffer, image)
+        timings.append(time.perf_counter() - start)
+        size = len(buffer.getvalue())
+
+    return min(timings), size
+
+
+def main() -> None:
+    """Benchmark entrypoint"""
+
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--input', default='tests/resources/3_cat.png')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.input, mode='rb') as file:
+        image = PNGReader().read_format(file)
+
+    height, width = image.data.shape[:2]
+    megapixels = width * height / 1e6
+
+    for selection in FilterSelection:
+        seconds, size = measure(image, selection, args.repeats)
+        print(f'{selection.name.lower():>8}: {size / 1e3:10.1f} kB  {seconds * 1e3:8.1f} ms  '
+              f'{megapixels / seconds:8.1f} MP/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Measures the startup of imcli with python -X importtime: the wall time, the time spent importing and the number of
+imported modules of --help, of the parsing of one operation and of short jobs on small images. The benchmark fails
+when --help imports NumPy, a codec or an operation, or when its imports take longer than --max-help-ms.
+
+Usage: PYTHONPATH=src/python python benchmarks/python/benchmark_startup.py [--repeats 5] [--max-help-ms 60]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+import numpy as np
+
+from app.image.image import Image
+from app.io.jpeg import JPEGWriter
+from app.io.png import PNGWriter
+
+CODEC_MODULES = ('app.io.apng', 'app.io.bmp', 'app.io.jpeg', 'app.io.png', 'app.io.pnm')
+
+
+def heavy_modules(modules: dict[str, int]) -> list[str]:
+    """Returns NumPy, the codec and the operation modules of the imported ones"""
+
+    return sorted(x for x in modules if x == 'numpy' or x in CODEC_MODULES
+                  or (x.startswith('app.operation.') and x != 'app.operation.ioperation'))
+
+
+def run_importtime(arguments: list[str]) -> tuple[float, dict[str, int]]:
+    """Runs imcli once and returns its wall time in seconds and the self import time of every module in microseconds"""
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'app.imcli', *arguments],
+                            capture_output=True,
+                            text=True,
+                            check=True,
+                            env=os.environ | {'PYTHONPATH': os.pathsep.join(sys.path)})
+    elapsed = time.perf_counter() - start
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_time, _, name = line.removeprefix('import time:').split('|')
+        modules[name.strip()] = int(self_time)
+
+    return elapsed, modules
+
+
+def measure(arguments: list[str], repeats: int) -> tuple[float, float, dict[str, int]]:
+    """Returns the best wall time and the best import time in seconds with the modules of that run"""
+
+    runs = [run_importtime(arguments) for _ in range(repeats)]
+    modules = min((x[1] for x in runs), key=lambda x: sum(x.values()))
+
+    return min(x[0] for x in runs), sum(modules.values()) / 1e6, modules
+
+
+def main() -> None:
+    """Benchmark entrypoint"""
+
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--max-help-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        image = Image(np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8))
+        png, jpeg = Path(directory) / 'input.png', Path(directory) / 'input.jpg'
+        for path, writer in [(png, PNGWriter()), (jpeg, JPEGWriter())]:
+            with open(path, mode='wb') as file:
+                writer.write_format(file, image)
+
+        scenarios = {
+            '--help': ['--help'],
+            'rotate90 --help': ['rotate90', '--help'],
+            'info png': ['info', str(png)],
+            'identity png': ['-i', str(png), '-o', f'{directory}/output.png', 'identity'],
+            'rotate90 jpeg': ['-i', str(jpeg), '-o', f'{directory}/output.jpg', 'rotate90'],
+        }
+
+        print(f'{"command":>16} {"wall [s]":>9} {"imports [s]":>12} {"modules":>8}  heavy modules')
+        results = {}
+        for name, arguments in scenarios.items():
+            wall, imports, modules = measure(arguments, args.repeats)
+            results[name] = imports, modules
+            print(f'{name:>16} {wall:>9.3f} {imports:>12.3f} {len(modules):>8}  {" ".join(heavy_modules(modules))}')
+
+    help_imports, help_modules = results['--help']
+    if heavy_modules(help_modules):
+        sys.exit(f'--help imports {", ".join(heavy_modules(help_modules))}')
+
+    if args.max_help_ms is not None and help_imports * 1e3 > args.max_help_ms:
+        sys.exit(f'--help imports take {help_imports * 1e3:.1f} ms, more than {args.max_help_ms} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@
 #include <iostream>
 #include <sstream>
 #include <stdexcept>
+#include <string>
 #include <vector>
 
 struct FastException : public std::runtime_error {
@@ -49,12 +50,31 @@ static PyObject *FastError = nullptr;
 
 static PyObject *fast_encode_jpeg(PyObject * /*self*/, PyObject *args) {
     PyArrayObject *input_array = nullptr;
-    PyArg_ParseTuple(args, "O", &input_array);
+    int quality = 90;
+    const char *subsampling_name = "4:2:0";
+    int optimized_huffman = 0;
+    PyArg_ParseTuple(args, "O|isp", &input_array, &quality, &subsampling_name, &optimized_huffman);
 
     if (PyErr_Occurred() != nullptr) {
         return nullptr;
     }
 
+    if (quality < 1 || quality > 100) {
+        PyErr_SetString(PyExc_ValueError, "Quality must be in the range from 1 to 100.");
+        return nullptr;
+    }
+
+    const std::string subsampling_string{subsampling_name};
+    nvjpegChromaSubsampling_t subsampling = NVJPEG_CSS_420;
+    if (subsampling_string == "4:4:4") {
+        subsampling = NVJPEG_CSS_444;
+    } else if (subsampling_string == "4:2:2") {
+        subsampling = NVJPEG_CSS_422;
+    } else if (subsampling_string != "4:2:0") {
+        PyErr_SetString(PyExc_ValueError, "Subsampling must be one of 4:4:4, 4:2:2 or 4:2:0.");
+        return nullptr;
+    }
+
     if (PyArray_NDIM(input_array) != 3 || PyArray_TYPE(input_array) != NPY_UINT8) {
         PyErr_SetString(PyExc_TypeError, "Input must be a (H, W, C) uint8 array.");
         return nullptr;
@@ -101,8 +121,9 @@ static PyObject *fast_encode_jpeg(PyObject * /*self*/, PyObject *args) {
             PyErr_SetString(PyExc_ValueError, error_stream.str().c_str());
             return nullptr;
         }
-        nvjpegEncoderParamsSetQuality(encode_params, 90, nullptr);
-        nvjpegEncoderParamsSetSamplingFactors(encode_params, NVJPEG_CSS_420, nullptr);
+        nvjpegEncoderParamsSetQuality(encode_params, quality, nullptr);
+        nvjpegEncoderParamsSetSamplingFactors(encode_params, subsampling, nullptr);
+        nvjpegEncoderParamsSetOptimizedHuffman(encode_params, optimized_huffman, nullptr);
 
         unsigned char *device_pixels_ptr;
         cudaError_t err = cudaMalloc(reinterpret_cast<void **>(&device_pixels_ptr), raw_size);
@@ -390,7 +411,8 @@ static int fast_module_exec(PyObject *module) {
 
 static PyMethodDef fast_methods[] = {
     {"encode_jpeg", fast_encode_jpeg, METH_VARARGS,
-     "Encodes the numpy array data as jpeg image. Returns bytes that form a jpeg image."    },
+     "Encodes the numpy array data as jpeg image with the quality, the chroma subsampling and optionally the "
+     "optimized Huffman tables. Returns bytes that form a jpeg image."                     },
     {"decode_jpeg", fast_decode_jpeg, METH_VARARGS,
      "Decodes the bytes as a JPEG image and returns the numpy array of the underlying data."},
     {nullptr,       nullptr,          0,            nullptr                                 }  /* Sentinel */
@@ -0,0 +1,52 @@
+"""Module implementing the info command that prints the image metadata read from the file headers only"""
+
+import sys
+from argparse import ArgumentParser, Namespace
+
+from app.error.app_exception import AppException
+from app.io.format_factory import get_probe_from_format, sniff_format
+from app.io.format_probe import ImageInfo
+
+
+def info_parser(parser: ArgumentParser) -> None:
+    """Initialises the info subcommand argument parser"""
+
+    parser.add_argument('files',
+                        nargs='+',
+                        help='image files to be inspected')
+
+
+def probe_file(path: str) -> ImageInfo:
+    """Determines the format of the file and parses only its headers, pipes are read from the peeked signature on"""
+
+    with open(path, mode='rb') as file:
+        data_format, stream = sniff_format(file)
+        return get_probe_from_format(data_format).probe(stream)
+
+
+def format_info(path: str, info: ImageInfo) -> str:
+    """Formats the image metadata as one tab separated line: path, format, width, height, channels, bits per pixel"""
+
+    return '\t'.join((path,
+                      info.data_format.name.lower(),
+                      str(info.width),
+                      str(info.height),
+                      str(info.channels),
+                      str(info.bits_per_pixel)))
+
+
+def info_command(args: Namespace) -> int:
+    """Prints the metadata of every file, files that cannot be probed are reported on stderr and skipped"""
+
+    status = 0
+    for path in args.files:
+        try:
+            info = probe_file(path)
+        except (AppException, OSError) as error:
+            print(f'{path}: {error}', file=sys.stderr)
+            status = 1
+            continue
+
+        print(format_info(path, info))
+
+    return status
@@ -1,17 +1,43 @@
 """Module for input/output operations related to parsing commandline"""
+import mmap
+import os
 from io import BytesIO
 from sys import stdin, stdout
-from typing import BinaryIO
+from typing import BinaryIO, Optional, cast
 
 
-def map_input(input_source: str) -> BinaryIO:
-    """Maps input source to stdin or to the file path"""
+class MappedInput(mmap.mmap):
+    """Copy-on-write memory map of the input file that can be used as a binary stream. It is closed when the block
+    exits, so the images decoded without a copy have to be released inside of it.
+    """
+
+    def __exit__(self, *args: object) -> None:
+        try:
+            self.close()
+        except BufferError:
+            # The frames of the raised exception may still hold the views, the mapping goes away with them then
+            if args[0] is None:
+                raise
+
+
+def map_input(input_source: str, output_source: Optional[str] = None) -> BinaryIO:
+    """Maps input source to stdin or to the file path. Files are memory mapped, so readers can use them without copy,
+    unless the file is also the output, whose truncation would take the mapped pages away
+    """
 
     if input_source is None:
         return BytesIO(stdin.buffer.read())
 
-    with open(input_source, mode='rb', buffering=16384) as file:
-        return BytesIO(file.read())
+    with open(input_source, mode='rb') as file:
+        status = os.fstat(file.fileno())
+        if status.st_size == 0:
+            return BytesIO()
+
+        if output_source is not None and os.path.exists(output_source) \
+                and os.path.samestat(status, os.stat(output_source)):
+            return BytesIO(file.read())
+
+        return cast(BinaryIO, MappedInput(file.fileno(), 0, access=mmap.ACCESS_COPY))
 
 
 def map_output(output_source: str) -> BinaryIO:
@@ -1,12 +1,38 @@
-"""Module containing functions that provide functionality related to commandline arguments parsing"""
+"""Module containing functions that provide functionality related to commandline arguments parsing
 
-from argparse import ArgumentParser, Namespace
-from typing import Callable
+The parser imports no codec and no operation. The arguments of every subcommand are added when it is parsed, so only
+the selected operation is imported and the job imports the codecs of its formats only.
+"""
 
-from app.command.io import map_input, map_output
-from app.io.format_factory import get_reader_from_format, get_writer_from_format, determine_format
+# pylint: disable=import-outside-toplevel
+
+import zlib
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from functools import partial
+from typing import Any, Callable, Optional, final, override
+
+from app.command.registry import OperationEntry, available_commands
+from app.io.codec_options import ChromaSubsampling, CRCVerification, CompressionStrategy, DecodeScale, \
+    FilterSelection, JPEGOptions, PNGOptions
 from app.io.known_format import KnownFormat
-from app.operation import Rotate90, Identity, Flip, BGR2RGB, Roll, Grayscale, HistogramEqualization, IOperation
+
+
+@final
+class LazyParser(ArgumentParser):
+    """Subcommand parser that adds its arguments on its first parse, which happens only for the selected subcommand"""
+
+    def __init__(self, *args: Any, loader: Optional[Callable[[ArgumentParser], None]] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.loader = loader
+
+    @override
+    def parse_known_args(self, args: Optional[Sequence[str]] = None, namespace: Any = None) -> tuple[Any, list[str]]:
+        if self.loader is not None:
+            loader, self.loader = self.loader, None
+            loader(self)
+
+        return super().parse_known_args(args, namespace)
 
 
 def get_parser() -> ArgumentParser:
@@ -31,53 +57,118 @@ def get_parser() -> ArgumentParser:
                         dest='output_format',
                         help='change the output stream data format')
 
+    bmp_group = parser.add_argument_group('BMP output options')
+    bmp_group.add_argument('--bmp-palette',
+                           action='store_true',
+                           dest='bmp_palette',
+                           help='write 8-bit bitmap with a color table (at most 256 colors)')
+    bmp_group.add_argument('--bmp-rle',
+                           action='store_true',
+                           dest='bmp_rle',
+                           help='compress the 8-bit bitmap with a color table using RLE8 (implies --bmp-palette)')
+
+    png_input_group = parser.add_argument_group('PNG input options')
+    png_input_group.add_argument('--png-crc',
+                                 default='strict',
+                                 choices=CRCVerification.get_available_policies(),
+                                 dest='png_crc',
+                                 help='verify the chunk checksums: all (strict), image data only (idat-only), '
+                                      'on a background thread while decoding (deferred) or never (off)')
+
+    png_group = parser.add_argument_group('PNG output options')
+    png_group.add_argument('--png-filter',
+                           default='adaptive',
+                           choices=FilterSelection.get_available_selections(),
+                           dest='png_filter',
+                           help='scanline filters: none, Paeth on every row (fixed) or the best one per row (adaptive)')
+    png_group.add_argument('--png-level',
+                           type=int,
+                           default=PNGOptions().level,
+                           choices=range(zlib.Z_DEFAULT_COMPRESSION, zlib.Z_BEST_COMPRESSION + 1),
+                           metavar='{-1..9}',
+                           dest='png_level',
+                           help='zlib compression level from 0 (store) to 9 (smallest), -1 for the zlib default')
+    png_group.add_argument('--png-strategy',
+                           default='default',
+                           choices=CompressionStrategy.get_available_strategies(),
+                           dest='png_strategy',
+                           help='zlib compression strategy')
+    png_group.add_argument('--png-threads',
+                           type=int,
+                           default=1,
+                           dest='png_threads',
+                           help='compress blocks of the image data on this many threads (0 for all the processors)')
+    png_group.add_argument('--png-chunk-size',
+                           type=int,
+                           default=PNGOptions.CHUNK_SIZE,
+                           dest='png_chunk_size',
+                           help='split the image data into IDAT chunks of at most this many bytes')
+    png_group.add_argument('--png-palette',
+                           action='store_true',
+                           dest='png_palette',
+                           help='write indexed image with a palette of at most 256 colors')
+    png_group.add_argument('--optimize',
+                           action='store_true',
+                           dest='optimize',
+                           help='try filter, level and strategy combinations on all processors and keep the smallest')
+
+    jpeg_input_group = parser.add_argument_group('JPEG input options')
+    jpeg_input_group.add_argument('--decode-scale',
+                                  default=None,
+                                  choices=DecodeScale.get_available_scales(),
+                                  dest='decode_scale',
+                                  help='decode the image reduced from the lowest frequencies of its blocks, by default '
+                                       'the operation chooses it (thumbnail reduces the image, the others need 1)')
+
+    jpeg_group = parser.add_argument_group('JPEG output options')
+    jpeg_group.add_argument('--jpeg-quality',
+                            type=int,
+                            default=JPEGOptions().quality,
+                            choices=range(JPEGOptions.MIN_QUALITY, JPEGOptions.MAX_QUALITY + 1),
+                            metavar='{1..100}',
+                            dest='jpeg_quality',
+                            help='scale of the quantization tables from 1 (smallest) to 100 (best quality), the '
+                                 'lossless rotate90 and flip of JPEG input keep the tables of the input')
+    jpeg_group.add_argument('--jpeg-subsampling',
+                            default=JPEGOptions().subsampling.value,
+                            choices=ChromaSubsampling.get_available_subsamplings(),
+                            dest='jpeg_subsampling',
+                            help='resolution of the chroma relative to the luma')
+    jpeg_group.add_argument('--jpeg-optimize',
+                            action='store_true',
+                            dest='jpeg_optimize',
+                            help='code the image with its optimal Huffman tables instead of the typical ones')
+
     subparser = parser.add_subparsers(required=True,
+                                      parser_class=LazyParser,
                                       help='Command or operation to be performed on an image')
 
-    for operation_class in available_commands():
-        operation = operation_class()
-
-        operation_parser = subparser.add_parser(name=operation_class.name(),
-                                                help=operation_class.help())
-        operation_parser.set_defaults(func=prepare_command(operation))
+    for entry in available_commands():
+        subparser.add_parser(name=entry.name,
+                             help=entry.help,
+                             loader=partial(load_operation, entry))
 
-        operation_class.parser(operation_parser)
+    subparser.add_parser(name='info',
+                         help='Print format, size and depth of images read from their headers only',
+                         loader=load_info)
 
     return parser
 
 
-def prepare_command(command: IOperation) -> Callable[[Namespace], int]:
-    """Function that decorates the operation in order to provide input and output to it"""
-
-    def wrapper(args: Namespace) -> int:
-        with map_input(args.input) as input_source:
-            data_format = determine_format(input_source)
-
-            reader = get_reader_from_format(data_format)
-            writer = get_writer_from_format(data_format
-                                            if args.output_format is None
-                                            else KnownFormat.from_string(args.output_format))
-
-            input_arr = reader.read_format(input_source)
-        result = command(args, input_arr)
+def load_operation(entry: OperationEntry, parser: ArgumentParser) -> None:
+    """Imports the selected operation, adds its arguments and the command that runs it on the input"""
 
-        with map_output(args.output) as output_source:
-            writer.write_format(output_source, result)
+    from app.command.runner import prepare_command
 
-        return 0
+    operation_class = entry.load()
+    operation_class.parser(parser)
+    parser.set_defaults(func=prepare_command(operation_class()))
 
-    return wrapper
 
+def load_info(parser: ArgumentParser) -> None:
+    """Imports the info command and adds its arguments"""
 
-def available_commands():
-    """Function that returns all the supported commandline operations by the program"""
+    from app.command.info import info_command, info_parser
 
-    return [
-        Rotate90,
-        Identity,
-        Flip,
-        BGR2RGB,
-        Roll,
-        Grayscale,
-        HistogramEqualization,
-    ]
+    info_parser(parser)
+    parser.set_defaults(func=info_command)
@@ -0,0 +1,45 @@
+"""Module providing the static manifest of the commandline operations
+
+The subcommands are built from the names and the help messages of the manifest, the operation class is imported only
+when its subcommand is parsed. So --help and the jobs do not import NumPy and the operations that they do not run.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, final
+
+import app.operation
+
+if TYPE_CHECKING:
+    from app.operation.ioperation import IOperation
+
+
+@final
+@dataclass(slots=True, frozen=True)
+class OperationEntry:
+    """Manifest entry of one operation, the name and the help are the ones of its class"""
+
+    name: str
+    help: str
+    attribute: str
+
+    def load(self) -> type['IOperation']:
+        """Imports the module of the operation and returns its class"""
+
+        operation_class: type['IOperation'] = getattr(app.operation, self.attribute)
+        return operation_class
+
+
+def available_commands() -> list[OperationEntry]:
+    """Function that returns all the supported commandline operations by the program"""
+
+    return [
+        OperationEntry('rotate90', 'Perform 90 deg rotation', 'Rotate90'),
+        OperationEntry('identity', 'Perform no operation on the image', 'Identity'),
+        OperationEntry('flip', 'Flip image horizontal or vertically', 'Flip'),
+        OperationEntry('bgr2rgb', 'Converts the image from bgr to rgb', 'BGR2RGB'),
+        OperationEntry('roll', 'Perform data roll on given axes', 'Roll'),
+        OperationEntry('grayscale', 'Converts the image to grayscale', 'Grayscale'),
+        OperationEntry('histogram_equalization', 'Performs histogram equalization on the image',
+                       'HistogramEqualization'),
+        OperationEntry('thumbnail', 'Shrink the image to fit the size keeping its aspect ratio', 'Thumbnail'),
+    ]
@@ -0,0 +1,151 @@
+"""Module containing functions that run the selected operation on the input and write its output
+
+The animated PNG and the lossless JPEG paths import their codecs only when the input is of that format.
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import sys
+from argparse import Namespace
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO, Callable, Optional
+
+from app.command.io import map_input, map_output
+from app.image.image import Image
+from app.io.codec_options import DecodeScale
+from app.io.format_checker import reset_stream
+from app.io.format_factory import get_reader_from_format, get_writer_from_format, sniff_format
+from app.io.format_reader import IFormatReader
+from app.io.format_writer import IFormatWriter
+from app.io.known_format import KnownFormat
+from app.operation.ioperation import IOperation
+
+if TYPE_CHECKING:
+    from app.io.jpeg_transform import JPEGTransform
+
+
+def prepare_command(command: IOperation) -> Callable[[Namespace], int]:
+    """Function that decorates the operation in order to provide input and output to it"""
+
+    def wrapper(args: Namespace) -> int:
+        with map_input(args.input, args.output) as mapped_input:
+            data_format, input_source = sniff_format(mapped_input)
+            output_format = data_format if args.output_format is None else KnownFormat.from_string(args.output_format)
+
+            if data_format == output_format == KnownFormat.PNG and transform_animation(args, command, input_source):
+                return 0
+
+            transform = lossless_transform(args, command) if data_format == output_format == KnownFormat.JPEG else None
+            if transform is not None and transform_jpeg(args, transform, input_source):
+                return 0
+
+            reader = get_reader_from_format(data_format, args)
+            if data_format == KnownFormat.JPEG and args.decode_scale is None:
+                reader = get_scaled_reader(args, command, input_source)
+
+            writer = get_writer_from_format(output_format, args)
+
+            bmp_layout = (data_format == KnownFormat.BMP) != (output_format == KnownFormat.BMP)
+            write_result(args, command, reader, writer, input_source, bmp_layout)
+            if args.optimize and output_format == KnownFormat.PNG:
+                print_optimize_report(writer)
+
+        return 0
+
+    return wrapper
+
+
+def write_result(args: Namespace, command: IOperation, reader: IFormatReader, writer: IFormatWriter,
+                 input_source: BinaryIO, bmp_layout: bool = False) -> None:
+    """Applies the operation to the image read from the input and writes the result. The images are local to this
+    function, so the views of the memory mapped input are released before the input is closed. The bmp_layout flag
+    converts the bottom-up BGR rows of a bitmap to the top-down RGB rows of the other formats or back.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    result = command(args, reader.read_format(input_source))
+    if bmp_layout:
+        from app.io.bmp import swap_layout
+
+        result = Image(data=swap_layout(result.data))
+
+    with map_output(args.output) as output_source:
+        writer.write_format(output_source, result)
+
+
+def print_optimize_report(writer: IFormatWriter) -> None:
+    """Prints the options that the PNG optimizer chose, their image data size and the search time on stderr"""
+
+    from app.io.png import PNGWriter
+
+    if not isinstance(writer, PNGWriter) or writer.report is None:
+        return
+
+    report = writer.report
+    print(f'PNG optimize: filter={report.options.filter_selection.name.lower()} level={report.options.level} '
+          f'strategy={report.options.strategy.name.lower()} size={report.size} in {report.seconds:.2f} s',
+          file=sys.stderr)
+
+
+def transform_animation(args: Namespace, command: IOperation, input_source: BinaryIO) -> bool:
+    """Applies the operation to every frame of the animated PNG, the frames are decoded, transformed and written one by
+    one, so the memory does not depend on the number of frames. False means that the PNG is not animated.
+    """
+
+    from app.io.apng import APNGReader, APNGWriter, is_animated
+
+    if not is_animated(input_source):
+        return False
+
+    animation = APNGReader.from_args(args).read_animation(input_source)
+
+    with map_output(args.output) as output_source:
+        APNGWriter.from_args(args).write_animation(output_source, animation.map(partial(command, args)))
+
+    return True
+
+
+def get_scaled_reader(args: Namespace, command: IOperation, input_source: BinaryIO) -> IFormatReader:
+    """Returns the JPEG reader at the smallest scale that the operation allows for the image size in the header"""
+
+    from app.io.jpeg import JPEGProbe, JPEGReader
+
+    info = JPEGProbe().probe(input_source)
+    reset_stream(input_source)
+
+    return JPEGReader(scale=DecodeScale.from_reduction(command.reduction(args, info.width, info.height)))
+
+
+def lossless_transform(args: Namespace, command: IOperation) -> Optional['JPEGTransform']:
+    """Returns the transform of the JPEG coefficients equal to the operation, None if the operation needs samples"""
+
+    from app.io.jpeg_transform import JPEGTransform
+
+    # The names are compared, so the modules of the operations that are not run are not imported
+    match command.name():
+        case 'rotate90':
+            # The operation turns the top-down rows of the reader counterclockwise
+            return JPEGTransform.from_rotations(-args.rotations)
+
+        case 'flip':
+            return JPEGTransform.FLIP_HORIZONTAL if args.horizontal else JPEGTransform.FLIP_VERTICAL
+
+    return None
+
+
+def transform_jpeg(args: Namespace, transform: 'JPEGTransform', input_source: BinaryIO) -> bool:
+    """Rotates or flips the JPEG coefficients without decoding the samples, so no quality is lost. False means that
+    the mirrored sides are not whole MCUs, the input is rewound for the operation on the samples then.
+    """
+
+    from app.io.jpeg import JPEGReader, JPEGWriter
+
+    image = JPEGReader().read_coefficients(input_source)
+    if not transform.is_perfect(image.frame):
+        input_source.seek(0)
+        return False
+
+    with map_output(args.output) as output_source:
+        JPEGWriter.from_args(args).write_coefficients(output_source, transform.apply(image))
+
+    return True
@@ -4,8 +4,13 @@ import numpy as np
 import numpy.typing as npt
 
 
-def encode_jpeg(input_array: npt.NDArray[np.uint8]) -> bytes:   # pylint: disable=unused-argument
-    """Encodes the numpy array data as jpeg image. Returns bytes that form a jpeg image."""
+def encode_jpeg(input_array: npt.NDArray[np.uint8],     # pylint: disable=unused-argument
+                quality: int = 90,                      # pylint: disable=unused-argument
+                subsampling: str = '4:2:0',             # pylint: disable=unused-argument
+                optimized_huffman: bool = False) -> bytes:  # pylint: disable=unused-argument
+    """Encodes the numpy array data as jpeg image with the quality, the chroma subsampling ('4:4:4', '4:2:2' or
+    '4:2:0') and optionally the optimized Huffman tables. Returns bytes that form a jpeg image.
+    """
 
 
 def decode_jpeg(input_data: bytes) -> npt.NDArray[np.uint8]:    # pylint: disable=unused-argument
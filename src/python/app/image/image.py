@@ -12,3 +12,15 @@ class Image:
     """Class that stores the image object as a numpy array"""
 
     data: np.ndarray
+
+
+def has_16_bit_samples(data: np.ndarray) -> bool:
+    """Checks if the samples are 16-bit unsigned integers in either byte order, like the big-endian ones of PNM"""
+
+    return data.dtype.kind == 'u' and data.dtype.itemsize == 2
+
+
+def to_8_bit_samples(data: np.ndarray) -> np.ndarray:
+    """Keeps the high bytes of the 16-bit samples for the formats that store 8 bits only, other samples are unchanged"""
+
+    return (data >> 8).astype(np.uint8) if has_16_bit_samples(data) else data
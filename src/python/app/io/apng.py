@@ -0,0 +1,286 @@
+"""Module providing streaming of the animated PNG frames (https://wiki.mozilla.org/APNG_Specification)
+
+The frames are decoded lazily: the compressed data of a frame is inflated only when the frame is requested and it is
+composed in place on one canvas buffer, so the memory does not grow with the number of frames. The writer encodes and
+writes every frame as soon as it is produced, so the operations are applied to the animation one frame at a time.
+"""
+
+import itertools
+import os
+import struct
+from argparse import Namespace
+from collections.abc import Buffer, Callable, Iterable, Iterator
+from dataclasses import dataclass, replace
+from typing import final, BinaryIO, Optional
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image, has_16_bit_samples
+from app.io.codec_options import CRCVerification, PNGOptions
+from app.io.format_checker import reset_stream, rest_read_bytes
+from app.io.png import PNG, PNGSignature, PNGWriter, build_palette, decode_row_bands
+from app.io.png_chunks import ACTLData, BlendOp, ChunkType, DisposeOp, FCTLData, FDATData, IDATData, IENDData, \
+    IHDRData, PNGChunk
+
+
+@final
+@dataclass(slots=True, frozen=True)
+class AnimationFrame:
+    """Class that holds one frame of the animation with its delay of delay_numerator / delay_denominator seconds"""
+
+    image: Image
+    delay_numerator: int
+    delay_denominator: int
+
+
+@final
+@dataclass(slots=True)
+class Animation:
+    """Class that holds the animation control and the lazily produced frames"""
+
+    num_frames: int
+    num_plays: int
+    frames: Iterator[AnimationFrame]
+
+    def map(self, operation: Callable[[Image], Image]) -> 'Animation':
+        """Returns the animation whose frames are transformed by the operation when they are requested"""
+
+        return Animation(num_frames=self.num_frames,
+                         num_plays=self.num_plays,
+                         frames=(replace(frame, image=operation(frame.image)) for frame in self.frames))
+
+
+def is_animated(file: BinaryIO) -> bool:
+    """Checks if the acTL chunk precedes the image data, only the chunk headers are read and the stream is reset"""
+
+    try:
+        PNGSignature.from_bytes(rest_read_bytes(file, PNGSignature.SIGNATURE_LENGTH))
+        while len(header := file.read(PNGChunk.HEADER_LENGTH)) == PNGChunk.HEADER_LENGTH:
+            length, chunk_type = struct.unpack('>II', header)
+            if chunk_type in {ChunkType.acTL, ChunkType.IDAT}:
+                return chunk_type == ChunkType.acTL
+
+            file.seek(length + PNGChunk.CRC_LENGTH, os.SEEK_CUR)
+
+        return False
+    finally:
+        reset_stream(file)
+
+
+def split_frames(chunks: Iterable[PNGChunk]) -> Iterator[tuple[FCTLData, list[Buffer]]]:
+    """Yields the control and the compressed data parts of every frame. IDAT chunks belong to the first frame only if
+    they follow its fcTL chunk, otherwise the default image is not a part of the animation.
+    """
+
+    control: Optional[FCTLData] = None
+    compressed: list[Buffer] = []
+    sequence_number = 0
+
+    for chunk in chunks:
+        match chunk.chunk_type:
+            case ChunkType.fcTL | ChunkType.fdAT:
+                if chunk.chunk_data.sequence_number != sequence_number:
+                    raise InvalidFormatException(f'Wrong sequence number: {chunk.chunk_data.sequence_number} '
+                                                 f'instead of {sequence_number}')
+                sequence_number += 1
+
+                if chunk.chunk_type == ChunkType.fdAT:
+                    compressed.append(chunk.chunk_data.compressed_data)
+                    continue
+
+                if control is not None:
+                    yield control, compressed
+
+                control, compressed = chunk.chunk_data, []
+
+            case ChunkType.IDAT if control is not None:
+                compressed.append(chunk.chunk_data.compressed_data)
+
+    if control is not None:
+        yield control, compressed
+
+
+def to_rgba(pixels: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Returns the gray, gray with alpha, RGB or RGBA pixels as RGBA of the dtype"""
+
+    channels = pixels.shape[2]
+    result = np.empty((*pixels.shape[:2], 4), dtype=dtype)
+
+    result[:, :, :3] = pixels[:, :, :1] if channels <= 2 else pixels[:, :, :3]
+    result[:, :, 3] = pixels[:, :, -1] if channels in {2, 4} else np.iinfo(dtype).max
+
+    return result
+
+
+def blend_over(target: np.ndarray, source: np.ndarray) -> None:
+    """Composes the RGBA source over the RGBA target in place"""
+
+    maximum = np.iinfo(target.dtype).max
+    source_alpha = source[:, :, 3:].astype(np.float32) / maximum
+    target_alpha = target[:, :, 3:].astype(np.float32) / maximum * (1 - source_alpha)
+    alpha = source_alpha + target_alpha
+
+    # Fully transparent pixels of both images stay transparent black instead of dividing by zero
+    color = (source[:, :, :3] * source_alpha + target[:, :, :3] * target_alpha) / np.maximum(alpha, 1e-6)
+    target[:, :, :3] = np.rint(color)
+    target[:, :, 3:] = np.rint(alpha * maximum)
+
+
+def compose_frames(png: PNG) -> Iterator[AnimationFrame]:
+    """Yields the RGBA frames composed on the canvas. The frames share the canvas buffer, so the data of a frame has to
+    be copied to be kept after the next frame is requested.
+    """
+
+    i_header = png.i_header.chunk_data
+    palette = build_palette(png.chunks)
+
+    dtype = np.dtype(np.uint16 if i_header.bit_depth == 16 else np.uint8)
+    canvas = np.zeros((i_header.height, i_header.width, 4), dtype=dtype)
+
+    for control, compressed in split_frames(png.chunks):
+        if control.x_offset + control.width > i_header.width or control.y_offset + control.height > i_header.height:
+            raise InvalidFormatException(f'Frame {control.sequence_number} is outside of the canvas')
+
+        columns = slice(control.x_offset, control.x_offset + control.width)
+        region = canvas[control.y_offset:control.y_offset + control.height, columns]
+        previous = region.copy() if control.dispose_op == DisposeOp.PREVIOUS else None
+
+        row = 0
+        frame_header = replace(i_header, width=control.width, height=control.height)
+        for band in decode_row_bands(frame_header, compressed, palette=palette):
+            if control.blend_op == BlendOp.OVER:
+                blend_over(region[row:row + len(band)], to_rgba(band, dtype))
+            else:
+                region[row:row + len(band)] = to_rgba(band, dtype)
+
+            row += len(band)
+
+        yield AnimationFrame(image=Image(data=canvas),
+                             delay_numerator=control.delay_numerator,
+                             delay_denominator=control.delay_denominator)
+
+        match control.dispose_op:
+            case DisposeOp.BACKGROUND:
+                region[:] = 0
+
+            case DisposeOp.PREVIOUS:
+                region[:] = previous
+
+
+@final
+class APNGReader:   # pylint: disable=too-few-public-methods
+    """Class that deserializes the animated PNG to the lazily decoded frames"""
+
+    def __init__(self, verification: CRCVerification = CRCVerification.STRICT) -> None:
+        self.verification = verification
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'APNGReader':
+        """Additional constructor that takes the reader options from the commandline arguments"""
+
+        return cls(verification=CRCVerification.from_string(args.png_crc))
+
+    def read_animation(self, file: BinaryIO) -> Animation:
+        """Parses the chunks without inflating them, the frames are decoded when they are iterated"""
+
+        png = PNG.from_file(file, self.verification)
+
+        control = next((x.chunk_data for x in png.chunks if x.chunk_type == ChunkType.acTL), None)
+        if control is None:
+            raise InvalidFormatException('Missing acTL chunk')
+
+        return Animation(num_frames=control.num_frames,
+                         num_plays=control.num_plays,
+                         frames=compose_frames(png))
+
+
+def animation_header(data: np.ndarray) -> IHDRData:
+    """Returns the header of the frames shaped like the data, all the frames share its color type and bit depth"""
+
+    color_types = {
+        1: IHDRData.GRAYSCALE_COLOR_TYPE,
+        2: IHDRData.GRAYSCALE_ALPHA_COLOR_TYPE,
+        3: IHDRData.TRUECOLOR_COLOR_TYPE,
+        4: IHDRData.TRUECOLOR_ALPHA_COLOR_TYPE,
+    }
+
+    height, width, channels = data.shape
+    return IHDRData(width=width,
+                    height=height,
+                    bit_depth=16 if has_16_bit_samples(data) else 8,
+                    color_type=color_types[channels],
+                    compression_method=IHDRData.DEFLATE_COMPRESSION,
+                    filter_method=IHDRData.FILTER_METHOD,
+                    interlace_method=IHDRData.WITH_NO_INTERLACE)
+
+
+@final
+class APNGWriter:   # pylint: disable=too-few-public-methods
+    """Class that serializes the animation to the animated PNG. Every frame covers the whole canvas and is encoded and
+    written as soon as it is produced, the palette option does not apply to the frames.
+    """
+
+    def __init__(self, options: PNGOptions = PNGOptions()) -> None:
+        self.options = options
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'APNGWriter':
+        """Additional constructor that takes the writer options from the commandline arguments"""
+
+        return cls(options=PNGWriter.from_args(args).options)
+
+    def write_animation(self, file: BinaryIO, animation: Animation) -> None:
+        """Writes the frames one at a time, the first frame is the default image stored in the IDAT chunks. The number
+        of frames is checked against the acTL chunk before any frame past it and before the IEND chunk are written, so
+        the wrong animation is never written as the complete PNG.
+        """
+
+        frames = iter(animation.frames)
+        first = next(frames, None)
+        if first is None:
+            raise InvalidFormatException('Animation has no frames')
+
+        i_header = animation_header(first.image.data)
+        file.write(bytes(PNGSignature.from_default()))
+        PNGChunk.from_chunk(i_header).to_file(file)
+        PNGChunk.from_chunk(ACTLData(num_frames=animation.num_frames, num_plays=animation.num_plays)).to_file(file)
+
+        sequence_number = 0
+        frames_count = 0
+        for frame in itertools.chain([first], frames):
+            if frames_count == animation.num_frames:
+                raise InvalidFormatException(f'Wrong number of frames: more than {animation.num_frames}')
+
+            if animation_header(frame.image.data) != i_header:
+                raise InvalidFormatException(f'Frame {frames_count} does not match the first frame: '
+                                             f'{frame.image.data.shape}, {frame.image.data.dtype}')
+
+            PNGChunk.from_chunk(FCTLData(sequence_number=sequence_number,
+                                         width=i_header.width,
+                                         height=i_header.height,
+                                         x_offset=0,
+                                         y_offset=0,
+                                         delay_numerator=frame.delay_numerator,
+                                         delay_denominator=frame.delay_denominator,
+                                         dispose_op=DisposeOp.NONE,
+                                         blend_op=BlendOp.SOURCE)).to_file(file)
+            sequence_number += 1
+
+            image_data = IDATData.from_rows(i_header.pack_samples(frame.image.data),
+                                            i_header.get_bytes_per_pixel(),
+                                            self.options)
+            for part in image_data.split(self.options.chunk_size):
+                if frames_count == 0:
+                    PNGChunk.from_chunk(part).to_file(file)
+                else:
+                    PNGChunk.from_chunk(FDATData(sequence_number=sequence_number,
+                                                 compressed_data=part.compressed_data)).to_file(file)
+                    sequence_number += 1
+
+            frames_count += 1
+
+        if frames_count != animation.num_frames:
+            raise InvalidFormatException(f'Wrong number of frames: {frames_count} instead of {animation.num_frames}')
+
+        PNGChunk.from_chunk(IENDData()).to_file(file)
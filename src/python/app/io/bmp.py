@@ -1,40 +1,41 @@
 """Module providing serialization and deserialization for BMP format (https://en.wikipedia.org/wiki/BMP_file_format)"""
 
 import struct
-from collections.abc import Sized
+from collections.abc import Buffer, Sized
 from enum import IntEnum
+from argparse import Namespace
 from typing import final, BinaryIO, override, ClassVar, Optional, Final
 from dataclasses import dataclass, field, astuple
 
 import numpy as np
 
 from app.error.invalid_format_exception import InvalidFormatException
-from app.image.image import Image
-from app.io.format_checker import IFormatChecker, check_compare
+from app.image.image import Image, to_8_bit_samples
+from app.io.bmp_rle import decode_rle, encode_rle8
+from app.io.format_probe import IFormatProbe, ImageInfo
 from app.io.known_format import KnownFormat
-from app.io.format_reader import IFormatReader
+from app.io.format_reader import IFormatReader, read_buffer
 from app.io.format_writer import IFormatWriter
 
 
-def compute_padding(width: int) -> int:
+def compute_padding(width: int, bytes_per_pixel: int = 3) -> int:
     """Computes the number of bytes that need to be added to end of the image row"""
 
     windows_32_dword_len: Final = 4
 
-    return (windows_32_dword_len - (((windows_32_dword_len - 1) * width) % windows_32_dword_len)) % windows_32_dword_len
+    return (windows_32_dword_len - ((bytes_per_pixel * width) % windows_32_dword_len)) % windows_32_dword_len
 
 
-@final
-class BMPChecker(IFormatChecker):
-    """Class that checks if the BMP signature is present"""
+def swap_layout(data: np.ndarray) -> np.ndarray:
+    """Converts between the bottom-up BGR rows of the bitmaps and the top-down RGB rows of the other formats. The
+    conversion is its own inverse, the alpha stays the last channel.
+    """
 
-    @override
-    def check_format(self, file: BinaryIO) -> bool:
-        return check_compare(file, '424D')
+    rows = data[::-1]
+    if data.shape[2] < 3:
+        return rows
 
-    @override
-    def type(self) -> KnownFormat:
-        return KnownFormat.BMP
+    return rows[:, :, ::-1] if data.shape[2] == 3 else rows[:, :, [2, 1, 0, *range(3, data.shape[2])]]
 
 
 class DIBHeaderType(IntEnum):
@@ -97,14 +98,14 @@ class BitmapFileHeader(Sized):
         return cls(*struct.unpack('<HIHHI', data))
 
     @classmethod
-    def from_default(cls, dib_size: int, image_data_size: int) -> 'BitmapFileHeader':
+    def from_default(cls, dib_size: int, image_data_size: int, color_table_size: int = 0) -> 'BitmapFileHeader':
         """Additional constructor that create the BMP header with correct file length"""
 
         return cls(signature=Signature.BM.value,
-                   file_size=cls.HEADER_LENGTH + dib_size + image_data_size,
+                   file_size=cls.HEADER_LENGTH + dib_size + color_table_size + image_data_size,
                    reserved_1=0,
                    reserved_2=0,
-                   file_offset_to_pixel_array=cls.HEADER_LENGTH + dib_size)
+                   file_offset_to_pixel_array=cls.HEADER_LENGTH + dib_size + color_table_size)
 
     def __post_init__(self) -> None:
         if self.signature not in set(e.value for e in Signature):
@@ -123,6 +124,76 @@ class BitmapFileHeader(Sized):
         return self.HEADER_LENGTH
 
 
+def extract_channel(pixels: np.ndarray, mask: int) -> np.ndarray:
+    """Extracts the masked bits of 16 or 32-bit pixels and scales them to the full 8-bit range"""
+
+    shift = (mask & -mask).bit_length() - 1
+    max_value = mask >> shift
+    values = (pixels & mask) >> shift
+
+    if max_value == np.iinfo(np.uint8).max:
+        return values.astype(np.uint8)
+
+    if max_value > np.iinfo(np.uint8).max:
+        return (values >> (max_value.bit_length() - 8)).astype(np.uint8)
+
+    return ((values.astype(np.uint32) * np.iinfo(np.uint8).max + max_value // 2) // max_value).astype(np.uint8)
+
+
+@dataclass(slots=True, frozen=True)
+class DIBBitfieldsHeader(Sized):
+    """Class that represents the channel masks of the BMP file DIB V2, V3, V4 and V5 headers.
+
+    Fields that follow the masks in V4 and V5 headers (color space, gamma, ICC profile) are kept as raw bytes.
+    """
+
+    RGB_MASKS_LENGTH_BYTES: ClassVar[int] = 12
+    ALPHA_MASK_LENGTH_BYTES: ClassVar[int] = 4
+
+    red_mask: int
+    green_mask: int
+    blue_mask: int
+    alpha_mask: Optional[int] = field(default=None)
+    color_space: bytes = field(default=b'')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DIBBitfieldsHeader':
+        """Additional constructor that allows to create this class object from the raw bytes"""
+
+        if len(data) < cls.RGB_MASKS_LENGTH_BYTES:
+            raise InvalidFormatException(f'Channel masks too short: {len(data)}')
+
+        red_mask, green_mask, blue_mask = struct.unpack_from('<III', data)
+        if len(data) < cls.RGB_MASKS_LENGTH_BYTES + cls.ALPHA_MASK_LENGTH_BYTES:
+            return cls(red_mask=red_mask,
+                       green_mask=green_mask,
+                       blue_mask=blue_mask)
+
+        alpha_mask, = struct.unpack_from('<I', data, cls.RGB_MASKS_LENGTH_BYTES)
+        return cls(red_mask=red_mask,
+                   green_mask=green_mask,
+                   blue_mask=blue_mask,
+                   alpha_mask=alpha_mask,
+                   color_space=data[cls.RGB_MASKS_LENGTH_BYTES + cls.ALPHA_MASK_LENGTH_BYTES:])
+
+    def __post_init__(self) -> None:
+        if self.alpha_mask is None and len(self.color_space) != 0:
+            raise InvalidFormatException('Color space fields require the alpha mask')
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('<III', self.red_mask, self.green_mask, self.blue_mask)\
+            + (b'' if self.alpha_mask is None else struct.pack('<I', self.alpha_mask) + self.color_space)
+
+    def __len__(self) -> int:
+        return self.RGB_MASKS_LENGTH_BYTES \
+            + (0 if self.alpha_mask is None else self.ALPHA_MASK_LENGTH_BYTES + len(self.color_space))
+
+    def get_masks(self) -> tuple[int, int, int, int]:
+        """Returns red, green, blue and alpha masks, the alpha mask is 0 if the header does not declare it"""
+
+        return self.red_mask, self.green_mask, self.blue_mask, 0 if self.alpha_mask is None else self.alpha_mask
+
+
 @dataclass(slots=True, frozen=True)
 class DIBInfoHeader(Sized):
     """Class that represents BMP file DIB Info header specific fields"""
@@ -135,9 +206,10 @@ class DIBInfoHeader(Sized):
     y_pixels_in_meters: int
     colors_in_color_table: int
     important_color_count: int
+    bitfields_header: Optional[DIBBitfieldsHeader] = field(default=None)
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> 'DIBInfoHeader':
+    def from_bytes(cls, data: bytes, bitfields_header: Optional[DIBBitfieldsHeader] = None) -> 'DIBInfoHeader':
         """Additional constructor for the class to create the object from the raw bytes"""
 
         compression, image_size, x_pixels_in_meters, y_pixels_in_meters, colors_in_color_table, important_color_count =\
@@ -148,17 +220,21 @@ class DIBInfoHeader(Sized):
                    x_pixels_in_meters=x_pixels_in_meters,
                    y_pixels_in_meters=y_pixels_in_meters,
                    colors_in_color_table=colors_in_color_table,
-                   important_color_count=important_color_count)
+                   important_color_count=important_color_count,
+                   bitfields_header=bitfields_header)
 
     @classmethod
-    def from_default(cls) -> 'DIBInfoHeader':
+    def from_default(cls,
+                     colors_in_color_table: int = 0,
+                     compression: CompressionMethod = CompressionMethod.BI_RGB,
+                     image_size: int = 1) -> 'DIBInfoHeader':
         """Additional constructor for the class to create the object with default values"""
 
-        return cls(compression=CompressionMethod.BI_RGB.value,
-                   image_size=1,
+        return cls(compression=compression.value,
+                   image_size=image_size,
                    x_pixels_in_meters=200,
                    y_pixels_in_meters=200,
-                   colors_in_color_table=0,
+                   colors_in_color_table=colors_in_color_table,
                    important_color_count=0)
 
     def __post_init__(self) -> None:
@@ -187,10 +263,11 @@ class DIBInfoHeader(Sized):
                            self.x_pixels_in_meters,
                            self.y_pixels_in_meters,
                            self.colors_in_color_table,
-                           self.important_color_count)
+                           self.important_color_count)\
+            + (b'' if self.bitfields_header is None else bytes(self.bitfields_header))
 
     def __len__(self) -> int:
-        return self.BASE_LENGTH_BYTES
+        return self.BASE_LENGTH_BYTES + (0 if self.bitfields_header is None else len(self.bitfields_header))
 
 
 @dataclass(slots=True, frozen=True)
@@ -213,12 +290,16 @@ class DIBOS22Header(Sized):
                    info_header=info_header)
 
     @classmethod
-    def from_default(cls) -> 'DIBOS22Header':
+    def from_default(cls,
+                     bits_per_pixel: int = 24,
+                     colors_in_color_table: int = 0,
+                     compression: CompressionMethod = CompressionMethod.BI_RGB,
+                     image_size: int = 1) -> 'DIBOS22Header':
         """Additional constructor that allows to create this class object using default initialisation"""
 
         return DIBOS22Header(planes=1,
-                             bits_per_pixel=24,
-                             info_header=DIBInfoHeader.from_default())
+                             bits_per_pixel=bits_per_pixel,
+                             info_header=DIBInfoHeader.from_default(colors_in_color_table, compression, image_size))
 
     def __post_init__(self) -> None:
         if self.planes != 1:
@@ -241,6 +322,11 @@ class DIBCoreHeader(Sized):
 
     HEADER_SIZE_LEN: ClassVar[int] = 4
     BASE_LENGTH_BYTES: ClassVar[int] = 12
+    TOP_DOWN_COMPRESSIONS: ClassVar[frozenset[int]] = frozenset({CompressionMethod.BI_RGB.value,
+                                                                 CompressionMethod.BI_BITFIELDS.value,
+                                                                 CompressionMethod.BI_ALPHA_BITFIELDS.value})
+    BITFIELDS_COMPRESSIONS: ClassVar[dict[int, int]] = {CompressionMethod.BI_BITFIELDS.value: 3,
+                                                        CompressionMethod.BI_ALPHA_BITFIELDS.value: 4}
 
     dib_header_size: int
     image_width: int
@@ -269,17 +355,27 @@ class DIBCoreHeader(Sized):
                            image_height=image_height,
                            os22_header=DIBOS22Header.from_bytes(file.read(DIBOS22Header.BASE_LENGTH_BYTES)))
 
-            case DIBHeaderType.BITMAP_INFO_HEADER.value:
+            case (DIBHeaderType.BITMAP_INFO_HEADER.value
+                  | DIBHeaderType.BITMAP_V2_INFO_HEADER.value
+                  | DIBHeaderType.BITMAP_V3_INFO_HEADER.value
+                  | DIBHeaderType.BITMAP_V4_HEADER.value
+                  | DIBHeaderType.BITMAP_V5_HEADER.value):
                 image_width, image_height = struct.unpack('ii', dib_header_no_size)
                 os_22_header_raw_data = file.read(DIBOS22Header.BASE_LENGTH_BYTES)
                 info_header_raw_bytes = file.read(DIBInfoHeader.BASE_LENGTH_BYTES)
+                bitfields_header_raw_bytes = file.read(dib_header_size - DIBHeaderType.BITMAP_INFO_HEADER.value)
+
+                bitfields_header = None \
+                    if dib_header_size == DIBHeaderType.BITMAP_INFO_HEADER.value \
+                    else DIBBitfieldsHeader.from_bytes(bitfields_header_raw_bytes)
 
                 return cls(dib_header_size=dib_header_size,
                            image_width=image_width,
                            image_height=image_height,
                            os22_header=DIBOS22Header.from_bytes(os_22_header_raw_data,
                                                                 info_header=DIBInfoHeader.from_bytes(
-                                                                    info_header_raw_bytes)))
+                                                                    info_header_raw_bytes,
+                                                                    bitfields_header=bitfields_header)))
 
         raise InvalidFormatException('Invalid Format')
 
@@ -297,7 +393,10 @@ class DIBCoreHeader(Sized):
         if self.image_width <= 0:
             raise InvalidFormatException(f'Wrong: {self.image_width=}')
 
-        if self.image_height <= 0:
+        if self.image_height == 0:
+            raise InvalidFormatException(f'Wrong: {self.image_height=}')
+
+        if self.image_height < 0 and self.get_compression() not in self.TOP_DOWN_COMPRESSIONS:
             raise InvalidFormatException(f'Wrong: {self.image_height=}')
 
     def get_bits_per_pixel(self) -> int:
@@ -305,15 +404,90 @@ class DIBCoreHeader(Sized):
 
         return 24 if self.os22_header is None else self.os22_header.bits_per_pixel
 
+    def get_compression(self) -> Optional[int]:
+        """Getter for the compression method, returns None if the header is too short to declare it"""
+
+        if self.os22_header is None or self.os22_header.info_header is None:
+            return None
+
+        return self.os22_header.info_header.compression
+
+    def get_color_table_entries(self) -> int:
+        """Returns the number of color table entries, indexed bitmaps default to the full table for their depth"""
+
+        bits_per_pixel = self.get_bits_per_pixel()
+        colors_in_color_table = 0 \
+            if self.os22_header is None or self.os22_header.info_header is None \
+            else self.os22_header.info_header.colors_in_color_table
+
+        if colors_in_color_table == 0 and bits_per_pixel <= 8:
+            return 1 << bits_per_pixel
+
+        return colors_in_color_table
+
+    def get_channel_masks(self) -> Optional[tuple[int, int, int, int]]:
+        """Returns red, green, blue and alpha masks declared by V2 and later headers, None for shorter headers"""
+
+        if self.os22_header is None \
+                or self.os22_header.info_header is None \
+                or self.os22_header.info_header.bitfields_header is None:
+            return None
+
+        return self.os22_header.info_header.bitfields_header.get_masks()
+
+    def get_channels(self) -> int:
+        """Returns the number of channels of the decoded pixels, only 32-bit bitmaps with alpha have four of them"""
+
+        compression = self.get_compression()
+        if compression not in self.BITFIELDS_COMPRESSIONS or self.get_bits_per_pixel() <= 8:
+            return 4 if self.get_bits_per_pixel() == 32 else 3
+
+        masks = self.get_channel_masks()
+        if masks is None:
+            return self.BITFIELDS_COMPRESSIONS[compression]
+
+        return 3 if masks[3] == 0 else 4
+
+    def get_color_table_size(self) -> int:
+        """Returns the number of bytes between the DIB header and the pixel array that hold the color table.
+
+        BITMAP_INFO_HEADER bitfields bitmaps store their 3 or 4 channel masks in place of the color table.
+        """
+
+        if self.get_bits_per_pixel() <= 8:
+            return self.get_color_table_entries() * self.get_color_table_entry_size()
+
+        compression = self.get_compression()
+        if compression in self.BITFIELDS_COMPRESSIONS and self.get_channel_masks() is None:
+            return self.BITFIELDS_COMPRESSIONS[compression] * DIBBitfieldsHeader.ALPHA_MASK_LENGTH_BYTES
+
+        return 0
+
+    def get_color_table_entry_size(self) -> int:
+        """Returns the length of one color table entry, OS/2 core headers store BGR triples instead of BGR0 quads"""
+
+        return 3 if self.dib_header_size == DIBHeaderType.BITMAP_CORE_HEADER.value else 4
+
+    def is_top_down(self) -> bool:
+        """Returns True if the rows are stored starting from the top of the image (negative height)"""
+
+        return self.image_height < 0
+
 
 @dataclass(slots=True)
 class BMP:
     """Class that represents the BMP file in a structured way"""
 
+    DEFAULT_CHANNEL_MASKS: ClassVar[dict[int, tuple[int, int, int, int]]] = {
+        16: (0x7C00, 0x03E0, 0x001F, 0),
+        32: (0x00FF0000, 0x0000FF00, 0x000000FF, 0),
+    }
+    BYTE_ALIGNED_CHANNEL_MASKS: ClassVar[tuple[int, int, int, int]] = (0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000)
+
     header: BitmapFileHeader
     dib_header: DIBCoreHeader
     color_table: Optional[bytes]
-    image_data: bytes
+    image_data: Buffer
 
     @classmethod
     def from_bytes(cls, file: BinaryIO) -> 'BMP':
@@ -322,64 +496,231 @@ class BMP:
         header = BitmapFileHeader.from_bytes(data=file.read(BitmapFileHeader.HEADER_LENGTH))
         dib_header = DIBCoreHeader.from_bytes(file)
 
+        gap_size = header.file_offset_to_pixel_array - BitmapFileHeader.HEADER_LENGTH - len(dib_header)
+        if gap_size < 0:
+            raise InvalidFormatException(f'Pixel array overlaps the headers: {header.file_offset_to_pixel_array=}')
+
+        color_table_size = dib_header.get_color_table_size()
+        if color_table_size > gap_size:
+            raise InvalidFormatException(f'Color table does not fit before the pixel array: {color_table_size}')
+
+        gap = file.read(gap_size)
+
         return cls(header=header,
                    dib_header=dib_header,
-                   color_table=None,
-                   image_data=file.read(header.file_size - header.file_offset_to_pixel_array))
+                   color_table=None if color_table_size == 0 else gap[:color_table_size],
+                   image_data=read_buffer(file, header.file_size - header.file_offset_to_pixel_array))
 
     @classmethod
-    def from_ndarray(cls, data: np.ndarray) -> 'BMP':
-        """Additional constructor that allows to create this class object from numpy array"""
+    def from_ndarray(cls, data: np.ndarray, palette: bool = False, rle: bool = False) -> 'BMP':
+        """Additional constructor that allows to create this class object from numpy array.
 
-        image_height, image_width, _ = data.shape
-        padding = compute_padding(image_width)
+        Single channel images and images with palette flag are stored as 8-bit indices to the color table. The rle flag
+        implies the palette and additionally compresses the indices with BI_RLE8.
+        """
 
-        image_data = bytearray()
-        for i in range(image_height):
-            image_data += data[i].tobytes() + bytes([0] * padding)
+        image_height, image_width, _ = data.shape
 
-        os22_header = DIBOS22Header.from_default()
+        color_table: Optional[bytes] = None
+        pixels = data
+        if palette or rle or data.shape[-1] == 1:
+            pixels, color_table_entries = cls.build_color_table(data)
+            color_table = np.pad(color_table_entries, ((0, 0), (0, 1))).tobytes()
+
+        bytes_per_pixel = pixels.shape[-1]
+        padding = compute_padding(image_width, bytes_per_pixel)
+
+        image_data: np.ndarray
+        if rle:
+            image_data = encode_rle8(pixels[:, :, 0])
+        elif padding == 0:
+            image_data = np.ascontiguousarray(pixels, dtype=np.uint8)
+        else:
+            image_data = np.zeros((image_height, image_width * bytes_per_pixel + padding), dtype=np.uint8)
+            image_data[:, :image_width * bytes_per_pixel].reshape(image_height, image_width, bytes_per_pixel)[...] = \
+                pixels
+
+        os22_header = DIBOS22Header.from_default(bits_per_pixel=8 * bytes_per_pixel,
+                                                 colors_in_color_table=0 if color_table is None
+                                                 else len(color_table) // 4,
+                                                 compression=CompressionMethod.BI_RLE8 if rle
+                                                 else CompressionMethod.BI_RGB,
+                                                 image_size=image_data.nbytes if rle else 1)
         dib_header = DIBCoreHeader(dib_header_size=DIBCoreHeader.BASE_LENGTH_BYTES + len(os22_header),
                                    image_width=image_width,
                                    image_height=image_height,
                                    os22_header=os22_header)
         header = BitmapFileHeader.from_default(dib_size=len(dib_header),
-                                               image_data_size=len(image_data))
+                                               image_data_size=image_data.nbytes,
+                                               color_table_size=0 if color_table is None else len(color_table))
 
         return cls(header=header,
                    dib_header=dib_header,
-                   color_table=None,
+                   color_table=color_table,
                    image_data=image_data)
 
-    def to_numpy(self) -> np.ndarray:
-        """Converter to a numpy array from a bitmap data"""
+    @staticmethod
+    def build_color_table(data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Maps the pixels to the indices of a color table with at most 256 BGR entries. Returns (indices, entries)"""
+
+        max_colors: Final = 256
+
+        if data.shape[-1] == 1 or np.all(data[:, :, 1:3] == data[:, :, :1]):
+            gray_ramp = np.arange(max_colors, dtype=np.uint8)
+            return data[:, :, :1], np.repeat(gray_ramp[:, np.newaxis], 3, axis=1)
+
+        channels = data[:, :, :3].astype(np.uint32)
+        packed_colors = channels[:, :, 0] | (channels[:, :, 1] << 8) | (channels[:, :, 2] << 16)
+        colors, indices = np.unique(packed_colors, return_inverse=True)
+
+        if len(colors) > max_colors:
+            raise InvalidFormatException(f'Too many colors for a color table: {len(colors)} > {max_colors}')
+
+        entries = np.stack((colors, colors >> 8, colors >> 16), axis=-1).astype(np.uint8)
+        return indices.reshape(data.shape[0], data.shape[1], 1).astype(np.uint8), entries
+
+    def to_numpy(self, contiguous: bool = False) -> np.ndarray:
+        """Converter to a numpy array from a bitmap data.
+
+        The result is a strided view over the pixel buffer, so the row padding is skipped without copying. Rows are
+        always returned in the bottom-up order, top-down bitmaps are reversed with a negative row stride. When
+        contiguous result is requested, the view is copied exactly once. Indexed bitmaps are expanded with a single
+        gather from the color table.
+        """
 
         width = self.dib_header.image_width
-        height = self.dib_header.image_height
+        height = abs(self.dib_header.image_height)
         bits_per_pixel = self.dib_header.get_bits_per_pixel()
 
-        padding = self.get_padding()
-        row_size = self.get_row_size()
+        match self.dib_header.get_compression():
+            case CompressionMethod.BI_RLE8 | CompressionMethod.BI_RLE4:
+                indices = decode_rle(self.image_data, width, height, bits_per_pixel)
+                return np.take(self.get_color_table(), indices, axis=0, mode='clip')
+
+            case (None
+                  | CompressionMethod.BI_RGB
+                  | CompressionMethod.BI_BITFIELDS
+                  | CompressionMethod.BI_ALPHA_BITFIELDS):
+                pass
+
+            case compression:
+                raise InvalidFormatException(f'Unsupported compression method: {CompressionMethod(compression).name}')
 
-        image_bytes = bytearray()
-        for height_idx in range(height):
-            image_bytes += self.image_data[height_idx * row_size: ((height_idx + 1) * row_size) - padding]
+        rows = self.get_pixel_rows()
+        if bits_per_pixel <= 8:
+            return np.take(self.get_color_table(), self.to_indices(rows), axis=0, mode='clip')
+
+        if bits_per_pixel == 16 or self.dib_header.get_compression() in DIBCoreHeader.BITFIELDS_COMPRESSIONS:
+            return self.unpack_bitfields(rows, contiguous)
 
         num_colors_end = bits_per_pixel // 8
-        return np.frombuffer(bytes(image_bytes),
-                             dtype=np.uint8).reshape(height, width, num_colors_end)
+        pixels = rows[:, :width * num_colors_end].reshape(height, width, num_colors_end)
+
+        return np.ascontiguousarray(pixels) if contiguous else pixels
+
+    def unpack_bitfields(self, rows: np.ndarray, contiguous: bool = False) -> np.ndarray:
+        """Unpacks 16 or 32-bit pixels to BGR channels, or BGRA if the alpha mask is present.
+
+        Channels are masked and shifted out of the whole pixel array at once. 32-bit pixels with byte aligned masks are
+        returned as a view over the pixel buffer instead.
+        """
+
+        width = self.dib_header.image_width
+        bits_per_pixel = self.dib_header.get_bits_per_pixel()
+
+        red_mask, green_mask, blue_mask, alpha_mask = self.get_channel_masks()
+        channel_masks = (blue_mask, green_mask, red_mask) if alpha_mask == 0 \
+            else (blue_mask, green_mask, red_mask, alpha_mask)
+
+        if bits_per_pixel == 32 and channel_masks == self.BYTE_ALIGNED_CHANNEL_MASKS[:len(channel_masks)]:
+            pixels = rows[:, :width * 4].reshape(rows.shape[0], width, 4)[:, :, :len(channel_masks)]
+            return np.ascontiguousarray(pixels) if contiguous else pixels
+
+        packed = rows[:, :width * bits_per_pixel // 8].view('<u2' if bits_per_pixel == 16 else '<u4')
+        return np.stack([extract_channel(packed, mask) for mask in channel_masks], axis=-1)
+
+    def get_channel_masks(self) -> tuple[int, int, int, int]:
+        """Returns red, green, blue and alpha masks of 16 or 32-bit pixels, the alpha mask is 0 if there is no alpha"""
+
+        bits_per_pixel = self.dib_header.get_bits_per_pixel()
+        if bits_per_pixel not in self.DEFAULT_CHANNEL_MASKS:
+            raise InvalidFormatException(f'Channel masks require 16 or 32 bits per pixel, got: {bits_per_pixel}')
+
+        masks = self.dib_header.get_channel_masks()
+        if self.dib_header.get_compression() not in DIBCoreHeader.BITFIELDS_COMPRESSIONS:
+            masks = self.DEFAULT_CHANNEL_MASKS[bits_per_pixel]
+
+        elif masks is None:
+            if self.color_table is None:
+                raise InvalidFormatException('Bitfields bitmap without channel masks')
+
+            masks_count = len(self.color_table) // DIBBitfieldsHeader.ALPHA_MASK_LENGTH_BYTES
+            red_mask, green_mask, blue_mask, *alpha_mask = struct.unpack(f'<{masks_count}I', self.color_table)
+            masks = red_mask, green_mask, blue_mask, 0 if len(alpha_mask) == 0 else alpha_mask[0]
+
+        if 0 in masks[:3] or any(mask >> bits_per_pixel != 0 for mask in masks):
+            raise InvalidFormatException(f'Wrong channel masks: {masks}')
+
+        return masks
+
+    def get_pixel_rows(self) -> np.ndarray:
+        """Returns the padded rows of the pixel array as a strided view in the bottom-up order"""
+
+        height = abs(self.dib_header.image_height)
+        row_size = self.get_row_size()
+
+        image_data_size = memoryview(self.image_data).nbytes
+        if image_data_size < row_size * height:
+            raise InvalidFormatException(f'Pixel array too short: {image_data_size} < {row_size * height}')
+
+        # The array keeps the buffer export of the memory mapped input, so the mapping cannot be closed under it
+        rows = np.frombuffer(self.image_data, dtype=np.uint8, count=row_size * height).reshape(height, row_size)
+
+        return rows[::-1] if self.dib_header.is_top_down() else rows
+
+    def to_indices(self, rows: np.ndarray) -> np.ndarray:
+        """Unpacks the 1, 2, 4 or 8-bit color table indices from the padded pixel rows"""
+
+        width = self.dib_header.image_width
+        bits_per_pixel = self.dib_header.get_bits_per_pixel()
+
+        if bits_per_pixel == 8:
+            return rows[:, :width]
+
+        bits = np.unpackbits(rows, axis=1).reshape((rows.shape[0], -1, bits_per_pixel))
+        return np.packbits(bits[:, :width], axis=-1)[:, :, 0] >> (8 - bits_per_pixel)
+
+    def get_color_table(self) -> np.ndarray:
+        """Returns the color table as an array of BGR entries"""
+
+        if self.color_table is None:
+            raise InvalidFormatException('Indexed bitmap without a color table')
+
+        entry_size = self.dib_header.get_color_table_entry_size()
+        return np.frombuffer(self.color_table, dtype=np.uint8).reshape(-1, entry_size)[:, :3]
 
     def __bytes__(self) -> bytes:
         return bytes(self.header)\
             + bytes(self.dib_header)\
             + (b'' if self.color_table is None else self.color_table)\
-            + self.image_data
+            + memoryview(self.image_data).cast('B')
+
+    def to_file(self, file: BinaryIO) -> None:
+        """Serializes the object to a BinaryIO interface, pixel data is written through a memoryview without copy"""
+
+        file.write(bytes(self.header))
+        file.write(bytes(self.dib_header))
+        if self.color_table is not None:
+            file.write(self.color_table)
+        file.write(memoryview(self.image_data).cast('B'))
 
     def get_padding(self) -> int:
         """Method that computes the number of bytes that are appended at the end of all the row"""
 
         width = self.dib_header.image_width
-        return compute_padding(width)
+        bits_per_pixel = self.dib_header.get_bits_per_pixel()
+
+        return self.get_row_size() - (bits_per_pixel * width + 7) // 8
 
     def get_row_size(self) -> int:
         """https://en.wikipedia.org/wiki/BMP_file_format#Pixel_storage"""
@@ -394,17 +735,47 @@ class BMP:
 class BMPReader(IFormatReader):     # pylint: disable=too-few-public-methods
     """Class that deserializes BMP format to Image"""
 
+    def __init__(self, contiguous: bool = False) -> None:
+        self.contiguous = contiguous
+
     @override
     def read_format(self, file: BinaryIO) -> Image:
         bmp = BMP.from_bytes(file)
-        return Image(data=bmp.to_numpy())
+        return Image(data=bmp.to_numpy(contiguous=self.contiguous))
+
+
+@final
+class BMPProbe(IFormatProbe):   # pylint: disable=too-few-public-methods
+    """Class that reads the image metadata from the BMP file header and DIB header"""
+
+    @override
+    def probe(self, file: BinaryIO) -> ImageInfo:
+        BitmapFileHeader.from_bytes(data=file.read(BitmapFileHeader.HEADER_LENGTH))
+        dib_header = DIBCoreHeader.from_bytes(file)
+
+        return ImageInfo(data_format=KnownFormat.BMP,
+                         width=dib_header.image_width,
+                         height=abs(dib_header.image_height),
+                         channels=dib_header.get_channels(),
+                         bits_per_pixel=dib_header.get_bits_per_pixel())
 
 
 @final
 class BMPWriter(IFormatWriter):     # pylint: disable=too-few-public-methods
     """Class that serializes Image to BMP format"""
 
+    def __init__(self, palette: bool = False, rle: bool = False) -> None:
+        self.palette = palette
+        self.rle = rle
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'BMPWriter':
+        """Additional constructor that takes the writer options from the commandline arguments"""
+
+        return cls(palette=args.bmp_palette,
+                   rle=args.bmp_rle)
+
     @override
     def write_format(self, file: BinaryIO, input_image: Image) -> None:
-        bmp = BMP.from_ndarray(input_image.data)
-        file.write(bytes(bmp))
+        bmp = BMP.from_ndarray(to_8_bit_samples(input_image.data), palette=self.palette, rle=self.rle)
+        bmp.to_file(file)
@@ -0,0 +1,177 @@
+"""Module providing BI_RLE8 and BI_RLE4 codecs for the BMP pixel array (https://en.wikipedia.org/wiki/BMP_file_format)
+
+Runs are first collected from the escape codes, one Python iteration per run, and then all the pixels are expanded at
+once with numpy repeat and gather operations.
+"""
+
+from collections.abc import Buffer
+from typing import Final
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+
+RLE_ESCAPE: Final = 0
+RLE_END_OF_LINE: Final = 0
+RLE_END_OF_BITMAP: Final = 1
+RLE_DELTA: Final = 2
+RLE_MAX_RUN: Final = 255
+RLE_MIN_ABSOLUTE_RUN: Final = 3
+
+
+def expand_runs(lengths: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """For every pixel of the concatenated runs returns the index of its run and its position inside the run"""
+
+    run_ids = np.repeat(np.arange(len(lengths)), lengths)
+    run_offsets = np.cumsum(lengths) - lengths
+
+    return run_ids, np.arange(len(run_ids)) - run_offsets[run_ids]
+
+
+def decode_rle(data: Buffer, width: int, height: int, bits_per_pixel: int) -> np.ndarray:
+    # pylint: disable=too-many-locals
+    """Decodes BI_RLE8 (8 bits per pixel) or BI_RLE4 (4 bits per pixel) pixel array to bottom-up color table indices"""
+
+    if bits_per_pixel not in {4, 8}:
+        raise InvalidFormatException(f'RLE compression requires 4 or 8 bits per pixel, got: {bits_per_pixel}')
+
+    stream = np.frombuffer(data, dtype=np.uint8)
+    raw = stream.tobytes()
+
+    starts: list[int] = []
+    lengths: list[int] = []
+    sources: list[int] = []
+    absolute: list[bool] = []
+
+    position, x, y = 0, 0, 0
+    while position + 1 < len(raw) and y < height:
+        count, value = raw[position], raw[position + 1]
+        position += 2
+
+        if count != RLE_ESCAPE:
+            run_length, run_source, run_absolute = count, position - 1, False
+
+        elif value == RLE_END_OF_LINE:
+            x, y = 0, y + 1
+            continue
+
+        elif value == RLE_END_OF_BITMAP:
+            break
+
+        elif value == RLE_DELTA:
+            if position + 1 >= len(raw):
+                raise InvalidFormatException('Truncated RLE delta escape')
+
+            x, y = x + raw[position], y + raw[position + 1]
+            position += 2
+            continue
+
+        else:
+            run_length, run_source, run_absolute = value, position, True
+            run_bytes = value if bits_per_pixel == 8 else (value + 1) // 2
+            if position + run_bytes > len(raw):
+                raise InvalidFormatException('Truncated RLE absolute run')
+
+            # Absolute runs are padded to the 16-bit boundary
+            position += run_bytes + (run_bytes & 1)
+
+        visible_length = min(run_length, width - x)
+        if visible_length > 0:
+            starts.append(y * width + x)
+            lengths.append(visible_length)
+            sources.append(run_source)
+            absolute.append(run_absolute)
+
+        x += run_length
+
+    run_ids, run_positions = expand_runs(np.array(lengths, dtype=np.intp))
+    run_sources = np.array(sources, dtype=np.intp)[run_ids]
+    run_absolute = np.array(absolute, dtype=np.bool_)[run_ids]
+
+    if bits_per_pixel == 8:
+        values = stream
+        source_indices = run_sources + np.where(run_absolute, run_positions, 0)
+    else:
+        # Encoded RLE4 runs alternate the two nibbles of the value byte
+        values = np.stack((stream >> 4, stream & 0x0F), axis=-1).ravel()
+        source_indices = 2 * run_sources + np.where(run_absolute, run_positions, run_positions & 1)
+
+    indices = np.zeros(width * height, dtype=np.uint8)
+    indices[np.array(starts, dtype=np.intp)[run_ids] + run_positions] = values[source_indices]
+
+    return indices.reshape(height, width)
+
+
+def split_runs(indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns flat starts and lengths of the runs of equal values, runs never cross rows and are at most RLE_MAX_RUN"""
+
+    height, width = indices.shape
+
+    run_starts_mask = np.ones((height, width), dtype=np.bool_)
+    run_starts_mask[:, 1:] = indices[:, 1:] != indices[:, :-1]
+    run_starts = np.flatnonzero(run_starts_mask)
+    run_lengths = np.diff(np.append(run_starts, height * width))
+
+    run_ids, chunk_ids = expand_runs((run_lengths + RLE_MAX_RUN - 1) // RLE_MAX_RUN)
+
+    return run_starts[run_ids] + chunk_ids * RLE_MAX_RUN, \
+        np.minimum(run_lengths[run_ids] - chunk_ids * RLE_MAX_RUN, RLE_MAX_RUN)
+
+
+def group_absolute_runs(lengths: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Groups consecutive single pixel runs of one row into absolute runs of RLE_MIN_ABSOLUTE_RUN to RLE_MAX_RUN pixels.
+
+    Returns for every run the index of the first run of its absolute run (-1 if it stays encoded) and for every run the
+    number of the runs that it heads.
+    """
+
+    single = lengths == 1
+    new_group = np.ones(len(lengths), dtype=np.bool_)
+    new_group[1:] = ~single[1:] | ~single[:-1] | (rows[1:] != rows[:-1])
+
+    run_ids = np.arange(len(lengths))
+    group_positions = run_ids - np.flatnonzero(new_group)[np.cumsum(new_group) - 1]
+    heads = run_ids - group_positions % RLE_MAX_RUN
+    block_sizes = np.bincount(heads, minlength=len(lengths))
+
+    return np.where(single & (block_sizes[heads] >= RLE_MIN_ABSOLUTE_RUN), heads, -1), block_sizes
+
+
+def encode_rle8(indices: np.ndarray) -> np.ndarray:     # pylint: disable=too-many-locals
+    """Encodes bottom-up (height, width) 8-bit color table indices as BI_RLE8 pixel array.
+
+    Repeated values become encoded runs, sequences of at least three single pixels become absolute runs.
+    """
+
+    height, width = indices.shape
+    flat = indices.ravel()
+
+    starts, lengths = split_runs(indices)
+    rows = starts // width
+    absolute_heads, block_sizes = group_absolute_runs(lengths, rows)
+
+    # Every encoded run and every absolute run is one token of the output stream
+    run_ids = np.arange(len(lengths))
+    token_ids = np.flatnonzero((absolute_heads < 0) | (absolute_heads == run_ids))
+    absolute_sizes = np.where(absolute_heads[token_ids] < 0, 0, block_sizes[token_ids])
+    token_sizes = np.where(absolute_sizes == 0, 2, 2 + absolute_sizes + (absolute_sizes & 1))
+
+    # Tokens are in the row order and every row is terminated by the two bytes of the end of line escape code
+    token_offsets = np.cumsum(token_sizes) - token_sizes + 2 * rows[token_ids]
+    result = np.zeros(int(token_sizes.sum()) + 2 * height, dtype=np.uint8)
+
+    encoded = absolute_sizes == 0
+    result[token_offsets[encoded]] = lengths[token_ids[encoded]]
+    result[token_offsets[encoded] + 1] = flat[starts[token_ids[encoded]]]
+    result[token_offsets[~encoded] + 1] = absolute_sizes[~encoded]
+
+    run_offsets = np.zeros(len(lengths), dtype=np.intp)
+    run_offsets[token_ids] = token_offsets
+    members = np.flatnonzero(absolute_heads >= 0)
+    member_heads = absolute_heads[members]
+    result[run_offsets[member_heads] + 2 + members - member_heads] = flat[starts[members]]
+
+    # The last end of line becomes the end of bitmap
+    result[-1] = RLE_END_OF_BITMAP
+
+    return result
@@ -0,0 +1,194 @@
+"""Module providing the options of the codecs
+
+The commandline builds its choices and the default values from these types before any image is read, so the module
+imports no codec and no NumPy.
+"""
+
+import zlib
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import final, ClassVar
+
+from app.error.invalid_format_exception import InvalidFormatException
+
+
+class CompressionStrategy(Enum):
+    """Deflate strategies of zlib, filtered and RLE suit the filtered image data better than the default one"""
+
+    DEFAULT = zlib.Z_DEFAULT_STRATEGY
+    FILTERED = zlib.Z_FILTERED
+    RLE = zlib.Z_RLE
+    HUFFMAN_ONLY = zlib.Z_HUFFMAN_ONLY
+
+    @classmethod
+    def from_string(cls, data: str) -> 'CompressionStrategy':
+        """Additional constructor to convert string into the CompressionStrategy enum object"""
+
+        return cls[data.upper().replace('-', '_')]
+
+    @classmethod
+    def get_available_strategies(cls) -> list[str]:
+        """Returns the names of the strategies for the commandline"""
+
+        return [e.name.lower().replace('_', '-') for e in cls]
+
+
+class FilterSelection(Enum):
+    """How the encoder chooses the filter of every row"""
+
+    NONE = 0
+    FIXED = auto()
+    ADAPTIVE = auto()
+
+    @classmethod
+    def from_string(cls, data: str) -> 'FilterSelection':
+        """Additional constructor to convert string into the FilterSelection enum object"""
+
+        return cls[data.upper()]
+
+    @classmethod
+    def get_available_selections(cls) -> list[str]:
+        """Returns the names of the selections for the commandline"""
+
+        return [e.name.lower() for e in cls]
+
+
+class CRCVerification(Enum):
+    """When the reader verifies the checksums of the chunks"""
+
+    STRICT = 0
+    IDAT_ONLY = auto()
+    DEFERRED = auto()
+    OFF = auto()
+
+    @classmethod
+    def from_string(cls, data: str) -> 'CRCVerification':
+        """Additional constructor to convert string into the CRCVerification enum object"""
+
+        return cls[data.upper().replace('-', '_')]
+
+    @classmethod
+    def get_available_policies(cls) -> list[str]:
+        """Returns the names of the policies for the commandline"""
+
+        return [e.name.lower().replace('_', '-') for e in cls]
+
+    def verifies_at_once(self, image_data: bool) -> bool:
+        """Whether the checksum of the chunk is verified while it is parsed, the deferred ones are verified later"""
+
+        return self == CRCVerification.STRICT or (self == CRCVerification.IDAT_ONLY and image_data)
+
+
+@dataclass(slots=True, frozen=True)
+class PNGOptions:
+    """Class that holds the settings of the PNG encoder"""
+
+    CHUNK_SIZE: ClassVar[int] = 1 << 16
+
+    filter_selection: FilterSelection = FilterSelection.ADAPTIVE
+    level: int = zlib.Z_BEST_SPEED
+    strategy: CompressionStrategy = CompressionStrategy.DEFAULT
+    threads: int = 1
+    chunk_size: int = CHUNK_SIZE
+    palette: bool = False
+
+    def __post_init__(self) -> None:
+        if not zlib.Z_DEFAULT_COMPRESSION <= self.level <= zlib.Z_BEST_COMPRESSION:
+            raise InvalidFormatException(f'Wrong: {self.level=}')
+
+        if self.threads <= 0:
+            raise InvalidFormatException(f'Wrong: {self.threads=}')
+
+        if self.chunk_size <= 0:
+            raise InvalidFormatException(f'Wrong: {self.chunk_size=}')
+
+
+class ChromaSubsampling(Enum):
+    """Resolution of the chroma components, 4:2:2 halves it horizontally and 4:2:0 in both directions"""
+
+    YUV444 = '4:4:4'
+    YUV422 = '4:2:2'
+    YUV420 = '4:2:0'
+
+    @classmethod
+    def from_string(cls, data: str) -> 'ChromaSubsampling':
+        """Additional constructor to convert string into the ChromaSubsampling enum object"""
+
+        return cls(data)
+
+    @classmethod
+    def get_available_subsamplings(cls) -> list[str]:
+        """Returns the names of the subsamplings for the commandline"""
+
+        return [e.value for e in cls]
+
+    def get_luma_sampling(self) -> tuple[int, int]:
+        """Returns the vertical and horizontal sampling factors of the luma, the chroma factors are ones"""
+
+        match self:
+            case ChromaSubsampling.YUV444:
+                return 1, 1
+
+            case ChromaSubsampling.YUV422:
+                return 1, 2
+
+        return 2, 2
+
+
+@final
+@dataclass(slots=True, frozen=True)
+class JPEGOptions:
+    """Class that holds the settings of the JPEG encoder, the defaults are the ones of the CUDA encoder"""
+
+    MIN_QUALITY: ClassVar[int] = 1
+    MAX_QUALITY: ClassVar[int] = 100
+
+    quality: int = 90
+    subsampling: ChromaSubsampling = ChromaSubsampling.YUV420
+    optimize_huffman: bool = False
+
+    def __post_init__(self) -> None:
+        if not self.MIN_QUALITY <= self.quality <= self.MAX_QUALITY:
+            raise InvalidFormatException(f'Wrong: {self.quality=}')
+
+
+class DecodeScale(Enum):
+    """Size of the decoded JPEG image relative to the full size, the sides are rounded up"""
+
+    FULL = '1'
+    HALF = '1/2'
+    QUARTER = '1/4'
+    EIGHTH = '1/8'
+
+    @classmethod
+    def from_string(cls, data: str) -> 'DecodeScale':
+        """Additional constructor to convert string into the DecodeScale enum object"""
+
+        return cls(data)
+
+    @classmethod
+    def get_available_scales(cls) -> list[str]:
+        """Returns the names of the scales for the commandline"""
+
+        return [e.value for e in cls]
+
+    @classmethod
+    def from_reduction(cls, reduction: int) -> 'DecodeScale':
+        """Additional constructor of the smallest scale that reduces the sides by at most the factor"""
+
+        return next(x for x in reversed(cls) if x.get_reduction() <= max(reduction, 1))
+
+    def get_reduction(self) -> int:
+        """Returns the factor that the sides of the image are divided by"""
+
+        match self:
+            case DecodeScale.FULL:
+                return 1
+
+            case DecodeScale.HALF:
+                return 2
+
+            case DecodeScale.QUARTER:
+                return 4
+
+        return 8
@@ -0,0 +1,94 @@
+"""Module providing block-parallel zlib compression (https://www.rfc-editor.org/rfc/rfc1950)
+
+The data is split into blocks that are compressed as raw deflate streams on a thread pool, zlib releases the GIL while
+compressing. Every block is primed with the tail of the preceding block as a dictionary, so matches may reach across
+the boundary, and all blocks except the last end with a sync flush on a byte boundary, so the raw streams concatenate
+into one deflate stream. The zlib header and the Adler-32 combined from the checksums of the blocks wrap it.
+"""
+
+import struct
+import zlib
+from collections.abc import Buffer
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Final
+
+from app.io.codec_options import CompressionStrategy
+
+DEFLATE_BLOCK_SIZE: Final = 1 << 17
+DEFLATE_WINDOW_SIZE: Final = 1 << 15
+ADLER_BASE: Final = 65521
+ZLIB_METHOD: Final = 0x78
+
+
+def adler32_combine(first: int, second: int, second_length: int) -> int:
+    """Returns the Adler-32 of concatenated data from the checksums of its parts and the length of the second one"""
+
+    remainder = second_length % ADLER_BASE
+    first_low, first_high = first & 0xFFFF, first >> 16
+    second_low, second_high = second & 0xFFFF, second >> 16
+
+    low = (first_low + second_low - 1) % ADLER_BASE
+    high = (first_high + second_high + remainder * (first_low - 1)) % ADLER_BASE
+
+    return low | high << 16
+
+
+def zlib_header(level: int) -> bytes:
+    """Returns the zlib stream header for the deflate with 32 KiB window and the given compression level"""
+
+    match level:
+        case 0 | 1:
+            level_flags = 0
+        case 2 | 3 | 4 | 5:
+            level_flags = 1
+        case 6 | zlib.Z_DEFAULT_COMPRESSION:
+            level_flags = 2
+        case _:
+            level_flags = 3
+
+    flags = level_flags << 6
+    return bytes((ZLIB_METHOD, flags + (31 - (ZLIB_METHOD << 8 | flags) % 31) % 31))
+
+
+def compress(data: Buffer, level: int, strategy: CompressionStrategy = CompressionStrategy.DEFAULT) -> bytes:
+    """Compresses the data to a zlib stream on the calling thread"""
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, strategy.value)
+    return compressor.compress(data) + compressor.flush()
+
+
+def deflate_block(block: Buffer,
+                  dictionary: Buffer,
+                  last: bool,
+                  level: int,
+                  strategy: CompressionStrategy) -> tuple[bytes, int]:
+    """Compresses one block to a raw deflate stream and returns it with the Adler-32 of the block"""
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, strategy.value, dictionary)
+    stream = compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    return stream, zlib.adler32(block)
+
+
+def compress_parallel(data: Buffer,
+                      level: int,
+                      threads: int,
+                      strategy: CompressionStrategy = CompressionStrategy.DEFAULT,
+                      block_size: int = DEFLATE_BLOCK_SIZE) -> bytes:
+    """Compresses the data to a standard zlib stream, the blocks of block_size bytes are compressed by the threads"""
+
+    view = memoryview(data).cast('B')
+    starts = range(0, max(len(view), 1), block_size)
+
+    blocks = [view[start:start + block_size] for start in starts]
+    dictionaries = [view[max(0, start - DEFLATE_WINDOW_SIZE):start] for start in starts]
+    last = [False] * (len(blocks) - 1) + [True]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(partial(deflate_block, level=level, strategy=strategy), blocks, dictionaries, last))
+
+    checksum = 1
+    for block, (_, block_checksum) in zip(blocks, results):
+        checksum = adler32_combine(checksum, block_checksum, len(block))
+
+    return zlib_header(level) + b''.join(stream for stream, _ in results) + struct.pack('>I', checksum)
@@ -1,8 +1,12 @@
-"""Module defining Checker interface"""
+"""Module defining Checker interface, the checkers of the supported formats and the signature table that matches all
+the checkers at once. The checkers are kept apart from the codecs, so the format is determined without importing them.
+"""
 
+import io
 import os
 from abc import abstractmethod, ABC
-from typing import BinaryIO
+from collections.abc import Buffer, Iterable
+from typing import BinaryIO, ClassVar, Optional, cast, final, override
 
 from app.io.known_format import KnownFormat
 
@@ -11,19 +15,189 @@ class IFormatChecker(ABC):
     """https://en.wikipedia.org/wiki/List_of_file_signatures"""
 
     @abstractmethod
-    def check_format(self, file: BinaryIO) -> bool:
-        """Determines the type of file from its signature"""
+    def signatures(self) -> tuple[bytes, ...]:
+        """Returns the byte sequences that the files of the format start with"""
 
     @abstractmethod
     def type(self) -> KnownFormat:
         """Returns the KnownFormat the checker is inspecting"""
 
 
-def check_compare(file: BinaryIO, signature: str) -> bool:
-    """Checks if the file starts with a hex representation of signature"""
+@final
+class BMPChecker(IFormatChecker):
+    """Class that checks if the BMP signature is present"""
 
-    signature_bytes = bytes.fromhex(signature.lower())
-    return rest_read_bytes(file, len(signature_bytes)) == signature_bytes
+    @override
+    def signatures(self) -> tuple[bytes, ...]:
+        return (b'BM',)
+
+    @override
+    def type(self) -> KnownFormat:
+        return KnownFormat.BMP
+
+
+@final
+class PNGChecker(IFormatChecker):
+    """Class checking if a given file starts with a PNG signature. Used for the type deduction"""
+
+    @override
+    def signatures(self) -> tuple[bytes, ...]:
+        return (b'\x89PNG\r\n\x1a\n',)
+
+    @override
+    def type(self) -> KnownFormat:
+        return KnownFormat.PNG
+
+
+@final
+class JPEGChecker(IFormatChecker):
+    """Class comparing the file signature to deduce file format"""
+
+    SIGNATURES: ClassVar[tuple[bytes, ...]] = tuple(bytes.fromhex(x) for x in [
+        'FFD8FFDB',
+        'FFD8FFE000104A4649460001',
+        'FFD8FFEE',
+        'FFD8FFE0',
+        '0000000C6A5020200D0A870A',
+        'FF4FFF51',
+    ])
+
+    @override
+    def signatures(self) -> tuple[bytes, ...]:
+        return self.SIGNATURES
+
+    @override
+    def type(self) -> KnownFormat:
+        return KnownFormat.JPEG
+
+
+@final
+class PBMChecker(IFormatChecker):
+    """Class that checks if the binary PBM signature is present"""
+
+    @override
+    def signatures(self) -> tuple[bytes, ...]:
+        return (b'P4',)
+
+    @override
+    def type(self) -> KnownFormat:
+        return KnownFormat.PBM
+
+
+@final
+class PGMChecker(IFormatChecker):
+    """Class that checks if the binary PGM signature is present"""
+
+    @override
+    def signatures(self) -> tuple[bytes, ...]:
+        return (b'P5',)
+
+    @override
+    def type(self) -> KnownFormat:
+        return KnownFormat.PGM
+
+
+@final
+class PPMChecker(IFormatChecker):
+    """Class that checks if the binary PPM signature is present"""
+
+    @override
+    def signatures(self) -> tuple[bytes, ...]:
+        return (b'P6',)
+
+    @override
+    def type(self) -> KnownFormat:
+        return KnownFormat.PPM
+
+
+@final
+class SignatureTrie:     # pylint: disable=too-few-public-methods
+    """Prefix tree of the signatures of all the checkers, built once. The header of the file is matched in one pass over
+    its bytes, the longest matching signature wins.
+    """
+
+    def __init__(self, checkers: Iterable[IFormatChecker]) -> None:
+        self.children: list[dict[int, int]] = [{}]
+        self.formats: list[Optional[KnownFormat]] = [None]
+        self.length = 0
+
+        for checker in checkers:
+            for signature in checker.signatures():
+                node = 0
+                for byte in signature:
+                    if byte not in self.children[node]:
+                        self.children[node][byte] = len(self.children)
+                        self.children.append({})
+                        self.formats.append(None)
+                    node = self.children[node][byte]
+
+                # The signatures of the checkers that come first are kept, like the checkers were tried in order
+                if self.formats[node] is None:
+                    self.formats[node] = checker.type()
+                self.length = max(self.length, len(signature))
+
+    def match(self, header: bytes) -> Optional[KnownFormat]:
+        """Returns the format of the longest signature that the header starts with, None if there is no such"""
+
+        node = 0
+        result = None
+        for byte in header:
+            next_node = self.children[node].get(byte)
+            if next_node is None:
+                break
+
+            node = next_node
+            result = self.formats[node] or result
+
+        return result
+
+
+@final
+class PushbackStream(io.RawIOBase):
+    """Readable stream that returns the pushed back bytes first and then the rest of the wrapped stream"""
+
+    def __init__(self, pushed_back: bytes, file: BinaryIO) -> None:
+        super().__init__()
+        self.pushed_back = memoryview(pushed_back)
+        self.file = file
+
+    @override
+    def readable(self) -> bool:
+        return True
+
+    @override
+    def readinto(self, buffer: Buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        if self.pushed_back:
+            count = min(len(view), len(self.pushed_back))
+            view[:count] = self.pushed_back[:count]
+            self.pushed_back = self.pushed_back[count:]
+            return count
+
+        data = self.file.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+
+def peek_stream(file: BinaryIO, n: int) -> tuple[bytes, BinaryIO]:
+    """Reads the first n bytes (fewer at the end of the stream) and returns them with the stream to continue from the
+    start. Seekable streams are reset and returned, the others are wrapped to read the peeked bytes again.
+    """
+
+    if file.seekable():
+        header = rest_read_bytes(file, n)
+        reset_stream(file)
+        return header, file
+
+    header = b''
+    while len(header) < n:
+        # Pipes return what is available, so the read is repeated until the end of the stream
+        data = file.read(n - len(header))
+        if not data:
+            break
+        header += data
+
+    return header, cast(BinaryIO, io.BufferedReader(PushbackStream(header, file)))
 
 
 def rest_read_bytes(file: BinaryIO, n: int) -> bytes:
@@ -1,64 +1,132 @@
-"""Module implementing routing functions for input image formats"""
+"""Module implementing routing functions for input image formats
 
-from typing import BinaryIO
+The codec modules are imported by the factory functions of their format only, so a job pays for the NumPy codecs that
+it reads and writes and the format is determined from the signatures without any of them.
+"""
+
+# pylint: disable=import-outside-toplevel
+
+from argparse import Namespace
+from functools import cache
+from typing import TYPE_CHECKING, BinaryIO, Optional
 
 from app.error.unknown_format_exception import UnknownFormatException
-from app.io.bmp import BMPReader, BMPWriter, BMPChecker
-from app.io.format_checker import reset_stream
-from app.io.format_reader import IFormatReader
-from app.io.format_writer import IFormatWriter
-from app.io.jpeg import JPEGReader, JPEGWriter, JPEGChecker
+from app.io.format_checker import BMPChecker, IFormatChecker, JPEGChecker, PBMChecker, PGMChecker, PNGChecker, \
+    PPMChecker, SignatureTrie, peek_stream
+from app.io.format_probe import IFormatProbe
 from app.io.known_format import KnownFormat
-from app.io.png import PNGWriter, PNGReader, PNGChecker
 
+if TYPE_CHECKING:
+    from app.io.format_reader import IFormatReader
+    from app.io.format_writer import IFormatWriter
 
-def get_available_formats():
+
+def get_available_formats() -> list[IFormatChecker]:
     """Returns all supported format checkers"""
     return [
         BMPChecker(),
         PNGChecker(),
         JPEGChecker(),
+        PBMChecker(),
+        PGMChecker(),
+        PPMChecker(),
     ]
 
 
-def determine_format(file: BinaryIO) -> KnownFormat:
-    """Function implementing the logic of parsing the format signature for available formats"""
+@cache
+def get_signature_trie() -> SignatureTrie:
+    """Returns the prefix tree of the signatures of all the supported formats, it is built on the first call only"""
+
+    return SignatureTrie(get_available_formats())
+
+
+def sniff_format(file: BinaryIO) -> tuple[KnownFormat, BinaryIO]:
+    """Reads the longest signature length of bytes once and matches them against all the signatures. Returns the format
+    and the stream to read the image from its start, non-seekable streams are wrapped to return the peeked bytes again.
+    """
 
-    for format_checker in get_available_formats():
-        if format_checker.check_format(file):
-            reset_stream(file)
-            return format_checker.type()
+    trie = get_signature_trie()
+    header, stream = peek_stream(file, trie.length)
 
-    raise UnknownFormatException("The file signature is not recognized as a supported image format")
+    data_format = trie.match(header)
+    if data_format is None:
+        raise UnknownFormatException("The file signature is not recognized as a supported image format")
 
+    return data_format, stream
 
-def get_reader_from_format(data_format: KnownFormat) -> IFormatReader:
-    """Factory function for format reader"""
+
+def determine_format(file: BinaryIO) -> KnownFormat:
+    """Function implementing the logic of parsing the format signature for available formats, the seekable stream is
+    reset to its start. The peeked bytes of the non-seekable streams are lost, the readers of them use sniff_format.
+    """
+
+    return sniff_format(file)[0]
+
+
+def get_reader_from_format(data_format: KnownFormat, args: Optional[Namespace] = None) -> 'IFormatReader':
+    """Factory function for format reader, the reader options are taken from the commandline arguments if provided"""
 
     match data_format:
         case KnownFormat.BMP:
+            from app.io.bmp import BMPReader
             return BMPReader()
 
         case KnownFormat.PNG:
-            return PNGReader()
+            from app.io.png import PNGReader
+            return PNGReader() if args is None else PNGReader.from_args(args)
+
+        case KnownFormat.JPEG:
+            from app.io.jpeg import JPEGReader
+            return JPEGReader() if args is None else JPEGReader.from_args(args)
+
+        case KnownFormat.PBM | KnownFormat.PGM | KnownFormat.PPM:
+            from app.io.pnm import PNMReader
+            return PNMReader()
+
+    assert False, "unreachable"
+
+
+def get_probe_from_format(data_format: KnownFormat) -> IFormatProbe:
+    """Factory function for format probe"""
+
+    match data_format:
+        case KnownFormat.BMP:
+            from app.io.bmp import BMPProbe
+            return BMPProbe()
+
+        case KnownFormat.PNG:
+            from app.io.png import PNGProbe
+            return PNGProbe()
 
         case KnownFormat.JPEG:
-            return JPEGReader()
+            from app.io.jpeg import JPEGProbe
+            return JPEGProbe()
+
+        case KnownFormat.PBM | KnownFormat.PGM | KnownFormat.PPM:
+            from app.io.pnm import PNMProbe
+            return PNMProbe()
 
     assert False, "unreachable"
 
 
-def get_writer_from_format(data_format: KnownFormat) -> IFormatWriter:
-    """Factory function for format writer"""
+def get_writer_from_format(data_format: KnownFormat, args: Optional[Namespace] = None) -> 'IFormatWriter':
+    """Factory function for format writer, the writer options are taken from the commandline arguments if provided"""
 
     match data_format:
         case KnownFormat.BMP:
-            return BMPWriter()
+            from app.io.bmp import BMPWriter
+            return BMPWriter() if args is None else BMPWriter.from_args(args)
 
         case KnownFormat.PNG:
-            return PNGWriter()
+            from app.io.png import PNGWriter
+            return PNGWriter() if args is None else PNGWriter.from_args(args)
 
         case KnownFormat.JPEG:
-            return JPEGWriter()
+            from app.io.jpeg import JPEGWriter
+            return JPEGWriter() if args is None else JPEGWriter.from_args(args)
+
+        case KnownFormat.PBM | KnownFormat.PGM | KnownFormat.PPM:
+            from app.io.pnm import PNMWriter
+            return PNMWriter(data_format)
 
     assert False, "unreachable"
@@ -0,0 +1,41 @@
+"""Module providing header-only metadata probing interface for binary streams"""
+
+from abc import abstractmethod, ABC
+from dataclasses import dataclass
+from typing import BinaryIO, final
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.known_format import KnownFormat
+
+
+@final
+@dataclass(slots=True, frozen=True)
+class ImageInfo:
+    """Class that describes the image stored in the file without decoding its pixels"""
+
+    data_format: KnownFormat
+    width: int
+    height: int
+    channels: int
+    bits_per_pixel: int
+
+    def __post_init__(self) -> None:
+        if self.width <= 0:
+            raise InvalidFormatException(f'Wrong: {self.width=}')
+
+        if self.height <= 0:
+            raise InvalidFormatException(f'Wrong: {self.height=}')
+
+        if self.channels <= 0:
+            raise InvalidFormatException(f'Wrong: {self.channels=}')
+
+        if self.bits_per_pixel <= 0:
+            raise InvalidFormatException(f'Wrong: {self.bits_per_pixel=}')
+
+
+class IFormatProbe(ABC):    # pylint: disable=too-few-public-methods
+    """Interface that reads the image metadata from the format headers only"""
+
+    @abstractmethod
+    def probe(self, file: BinaryIO) -> ImageInfo:
+        """Abstract method that parses only the headers of the binary stream, pixel data is never read"""
@@ -1,6 +1,8 @@
 """Module providing deserialization interface for binary streams"""
 
+import mmap
 from abc import abstractmethod, ABC
+from collections.abc import Buffer
 from typing import BinaryIO
 
 from app.image.image import Image
@@ -12,3 +14,16 @@ class IFormatReader(ABC):   # pylint: disable=too-few-public-methods
     @abstractmethod
     def read_format(self, file: BinaryIO) -> Image:
         """Abstract method that deserialize image to binary stream"""
+
+
+def read_buffer(file: BinaryIO, n: int = -1) -> Buffer:
+    """Reads n bytes (or the rest of the stream if negative). Memory mapped streams return a view without a copy"""
+
+    if not isinstance(file, mmap.mmap):
+        return file.read(n)
+
+    start = file.tell()
+    end = len(file) if n < 0 else min(len(file), start + n)
+    file.seek(end)
+
+    return memoryview(file)[start:end]
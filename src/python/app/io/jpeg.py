@@ -1,55 +1,162 @@
 """Module for IO operations related to Jpeg encoding"""
 
-from typing import BinaryIO, override, final
+import os
+import struct
+from argparse import Namespace
+from functools import cache
+from types import ModuleType
+from typing import BinaryIO, override, final, ClassVar, Optional
 
-import numpy as np
-
-from app.image.image import Image
-from app.io.format_checker import IFormatChecker, check_compare
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image, to_8_bit_samples
+from app.io.codec_options import ChromaSubsampling, DecodeScale, JPEGOptions
+from app.io.format_probe import IFormatProbe, ImageInfo
 from app.io.known_format import KnownFormat
-from app.io.format_reader import IFormatReader
+from app.io.format_reader import IFormatReader, read_buffer
 from app.io.format_writer import IFormatWriter
+from app.io.jpeg_decoder import JPEGCoefficients, decode_jpeg, read_coefficients
+from app.io.jpeg_encoder import encode_jpeg, write_coefficients
 
 
-@final
-class JPEGChecker(IFormatChecker):
-    """Class comparing the file signature to deduce file format"""
+@cache
+def load_fast_backend() -> Optional[ModuleType]:
+    """Imports the CUDA codec module app.fast once, None means that it is not available and the CPU codec is used"""
 
-    @override
-    def check_format(self, file: BinaryIO) -> bool:
-        return check_compare(file, 'FFD8FFDB')\
-            or check_compare(file, 'FFD8FFE000104A4649460001')\
-            or check_compare(file, 'FFD8FFEE')\
-            or check_compare(file, 'FFD8FFE0')\
-            or check_compare(file, '0000000C6A5020200D0A870A')\
-            or check_compare(file, 'FF4FFF51')
+    # Module app.fast is lazy imported in order to allow the end user without CUDA driver installed to run the other
+    # application functionalists.
+    try:
+        import app.fast     # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
 
-    @override
-    def type(self) -> KnownFormat:
-        return KnownFormat.JPEG
+    return app.fast
 
 
 @final
 class JPEGReader(IFormatReader):        # pylint: disable=too-few-public-methods
-    """Class that deserializes JPEG format to Image"""
+    """Class that deserializes JPEG format to Image, the reduced scales are always decoded on the CPU"""
+
+    def __init__(self, scale: DecodeScale = DecodeScale.FULL) -> None:
+        self.scale = scale
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'JPEGReader':
+        """Additional constructor that takes the reader options from the commandline arguments"""
+
+        return cls(scale=DecodeScale.FULL if args.decode_scale is None else DecodeScale.from_string(args.decode_scale))
 
     @override
     def read_format(self, file: BinaryIO) -> Image:
-        # Module app.fast is lazy imported in order to allow the end user without CUDA driver installed to run the other
-        # application functionalists.
+        fast = load_fast_backend()
+        if fast is None or self.scale != DecodeScale.FULL:
+            return Image(data=decode_jpeg(read_buffer(file), self.scale))
 
-        import app.fast     # pylint: disable=import-outside-toplevel
-        return Image(data=app.fast.decode_jpeg(file.read()))
+        return Image(data=fast.decode_jpeg(file.read()))
+
+    def read_coefficients(self, file: BinaryIO) -> JPEGCoefficients:
+        """Reads the quantized DCT coefficients of the image without transforming them to samples"""
+
+        return read_coefficients(read_buffer(file))
+
+
+@final
+class JPEGProbe(IFormatProbe):  # pylint: disable=too-few-public-methods
+    """Class that reads the image metadata from the JPEG frame header (SOF marker), other segments are skipped"""
+
+    MARKER_PREFIX: ClassVar[bytes] = b'\xff'
+    START_OF_IMAGE: ClassVar[bytes] = b'\xff\xd8'
+    START_OF_FRAME_MARKERS: ClassVar[frozenset[int]] = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+    STANDALONE_MARKERS: ClassVar[frozenset[int]] = frozenset(range(0xD0, 0xD8)) | {0x01}
+    END_MARKERS: ClassVar[frozenset[int]] = frozenset({0xD9, 0xDA})
+    SEGMENT_LENGTH_LENGTH: ClassVar[int] = 2
+    FRAME_HEADER_LENGTH: ClassVar[int] = 6
+
+    @override
+    def probe(self, file: BinaryIO) -> ImageInfo:
+        if file.read(len(self.START_OF_IMAGE)) != self.START_OF_IMAGE:
+            raise InvalidFormatException('Missing JPEG start of image marker')
+
+        while True:
+            marker = self.read_marker(file)
+            if marker in self.STANDALONE_MARKERS:
+                continue
+
+            if marker in self.END_MARKERS:
+                raise InvalidFormatException('JPEG frame header not found before the scan')
+
+            segment_length = file.read(self.SEGMENT_LENGTH_LENGTH)
+            if len(segment_length) < self.SEGMENT_LENGTH_LENGTH:
+                raise InvalidFormatException('Truncated JPEG segment')
+
+            length, = struct.unpack('>H', segment_length)
+            if marker not in self.START_OF_FRAME_MARKERS:
+                file.seek(length - self.SEGMENT_LENGTH_LENGTH, os.SEEK_CUR)
+                continue
+
+            frame_header = file.read(self.FRAME_HEADER_LENGTH)
+            if len(frame_header) < self.FRAME_HEADER_LENGTH:
+                raise InvalidFormatException('Truncated JPEG frame header')
+
+            precision, height, width, components = struct.unpack('>BHHB', frame_header)
+            return ImageInfo(data_format=KnownFormat.JPEG,
+                             width=width,
+                             height=height,
+                             channels=components,
+                             bits_per_pixel=precision * components)
+
+    def read_marker(self, file: BinaryIO) -> int:
+        """Reads the next marker code, fill bytes that precede it are skipped"""
+
+        byte = file.read(1)
+        if byte != self.MARKER_PREFIX:
+            raise InvalidFormatException(f'Expected JPEG marker, got: {byte!r}')
+
+        while byte == self.MARKER_PREFIX:
+            byte = file.read(1)
+
+        if len(byte) == 0:
+            raise InvalidFormatException('Truncated JPEG marker')
+
+        return byte[0]
 
 
 @final
 class JPEGWriter(IFormatWriter):        # pylint: disable=too-few-public-methods
-    """Class that serializes Image to JPEG format"""
+    """Class that serializes Image to JPEG format, with the CUDA backend if it is available"""
+
+    def __init__(self, options: JPEGOptions = JPEGOptions()) -> None:
+        self.options = options
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'JPEGWriter':
+        """Additional constructor that takes the writer options from the commandline arguments"""
+
+        return cls(options=JPEGOptions(quality=args.jpeg_quality,
+                                       subsampling=ChromaSubsampling.from_string(args.jpeg_subsampling),
+                                       optimize_huffman=args.jpeg_optimize))
 
     @override
     def write_format(self, file: BinaryIO, input_image: Image) -> None:
-        # Module app.fast is lazy imported in order to allow the end user without CUDA driver installed to run the other
-        # application functionalists.
+        # The pixels are top-down RGB like the ones of the reader, so the JPEG images round trip unchanged. The alpha is
+        # dropped, a single channel is written as grayscale.
+        data = to_8_bit_samples(input_image.data)
+        pixels = data[:, :, :1 if data.shape[2] < 3 else 3]
 
-        import app.fast     # pylint: disable=import-outside-toplevel
-        file.write(app.fast.encode_jpeg(np.flip(input_image.data[:, :, ::-1], axis=0).copy()))
+        fast = load_fast_backend()
+        if fast is None:
+            file.write(encode_jpeg(pixels, self.options))
+            return
+
+        # The CUDA encoder takes the interleaved RGB only, the grayscale channel is repeated to the three of them
+        rgb = pixels.repeat(3, axis=2) if pixels.shape[2] == 1 else pixels.copy()
+        file.write(fast.encode_jpeg(rgb,
+                                    self.options.quality,
+                                    self.options.subsampling.value,
+                                    self.options.optimize_huffman))
+
+    def write_coefficients(self, file: BinaryIO, image: JPEGCoefficients) -> None:
+        """Writes the quantized DCT coefficients with their own quantization tables, the quality and the subsampling
+        options do not apply
+        """
+
+        file.write(write_coefficients(image, self.options.optimize_huffman))
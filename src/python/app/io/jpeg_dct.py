@@ -0,0 +1,124 @@
+"""Module providing the sample domain stages of the JPEG codec on whole planes of 8x8 blocks at once
+
+The coefficient blocks are (rows, columns, 64) arrays in the zigzag order. The 2-D DCT of every block is two products
+with the 8x8 DCT matrix, so all the blocks of a plane are transformed by one batched matrix multiplication. The encoder
+runs the same stages in the reverse order. The decoder may keep only the lowest frequencies of the blocks and transform
+them with the smaller DCT matrix, which gives the samples reduced by the ratio of the sizes.
+"""
+
+from typing import Final
+
+import numpy as np
+
+from app.io.jpeg_segments import BLOCK_SIZE, ZIGZAG, ZIGZAG_INDEX
+
+SAMPLE_OFFSET: Final = 128
+
+
+def dct_matrix(size: int = BLOCK_SIZE) -> np.ndarray:
+    """Returns the orthonormal DCT-II matrix, the rows are the cosine basis functions of the frequencies"""
+
+    frequencies = np.arange(size)[:, np.newaxis]
+    positions = np.arange(size)[np.newaxis, :]
+
+    matrix = np.cos((2 * positions + 1) * frequencies * np.pi / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+
+    return matrix.astype(np.float32)
+
+
+DCT_MATRIX: Final = dct_matrix()
+
+
+def dequantize(coefficients: np.ndarray, quantization: np.ndarray, size: int = BLOCK_SIZE) -> np.ndarray:
+    """Returns the (rows, columns, size, size) dequantized blocks of the lowest frequencies of the zigzag ordered
+    coefficients in the natural order. They are scaled for the orthonormal inverse DCT of the size.
+    """
+
+    indices = ZIGZAG_INDEX.reshape(BLOCK_SIZE, BLOCK_SIZE)[:size, :size].reshape(-1)
+    blocks = coefficients[..., indices] * (quantization[indices] * (size / BLOCK_SIZE)).astype(np.float32)
+
+    return blocks.reshape(*coefficients.shape[:-1], size, size)
+
+
+def quantize(blocks: np.ndarray, quantization: np.ndarray) -> np.ndarray:
+    """Returns the (rows, columns, 64) zigzag ordered quantized coefficients of the (rows, columns, 8, 8) blocks"""
+
+    coefficients = blocks.reshape(*blocks.shape[:-2], BLOCK_SIZE * BLOCK_SIZE)[..., ZIGZAG]
+    return np.rint(coefficients / quantization.astype(np.float32)).astype(np.int16)
+
+
+def forward_dct(blocks: np.ndarray) -> np.ndarray:
+    """Returns the DCT coefficients of the (..., 8, 8) blocks of the samples, they are level shifted first"""
+
+    return DCT_MATRIX @ (blocks.astype(np.float32) - SAMPLE_OFFSET) @ DCT_MATRIX.T
+
+
+def inverse_dct(blocks: np.ndarray) -> np.ndarray:
+    """Returns the samples of the (..., size, size) dequantized blocks, level shifted and rounded to 8 bits"""
+
+    matrix = DCT_MATRIX if blocks.shape[-1] == BLOCK_SIZE else dct_matrix(blocks.shape[-1])
+    samples = matrix.T @ blocks @ matrix
+    return np.clip(np.rint(samples + SAMPLE_OFFSET), 0, np.iinfo(np.uint8).max).astype(np.uint8)
+
+
+def blocks_to_plane(blocks: np.ndarray) -> np.ndarray:
+    """Arranges the (rows, columns, size, size) blocks to one plane of samples"""
+
+    rows, columns, height, width = blocks.shape
+    return blocks.transpose(0, 2, 1, 3).reshape(rows * height, columns * width)
+
+
+def plane_to_blocks(plane: np.ndarray) -> np.ndarray:
+    """Splits the plane, whose sides are multiples of the block size, to the (rows, columns, size, size) blocks"""
+
+    height, width = plane.shape
+    return plane.reshape(height // BLOCK_SIZE, BLOCK_SIZE, width // BLOCK_SIZE, BLOCK_SIZE).transpose(0, 2, 1, 3)
+
+
+def downsample(plane: np.ndarray, vertical_factor: int, horizontal_factor: int) -> np.ndarray:
+    """Averages every factors sized box of samples, the sides of the plane are multiples of the factors"""
+
+    if vertical_factor == horizontal_factor == 1:
+        return plane
+
+    height, width = plane.shape
+    boxes = plane.reshape(height // vertical_factor, vertical_factor, width // horizontal_factor, horizontal_factor)
+    return boxes.mean(axis=(1, 3), dtype=np.float32)
+
+
+def upsample(plane: np.ndarray, vertical_factor: int, horizontal_factor: int) -> np.ndarray:
+    """Replicates every sample of the subsampled plane to the factors in each direction"""
+
+    if vertical_factor > 1:
+        plane = np.repeat(plane, vertical_factor, axis=0)
+
+    if horizontal_factor > 1:
+        plane = np.repeat(plane, horizontal_factor, axis=1)
+
+    return plane
+
+
+def rgb_to_ycbcr(pixels: np.ndarray) -> list[np.ndarray]:
+    """Converts the (height, width, 3) RGB image to the Y, Cb and Cr planes of JFIF, they are not rounded"""
+
+    red, green, blue = (pixels[:, :, x].astype(np.float32) for x in range(3))
+
+    return [0.299 * red + 0.587 * green + 0.114 * blue,
+            -0.168736 * red - 0.331264 * green + 0.5 * blue + SAMPLE_OFFSET,
+            0.5 * red - 0.418688 * green - 0.081312 * blue + SAMPLE_OFFSET]
+
+
+def ycbcr_to_rgb(planes: list[np.ndarray]) -> np.ndarray:
+    """Converts the full resolution Y, Cb and Cr planes to the (height, width, 3) RGB image of JFIF"""
+
+    luma = planes[0].astype(np.float32)
+    blue = planes[1].astype(np.float32) - SAMPLE_OFFSET
+    red = planes[2].astype(np.float32) - SAMPLE_OFFSET
+
+    result = np.empty((*luma.shape, 3), dtype=np.float32)
+    result[:, :, 0] = luma + 1.402 * red
+    result[:, :, 1] = luma - 0.344136 * blue - 0.714136 * red
+    result[:, :, 2] = luma + 1.772 * blue
+
+    return np.clip(np.rint(result), 0, np.iinfo(np.uint8).max).astype(np.uint8)
@@ -0,0 +1,272 @@
+"""Module providing the CPU decoder of the baseline and progressive JPEG images
+
+The marker segments are parsed and the scans are entropy decoded to the quantized coefficients of every component. The
+coefficients are then dequantized, transformed, upsampled and converted to RGB on whole planes with numpy. The reduced
+scales transform only the lowest frequencies of the blocks, at 1/8 every block is one sample of its DC coefficient.
+"""
+
+import struct
+from collections.abc import Buffer
+from dataclasses import dataclass
+from typing import final, Optional
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.codec_options import DecodeScale
+from app.io.jpeg_dct import blocks_to_plane, dequantize, inverse_dct, upsample, ycbcr_to_rgb
+from app.io.jpeg_huffman import Block, ScanDecoder, split_intervals
+from app.io.jpeg_segments import BLOCK_AREA, BLOCK_SIZE, MARKER_PREFIX, ZIGZAG_INDEX, FrameHeader, HuffmanTable, \
+    Marker, QuantizationTable, ScanHeader
+
+ADOBE_IDENTIFIER = b'Adobe'
+ADOBE_TRANSFORM_OFFSET = 11
+RGB_IDENTIFIERS = (ord('R'), ord('G'), ord('B'))
+
+
+@final
+@dataclass(slots=True)
+class JPEGCoefficients:
+    """Class that holds the frame header and the quantized zigzag ordered coefficients of every component with its
+    quantization table. The Adobe color transform is None when the APP14 segment is missing.
+    """
+
+    frame: FrameHeader
+    quantization: list[np.ndarray]
+    coefficients: list[np.ndarray]
+    color_transform: Optional[int] = None
+
+    def is_ycbcr(self) -> bool:
+        """Checks if the three components are the YCbCr color space, Adobe or component identifiers may mark RGB"""
+
+        if self.color_transform is not None:
+            return self.color_transform != 0
+
+        return tuple(x.identifier for x in self.frame.components) != RGB_IDENTIFIERS
+
+
+def next_marker(view: memoryview, offset: int) -> tuple[int, int]:
+    """Returns the code of the marker at the offset and the offset that follows it, fill bytes are skipped"""
+
+    if offset >= len(view) or view[offset] != MARKER_PREFIX:
+        raise InvalidFormatException(f'Expected JPEG marker at offset {offset}')
+
+    while offset < len(view) and view[offset] == MARKER_PREFIX:
+        offset += 1
+
+    if offset >= len(view):
+        raise InvalidFormatException('Truncated JPEG marker')
+
+    return view[offset], offset + 1
+
+
+def scan_blocks(frame: FrameHeader, scan: ScanHeader) -> list[Block]:
+    """Returns the scan components and the offsets of the blocks in the flat coefficients in their coding order"""
+
+    slots, indices = scan.get_block_order(frame)
+    return list(zip(slots.tolist(), (indices * BLOCK_AREA).tolist()))
+
+
+@final
+class CoefficientReader:    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """Class that collects the tables of the marker segments and decodes the scans to the coefficients. Only the first
+    frequencies in the zigzag order are decoded, the others are left zero and their codes are stepped over with the
+    skip lookups of the AC tables.
+    """
+
+    def __init__(self, frequencies: int = BLOCK_AREA) -> None:
+        self.frequencies = frequencies
+        self.quantization_tables: dict[int, np.ndarray] = {}
+        self.huffman_lookups: dict[tuple[int, int], list[int]] = {}
+        self.skip_lookups: dict[int, list[int]] = {}
+        self.restart_interval = 0
+        self.color_transform: Optional[int] = None
+        self.frame: Optional[FrameHeader] = None
+        self.quantization: list[Optional[np.ndarray]] = []
+        self.coefficients: list[np.ndarray] = []
+
+    def read(self, data: Buffer) -> JPEGCoefficients:
+        """Parses the segments until the end of image marker or the end of the data after the scans"""
+
+        view = memoryview(data).cast('B')
+        if bytes(view[:2]) != b'\xff\xd8':
+            raise InvalidFormatException('Missing JPEG start of image marker')
+
+        offset = 2
+        while offset < len(view) or self.frame is None:
+            marker, offset = next_marker(view, offset)
+            if marker == Marker.EOI:
+                break
+
+            if Marker.is_restart(marker) or marker == 0x01:
+                continue
+
+            if offset + 2 > len(view):
+                raise InvalidFormatException('Truncated JPEG segment')
+
+            length, = struct.unpack_from('>H', view, offset)
+            if length < 2 or offset + length > len(view):
+                raise InvalidFormatException(f'Wrong JPEG segment length: {length}')
+
+            offset = self.read_segment(marker, view, offset + 2, offset + length)
+
+        if self.frame is None or any(x is None for x in self.quantization):
+            raise InvalidFormatException('JPEG has no frame or scans of all its components')
+
+        return JPEGCoefficients(frame=self.frame,
+                                quantization=[x for x in self.quantization if x is not None],
+                                coefficients=self.coefficients,
+                                color_transform=self.color_transform)
+
+    def read_segment(self, marker: int, view: memoryview, start: int, end: int) -> int:
+        """Handles the segment data between start and end, returns the offset of the next marker"""
+
+        segment = view[start:end]
+        match marker:
+            case Marker.DQT:
+                self.quantization_tables.update((x.identifier, x.values)
+                                                for x in QuantizationTable.from_segment(segment))
+
+            case Marker.DHT:
+                tables = HuffmanTable.from_segment(segment)
+                self.huffman_lookups.update(((x.table_class, x.identifier), x.build_lookup()) for x in tables)
+                if self.frequencies < BLOCK_AREA:
+                    self.skip_lookups.update((x.identifier, x.build_skip_lookup())
+                                             for x in tables if x.table_class == HuffmanTable.AC_CLASS)
+
+            case Marker.DRI:
+                if len(segment) != 2:
+                    raise InvalidFormatException(f'Wrong restart interval length: {len(segment)}')
+                self.restart_interval, = struct.unpack('>H', segment)
+
+            case Marker.SOF0 | Marker.SOF1 | Marker.SOF2:
+                if self.frame is not None:
+                    raise InvalidFormatException('JPEG has many frames')
+
+                self.frame = FrameHeader.from_bytes(marker, segment)
+                self.quantization = [None] * len(self.frame.components)
+                self.coefficients = [np.zeros((*self.frame.get_block_counts(x), BLOCK_AREA), dtype=np.int16)
+                                     for x in self.frame.components]
+
+            case Marker.SOS:
+                return self.read_scan(ScanHeader.from_bytes(segment, self.get_frame()), view, end)
+
+            case Marker.APP14 if bytes(segment[:len(ADOBE_IDENTIFIER)]) == ADOBE_IDENTIFIER:
+                if len(segment) > ADOBE_TRANSFORM_OFFSET:
+                    self.color_transform = segment[ADOBE_TRANSFORM_OFFSET]
+
+            case _ if 0xC0 <= marker <= 0xCF:
+                # The remaining codes of the range are the other frame types and the arithmetic coding conditioning
+                raise InvalidFormatException(f'Unsupported JPEG coding process: {marker:#x}')
+
+        return end
+
+    def get_frame(self) -> FrameHeader:
+        """Returns the frame header that has to precede the scans"""
+
+        if self.frame is None:
+            raise InvalidFormatException('JPEG scan precedes the frame header')
+
+        return self.frame
+
+    def get_lookup(self, table_class: int, identifier: int) -> list[int]:
+        """Returns the code lookup of the Huffman table defined before the scan"""
+
+        lookup = self.huffman_lookups.get((table_class, identifier))
+        if lookup is None:
+            raise InvalidFormatException(f'Missing Huffman table: {table_class=}, {identifier=}')
+
+        return lookup
+
+    def read_scan(self, scan: ScanHeader, view: memoryview, offset: int) -> int:
+        """Decodes the entropy coded data that follows the scan header, returns the offset of the marker that ends it"""
+
+        frame = self.get_frame()
+        for scan_component in scan.components:
+            index = scan_component.component_index
+            if self.quantization[index] is None:
+                table = self.quantization_tables.get(frame.components[index].quantization_table)
+                if table is None:
+                    raise InvalidFormatException(f'Missing quantization table of component {index}')
+                self.quantization[index] = table
+
+        if scan.spectral_start >= self.frequencies:
+            # The progressive scans of the higher frequencies are not decoded at all
+            return split_intervals(view, offset)[1]
+
+        uses_dc = scan.spectral_start == 0 and scan.approximation_high == 0
+        empty: list[int] = []
+        decoder = ScanDecoder(
+            scan=scan,
+            coefficients=[memoryview(self.coefficients[x.component_index].reshape(-1)) for x in scan.components],
+            dc_lookups=[self.get_lookup(HuffmanTable.DC_CLASS, x.dc_table) if uses_dc else empty
+                        for x in scan.components],
+            ac_lookups=[self.get_lookup(HuffmanTable.AC_CLASS, x.ac_table) if scan.spectral_end > 0 else empty
+                        for x in scan.components],
+            frequencies=self.frequencies,
+            skip_lookups=[self.skip_lookups.get(x.ac_table, empty) for x in scan.components])
+
+        intervals, end = split_intervals(view, offset)
+        decoder.decode(intervals, scan_blocks(frame, scan), self.restart_interval * scan.get_blocks_in_mcu(frame))
+
+        return end
+
+
+def get_block_size(scale: DecodeScale) -> int:
+    """Returns the number of the samples that every block is decoded to in each direction at the scale"""
+
+    return BLOCK_SIZE // scale.get_reduction()
+
+
+def get_frequencies(scale: DecodeScale) -> int:
+    """Returns the number of the first coefficients in the zigzag order that the decoding at the scale needs"""
+
+    size = get_block_size(scale)
+    return int(ZIGZAG_INDEX.reshape(BLOCK_SIZE, BLOCK_SIZE)[:size, :size].max()) + 1
+
+
+def read_coefficients(data: Buffer, scale: DecodeScale = DecodeScale.FULL) -> JPEGCoefficients:
+    """Parses the JPEG image to its quantized DCT coefficients without transforming them to samples, the reduced scales
+    leave the coefficients that they do not need zero
+    """
+
+    return CoefficientReader(get_frequencies(scale)).read(data)
+
+
+def decode_plane(image: JPEGCoefficients, index: int, scale: DecodeScale = DecodeScale.FULL) -> np.ndarray:
+    """Returns the samples of one component upsampled to the image size at the scale"""
+
+    frame = image.frame
+    component = frame.components[index]
+    max_vertical, max_horizontal = frame.get_max_sampling()
+    if max_vertical % component.vertical_sampling or max_horizontal % component.horizontal_sampling:
+        raise InvalidFormatException(f'Unsupported fractional sampling of component {index}')
+
+    blocks = dequantize(image.coefficients[index], image.quantization[index], get_block_size(scale))
+    plane = upsample(blocks_to_plane(inverse_dct(blocks)),
+                     max_vertical // component.vertical_sampling,
+                     max_horizontal // component.horizontal_sampling)
+
+    reduction = scale.get_reduction()
+    return plane[:-(-frame.height // reduction), :-(-frame.width // reduction)]
+
+
+def to_rgb(image: JPEGCoefficients, scale: DecodeScale = DecodeScale.FULL) -> np.ndarray:
+    """Returns the (height, width, 3) RGB samples of the grayscale, YCbCr or RGB coefficients at the scale"""
+
+    match len(image.frame.components):
+        case 1:
+            return np.repeat(decode_plane(image, 0, scale)[:, :, np.newaxis], 3, axis=2)
+
+        case 3:
+            planes = [decode_plane(image, x, scale) for x in range(3)]
+            return ycbcr_to_rgb(planes) if image.is_ycbcr() else np.stack(planes, axis=2)
+
+        case count:
+            raise InvalidFormatException(f'Unsupported number of JPEG components: {count}')
+
+
+def decode_jpeg(data: Buffer, scale: DecodeScale = DecodeScale.FULL) -> np.ndarray:
+    """Decodes the JPEG image to the top-down (height, width, 3) RGB samples, like the CUDA backend"""
+
+    return to_rgb(read_coefficients(data, scale), scale)
@@ -0,0 +1,182 @@
+"""Module providing the CPU encoder of the baseline JPEG images
+
+The color conversion, the edge padding to whole MCUs, the chroma downsampling, the forward DCT and the quantization run
+on the whole image at once. The scan is entropy coded with the typical Huffman tables of the standard or with the
+optimal tables of the image symbols, which costs one more pass over the symbols but no pass over the pixels.
+"""
+
+from dataclasses import replace
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.codec_options import ChromaSubsampling, JPEGOptions
+from app.io.jpeg_dct import downsample, forward_dct, plane_to_blocks, quantize, rgb_to_ycbcr
+from app.io.jpeg_decoder import ADOBE_IDENTIFIER, JPEGCoefficients
+from app.io.jpeg_huffman import SymbolStream
+from app.io.jpeg_segments import BLOCK_AREA, BLOCK_SIZE, CHROMINANCE_AC_COUNTS, CHROMINANCE_AC_SYMBOLS, \
+    CHROMINANCE_DC_COUNTS, CHROMINANCE_QUANTIZATION, DC_SYMBOLS, LUMINANCE_AC_COUNTS, LUMINANCE_AC_SYMBOLS, \
+    LUMINANCE_DC_COUNTS, LUMINANCE_QUANTIZATION, FrameComponent, FrameHeader, HuffmanTable, Marker, \
+    QuantizationTable, ScanComponent, ScanHeader, to_segment
+
+JFIF_HEADER = b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+ADOBE_HEADER = ADOBE_IDENTIFIER + b'\x00\x64\x00\x00\x00\x00'
+TYPICAL_HUFFMAN_TABLES = (
+    (LUMINANCE_DC_COUNTS, DC_SYMBOLS, LUMINANCE_AC_COUNTS, LUMINANCE_AC_SYMBOLS),
+    (CHROMINANCE_DC_COUNTS, DC_SYMBOLS, CHROMINANCE_AC_COUNTS, CHROMINANCE_AC_SYMBOLS),
+)
+
+
+def quantization_tables(image: JPEGCoefficients) -> tuple[list[QuantizationTable], list[int]]:
+    """Returns the distinct quantization tables of the components and the table identifier of every component"""
+
+    tables: list[QuantizationTable] = []
+    identifiers = []
+    for values in image.quantization:
+        identifier = next((x.identifier for x in tables if np.array_equal(x.values, values)), len(tables))
+        if identifier == len(tables):
+            tables.append(QuantizationTable(identifier=identifier, values=values))
+
+        identifiers.append(identifier)
+
+    return tables, identifiers
+
+
+def huffman_tables(streams: list[tuple[ScanHeader, SymbolStream]], optimize: bool) -> list[HuffmanTable]:
+    """Returns the DC and AC tables of the luma (identifier 0) and of the chroma (identifier 1) used by the scans, the
+    optimal ones are built from the symbol frequencies of all the scans
+    """
+
+    frequencies = np.zeros((len(TYPICAL_HUFFMAN_TABLES), 2, 256), dtype=np.int64)
+    for scan, stream in streams:
+        counts = stream.count_frequencies(2 * len(scan.components))
+        for slot, component in enumerate(scan.components):
+            frequencies[component.dc_table] += counts[2 * slot:2 * slot + 2]
+
+    tables = []
+    for identifier, (dc_counts, dc_symbols, ac_counts, ac_symbols) in enumerate(TYPICAL_HUFFMAN_TABLES):
+        if not frequencies[identifier].any():
+            continue
+
+        if optimize:
+            tables.append(HuffmanTable.from_frequencies(HuffmanTable.DC_CLASS, identifier, frequencies[identifier, 0]))
+            tables.append(HuffmanTable.from_frequencies(HuffmanTable.AC_CLASS, identifier, frequencies[identifier, 1]))
+        else:
+            tables.append(HuffmanTable(HuffmanTable.DC_CLASS, identifier, dc_counts, dc_symbols))
+            tables.append(HuffmanTable(HuffmanTable.AC_CLASS, identifier, ac_counts, ac_symbols))
+
+    return tables
+
+
+def scan_symbols(image: JPEGCoefficients, frame: FrameHeader, components: list[int]) -> tuple[ScanHeader, SymbolStream]:
+    """Returns the sequential scan of the components and its symbols, the chroma components use the tables 1"""
+
+    scan = ScanHeader(components=tuple(ScanComponent(component_index=x, dc_table=min(x, 1), ac_table=min(x, 1))
+                                       for x in components),
+                      spectral_start=0,
+                      spectral_end=BLOCK_AREA - 1,
+                      approximation_high=0,
+                      approximation_low=0)
+
+    slots, indices = scan.get_block_order(frame)
+    blocks = np.empty((len(slots), BLOCK_AREA), dtype=np.int16)
+    for slot, component in enumerate(components):
+        mask = slots == slot
+        blocks[mask] = image.coefficients[component].reshape(-1, BLOCK_AREA)[indices[mask]]
+
+    return scan, SymbolStream.from_blocks(blocks, slots)
+
+
+def write_coefficients(image: JPEGCoefficients, optimize_huffman: bool = False) -> bytes:
+    """Writes the quantized coefficients as the sequential JPEG. All the components are interleaved in one scan, unless
+    their MCU has too many blocks. The Adobe color transform of the coefficients is kept.
+    """
+
+    tables, identifiers = quantization_tables(image)
+    marker = Marker.SOF0 if all(np.all(x.values <= np.iinfo(np.uint8).max) for x in tables) else Marker.SOF1
+    frame = replace(image.frame,
+                    marker=marker,
+                    components=tuple(replace(x, quantization_table=y)
+                                     for x, y in zip(image.frame.components, identifiers)))
+
+    indices = list(range(len(frame.components)))
+    interleaved = sum(x.vertical_sampling * x.horizontal_sampling for x in frame.components) \
+        <= FrameHeader.MAX_BLOCKS_IN_MCU
+    streams = [scan_symbols(image, frame, x) for x in ([indices] if interleaved else [[x] for x in indices])]
+    huffman = huffman_tables(streams, optimize_huffman)
+
+    header = to_segment(Marker.APP0, JFIF_HEADER) if image.color_transform is None \
+        else to_segment(Marker.APP14, ADOBE_HEADER + bytes([image.color_transform]))
+    segments = [b'\xff\xd8', header,
+                to_segment(Marker.DQT, b''.join(bytes(x) for x in tables)),
+                to_segment(frame.marker, bytes(frame)),
+                to_segment(Marker.DHT, b''.join(bytes(x) for x in huffman))]
+
+    for scan, stream in streams:
+        stream_tables = [next(x for x in huffman if (x.table_class, x.identifier) == (table_class, y.dc_table))
+                         for y in scan.components for table_class in (HuffmanTable.DC_CLASS, HuffmanTable.AC_CLASS)]
+        segments += [to_segment(Marker.SOS, scan.to_bytes(frame)), stream.pack(stream_tables)]
+
+    return b''.join([*segments, b'\xff\xd9'])
+
+
+def encoder_frame(height: int, width: int, channels: int, subsampling: ChromaSubsampling) -> FrameHeader:
+    """Returns the baseline frame of the luma and the chroma components, they use the quantization tables 0 and 1"""
+
+    vertical, horizontal = subsampling.get_luma_sampling() if channels > 1 else (1, 1)
+    components = [FrameComponent(identifier=1,
+                                 horizontal_sampling=horizontal,
+                                 vertical_sampling=vertical,
+                                 quantization_table=0)]
+    components += [FrameComponent(identifier=x + 1, horizontal_sampling=1, vertical_sampling=1, quantization_table=1)
+                   for x in range(1, channels)]
+
+    return FrameHeader(marker=Marker.SOF0,
+                       precision=FrameHeader.PRECISION,
+                       height=height,
+                       width=width,
+                       components=tuple(components))
+
+
+def encode_plane(frame: FrameHeader, component: FrameComponent, quantization: np.ndarray,
+                 plane: np.ndarray) -> np.ndarray:
+    """Returns the quantized coefficients of the full resolution plane of the component"""
+
+    # The edge samples are repeated to whole MCUs, so the padding blocks are cheap to code and do not bleed
+    max_vertical, max_horizontal = frame.get_max_sampling()
+    mcu_rows, mcu_columns = frame.get_mcu_counts()
+    padding = ((0, mcu_rows * BLOCK_SIZE * max_vertical - frame.height),
+               (0, mcu_columns * BLOCK_SIZE * max_horizontal - frame.width))
+
+    samples = downsample(np.pad(plane, padding, mode='edge'),
+                         max_vertical // component.vertical_sampling,
+                         max_horizontal // component.horizontal_sampling)
+
+    return quantize(forward_dct(plane_to_blocks(samples)), quantization)
+
+
+def encode_jpeg(pixels: np.ndarray, options: JPEGOptions = JPEGOptions()) -> bytes:
+    """Encodes the top-down (height, width, 3) RGB or (height, width, 1) grayscale image as the baseline JPEG"""
+
+    height, width, channels = pixels.shape
+    match channels:
+        case 1:
+            planes = [pixels[:, :, 0].astype(np.float32)]
+
+        case 3:
+            planes = rgb_to_ycbcr(pixels)
+
+        case _:
+            raise InvalidFormatException(f'Unsupported number of channels for JPEG: {channels}')
+
+    frame = encoder_frame(height, width, channels, options.subsampling)
+    tables = [QuantizationTable.from_quality(0, LUMINANCE_QUANTIZATION, options.quality).values,
+              QuantizationTable.from_quality(1, CHROMINANCE_QUANTIZATION, options.quality).values]
+    quantization = [tables[x.quantization_table] for x in frame.components]
+
+    return write_coefficients(JPEGCoefficients(frame=frame,
+                                               quantization=quantization,
+                                               coefficients=[encode_plane(frame, *x) for x in zip(frame.components,
+                                                                                                  quantization,
+                                                                                                  planes)]),
+                              options.optimize_huffman)
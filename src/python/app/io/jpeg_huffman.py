@@ -0,0 +1,452 @@
+"""Module providing the Huffman entropy coding of the JPEG scans from and to the coefficient arrays
+
+Every restart interval is unstuffed and turned into the list of the 32-bit windows that start at its bytes, so up to 25
+bits at any bit position are read with one list lookup and a shift. Codes are decoded with the tables of all the 16-bit
+prefixes. Only the decoding runs one Python iteration per coded symbol, the coefficients are written straight to the
+numpy arrays through memoryviews.
+
+The encoder has no per symbol loop: the symbols of all the blocks are derived with array operations, their codes are
+looked up at once and the bits are packed by numpy.
+"""
+
+import re
+from collections.abc import Buffer
+from dataclasses import dataclass
+from typing import final, Final, Optional
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.jpeg_segments import BLOCK_AREA, HuffmanTable, ScanHeader
+
+SCAN_END: Final = re.compile(rb'\xff[^\x00\xd0-\xd7]')
+RESTART_MARKER: Final = re.compile(rb'\xff[\xd0-\xd7]')
+STUFFED_BYTE: Final = b'\xff\x00'
+WINDOW_PADDING: Final = 8
+ZERO_RUN_LENGTH: Final = 0xF0
+MAX_RUN: Final = 15
+PACKED_SYMBOLS: Final = 1 << 20
+
+Block = tuple[int, int]
+
+
+def split_intervals(data: Buffer, offset: int) -> tuple[list[bytes], int]:
+    """Returns the unstuffed restart intervals of the entropy coded data that starts at the offset and the offset of
+    the marker that ends it
+    """
+
+    match = SCAN_END.search(data, offset)
+    end = len(memoryview(data)) if match is None else match.start()
+    segment = bytes(memoryview(data)[offset:end])
+
+    return [x.replace(STUFFED_BYTE, b'\xff') for x in RESTART_MARKER.split(segment)], end
+
+
+def bit_windows(interval: bytes) -> list[int]:
+    """Returns the big-endian 32-bit window at every byte of the interval, the bytes past its end are zero"""
+
+    padded = np.frombuffer(interval + bytes(WINDOW_PADDING), dtype=np.uint8).astype(np.uint32)
+    count = len(interval) + WINDOW_PADDING // 2
+
+    windows = padded[:count] << 24 | padded[1:count + 1] << 16 | padded[2:count + 2] << 8 | padded[3:count + 3]
+    return windows.tolist()
+
+
+def extend(bits: int, size: int) -> int:
+    """Returns the signed value of the size bits, the values with the leading zero bit are negative"""
+
+    return bits if bits >> (size - 1) else bits - (1 << size) + 1
+
+
+def magnitude_sizes(values: np.ndarray) -> np.ndarray:
+    """Returns the numbers of the bits of the absolute values, they are the categories of the coded values"""
+
+    return np.frexp(np.abs(values).astype(np.float64))[1].astype(np.int64)
+
+
+def magnitude_bits(values: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Returns the additional bits of the values, the negative ones are coded as the complement of the magnitude"""
+
+    return np.where(values < 0, values + (1 << sizes) - 1, values).astype(np.int64)
+
+
+def pack_bits(words: np.ndarray, lengths: np.ndarray) -> bytes:
+    """Concatenates the lowest length bits of every word, pads the last byte with ones and stuffs the 0xFF bytes"""
+
+    parts = []
+    for start in range(0, len(words), PACKED_SYMBOLS):
+        part_lengths = lengths[start:start + PACKED_SYMBOLS]
+        owners = np.repeat(np.arange(len(part_lengths)), part_lengths)
+        shifts = np.cumsum(part_lengths)[owners] - 1 - np.arange(len(owners))
+        parts.append((words[start:start + PACKED_SYMBOLS][owners] >> shifts & 1).astype(np.uint8))
+
+    bits = np.concatenate([*parts, np.ones(-sum(len(x) for x in parts) % 8, dtype=np.uint8)])
+    return np.packbits(bits).tobytes().replace(b'\xff', STUFFED_BYTE)
+
+
+@final
+@dataclass(slots=True, frozen=True)
+class SymbolStream:
+    """Class that holds the Huffman symbols of a sequential scan in their coding order, with the table index and the
+    additional bits of every symbol. The DC symbols of the scan component use the table 2 * component, the AC symbols
+    the next one.
+    """
+
+    tables: np.ndarray
+    symbols: np.ndarray
+    bits: np.ndarray
+    sizes: np.ndarray
+
+    @classmethod
+    def from_blocks(cls, blocks: np.ndarray, slots: np.ndarray) -> 'SymbolStream':
+        # pylint: disable=too-many-locals
+        """Additional constructor that codes the (count, 64) zigzag ordered blocks of the scan components in the slots.
+
+        Every block is the DC difference, the runs of the zeros with the nonzero AC coefficients, the zero run lengths
+        for the runs longer than 15 and the end of block unless the last coefficient is nonzero.
+        """
+
+        count = len(blocks)
+        differences = blocks[:, 0].astype(np.int64)
+        for slot in np.unique(slots):
+            mask = slots == slot
+            differences[mask] = np.diff(differences[mask], prepend=0)
+
+        block_indices, columns = np.nonzero(blocks[:, 1:])
+        values = blocks[block_indices, columns + 1].astype(np.int64)
+        first = np.ones(len(block_indices), dtype=np.bool_)
+        first[1:] = block_indices[1:] != block_indices[:-1]
+
+        previous = np.concatenate([[-1], columns[:-1]])
+        previous[first] = -1
+        runs = columns - previous - 1
+
+        last = np.zeros(count, dtype=np.int64)
+        ends = np.flatnonzero(np.append(first[1:], len(first) > 0))
+        last[block_indices[ends]] = columns[ends] + 1
+
+        # Positions of the symbols: the DC difference, the zero run lengths followed by their coefficient and the end
+        events = (runs >> 4) + 1
+        block_counts = 1 + np.bincount(block_indices, weights=events, minlength=count).astype(np.int64) \
+            + (last < BLOCK_AREA - 1)
+        block_starts = np.cumsum(block_counts) - block_counts
+
+        totals = np.cumsum(events)
+        block_totals = np.zeros(count, dtype=np.int64)
+        block_totals[block_indices[first]] = (totals - events)[first]
+        positions = block_starts[block_indices] + totals - block_totals[block_indices]
+
+        tables = np.repeat(2 * slots.astype(np.int64) + 1, block_counts)
+        symbols = np.zeros(len(tables), dtype=np.int64)
+        bits = np.zeros(len(tables), dtype=np.int64)
+        sizes = np.zeros(len(tables), dtype=np.int64)
+
+        tables[block_starts] -= 1
+        sizes[block_starts] = symbols[block_starts] = magnitude_sizes(differences)
+        bits[block_starts] = magnitude_bits(differences, sizes[block_starts])
+
+        long_runs = runs >> 4
+        zero_runs = np.repeat(positions - long_runs, long_runs) \
+            + np.arange(int(long_runs.sum())) - np.repeat(np.cumsum(long_runs) - long_runs, long_runs)
+        symbols[zero_runs] = ZERO_RUN_LENGTH
+
+        sizes[positions] = magnitude_sizes(values)
+        symbols[positions] = (runs & MAX_RUN) << 4 | sizes[positions]
+        bits[positions] = magnitude_bits(values, sizes[positions])
+
+        return cls(tables=tables, symbols=symbols, bits=bits, sizes=sizes)
+
+    def count_frequencies(self, table_count: int) -> np.ndarray:
+        """Returns the (table_count, 256) counts of the symbols of every table"""
+
+        counts = np.bincount(self.tables * 256 + self.symbols, minlength=table_count * 256)
+        return counts.reshape(table_count, 256)
+
+    def pack(self, tables: list[HuffmanTable]) -> bytes:
+        """Returns the entropy coded data of the symbols with the Huffman tables at their table indices"""
+
+        codes = np.stack([x.get_codes()[0] for x in tables])
+        lengths = np.stack([x.get_codes()[1] for x in tables])
+
+        symbol_lengths = lengths[self.tables, self.symbols]
+        if np.any(symbol_lengths == 0):
+            raise InvalidFormatException('Huffman table has no code for a symbol of the scan')
+
+        return pack_bits(codes[self.tables, self.symbols] << self.sizes | self.bits, symbol_lengths + self.sizes)
+
+
+@final
+class ScanDecoder:     # pylint: disable=too-few-public-methods
+    """Class that decodes the entropy coded data of one scan to the zigzag ordered coefficients of its components.
+
+    The coefficients are the flat memoryviews of the 16-bit component arrays, indexed by the scan component. Blocks are
+    the pairs of the scan component and the offset of the block in its coefficients, in the order of the scan. The
+    sequential scans store only the first frequencies of the zigzag order, the codes of the others are stepped over
+    with the skip lookups.
+    """
+
+    def __init__(self,
+                 scan: ScanHeader,
+                 coefficients: list[memoryview],
+                 dc_lookups: list[list[int]],
+                 ac_lookups: list[list[int]],
+                 frequencies: int = BLOCK_AREA,
+                 skip_lookups: Optional[list[list[int]]] = None) -> None:
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.scan = scan
+        self.coefficients = coefficients
+        self.dc_lookups = dc_lookups
+        self.ac_lookups = ac_lookups
+        self.frequencies = frequencies
+        self.skip_lookups = [] if skip_lookups is None else skip_lookups
+
+    def decode(self, intervals: list[bytes], blocks: list[Block], blocks_per_interval: int) -> None:
+        """Decodes the blocks, the prediction and the end of band run are reset at every restart interval"""
+
+        if blocks_per_interval <= 0:
+            blocks_per_interval = len(blocks)
+
+        interval_count = -(-len(blocks) // blocks_per_interval) if blocks else 0
+        if len(intervals) < interval_count:
+            raise InvalidFormatException(f'Missing restart markers: {len(intervals)} of {interval_count} intervals')
+
+        scan = self.scan
+        match (scan.spectral_start == 0, scan.approximation_high == 0):
+            case (True, True):
+                decode_interval = self.decode_dc_first if scan.spectral_end == 0 else self.decode_sequential
+            case (True, False):
+                decode_interval = self.decode_dc_refine
+            case (False, True):
+                decode_interval = self.decode_ac_first
+            case _:
+                decode_interval = self.decode_ac_refine
+
+        try:
+            for index in range(interval_count):
+                decode_interval(bit_windows(intervals[index]),
+                                blocks[index * blocks_per_interval:(index + 1) * blocks_per_interval])
+        except (IndexError, ValueError) as error:
+            raise InvalidFormatException(f'Corrupted JPEG scan data: {error}') from error
+
+    def decode_sequential(self, windows: list[int], blocks: list[Block]) -> None:
+        # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+        """Decodes the first frequencies of every block, the DC coefficients are coded as differences. The codes of the
+        other coefficients are stepped over without extracting their values.
+        """
+
+        coefficients, dc_lookups, ac_lookups = self.coefficients, self.dc_lookups, self.ac_lookups
+        frequencies, skip_lookups = self.frequencies, self.skip_lookups
+        predictions = [0] * len(coefficients)
+        position = 0
+
+        for slot, offset in blocks:
+            view = coefficients[slot]
+            ac_lookup = ac_lookups[slot]
+
+            entry = dc_lookups[slot][windows[position >> 3] >> (16 - (position & 7)) & 0xFFFF]
+            if entry == 0:
+                raise InvalidFormatException('Invalid DC Huffman code')
+
+            position += entry >> 8
+            size = entry & 0x0F
+            if size:
+                bits = windows[position >> 3] >> (32 - size - (position & 7)) & ((1 << size) - 1)
+                position += size
+                predictions[slot] += bits if bits >> (size - 1) else bits - (1 << size) + 1
+
+            view[offset] = predictions[slot]
+
+            index = 1
+            while index < frequencies:
+                entry = ac_lookup[windows[position >> 3] >> (16 - (position & 7)) & 0xFFFF]
+                if entry == 0:
+                    raise InvalidFormatException('Invalid AC Huffman code')
+
+                position += entry >> 8
+                size = entry & 0x0F
+                if size == 0:
+                    if entry & 0xF0 != 0xF0:
+                        index = BLOCK_AREA
+                        break
+
+                    index += 16
+                    continue
+
+                index += (entry >> 4) & 0x0F
+                if index < frequencies:
+                    bits = windows[position >> 3] >> (32 - size - (position & 7)) & ((1 << size) - 1)
+                    view[offset + index] = bits if bits >> (size - 1) else bits - (1 << size) + 1
+
+                position += size
+                index += 1
+
+            if index < BLOCK_AREA:
+                skip_lookup = skip_lookups[slot]
+                while index < BLOCK_AREA:
+                    window = windows[position >> 3] >> (16 - (position & 7)) & 0xFFFF
+                    entry = skip_lookup[window]
+                    if entry != 0 and index + (entry & 0x7F) < BLOCK_AREA:
+                        position += entry >> 8
+                        index += entry & 0x7F
+                        if entry & 0x80:
+                            break
+                        continue
+
+                    # The symbols longer than the window and the ones that may reach the end of the block, after which
+                    # the next block starts, are stepped over one at a time
+                    entry = ac_lookup[window]
+                    if entry == 0:
+                        raise InvalidFormatException('Invalid AC Huffman code')
+
+                    size = entry & 0x0F
+                    if size == 0 and entry & 0xF0 != 0xF0:
+                        position += entry >> 8
+                        break
+
+                    position += (entry >> 8) + size
+                    index += ((entry >> 4) & 0x0F) + 1
+
+            if index > BLOCK_AREA:
+                raise InvalidFormatException(f'Coefficient run past the end of the block: {index}')
+
+    def decode_dc_first(self, windows: list[int], blocks: list[Block]) -> None:
+        """Decodes the DC differences of the first progressive scan, scaled by the successive approximation"""
+
+        coefficients, dc_lookups = self.coefficients, self.dc_lookups
+        shift = self.scan.approximation_low
+        predictions = [0] * len(coefficients)
+        position = 0
+
+        for slot, offset in blocks:
+            entry = dc_lookups[slot][windows[position >> 3] >> (16 - (position & 7)) & 0xFFFF]
+            if entry == 0:
+                raise InvalidFormatException('Invalid DC Huffman code')
+
+            position += entry >> 8
+            size = entry & 0x0F
+            if size:
+                bits = windows[position >> 3] >> (32 - size - (position & 7)) & ((1 << size) - 1)
+                position += size
+                predictions[slot] += extend(bits, size)
+
+            coefficients[slot][offset] = predictions[slot] << shift
+
+    def decode_dc_refine(self, windows: list[int], blocks: list[Block]) -> None:
+        """Decodes one more bit of every DC coefficient"""
+
+        coefficients = self.coefficients
+        bit = 1 << self.scan.approximation_low
+
+        for position, (slot, offset) in enumerate(blocks):
+            if windows[position >> 3] >> (31 - (position & 7)) & 1:
+                coefficients[slot][offset] |= bit
+
+    def decode_ac_first(self, windows: list[int], blocks: list[Block]) -> None:
+        # pylint: disable=too-many-locals
+        """Decodes the band of the AC coefficients of one component, the bands of the following blocks that have no
+        coefficients are coded together as one end of band run
+        """
+
+        scan = self.scan
+        view = self.coefficients[0]
+        lookup = self.ac_lookups[0]
+        shift = scan.approximation_low
+        position = 0
+        end_of_band_run = 0
+
+        for _, offset in blocks:
+            if end_of_band_run > 0:
+                end_of_band_run -= 1
+                continue
+
+            index = scan.spectral_start
+            while index <= scan.spectral_end:
+                entry = lookup[windows[position >> 3] >> (16 - (position & 7)) & 0xFFFF]
+                if entry == 0:
+                    raise InvalidFormatException('Invalid AC Huffman code')
+
+                position += entry >> 8
+                run, size = (entry >> 4) & 0x0F, entry & 0x0F
+                if size == 0:
+                    if run == 15:
+                        index += 16
+                        continue
+
+                    end_of_band_run = (1 << run) - 1
+                    if run:
+                        end_of_band_run += windows[position >> 3] >> (32 - run - (position & 7)) & ((1 << run) - 1)
+                        position += run
+                    break
+
+                index += run
+                bits = windows[position >> 3] >> (32 - size - (position & 7)) & ((1 << size) - 1)
+                position += size
+                view[offset + index] = extend(bits, size) << shift
+                index += 1
+
+            if index > scan.spectral_end + 1:
+                raise InvalidFormatException(f'Coefficient run past the end of the band: {index}')
+
+    def decode_ac_refine(self, windows: list[int], blocks: list[Block]) -> None:
+        # pylint: disable=too-many-locals,too-many-branches,too-many-statements,too-many-nested-blocks
+        """Decodes one more bit of the band of the AC coefficients of one component. Coefficients that become nonzero
+        are coded by their zero runs, the correction bits of the already nonzero ones follow the codes.
+        """
+
+        scan = self.scan
+        view = self.coefficients[0]
+        lookup = self.ac_lookups[0]
+        positive, negative = 1 << scan.approximation_low, -1 << scan.approximation_low
+        position = 0
+        end_of_band_run = 0
+
+        for _, offset in blocks:
+            index = offset + scan.spectral_start
+            end = offset + scan.spectral_end
+
+            if end_of_band_run == 0:
+                while index <= end:
+                    entry = lookup[windows[position >> 3] >> (16 - (position & 7)) & 0xFFFF]
+                    if entry == 0:
+                        raise InvalidFormatException('Invalid AC Huffman code')
+
+                    position += entry >> 8
+                    run, size = (entry >> 4) & 0x0F, entry & 0x0F
+                    value = 0
+                    if size:
+                        value = positive if windows[position >> 3] >> (31 - (position & 7)) & 1 else negative
+                        position += 1
+                    elif run != 15:
+                        end_of_band_run = 1 << run
+                        if run:
+                            end_of_band_run += windows[position >> 3] >> (32 - run - (position & 7)) & ((1 << run) - 1)
+                            position += run
+                        break
+
+                    # Skips the run of the zero coefficients, the nonzero ones on the way get their correction bits
+                    while index <= end:
+                        coefficient = view[index]
+                        if coefficient:
+                            if windows[position >> 3] >> (31 - (position & 7)) & 1 and coefficient & positive == 0:
+                                view[index] = coefficient + (positive if coefficient >= 0 else negative)
+                            position += 1
+                        else:
+                            if run == 0:
+                                break
+                            run -= 1
+                        index += 1
+
+                    if value:
+                        view[index] = value
+                    index += 1
+
+            if end_of_band_run > 0:
+                while index <= end:
+                    coefficient = view[index]
+                    if coefficient:
+                        if windows[position >> 3] >> (31 - (position & 7)) & 1 and coefficient & positive == 0:
+                            view[index] = coefficient + (positive if coefficient >= 0 else negative)
+                        position += 1
+                    index += 1
+
+                end_of_band_run -= 1
@@ -0,0 +1,544 @@
+"""Module providing the marker segments of the JPEG format (https://www.w3.org/Graphics/JPEG/itu-t81.pdf)"""
+
+import heapq
+import struct
+from collections.abc import Buffer
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import ClassVar, Final
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+
+MARKER_PREFIX: Final = 0xFF
+BLOCK_SIZE: Final = 8
+BLOCK_AREA: Final = BLOCK_SIZE * BLOCK_SIZE
+
+# The natural (row-major) position of every coefficient of the block in the zigzag order
+ZIGZAG: Final = np.array([
+    0, 1, 8, 16, 9, 2, 3, 10, 17, 24, 32, 25, 18, 11, 4, 5,
+    12, 19, 26, 33, 40, 48, 41, 34, 27, 20, 13, 6, 7, 14, 21, 28,
+    35, 42, 49, 56, 57, 50, 43, 36, 29, 22, 15, 23, 30, 37, 44, 51,
+    58, 59, 52, 45, 38, 31, 39, 46, 53, 60, 61, 54, 47, 55, 62, 63,
+], dtype=np.intp)
+
+# The zigzag position of every coefficient of the block in the natural order
+ZIGZAG_INDEX: Final = np.argsort(ZIGZAG)
+
+# Quantization tables of the luminance and the chrominance in the natural order (ITU T.81 Annex K.1)
+LUMINANCE_QUANTIZATION: Final = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+], dtype=np.uint16)
+
+CHROMINANCE_QUANTIZATION: Final = np.array([
+    17, 18, 24, 47, 99, 99, 99, 99,
+    18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99,
+    47, 66, 99, 99, 99, 99, 99, 99,
+    *[99] * 32,
+], dtype=np.uint16)
+
+# Numbers of the codes of every length and the symbols of the typical Huffman tables (ITU T.81 Annex K.3)
+LUMINANCE_DC_COUNTS: Final = (0, 1, 5, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0)
+CHROMINANCE_DC_COUNTS: Final = (0, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0)
+DC_SYMBOLS: Final = bytes(range(12))
+
+LUMINANCE_AC_COUNTS: Final = (0, 2, 1, 3, 3, 2, 4, 3, 5, 5, 4, 4, 0, 0, 1, 0x7D)
+LUMINANCE_AC_SYMBOLS: Final = bytes.fromhex(
+    '01020300041105122131410613516107227114328191a1082342b1c11552d1f0'
+    '2433627282090a161718191a25262728292a3435363738393a434445464748494a'
+    '535455565758595a636465666768696a737475767778797a838485868788898a'
+    '92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6'
+    'c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9fa')
+
+CHROMINANCE_AC_COUNTS: Final = (0, 2, 1, 2, 4, 4, 3, 4, 7, 5, 4, 4, 0, 1, 2, 0x77)
+CHROMINANCE_AC_SYMBOLS: Final = bytes.fromhex(
+    '000102031104052131061241510761711322328108144291a1b1c109233352f0'
+    '156272d10a162434e125f11718191a262728292a35363738393a434445464748'
+    '494a535455565758595a636465666768696a737475767778797a828384858687'
+    '88898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3'
+    'c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae2e3e4e5e6e7e8e9eaf2f3f4f5f6f7f8f9fa')
+
+
+def to_segment(marker: int, data: bytes) -> bytes:
+    """Returns the marker segment with the length that counts itself"""
+
+    return struct.pack('>BBH', MARKER_PREFIX, marker, len(data) + 2) + data
+
+
+class Marker(IntEnum):
+    """Codes of the markers that follow the 0xFF prefix, the ones the codec does not handle are skipped or rejected"""
+
+    SOF0 = 0xC0
+    SOF1 = 0xC1
+    SOF2 = 0xC2
+    DHT = 0xC4
+    RST0 = 0xD0
+    RST7 = 0xD7
+    SOI = 0xD8
+    EOI = 0xD9
+    SOS = 0xDA
+    DQT = 0xDB
+    DRI = 0xDD
+    APP0 = 0xE0
+    APP14 = 0xEE
+    APP15 = 0xEF
+    COM = 0xFE
+
+    @classmethod
+    def is_restart(cls, code: int) -> bool:
+        """Checks if the code is one of the eight restart markers RST0 to RST7"""
+
+        return cls.RST0 <= code <= cls.RST7
+
+    @classmethod
+    def is_skipped(cls, code: int) -> bool:
+        """Checks if the segment of the marker carries no data for the decoder (application data and comments)"""
+
+        return cls.APP0 <= code <= cls.APP15 or code == cls.COM
+
+
+@dataclass(slots=True, frozen=True)
+class QuantizationTable:
+    """DQT, the quantizers of one table in the zigzag order"""
+
+    MAX_TABLES: ClassVar[int] = 4
+
+    identifier: int
+    values: np.ndarray
+
+    @classmethod
+    def from_segment(cls, data: Buffer) -> list['QuantizationTable']:
+        """Additional constructor that parses all the tables of the DQT segment"""
+
+        view = memoryview(data).cast('B')
+        tables = []
+        offset = 0
+        while offset < len(view):
+            precision, identifier = view[offset] >> 4, view[offset] & 0x0F
+            dtype = np.dtype('>u2') if precision == 1 else np.dtype(np.uint8)
+            end = offset + 1 + BLOCK_AREA * dtype.itemsize
+            if precision > 1 or end > len(view):
+                raise InvalidFormatException(f'Wrong quantization table: {precision=}, {identifier=}')
+
+            tables.append(cls(identifier=identifier,
+                              values=np.frombuffer(view[offset + 1:end], dtype=dtype).astype(np.uint16)))
+            offset = end
+
+        return tables
+
+    @classmethod
+    def from_quality(cls, identifier: int, base: np.ndarray, quality: int) -> 'QuantizationTable':
+        """Additional constructor that scales the natural ordered base table to the quality from 1 to 100 like IJG"""
+
+        scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+        values = np.clip((base.astype(np.int32) * scale + 50) // 100, 1, np.iinfo(np.uint8).max)
+
+        return cls(identifier=identifier, values=values[ZIGZAG].astype(np.uint16))
+
+    def __bytes__(self) -> bytes:
+        precision = int(np.any(self.values > np.iinfo(np.uint8).max))
+        dtype = np.dtype('>u2') if precision == 1 else np.dtype(np.uint8)
+
+        return bytes([precision << 4 | self.identifier]) + self.values.astype(dtype).tobytes()
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.identifier < self.MAX_TABLES:
+            raise InvalidFormatException(f'Wrong: {self.identifier=}')
+
+        if self.values.shape != (BLOCK_AREA,) or np.any(self.values == 0):
+            raise InvalidFormatException('Wrong quantization table values')
+
+
+@dataclass(slots=True, frozen=True)
+class HuffmanTable:
+    """DHT, the numbers of the codes of every length and the symbols of one Huffman table"""
+
+    DC_CLASS: ClassVar[int] = 0
+    AC_CLASS: ClassVar[int] = 1
+    MAX_TABLES: ClassVar[int] = 4
+    MAX_CODE_LENGTH: ClassVar[int] = 16
+
+    table_class: int
+    identifier: int
+    counts: tuple[int, ...]
+    symbols: bytes
+
+    @classmethod
+    def from_segment(cls, data: Buffer) -> list['HuffmanTable']:
+        """Additional constructor that parses all the tables of the DHT segment"""
+
+        view = memoryview(data).cast('B')
+        tables = []
+        offset = 0
+        while offset < len(view):
+            counts_end = offset + 1 + cls.MAX_CODE_LENGTH
+            if counts_end > len(view):
+                raise InvalidFormatException('Truncated Huffman table')
+
+            counts = tuple(view[offset + 1:counts_end])
+            symbols_end = counts_end + sum(counts)
+            if symbols_end > len(view):
+                raise InvalidFormatException('Truncated Huffman table symbols')
+
+            tables.append(cls(table_class=view[offset] >> 4,
+                              identifier=view[offset] & 0x0F,
+                              counts=counts,
+                              symbols=bytes(view[counts_end:symbols_end])))
+            offset = symbols_end
+
+        return tables
+
+    @classmethod
+    def from_frequencies(cls, table_class: int, identifier: int, frequencies: np.ndarray) -> 'HuffmanTable':
+        # pylint: disable=too-many-locals
+        """Additional constructor that builds the optimal table of the 256 symbol frequencies (ITU T.81 Annex K.2).
+
+        One reserved symbol keeps the all ones code unused. Codes longer than 16 bits are shortened by moving pairs of
+        the longest codes up the tree.
+        """
+
+        symbols = [x for x in range(len(frequencies)) if frequencies[x] > 0]
+        reserved = len(frequencies)
+        # The reserved symbol wins the ties of the rarest symbols, so it gets one of the longest codes
+        heap = [(int(frequencies[x]), x, [x]) for x in symbols] + [(1, -1, [reserved])]
+        heapq.heapify(heap)
+
+        lengths = dict.fromkeys([*symbols, reserved], 0)
+        while len(heap) > 1:
+            first_frequency, first_key, first_symbols = heapq.heappop(heap)
+            second_frequency, _, second_symbols = heapq.heappop(heap)
+            for symbol in first_symbols + second_symbols:
+                lengths[symbol] += 1
+            heapq.heappush(heap, (first_frequency + second_frequency, first_key, first_symbols + second_symbols))
+
+        counts = [0] * (max(lengths.values()) + 1)
+        for length in lengths.values():
+            counts[length] += 1
+
+        for length in range(len(counts) - 1, cls.MAX_CODE_LENGTH, -1):
+            while counts[length] > 0:
+                shorter = length - 2
+                while counts[shorter] == 0:
+                    shorter -= 1
+
+                counts[length] -= 2
+                counts[length - 1] += 1
+                counts[shorter + 1] += 2
+                counts[shorter] -= 1
+
+        counts = (counts + [0] * cls.MAX_CODE_LENGTH)[1:cls.MAX_CODE_LENGTH + 1]
+        counts[max(x for x in range(cls.MAX_CODE_LENGTH) if counts[x] > 0)] -= 1
+
+        ordered = sorted(symbols, key=lambda x: (lengths[x], x))
+        return cls(table_class=table_class, identifier=identifier, counts=tuple(counts), symbols=bytes(ordered))
+
+    def __bytes__(self) -> bytes:
+        return bytes([self.table_class << 4 | self.identifier, *self.counts]) + self.symbols
+
+    def __post_init__(self) -> None:
+        if self.table_class not in {self.DC_CLASS, self.AC_CLASS} or not 0 <= self.identifier < self.MAX_TABLES:
+            raise InvalidFormatException(f'Wrong Huffman table: {self.table_class=}, {self.identifier=}')
+
+        if len(self.counts) != self.MAX_CODE_LENGTH or sum(self.counts) != len(self.symbols):
+            raise InvalidFormatException('Wrong Huffman table code counts')
+
+        # Codes of every length continue the codes of the previous one, so they have to fit the length
+        capacity = 1
+        for count in self.counts:
+            capacity = 2 * capacity - count
+            if capacity < 0:
+                raise InvalidFormatException('Huffman table codes exceed their lengths')
+
+    def get_code_lengths(self) -> np.ndarray:
+        """Returns the length of the canonical code of every symbol"""
+
+        return np.repeat(np.arange(1, self.MAX_CODE_LENGTH + 1), self.counts)
+
+    def get_codes(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the canonical codes and their lengths indexed by the symbols, unused symbols have zero length"""
+
+        lengths = self.get_code_lengths()
+        starts = np.zeros(self.MAX_CODE_LENGTH + 1, dtype=np.int64)
+        for length in range(1, self.MAX_CODE_LENGTH):
+            starts[length + 1] = (starts[length] + self.counts[length - 1]) << 1
+
+        # Codes of one length are consecutive numbers that start where the codes of the previous length end
+        first_index = np.concatenate([[0], np.cumsum(self.counts)])[lengths - 1]
+        codes_by_index = starts[lengths] + np.arange(len(lengths)) - first_index
+
+        symbols = np.frombuffer(self.symbols, dtype=np.uint8)
+        codes, code_lengths = np.zeros(256, dtype=np.int64), np.zeros(256, dtype=np.int64)
+        codes[symbols], code_lengths[symbols] = codes_by_index, lengths
+
+        return codes, code_lengths
+
+    def build_lookup(self) -> list[int]:
+        """Returns the table of all the 16-bit prefixes to the code length shifted by 8 bits with the symbol.
+
+        Canonical codes are assigned in the increasing order, so the prefixes of consecutive symbols are consecutive
+        ranges starting from zero. Prefixes of no code map to zero.
+        """
+
+        entries = self.get_code_lengths() << 8 | np.frombuffer(self.symbols, dtype=np.uint8)
+        return self.expand_prefixes(entries).tolist()
+
+    def build_skip_lookup(self) -> list[int]:
+        """Returns the table of all the 16-bit prefixes of the AC codes to the bits of the whole symbols that they hold
+        shifted by 8 bits with the end of block flag at bit 7 and the number of the zigzag positions that the symbols
+        move. The reduced scales step over the coefficients that they do not need with one lookup per window.
+
+        The symbols are taken while their codes and additional bits fit in the window, up to the end of block. Prefixes
+        whose first symbol does not fit map to zero.
+        """
+
+        symbols = np.frombuffer(self.symbols, dtype=np.uint8).astype(np.int64)
+        runs, sizes = symbols >> 4, symbols & 0x0F
+        # The zero run length symbol 0xF0 moves over 16 zeros, the other symbols of no size end the block
+        ends = (sizes == 0) & (runs != 0x0F)
+        advances = np.where(ends, 0, runs + 1)
+        symbol_lookup = self.expand_prefixes((self.get_code_lengths() + sizes) << 8 | ends << 7 | advances)
+
+        windows = np.arange(1 << self.MAX_CODE_LENGTH, dtype=np.int64)
+        consumed, moved = np.zeros_like(windows), np.zeros_like(windows)
+        ended = np.zeros(windows.shape, dtype=bool)
+        # Every symbol takes at least one bit of the window
+        for _ in range(self.MAX_CODE_LENGTH):
+            entries = symbol_lookup[windows << consumed & 0xFFFF]
+            lengths = entries >> 8
+            taken = (entries != 0) & ~ended & (consumed + lengths <= self.MAX_CODE_LENGTH) & (moved < BLOCK_AREA)
+            consumed += np.where(taken, lengths, 0)
+            moved += np.where(taken, entries & 0x7F, 0)
+            ended |= taken & (entries & 0x80 != 0)
+
+        return (consumed << 8 | ended << 7 | moved).tolist()
+
+    def expand_prefixes(self, entries: np.ndarray) -> np.ndarray:
+        """Returns the table of all the 16-bit prefixes to the entries of the symbols whose codes they start with"""
+
+        lookup = np.zeros(1 << self.MAX_CODE_LENGTH, dtype=np.int64)
+
+        spans = np.left_shift(1, self.MAX_CODE_LENGTH - self.get_code_lengths())
+        lookup[:int(spans.sum())] = np.repeat(entries, spans)
+
+        return lookup
+
+
+@dataclass(slots=True, frozen=True)
+class FrameComponent:
+    """One component of the frame header with its sampling factors and quantization table"""
+
+    MAX_SAMPLING: ClassVar[int] = 4
+
+    identifier: int
+    horizontal_sampling: int
+    vertical_sampling: int
+    quantization_table: int
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.horizontal_sampling <= self.MAX_SAMPLING:
+            raise InvalidFormatException(f'Wrong: {self.horizontal_sampling=}')
+
+        if not 1 <= self.vertical_sampling <= self.MAX_SAMPLING:
+            raise InvalidFormatException(f'Wrong: {self.vertical_sampling=}')
+
+        if not 0 <= self.quantization_table < QuantizationTable.MAX_TABLES:
+            raise InvalidFormatException(f'Wrong: {self.quantization_table=}')
+
+
+@dataclass(slots=True, frozen=True)
+class FrameHeader:
+    """SOF0, SOF1 or SOF2, the size of the image and its components"""
+
+    PRECISION: ClassVar[int] = 8
+    SUPPORTED_MARKERS: ClassVar[frozenset[int]] = frozenset({Marker.SOF0, Marker.SOF1, Marker.SOF2})
+    MAX_COMPONENTS: ClassVar[int] = 4
+    MAX_BLOCKS_IN_MCU: ClassVar[int] = 10
+
+    marker: int
+    precision: int
+    height: int
+    width: int
+    components: tuple[FrameComponent, ...]
+
+    @classmethod
+    def from_bytes(cls, marker: int, data: Buffer) -> 'FrameHeader':
+        """Additional constructor for the class that allows the object creation from the raw data"""
+
+        view = memoryview(data).cast('B')
+        if len(view) < 6 or len(view) != 6 + 3 * view[5]:
+            raise InvalidFormatException(f'Wrong frame header length: {len(view)}')
+
+        precision, height, width, count = struct.unpack_from('>BHHB', view)
+        components = tuple(FrameComponent(identifier=view[offset],
+                                          horizontal_sampling=view[offset + 1] >> 4,
+                                          vertical_sampling=view[offset + 1] & 0x0F,
+                                          quantization_table=view[offset + 2])
+                           for offset in range(6, 6 + 3 * count, 3))
+
+        return cls(marker=marker, precision=precision, height=height, width=width, components=components)
+
+    def __post_init__(self) -> None:
+        if self.marker not in self.SUPPORTED_MARKERS:
+            raise InvalidFormatException(f'Unsupported JPEG coding process: {self.marker:#x}')
+
+        if self.precision != self.PRECISION:
+            raise InvalidFormatException(f'Unsupported sample precision: {self.precision}')
+
+        # The height defined later by the DNL marker is not supported
+        if self.height <= 0 or self.width <= 0:
+            raise InvalidFormatException(f'Wrong frame size: {self.width=}, {self.height=}')
+
+        if not 1 <= len(self.components) <= self.MAX_COMPONENTS:
+            raise InvalidFormatException(f'Wrong number of components: {len(self.components)}')
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('>BHHB', self.precision, self.height, self.width, len(self.components)) + b''.join(
+            bytes([x.identifier, x.horizontal_sampling << 4 | x.vertical_sampling, x.quantization_table])
+            for x in self.components)
+
+    def is_progressive(self) -> bool:
+        """Checks if the coefficients are refined by many scans"""
+
+        return self.marker == Marker.SOF2
+
+    def get_max_sampling(self) -> tuple[int, int]:
+        """Returns the largest vertical and horizontal sampling factors, they define the size of the MCU"""
+
+        return max(x.vertical_sampling for x in self.components), max(x.horizontal_sampling for x in self.components)
+
+    def get_mcu_counts(self) -> tuple[int, int]:
+        """Returns the numbers of the MCU rows and columns that cover the image"""
+
+        max_vertical, max_horizontal = self.get_max_sampling()
+        return -(-self.height // (BLOCK_SIZE * max_vertical)), -(-self.width // (BLOCK_SIZE * max_horizontal))
+
+    def get_component_size(self, component: FrameComponent) -> tuple[int, int]:
+        """Returns the height and the width of the subsampled component in samples"""
+
+        max_vertical, max_horizontal = self.get_max_sampling()
+        return -(-self.height * component.vertical_sampling // max_vertical), \
+            -(-self.width * component.horizontal_sampling // max_horizontal)
+
+    def get_block_counts(self, component: FrameComponent) -> tuple[int, int]:
+        """Returns the numbers of the block rows and columns of the component, including the padding of the MCUs"""
+
+        mcu_rows, mcu_columns = self.get_mcu_counts()
+        return mcu_rows * component.vertical_sampling, mcu_columns * component.horizontal_sampling
+
+
+@dataclass(slots=True, frozen=True)
+class ScanComponent:
+    """One component of the scan header, the index of the frame component and its Huffman tables"""
+
+    component_index: int
+    dc_table: int
+    ac_table: int
+
+
+@dataclass(slots=True, frozen=True)
+class ScanHeader:
+    """SOS, the components coded in the scan and the coefficients and bits they refine"""
+
+    MAX_COMPONENTS: ClassVar[int] = 4
+
+    components: tuple[ScanComponent, ...]
+    spectral_start: int
+    spectral_end: int
+    approximation_high: int
+    approximation_low: int
+
+    @classmethod
+    def from_bytes(cls, data: Buffer, frame: FrameHeader) -> 'ScanHeader':
+        """Additional constructor that maps the component identifiers to the components of the frame"""
+
+        view = memoryview(data).cast('B')
+        if len(view) < 1 or len(view) != 4 + 2 * view[0]:
+            raise InvalidFormatException(f'Wrong scan header length: {len(view)}')
+
+        identifiers = [x.identifier for x in frame.components]
+        components = []
+        for offset in range(1, 1 + 2 * view[0], 2):
+            if view[offset] not in identifiers:
+                raise InvalidFormatException(f'Scan of an unknown component: {view[offset]}')
+
+            components.append(ScanComponent(component_index=identifiers.index(view[offset]),
+                                            dc_table=view[offset + 1] >> 4,
+                                            ac_table=view[offset + 1] & 0x0F))
+
+        return cls(components=tuple(components),
+                   spectral_start=view[-3],
+                   spectral_end=view[-2],
+                   approximation_high=view[-1] >> 4,
+                   approximation_low=view[-1] & 0x0F)
+
+    def __post_init__(self) -> None:
+        if not 1 <= len(self.components) <= self.MAX_COMPONENTS:
+            raise InvalidFormatException(f'Wrong number of scan components: {len(self.components)}')
+
+        if not 0 <= self.spectral_start <= self.spectral_end < BLOCK_AREA:
+            raise InvalidFormatException(f'Wrong spectral selection: {self.spectral_start}..{self.spectral_end}')
+
+        # AC coefficients of the progressive scans are coded for one component at a time
+        if self.spectral_start > 0 and len(self.components) != 1:
+            raise InvalidFormatException('AC scan must have one component')
+
+    def to_bytes(self, frame: FrameHeader) -> bytes:
+        """Serializes the scan header, the components are referred by the identifiers of the frame components"""
+
+        return bytes([len(self.components)]) + b''.join(
+            bytes([frame.components[x.component_index].identifier, x.dc_table << 4 | x.ac_table])
+            for x in self.components) \
+            + bytes([self.spectral_start, self.spectral_end, self.approximation_high << 4 | self.approximation_low])
+
+    def get_blocks_in_mcu(self, frame: FrameHeader) -> int:
+        """Returns the number of blocks of one MCU of the scan, the restart interval is counted in MCUs"""
+
+        if len(self.components) == 1:
+            return 1
+
+        return sum(frame.components[x.component_index].vertical_sampling
+                   * frame.components[x.component_index].horizontal_sampling for x in self.components)
+
+    def get_block_order(self, frame: FrameHeader) -> tuple[np.ndarray, np.ndarray]:
+        # pylint: disable=too-many-locals
+        """Returns the scan components and the indices of the blocks in the component arrays in their coding order.
+
+        The single component scans cover only the blocks of the component size, the interleaved ones cover whole MCUs.
+        """
+
+        if len(self.components) == 1:
+            component = frame.components[self.components[0].component_index]
+            height, width = frame.get_component_size(component)
+            stride = frame.get_block_counts(component)[1]
+
+            rows = np.arange(-(-height // BLOCK_SIZE))[:, np.newaxis] * stride
+            indices = (rows + np.arange(-(-width // BLOCK_SIZE))).ravel()
+            return np.zeros(len(indices), dtype=np.int64), indices
+
+        if self.get_blocks_in_mcu(frame) > FrameHeader.MAX_BLOCKS_IN_MCU:
+            raise InvalidFormatException(f'Too many blocks in MCU: {self.get_blocks_in_mcu(frame)}')
+
+        mcu_rows, mcu_columns = frame.get_mcu_counts()
+        slots, offsets = [], []
+        for slot, scan_component in enumerate(self.components):
+            component = frame.components[scan_component.component_index]
+            vertical, horizontal = component.vertical_sampling, component.horizontal_sampling
+            stride = frame.get_block_counts(component)[1]
+
+            # Blocks of the component in the MCU are ordered left to right and top to bottom
+            inner = (np.arange(vertical)[:, np.newaxis] * stride + np.arange(horizontal)).ravel()
+            origins = np.arange(mcu_rows)[:, np.newaxis] * vertical * stride + np.arange(mcu_columns) * horizontal
+            offsets.append((origins[:, :, np.newaxis] + inner).reshape(mcu_rows, mcu_columns, -1))
+            slots.append(np.full(len(inner), slot))
+
+        mcu_slots = np.broadcast_to(np.concatenate(slots), (mcu_rows, mcu_columns, self.get_blocks_in_mcu(frame)))
+        return mcu_slots.ravel(), np.concatenate(offsets, axis=2).ravel()
@@ -0,0 +1,88 @@
+"""Module providing the lossless rotations and flips of the JPEG images on their quantized coefficients
+
+Mirroring the samples of a block negates its odd frequencies in that direction and transposing the samples transposes
+the coefficients, so the blocks are moved and rearranged without the inverse and the forward DCT. The coefficients and
+the quantization tables are kept exactly, only the entropy coding is repeated.
+"""
+
+from dataclasses import replace
+from enum import Enum
+
+import numpy as np
+
+from app.io.jpeg_decoder import JPEGCoefficients
+from app.io.jpeg_segments import BLOCK_SIZE, ZIGZAG, ZIGZAG_INDEX, FrameHeader
+
+TRANSPOSED_ZIGZAG = ZIGZAG_INDEX[(ZIGZAG % BLOCK_SIZE) * BLOCK_SIZE + ZIGZAG // BLOCK_SIZE]
+HORIZONTAL_SIGNS = np.where(ZIGZAG % BLOCK_SIZE % 2, -1, 1).astype(np.int16)
+VERTICAL_SIGNS = np.where(ZIGZAG // BLOCK_SIZE % 2, -1, 1).astype(np.int16)
+
+
+class JPEGTransform(Enum):
+    """Lossless transform of the image as it is displayed, the transposition is applied before the mirroring"""
+
+    NONE = (False, False, False)
+    ROTATE_90 = (True, True, False)
+    ROTATE_180 = (False, True, True)
+    ROTATE_270 = (True, False, True)
+    FLIP_HORIZONTAL = (False, True, False)
+    FLIP_VERTICAL = (False, False, True)
+
+    @classmethod
+    def from_rotations(cls, rotations: int) -> 'JPEGTransform':
+        """Additional constructor of the clockwise rotation by the number of quarter turns, negative ones rotate back"""
+
+        return (cls.NONE, cls.ROTATE_90, cls.ROTATE_180, cls.ROTATE_270)[rotations % 4]
+
+    def is_transposed(self) -> bool:
+        """Checks if the rows and the columns of the image are swapped"""
+
+        return self.value[0]
+
+    def is_mirrored(self) -> tuple[bool, bool]:
+        """Returns if the transposed image is mirrored vertically and horizontally"""
+
+        return self.value[2], self.value[1]
+
+    def is_perfect(self, frame: FrameHeader) -> bool:
+        """Checks if the mirrored sides of the image are whole MCUs, otherwise the padding of the edge blocks would be
+        moved inside the image and the transform is not lossless
+        """
+
+        max_vertical, max_horizontal = frame.get_max_sampling()
+        sizes = (frame.height, frame.width)
+        mcu_sizes = (BLOCK_SIZE * max_vertical, BLOCK_SIZE * max_horizontal)
+        if self.is_transposed():
+            sizes, mcu_sizes = sizes[::-1], mcu_sizes[::-1]
+
+        return all(size % mcu_size == 0 for size, mcu_size, mirrored in zip(sizes, mcu_sizes, self.is_mirrored())
+                   if mirrored)
+
+    def apply(self, image: JPEGCoefficients) -> JPEGCoefficients:
+        """Returns the transformed coefficients, the frame is transposed with its sampling factors and the tables"""
+
+        frame = image.frame
+        quantization = image.quantization
+        coefficients = image.coefficients
+        if self.is_transposed():
+            frame = replace(frame,
+                            height=frame.width,
+                            width=frame.height,
+                            components=tuple(replace(x,
+                                                     horizontal_sampling=x.vertical_sampling,
+                                                     vertical_sampling=x.horizontal_sampling)
+                                             for x in frame.components))
+            quantization = [x[TRANSPOSED_ZIGZAG] for x in quantization]
+            coefficients = [x.transpose(1, 0, 2)[..., TRANSPOSED_ZIGZAG] for x in coefficients]
+
+        vertical, horizontal = self.is_mirrored()
+        if vertical:
+            coefficients = [x[::-1] * VERTICAL_SIGNS for x in coefficients]
+
+        if horizontal:
+            coefficients = [x[:, ::-1] * HORIZONTAL_SIGNS for x in coefficients]
+
+        return JPEGCoefficients(frame=frame,
+                                quantization=quantization,
+                                coefficients=[np.ascontiguousarray(x) for x in coefficients],
+                                color_transform=image.color_transform)
@@ -1,33 +1,28 @@
 """Module providing serialization and deserialization for PNG format (https://en.wikipedia.org/wiki/PNG)"""
 
+import itertools
+import os
 import struct
+import time
 import zlib
-from abc import ABC, abstractmethod
-from dataclasses import dataclass, astuple
-from enum import IntEnum
-from typing import final, BinaryIO, override, ClassVar, Sequence
+from argparse import Namespace
+from collections.abc import Buffer, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, astuple, replace
+from typing import final, BinaryIO, override, ClassVar, Final, Optional, Sequence
 
 import numpy as np
 
 from app.error.invalid_format_exception import InvalidFormatException
 from app.image.image import Image
-from app.io.format_checker import IFormatChecker, check_compare
-from app.io.format_reader import IFormatReader
+from app.io.codec_options import CompressionStrategy, CRCVerification, FilterSelection, PNGOptions
+from app.io.format_probe import IFormatProbe, ImageInfo
+from app.io.format_reader import IFormatReader, read_buffer
 from app.io.format_writer import IFormatWriter
 from app.io.known_format import KnownFormat
-
-
-@final
-class PNGChecker(IFormatChecker):
-    """Class checking if a given file starts with a PNG signature. Used for the type deduction"""
-
-    @override
-    def check_format(self, file: BinaryIO) -> bool:
-        return check_compare(file, '89504E470D0A1A0A')
-
-    @override
-    def type(self) -> KnownFormat:
-        return KnownFormat.PNG
+from app.io.png_chunks import ChunkType, IChunkDataTypeSerializer, IDATData, IENDData, IHDRData, PLTEData, PNGChunk, \
+    TRNSData, iterate_chunks, verify_chunks
+from app.io.png_filter import unfilter_scanlines
 
 
 @dataclass(slots=True, frozen=True)
@@ -100,289 +95,225 @@ class PNGSignature:
         return struct.pack('>BBBBHBB', *astuple(self))
 
 
-class ChunkType(IntEnum):
-    """https://en.wikipedia.org/wiki/PNG#%22Chunks%22_within_the_file"""
-
-    # pylint: disable=invalid-name
-    IHDR = 0x49484452
-    PLTE = 0x504C5445
-    IDAT = 0x49444154
-    IEND = 0x49454E44
-
-    tRNS = 0x74524E53
-    cHRM = 0x6348524D
-    gAMA = 0x67414D41
-    iCCP = 0x69434350
-    sBIT = 0x73424954
-    sRGB = 0x73524742
-    cICP = 0x63494350
-    mDCV = 0x6D444356
-    cLLI = 0x634C4C49
-
-    tEXt = 0x74455874
-    zTXt = 0x7A545874
-    iTXt = 0x69545874
-
-    bKGD = 0x624B4744
-    hIST = 0x68495354
-    pHYs = 0x70485973
-    sPLT = 0x73504C54
-    eXIf = 0x65584966
-    tIME = 0x74494D45
-    acTL = 0x6163544C
-    fcTL = 0x6663544C
-    fdAT = 0x66644154
+ROW_BAND_SIZE: Final = 1 << 22
 
-    @classmethod
-    def map_data_to_chunk_type(cls, data: bytes) -> 'ChunkType':
-        """Additional constructor that converts the 4 bytes of the type to a ChunkType enum"""
 
-        return cls(*struct.unpack('>I', data))
+def inflate_bands(compressed: Iterable[Buffer], band_sizes: Iterable[int]) -> Iterator[bytes]:
+    """Inflates the zlib stream split over the buffers and yields it in pieces of the band sizes, the last piece is
+    shorter if the stream ends before. The data after the last band is not inflated.
 
-    def map_chunk_type_to_data_class(self):
-        """Convert the Chunk type to a class that will handle parsing of the chunk data filed"""
+    The output of every decompression call is limited, so the whole decompressed stream is never held at once.
+    """
 
-        match self:
-            case ChunkType.IHDR:
-                return IHDRData
+    decompressor = zlib.decompressobj()
+    sizes = iter(band_sizes)
+    band_size = next(sizes, 0)
+    band = bytearray()
 
-            case ChunkType.PLTE:
-                return PLTEData
+    for data in compressed:
+        while band_size != 0:
+            band += decompressor.decompress(data, band_size - len(band))
+            data = decompressor.unconsumed_tail
 
-            case ChunkType.IDAT:
-                return IDATData
+            if len(band) == band_size:
+                yield bytes(band)
+                band.clear()
+                band_size = next(sizes, 0)
+            elif len(data) == 0:
+                break
 
-            case ChunkType.IEND:
-                return IENDData
+    if len(band) != 0:
+        yield bytes(band)
 
-            case _:
-                return NotCriticalData
 
+# Row start, column start, row step and column step of the seven reduced images
+ADAM7_PASSES: Final = ((0, 0, 8, 8), (0, 4, 8, 8), (4, 0, 8, 4), (0, 2, 4, 4),
+                       (2, 0, 4, 2), (0, 1, 2, 2), (1, 0, 2, 1))
 
-class IChunkDataTypeSerializer(ABC):
-    """Interface for the Chunk data serialization"""
 
-    @abstractmethod
-    def type(self) -> ChunkType:
-        """Method that returns the Chunk type the serializer can parse"""
+def adam7_passes(height: int, width: int) -> Iterator[tuple[tuple[slice, slice], int, int]]:
+    """Yields the index of the pixels of every non-empty Adam7 pass in the image with the pass height and width"""
 
-    @abstractmethod
-    def __bytes__(self) -> bytes:
-        pass
+    for row_start, column_start, row_step, column_step in ADAM7_PASSES:
+        rows = max(0, -(-(height - row_start) // row_step))
+        columns = max(0, -(-(width - column_start) // column_step))
 
+        if rows != 0 and columns != 0:
+            yield (slice(row_start, None, row_step), slice(column_start, None, column_step)), rows, columns
 
-@dataclass(slots=True, frozen=True)
-class IHDRData(IChunkDataTypeSerializer):
-    """IHDR"""
 
-    DATA_LENGTH: ClassVar[int] = 13
+def interlaced_bands(i_header: IHDRData,
+                     band_height: Optional[int] = None) -> Iterator[tuple[tuple[slice, slice], int, int, int]]:
+    """Yields the index of the pixels of every row band of the Adam7 passes with the first row of the band in its pass,
+    the band height and the pass width.
 
-    DEFLATE_COMPRESSION: ClassVar[int] = 0
+    Bands are at most band_height rows of their pass, by default they fit ROW_BAND_SIZE bytes.
+    """
 
-    FILTER_METHOD: ClassVar[int] = 0
+    for (row_index, column_index), rows, columns in adam7_passes(i_header.height, i_header.width):
+        pass_band_height = band_height or max(1, ROW_BAND_SIZE // i_header.get_scanline_size(columns))
 
-    WITH_NO_INTERLACE: ClassVar[int] = 0
-    WITH_INTERLACE_ADAM7: ClassVar[int] = 1
+        for first_row in range(0, rows, pass_band_height):
+            band_rows = min(pass_band_height, rows - first_row)
+            band_start = row_index.start + first_row * row_index.step
 
-    width: int
-    height: int
-    bit_depth: int
-    color_type: int
-    compression_method: int
-    filter_method: int
-    interlace_method: int
+            yield (slice(band_start, band_start + band_rows * row_index.step, row_index.step), column_index), \
+                first_row, band_rows, columns
 
-    @classmethod
-    def from_bytes(cls, data: bytes) -> 'IHDRData':
-        """Additional constructor for the class that allows the object creation from the raw data"""
 
-        if len(data) < cls.DATA_LENGTH:
-            raise InvalidFormatException(f"Header too short, received: {len(data)} instead of {cls.DATA_LENGTH}")
+def decode_interlaced(i_header: IHDRData,
+                      compressed: Iterable[Buffer],
+                      band_height: Optional[int] = None) -> np.ndarray:
+    """Decodes the Adam7 interlaced image data to (height, width, channels) pixels.
 
-        return cls(*struct.unpack('>IIBBBBB', data))
+    The scanlines of every pass are inflated and reversed in row bands like the ones of the non-interlaced images, the
+    last row of a band is the row above the next band of the same pass. Every band is scattered into the image with
+    one strided slice assignment.
+    """
 
-    @classmethod
-    def from_numpy(cls, data: np.ndarray) -> 'IHDRData':
-        """Additional constructor for the class that allows the object creation from the raw data"""
+    bands = list(interlaced_bands(i_header, band_height))
+    band_sizes = [rows * i_header.get_scanline_size(columns) for _, _, rows, columns in bands]
 
-        return cls(width=data.shape[1],
-                   height=data.shape[0],
-                   bit_depth=16 if data.dtype == np.uint16 else 8,
-                   color_type=6,
-                   compression_method=cls.DEFLATE_COMPRESSION,
-                   filter_method=cls.FILTER_METHOD,
-                   interlace_method=cls.WITH_NO_INTERLACE)
+    pixels = np.empty((i_header.height, i_header.width, i_header.get_sample_channels()),
+                      dtype=i_header.get_sample_dtype())
+    previous_row: Optional[np.ndarray] = None
 
-    @override
-    def type(self) -> ChunkType:
-        return ChunkType.IHDR
+    for (index, first_row, rows, columns), band_size, data in itertools.zip_longest(
+            bands, band_sizes, inflate_bands(compressed, band_sizes)):
+        if data is None or len(data) < band_size:
+            raise InvalidFormatException(f'Image data too short: {sum(band_sizes)} bytes expected')
 
-    def __bytes__(self) -> bytes:
-        return struct.pack('>IIBBBBB', *astuple(self))
+        # The first band of every pass starts from the zero row above it
+        scanlines = np.frombuffer(data, dtype=np.uint8).reshape((rows, band_size // rows))
+        band = unfilter_scanlines(scanlines, i_header.get_bytes_per_pixel(), previous_row if first_row else None)
+        previous_row = band[-1].copy()
 
-    def __post_init__(self) -> None:
-        if self.bit_depth not in {1, 2, 4, 8, 16}:
-            raise InvalidFormatException("Invalid IHDR")
+        pixels[index] = i_header.unpack_samples(band, columns)
 
+    return pixels
 
-@dataclass(slots=True, frozen=True)
-class PLTEData(IChunkDataTypeSerializer):
-    """PLTE"""
 
-    palette_entries: np.ndarray
+def build_palette(chunks: Iterable[PNGChunk]) -> Optional[np.ndarray]:
+    """Returns the lookup table of all the 256 indices to RGB colors from the PLTE chunk, or RGBA colors if the tRNS
+    chunk is present. Indices past the palette are black and entries past the tRNS alpha are opaque.
+    """
 
-    @classmethod
-    def from_bytes(cls, data: bytes) -> 'PLTEData':
-        """Additional constructor for the class that allows the object creation from the raw data"""
+    entries: Optional[np.ndarray] = None
+    alpha: Optional[np.ndarray] = None
+    for chunk in chunks:
+        if chunk.chunk_type == ChunkType.PLTE:
+            entries = chunk.chunk_data.palette_entries
+        elif chunk.chunk_type == ChunkType.tRNS:
+            alpha = chunk.chunk_data.alpha[:PLTEData.MAX_ENTRIES]
 
-        length, remainder = divmod(len(data), 3)
-        if remainder != 0:
-            raise InvalidFormatException("Wrong Palette")
+    if entries is None:
+        return None
 
-        return cls(palette_entries=np.frombuffer(data, dtype=np.uint8).reshape((length, 3)))
+    palette = np.zeros((PLTEData.MAX_ENTRIES, 3 if alpha is None else 4), dtype=np.uint8)
+    palette[:len(entries), :3] = entries
+    if alpha is not None:
+        palette[:, 3] = np.iinfo(np.uint8).max
+        palette[:len(alpha), 3] = alpha
 
-    @override
-    def type(self) -> ChunkType:
-        return ChunkType.PLTE
+    return palette
 
-    def __bytes__(self) -> bytes:
-        return self.palette_entries.tobytes()
 
-    def __post_init__(self) -> None:
-        if len(self.palette_entries.shape) != 2:
-            raise InvalidFormatException("Wrong Palette")
+def apply_palette(samples: np.ndarray, palette: Optional[np.ndarray]) -> np.ndarray:
+    """Expands the palette indices of the samples to colors with one gather, other samples are returned unchanged"""
 
-        if 1 <= self.palette_entries.shape[0] <= 256:
-            raise InvalidFormatException("Wrong Palette")
+    return samples if palette is None else palette[samples[:, :, 0]]
 
-        if self.palette_entries.shape[1] == 3:
-            raise InvalidFormatException("Wrong Palette")
 
+def decode_row_bands(i_header: IHDRData,
+                     compressed: Iterable[Buffer],
+                     band_height: Optional[int] = None,
+                     palette: Optional[np.ndarray] = None) -> Iterator[np.ndarray]:
+    """Yields the reversed (rows, width, channels) bands of the image while the compressed data is being inflated.
 
-@dataclass(slots=True, frozen=True)
-class IDATData(IChunkDataTypeSerializer):
-    """IDAT"""
+    Bands are at most band_height rows, by default they fit ROW_BAND_SIZE bytes. The last row of every band is the row
+    above the next band, so the filters are reversed across the band boundaries. Interlaced images spread every pass
+    over the whole image, so they are yielded as one band, while the passes are inflated and reversed in row bands of
+    their own. Indexed images are expanded with the palette lookup table.
+    """
 
-    compressed_data: bytes
+    if i_header.color_type != IHDRData.INDEXED_COLOR_TYPE:
+        palette = None
+    elif palette is None:
+        raise InvalidFormatException('Missing PLTE chunk')
 
-    @classmethod
-    def from_bytes(cls, data: bytes) -> 'IDATData':
-        """Serializer (additional constructor) that takes bytes"""
+    if i_header.interlace_method == IHDRData.WITH_INTERLACE_ADAM7:
+        yield apply_palette(decode_interlaced(i_header, compressed, band_height), palette)
+        return
 
-        return cls(compressed_data=data)
+    scanline_size = i_header.get_scanline_size(i_header.width)
+    if band_height is None:
+        band_height = max(1, ROW_BAND_SIZE // scanline_size)
 
-    @classmethod
-    def from_numpy(cls, data: np.ndarray) -> 'IDATData':
-        """Serialize for IDAT binary content"""
+    previous_row: Optional[np.ndarray] = None
+    rows_left = i_header.height
 
-        new_data = np.concatenate((data, np.full((data.shape[0], data.shape[1], 1), 255, dtype=np.uint8)), axis=2)
+    for band in inflate_bands(compressed, itertools.repeat(scanline_size * min(band_height, rows_left))):
+        rows = min(len(band) // scanline_size, rows_left)
+        if rows == 0:
+            break
 
-        stream = bytearray()
-        compressor = zlib.compressobj(level=zlib.Z_BEST_SPEED)
+        scanlines = np.frombuffer(band, dtype=np.uint8, count=rows * scanline_size).reshape((rows, scanline_size))
+        pixels = unfilter_scanlines(scanlines, i_header.get_bytes_per_pixel(), previous_row)
+        previous_row = pixels[-1].copy()
+        rows_left -= rows
 
-        for i in range(new_data.shape[0]):
-            stream += compressor.compress(b'\0' + new_data[i].tobytes())
+        yield apply_palette(i_header.unpack_samples(pixels, i_header.width), palette)
 
-        stream += compressor.flush()
+        if rows_left == 0:
+            return
 
-        return cls(compressed_data=bytes(stream))
+    raise InvalidFormatException(f'Image data too short: {i_header.height - rows_left} rows')
 
-    @override
-    def type(self) -> ChunkType:
-        return ChunkType.IDAT
 
-    def __bytes__(self) -> bytes:
-        return self.compressed_data
+def quantize_palette(data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Maps the 8-bit pixels to the indices of their exact colors. Returns (height, width, 1) indices and the
+    (colors, channels) entries, there are at most 256 colors
+    """
 
+    height, width, channels = data.shape
 
-@dataclass(slots=True, frozen=True)
-class IENDData(IChunkDataTypeSerializer):
-    """IEND"""
+    # Every color is packed to one 32-bit value, so the colors are sorted and deduplicated in one pass
+    packed = np.zeros((height, width, 4), dtype=np.uint8)
+    packed[:, :, :channels] = data
+    colors, indices = np.unique(packed.view(np.uint32), return_inverse=True)
 
-    @classmethod
-    def from_bytes(cls, data: bytes) -> 'IENDData':
-        """Additional constructor that serialize the IEND chunk"""
+    if len(colors) > PLTEData.MAX_ENTRIES:
+        raise InvalidFormatException(f'Too many colors for a palette: {len(colors)} > {PLTEData.MAX_ENTRIES}')
 
-        if len(data) != 0:
-            raise InvalidFormatException("Data must be empty")
+    return indices.reshape(height, width, 1).astype(np.uint8), colors.view(np.uint8).reshape(-1, 4)[:, :channels]
 
-        return cls()
 
-    @override
-    def type(self) -> ChunkType:
-        return ChunkType.IEND
+def encode_image(data: np.ndarray,
+                 palette: bool = False) -> tuple[IHDRData, np.ndarray, list[IChunkDataTypeSerializer]]:
+    """Returns the header, the (height, row_size) packed samples and the palette chunks that store the pixels.
 
-    def __bytes__(self) -> bytes:
-        return b''
-
-
-@dataclass(slots=True, frozen=True)
-class NotCriticalData(IChunkDataTypeSerializer):
-    """Other"""
-
-    data: bytes
-
-    @classmethod
-    def from_bytes(cls, data: bytes) -> 'NotCriticalData':
-        """Identity additional constructor for that that can be ignored"""
-        return cls(data=data)
+    With the palette the pixels are stored as indices of the narrowest bit depth to the PLTE colors, the alpha of the
+    colors is stored in the tRNS chunk if some pixel is not opaque.
+    """
 
-    @override
-    def type(self) -> ChunkType:
-        return ChunkType.IEND
+    i_header = IHDRData.from_numpy(data)
+    pixels = i_header.select_channels(data)
+    if not palette:
+        return i_header, i_header.pack_samples(pixels), []
 
-    def __bytes__(self) -> bytes:
-        return self.data
+    if data.dtype != np.uint8:
+        raise InvalidFormatException(f'Palette requires 8-bit samples: {data.dtype}')
 
+    indices, entries = quantize_palette(pixels)
+    colors = np.repeat(entries[:, :1], 3, axis=1) if i_header.get_channels() <= 2 else entries[:, :3]
+    chunks: list[IChunkDataTypeSerializer] = [PLTEData(palette_entries=colors)]
+    if i_header.color_type in {IHDRData.GRAYSCALE_ALPHA_COLOR_TYPE, IHDRData.TRUECOLOR_ALPHA_COLOR_TYPE}:
+        chunks.append(TRNSData(alpha=entries[:, -1].copy()))
 
-@dataclass(slots=True, frozen=True)
-class PNGChunk[T: IChunkDataTypeSerializer]:
-    """Class representing the whole chunk from the PNG file. (One chunk of many)"""
+    bit_depth = next(depth for depth in (1, 2, 4, 8) if len(entries) <= 1 << depth)
+    i_header = replace(i_header, color_type=IHDRData.INDEXED_COLOR_TYPE, bit_depth=bit_depth)
 
-    length: int
-    chunk_type: ChunkType
-    chunk_data: T
-    crc: int
-
-    @classmethod
-    def from_file(cls, data: bytes) -> tuple['PNGChunk', bytes]:
-        """Additional constructor that creates the chunk from binary data."""
-
-        length, = struct.unpack('>I', data[:4])
-        chunk_type = ChunkType.map_data_to_chunk_type(data[4:8])
-        chunk_data = data[8:8 + length]
-        crc, = struct.unpack('!I', data[8 + length:8 + 4 + length])
-        rest = data[8 + 4 + length:]
-
-        return PNGChunk(length=length,
-                        chunk_type=chunk_type,
-                        chunk_data=chunk_type.map_chunk_type_to_data_class().from_bytes(chunk_data),
-                        crc=crc), rest
-
-    @classmethod
-    def from_chunk[U: IChunkDataTypeSerializer](cls, chunk: U) -> 'PNGChunk[U]':
-        """Additional constructor that creates the chunk from chunk binary data."""
-        chunk_bytes_data = bytes(chunk)
-        chunk_length = len(chunk_bytes_data)
-        chunk_type = chunk.type()
-        chunk_crc = zlib.crc32(struct.pack('>I', chunk_type.value) + chunk_bytes_data)
-
-        return PNGChunk(length=chunk_length,
-                        chunk_type=chunk_type,
-                        chunk_data=chunk,
-                        crc=chunk_crc)
-
-    def __post_init__(self) -> None:
-        if self.crc != zlib.crc32(struct.pack('>I', self.chunk_type.value) + bytes(self.chunk_data)):
-            raise InvalidFormatException("CRC check sum is invalid")
-
-        if len(bytes(self.chunk_data)) != self.length:
-            raise InvalidFormatException("Chunk data is wrong")
-
-    def __bytes__(self) -> bytes:
-        return struct.pack('>II', self.length, self.chunk_type.value) \
-            + bytes(self.chunk_data) \
-            + struct.pack('>I', self.crc)
+    return i_header, i_header.pack_samples(indices), chunks
 
 
 @dataclass(slots=True)
@@ -394,89 +325,275 @@ class PNG:
     chunks: Sequence[PNGChunk]
 
     @classmethod
-    def from_file(cls, file: BinaryIO) -> 'PNG':
-        """Additional constructor for the PNG object that takes BinaryIO"""
+    def from_file(cls, file: BinaryIO, verification: CRCVerification = CRCVerification.STRICT) -> 'PNG':
+        """Additional constructor for the PNG object that takes BinaryIO, the checksums are verified by the policy"""
 
         signature = PNGSignature.from_bytes(file.read(PNGSignature.SIGNATURE_LENGTH))
-        all_data = file.read()
-        chunks = []
+        chunks = list(iterate_chunks(memoryview(read_buffer(file)).cast('B'), verification))
 
-        i_header, all_data = PNGChunk.from_file(all_data)
-
-        while len(all_data) > 0:
-            chunk, all_data = PNGChunk.from_file(all_data)
-            chunks.append(chunk)
+        if chunks[0].chunk_type != ChunkType.IHDR:
+            raise InvalidFormatException('First chunk is not IHDR')
 
         return cls(signature=signature,
-                   i_header=i_header,
-                   chunks=chunks)
+                   i_header=chunks[0],
+                   chunks=chunks[1:])
 
     @classmethod
-    def from_numpy(cls, data: np.ndarray) -> 'PNG':
+    def from_numpy(cls, data: np.ndarray, options: PNGOptions = PNGOptions()) -> 'PNG':
         """Additional constructor for the PNG object that takes numpy array"""
 
-        i_header_chunk = IHDRData.from_numpy(data)
-        data_chunk = IDATData.from_numpy(data)
+        i_header_chunk, rows, palette_chunks = encode_image(data, options.palette)
+        return cls.from_encoded(i_header_chunk, rows, palette_chunks, options)
+
+    @classmethod
+    def from_encoded(cls,
+                     i_header_chunk: IHDRData,
+                     rows: np.ndarray,
+                     palette_chunks: list[IChunkDataTypeSerializer],
+                     options: PNGOptions = PNGOptions()) -> 'PNG':
+        """Additional constructor for the PNG object that takes the result of encode_image"""
+
+        data_chunk = IDATData.from_rows(rows, i_header_chunk.get_bytes_per_pixel(), options)
         end_chunk = IENDData()
 
         return cls(signature=PNGSignature.from_default(),
                    i_header=PNGChunk.from_chunk(i_header_chunk),
-                   chunks=[PNGChunk.from_chunk(data_chunk),
+                   chunks=[*(PNGChunk.from_chunk(x) for x in palette_chunks),
+                           *(PNGChunk.from_chunk(x) for x in data_chunk.split(options.chunk_size)),
                            PNGChunk.from_chunk(end_chunk)])
 
     def __post_init__(self) -> None:
         if self.chunks[-1].chunk_type != ChunkType.IEND:
             raise InvalidFormatException("Last chunk is not end")
 
-    def to_numpy(self) -> np.ndarray:
-        """Serializer of the data to a numpy array"""
-        all_data_compressed = b''.join(x.chunk_data.compressed_data
-                                       for x in self.chunks
-                                       if x.chunk_type == ChunkType.IDAT)
-        result = zlib.decompress(all_data_compressed)
+    def iterate_row_bands(self, band_height: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Yields the decoded top-down bands of rows, IDAT chunks are inflated one band at a time"""
+
+        return decode_row_bands(self.i_header.chunk_data,
+                                (x.chunk_data.compressed_data for x in self.chunks if x.chunk_type == ChunkType.IDAT),
+                                band_height,
+                                build_palette(self.chunks))
+
+    def to_numpy(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Serializer of the data to a numpy array, scanline filters are reversed and the alpha channel is dropped.
+        Indexed images with the tRNS chunk keep the alpha of their RGBA palette.
+
+        The rows are decoded in bands straight into the preallocated out array, if it is given. 16-bit images are
+        returned as uint16 in the native byte order, the samples are swapped while they are copied to the output.
+        """
 
-        palette = [x.chunk_data.palette_entries for x in self.chunks if x.chunk_type == ChunkType.PLTE]
+        i_header = self.i_header.chunk_data
+        channels = i_header.get_channels()
 
-        if len(palette) == 1:
-            return palette[np.frombuffer(result)].reshape(self.i_header.chunk_data.height,
-                                                          self.i_header.chunk_data.width,
-                                                          3)
+        # Gray with alpha and RGBA images have the alpha as the last channel
+        if i_header.color_type == IHDRData.INDEXED_COLOR_TYPE:
+            channels = 4 if any(x.chunk_type == ChunkType.tRNS for x in self.chunks) else 3
+        elif channels in {2, 4}:
+            channels -= 1
 
-        image_channels: int = 4
-        row_size = image_channels * self.i_header.chunk_data.width + 1
+        shape = (i_header.height, i_header.width, channels)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint16 if i_header.bit_depth == 16 else np.uint8)
+        elif out.shape != shape:
+            raise InvalidFormatException(f'Output shape {out.shape} does not match the image shape {shape}')
 
-        stream = bytearray()
-        for i in range(self.i_header.chunk_data.height):
-            stream += result[1 + i * row_size: (i + 1) * row_size]
+        row = 0
+        for band in self.iterate_row_bands():
+            out[row:row + len(band)] = band[:, :, :shape[2]]
+            row += len(band)
 
-        return np.frombuffer(stream, dtype=np.uint8).reshape(self.i_header.chunk_data.height,
-                                                             self.i_header.chunk_data.width,
-                                                             4)[:, :, :-1]
+        return out
 
     def to_file(self, file: BinaryIO) -> None:
         """Serializes the object to a BinaryIO interface"""
 
         file.write(bytes(self.signature))
-        file.write(bytes(self.i_header))
+        self.i_header.to_file(file)
         for chunk in self.chunks:
-            file.write(bytes(chunk))
+            chunk.to_file(file)
 
 
 @final
 class PNGReader(IFormatReader):     # pylint: disable=too-few-public-methods
-    """Class that deserializes PNG format to Image"""
+    """Class that deserializes PNG format to Image.
+
+    The verification policy tells which chunk checksums are verified while the chunks are parsed. The deferred ones are
+    verified on a background thread while the image is decoded, zlib releases the GIL while it computes the checksums.
+    """
+
+    def __init__(self, verification: CRCVerification = CRCVerification.STRICT) -> None:
+        self.verification = verification
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'PNGReader':
+        """Additional constructor that takes the reader options from the commandline arguments"""
+
+        return cls(verification=CRCVerification.from_string(args.png_crc))
 
     @override
     def read_format(self, file: BinaryIO) -> Image:
-        png = PNG.from_file(file)
-        return Image(data=png.to_numpy())
+        png = PNG.from_file(file, self.verification)
+        if self.verification != CRCVerification.DEFERRED:
+            return Image(data=png.to_numpy())
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            verified = executor.submit(verify_chunks, [png.i_header, *png.chunks])
+            data = png.to_numpy()
+            verified.result()
+
+        return Image(data=data)
+
+    def read_row_bands(self, file: BinaryIO, band_height: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Decodes the top-down bands of rows while the chunks are parsed, without the whole image in memory.
+
+        Deferred checksum failures are raised after the last band, so they are missed if the bands are not exhausted.
+        """
+
+        PNGSignature.from_bytes(file.read(PNGSignature.SIGNATURE_LENGTH))
+        chunks = iterate_chunks(memoryview(read_buffer(file)).cast('B'), self.verification)
+        if self.verification == CRCVerification.DEFERRED:
+            chunks = verify_in_background(chunks)
+
+        i_header = next(chunks, None)
+        if i_header is None or i_header.chunk_type != ChunkType.IHDR:
+            raise InvalidFormatException('First chunk is not IHDR')
+
+        # The palette precedes the image data, so the chunks before the first IDAT chunk are enough to build it
+        leading_chunks: list[PNGChunk] = []
+        for chunk in chunks:
+            if chunk.chunk_type == ChunkType.IDAT:
+                chunks = itertools.chain([chunk], chunks)
+                break
+
+            leading_chunks.append(chunk)
+
+        yield from decode_row_bands(i_header.chunk_data,
+                                    (x.chunk_data.compressed_data for x in chunks if x.chunk_type == ChunkType.IDAT),
+                                    band_height,
+                                    build_palette(leading_chunks))
+
+
+@final
+class PNGProbe(IFormatProbe):   # pylint: disable=too-few-public-methods
+    """Class that reads the image metadata from the PNG signature and IHDR chunk"""
+
+    CHUNK_HEADER_LENGTH: ClassVar[int] = 8
+
+    @override
+    def probe(self, file: BinaryIO) -> ImageInfo:
+        PNGSignature.from_bytes(file.read(PNGSignature.SIGNATURE_LENGTH))
+
+        chunk_header = file.read(self.CHUNK_HEADER_LENGTH)
+        if len(chunk_header) < self.CHUNK_HEADER_LENGTH:
+            raise InvalidFormatException('Missing IHDR chunk')
+
+        length, chunk_type = struct.unpack('>II', chunk_header)
+        if chunk_type != ChunkType.IHDR.value or length != IHDRData.DATA_LENGTH:
+            raise InvalidFormatException('First chunk is not IHDR')
+
+        i_header = IHDRData.from_bytes(file.read(IHDRData.DATA_LENGTH))
+
+        return ImageInfo(data_format=KnownFormat.PNG,
+                         width=i_header.width,
+                         height=i_header.height,
+                         channels=i_header.get_channels(),
+                         bits_per_pixel=i_header.get_bits_per_pixel())
+
+
+def verify_in_background(chunks: Iterable[PNGChunk]) -> Iterator[PNGChunk]:
+    """Yields the chunks while their checksums are verified on a background thread, failures are raised at the end"""
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        verified = []
+        for chunk in chunks:
+            verified.append(executor.submit(chunk.verify_crc))
+            yield chunk
+
+        for result in verified:
+            result.result()
+
+
+OPTIMIZE_LEVELS: Final = (6, 9)
+
+# The packed samples and the bytes per pixel of the optimized image, set once in every process of the optimizer pool
+OPTIMIZER_INPUT: Final[list[tuple[np.ndarray, int]]] = []
+
+
+@final
+@dataclass(slots=True, frozen=True)
+class OptimizeReport:
+    """Class that holds the options chosen by the optimizer, the size of their image data and the search time"""
+
+    options: PNGOptions
+    size: int
+    seconds: float
+
+
+def compressed_size(rows: np.ndarray, bytes_per_pixel: int, options: PNGOptions) -> int:
+    """Returns the size of the image data compressed with the options"""
+
+    return memoryview(IDATData.from_rows(rows, bytes_per_pixel, options).compressed_data).nbytes
+
+
+def init_optimizer(rows: np.ndarray, bytes_per_pixel: int) -> None:
+    """Initializer of the optimizer processes, the samples are passed to every process once instead of every task"""
+
+    OPTIMIZER_INPUT[:] = [(rows, bytes_per_pixel)]
+
+
+def optimizer_size(options: PNGOptions) -> int:
+    """Returns the compressed size of the samples given to init_optimizer, called in the optimizer processes"""
+
+    rows, bytes_per_pixel = OPTIMIZER_INPUT[0]
+    return compressed_size(rows, bytes_per_pixel, options)
+
+
+def optimize_options(rows: np.ndarray, bytes_per_pixel: int, options: PNGOptions) -> tuple[PNGOptions, int]:
+    """Compresses the packed samples with every filter selection, level of OPTIMIZE_LEVELS and strategy in a process
+    pool and returns the options of the smallest image data with its size
+    """
+
+    candidates = [replace(options, filter_selection=filter_selection, level=level, strategy=strategy, threads=1)
+                  for filter_selection in FilterSelection
+                  for level in OPTIMIZE_LEVELS
+                  for strategy in CompressionStrategy]
+
+    with ProcessPoolExecutor(initializer=init_optimizer, initargs=(rows, bytes_per_pixel)) as executor:
+        sizes = list(executor.map(optimizer_size, candidates))
+
+    best = int(np.argmin(sizes))
+    return replace(candidates[best], threads=options.threads), sizes[best]
 
 
 @final
 class PNGWriter(IFormatWriter):     # pylint: disable=too-few-public-methods
     """Class that serializes Image to PNG format"""
 
+    def __init__(self, options: PNGOptions = PNGOptions(), optimize: bool = False) -> None:
+        self.options = options
+        self.optimize = optimize
+        self.report: Optional[OptimizeReport] = None
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> 'PNGWriter':
+        """Additional constructor that takes the writer options from the commandline arguments"""
+
+        return cls(options=PNGOptions(filter_selection=FilterSelection.from_string(args.png_filter),
+                                      level=args.png_level,
+                                      strategy=CompressionStrategy.from_string(args.png_strategy),
+                                      threads=args.png_threads or os.cpu_count() or 1,
+                                      chunk_size=args.png_chunk_size,
+                                      palette=args.png_palette),
+                   optimize=args.optimize)
+
     @override
     def write_format(self, file: BinaryIO, input_image: Image) -> None:
-        png = PNG.from_numpy(input_image.data)
-        return png.to_file(file)
+        # The packed samples are encoded once, both for the optimizer and for the written image
+        options = self.options
+        start = time.perf_counter()
+        i_header, rows, palette_chunks = encode_image(input_image.data, options.palette)
+        if self.optimize:
+            options, size = optimize_options(rows, i_header.get_bytes_per_pixel(), options)
+            self.report = OptimizeReport(options=options, size=size, seconds=time.perf_counter() - start)
+
+        PNG.from_encoded(i_header, rows, palette_chunks, options).to_file(file)
@@ -0,0 +1,671 @@
+"""Module providing the chunks of the PNG format (https://www.w3.org/TR/png/#5Chunk-layout)"""
+
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Buffer, Iterable, Iterator
+from dataclasses import dataclass, astuple
+from enum import IntEnum
+from typing import BinaryIO, ClassVar, override
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import has_16_bit_samples
+from app.io.codec_options import CRCVerification, PNGOptions
+from app.io.deflate import compress, compress_parallel
+from app.io.png_filter import filter_scanlines
+
+
+class ChunkType(IntEnum):
+    """https://en.wikipedia.org/wiki/PNG#%22Chunks%22_within_the_file"""
+
+    # pylint: disable=invalid-name
+    IHDR = 0x49484452
+    PLTE = 0x504C5445
+    IDAT = 0x49444154
+    IEND = 0x49454E44
+
+    tRNS = 0x74524E53
+    cHRM = 0x6348524D
+    gAMA = 0x67414D41
+    iCCP = 0x69434350
+    sBIT = 0x73424954
+    sRGB = 0x73524742
+    cICP = 0x63494350
+    mDCV = 0x6D444356
+    cLLI = 0x634C4C49
+
+    tEXt = 0x74455874
+    zTXt = 0x7A545874
+    iTXt = 0x69545874
+
+    bKGD = 0x624B4744
+    hIST = 0x68495354
+    pHYs = 0x70485973
+    sPLT = 0x73504C54
+    eXIf = 0x65584966
+    tIME = 0x74494D45
+    acTL = 0x6163544C
+    fcTL = 0x6663544C
+    fdAT = 0x66644154
+
+    @classmethod
+    def map_data_to_chunk_type(cls, data: Buffer) -> 'ChunkType':
+        """Additional constructor that converts the 4 bytes of the type to a ChunkType enum"""
+
+        value, = struct.unpack('>I', data)
+        if value not in cls:
+            raise InvalidFormatException(f'Unknown chunk type: {bytes(data)!r}')
+
+        return cls(value)
+
+    def map_chunk_type_to_data_class(self):     # pylint: disable=too-many-return-statements
+        """Convert the Chunk type to a class that will handle parsing of the chunk data filed"""
+
+        match self:
+            case ChunkType.IHDR:
+                return IHDRData
+
+            case ChunkType.PLTE:
+                return PLTEData
+
+            case ChunkType.IDAT:
+                return IDATData
+
+            case ChunkType.IEND:
+                return IENDData
+
+            case ChunkType.tRNS:
+                return TRNSData
+
+            case ChunkType.acTL:
+                return ACTLData
+
+            case ChunkType.fcTL:
+                return FCTLData
+
+            case ChunkType.fdAT:
+                return FDATData
+
+            case _:
+                return NotCriticalData
+
+
+class IChunkDataTypeSerializer(ABC):
+    """Interface for the Chunk data serialization"""
+
+    @abstractmethod
+    def type(self) -> ChunkType:
+        """Method that returns the Chunk type the serializer can parse"""
+
+    @abstractmethod
+    def __bytes__(self) -> bytes:
+        pass
+
+    def to_buffer(self) -> Buffer:
+        """Returns the serialized chunk data, serializers that keep the raw data return it without a copy"""
+
+        return bytes(self)
+
+
+@dataclass(slots=True, frozen=True)
+class IHDRData(IChunkDataTypeSerializer):
+    """IHDR"""
+
+    DATA_LENGTH: ClassVar[int] = 13
+
+    DEFLATE_COMPRESSION: ClassVar[int] = 0
+
+    FILTER_METHOD: ClassVar[int] = 0
+
+    WITH_NO_INTERLACE: ClassVar[int] = 0
+    WITH_INTERLACE_ADAM7: ClassVar[int] = 1
+
+    GRAYSCALE_COLOR_TYPE: ClassVar[int] = 0
+    TRUECOLOR_COLOR_TYPE: ClassVar[int] = 2
+    INDEXED_COLOR_TYPE: ClassVar[int] = 3
+    GRAYSCALE_ALPHA_COLOR_TYPE: ClassVar[int] = 4
+    TRUECOLOR_ALPHA_COLOR_TYPE: ClassVar[int] = 6
+    COLOR_TYPE_CHANNELS: ClassVar[dict[int, int]] = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+    COLOR_TYPE_BIT_DEPTHS: ClassVar[dict[int, set[int]]] = {
+        0: {1, 2, 4, 8, 16},
+        2: {8, 16},
+        3: {1, 2, 4, 8},
+        4: {8, 16},
+        6: {8, 16},
+    }
+
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+    compression_method: int
+    filter_method: int
+    interlace_method: int
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'IHDRData':
+        """Additional constructor for the class that allows the object creation from the raw data"""
+
+        length = len(memoryview(data))
+        if length < cls.DATA_LENGTH:
+            raise InvalidFormatException(f"Header too short, received: {length} instead of {cls.DATA_LENGTH}")
+
+        return cls(*struct.unpack('>IIBBBBB', data))
+
+    @classmethod
+    def from_numpy(cls, data: np.ndarray) -> 'IHDRData':
+        """Additional constructor for the class that allows the object creation from the raw data.
+
+        The color type is the narrowest one that holds the pixels: equal color channels are stored as gray and the alpha
+        channel is stored only if some pixel is not opaque.
+        """
+
+        channels = data.shape[2]
+        color_channels = channels - 1 if channels in {2, 4} else channels
+
+        gray = color_channels == 1 \
+            or (np.array_equal(data[:, :, 0], data[:, :, 1]) and np.array_equal(data[:, :, 0], data[:, :, 2]))
+        alpha = color_channels != channels and not np.all(data[:, :, -1] == np.iinfo(data.dtype).max)
+
+        if gray:
+            color_type = cls.GRAYSCALE_ALPHA_COLOR_TYPE if alpha else cls.GRAYSCALE_COLOR_TYPE
+        else:
+            color_type = cls.TRUECOLOR_ALPHA_COLOR_TYPE if alpha else cls.TRUECOLOR_COLOR_TYPE
+
+        return cls(width=data.shape[1],
+                   height=data.shape[0],
+                   bit_depth=16 if has_16_bit_samples(data) else 8,
+                   color_type=color_type,
+                   compression_method=cls.DEFLATE_COMPRESSION,
+                   filter_method=cls.FILTER_METHOD,
+                   interlace_method=cls.WITH_NO_INTERLACE)
+
+    def select_channels(self, data: np.ndarray) -> np.ndarray:
+        """Returns the view of the (height, width, channels) pixels with the channels stored for the color type"""
+
+        match self.color_type:
+            case self.GRAYSCALE_COLOR_TYPE:
+                return data[:, :, :1]
+
+            case self.TRUECOLOR_COLOR_TYPE:
+                return data[:, :, :3]
+
+            case self.GRAYSCALE_ALPHA_COLOR_TYPE:
+                # The first and the last channel of both gray with alpha and RGBA pixels
+                return data[:, :, ::data.shape[2] - 1]
+
+            case self.TRUECOLOR_ALPHA_COLOR_TYPE:
+                return data
+
+        raise InvalidFormatException(f'Not a direct color type: {self.color_type=}')
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.IHDR
+
+    def get_channels(self) -> int:
+        """Returns the number of channels of the decoded pixels, indexed images have the three palette colors"""
+
+        if self.color_type not in self.COLOR_TYPE_CHANNELS:
+            raise InvalidFormatException(f'Wrong: {self.color_type=}')
+
+        return self.COLOR_TYPE_CHANNELS[self.color_type]
+
+    def get_bits_per_pixel(self) -> int:
+        """Returns the number of bits that store one pixel in the filtered scanline"""
+
+        if self.color_type == self.INDEXED_COLOR_TYPE:
+            return self.bit_depth
+
+        return self.bit_depth * self.get_channels()
+
+    def get_bytes_per_pixel(self) -> int:
+        """Returns the distance between the corresponding bytes of neighbouring pixels used by the scanline filters"""
+
+        return max(1, self.get_bits_per_pixel() // 8)
+
+    def get_scanline_size(self, width: int) -> int:
+        """Returns the number of bytes of the filtered scanline of the width pixels including the filter type byte"""
+
+        return 1 + (width * self.get_bits_per_pixel() + 7) // 8
+
+    def get_sample_channels(self) -> int:
+        """Returns the number of samples stored for every pixel, indexed images store one palette index"""
+
+        return 1 if self.color_type == self.INDEXED_COLOR_TYPE else self.get_channels()
+
+    def get_sample_dtype(self) -> np.dtype:
+        """Returns the type of the unpacked samples, 16-bit samples are stored in the big-endian order"""
+
+        return np.dtype('>u2') if self.bit_depth == 16 else np.dtype(np.uint8)
+
+    def unpack_samples(self, rows: np.ndarray, width: int) -> np.ndarray:
+        """Returns the (rows, width, channels) samples of the unfiltered scanline bytes.
+
+        16-bit samples are a big-endian view of the bytes. Gray samples narrower than a byte are unpacked from the bits
+        and scaled to the 8-bit range.
+        """
+
+        channels = self.get_sample_channels()
+        shape = (len(rows), width, channels)
+
+        if self.bit_depth >= 8:
+            return rows.view(self.get_sample_dtype()).reshape(shape)
+
+        bits = np.unpackbits(rows, axis=1).reshape((len(rows), -1, self.bit_depth))
+        weights = np.left_shift(1, np.arange(self.bit_depth - 1, -1, -1, dtype=np.uint8), dtype=np.uint8)
+        samples = (bits @ weights)[:, :width * channels].reshape(shape)
+
+        if self.color_type == self.INDEXED_COLOR_TYPE:
+            return samples
+
+        return samples * np.uint8(np.iinfo(np.uint8).max // ((1 << self.bit_depth) - 1))
+
+    def pack_samples(self, samples: np.ndarray) -> np.ndarray:
+        """Returns the (rows, row_size) scanline bytes of the (rows, width, channels) samples without filter types.
+
+        Samples narrower than a byte are packed to the bits of the bytes, 16-bit samples are stored in the big-endian
+        order.
+        """
+
+        if self.bit_depth >= 8:
+            return np.ascontiguousarray(samples, dtype=self.get_sample_dtype()).view(np.uint8).reshape(len(samples), -1)
+
+        bits = np.unpackbits(samples.reshape(len(samples), -1, 1), axis=2)[:, :, 8 - self.bit_depth:]
+        return np.packbits(bits.reshape(len(samples), -1), axis=1)
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('>IIBBBBB', *astuple(self))
+
+    def __post_init__(self) -> None:
+        if self.bit_depth not in self.COLOR_TYPE_BIT_DEPTHS.get(self.color_type, set()):
+            raise InvalidFormatException(f'Invalid IHDR: {self.bit_depth=}, {self.color_type=}')
+
+        if self.interlace_method not in {self.WITH_NO_INTERLACE, self.WITH_INTERLACE_ADAM7}:
+            raise InvalidFormatException(f'Wrong: {self.interlace_method=}')
+
+
+@dataclass(slots=True, frozen=True)
+class PLTEData(IChunkDataTypeSerializer):
+    """PLTE"""
+
+    MAX_ENTRIES: ClassVar[int] = 256
+
+    palette_entries: np.ndarray
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'PLTEData':
+        """Additional constructor for the class that allows the object creation from the raw data"""
+
+        length, remainder = divmod(len(memoryview(data)), 3)
+        if remainder != 0:
+            raise InvalidFormatException("Wrong Palette")
+
+        return cls(palette_entries=np.frombuffer(data, dtype=np.uint8).reshape((length, 3)))
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.PLTE
+
+    def __bytes__(self) -> bytes:
+        return self.palette_entries.tobytes()
+
+    def __post_init__(self) -> None:
+        if len(self.palette_entries.shape) != 2:
+            raise InvalidFormatException("Wrong Palette")
+
+        if not 1 <= self.palette_entries.shape[0] <= self.MAX_ENTRIES:
+            raise InvalidFormatException("Wrong Palette")
+
+        if self.palette_entries.shape[1] != 3:
+            raise InvalidFormatException("Wrong Palette")
+
+
+@dataclass(slots=True, frozen=True)
+class TRNSData(IChunkDataTypeSerializer):
+    """tRNS, the alpha of the first palette entries for indexed images"""
+
+    alpha: np.ndarray
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'TRNSData':
+        """Additional constructor for the class that allows the object creation from the raw data"""
+
+        return cls(alpha=np.frombuffer(data, dtype=np.uint8))
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.tRNS
+
+    def __bytes__(self) -> bytes:
+        return self.alpha.tobytes()
+
+
+@dataclass(slots=True, frozen=True)
+class ACTLData(IChunkDataTypeSerializer):
+    """acTL, the animation control of APNG (https://wiki.mozilla.org/APNG_Specification)"""
+
+    DATA_LENGTH: ClassVar[int] = 8
+    MAX_VALUE: ClassVar[int] = (1 << 31) - 1
+
+    num_frames: int
+    num_plays: int
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'ACTLData':
+        """Additional constructor for the class that allows the object creation from the raw data"""
+
+        length = len(memoryview(data))
+        if length != cls.DATA_LENGTH:
+            raise InvalidFormatException(f'Wrong acTL length: {length} instead of {cls.DATA_LENGTH}')
+
+        return cls(*struct.unpack('>II', data))
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.acTL
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('>II', self.num_frames, self.num_plays)
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.num_frames <= self.MAX_VALUE:
+            raise InvalidFormatException(f'Wrong: {self.num_frames=}')
+
+        if not 0 <= self.num_plays <= self.MAX_VALUE:
+            raise InvalidFormatException(f'Wrong: {self.num_plays=}')
+
+
+class DisposeOp(IntEnum):
+    """How the frame region of the canvas is disposed before the next frame is rendered"""
+
+    NONE = 0
+    BACKGROUND = 1
+    PREVIOUS = 2
+
+
+class BlendOp(IntEnum):
+    """Whether the frame replaces the canvas region or is alpha composited over it"""
+
+    SOURCE = 0
+    OVER = 1
+
+
+@dataclass(slots=True, frozen=True)
+class FCTLData(IChunkDataTypeSerializer):
+    # pylint: disable=too-many-instance-attributes
+    """fcTL, the region, the delay and the dispose and blend operations of one APNG frame"""
+
+    DATA_LENGTH: ClassVar[int] = 26
+
+    sequence_number: int
+    width: int
+    height: int
+    x_offset: int
+    y_offset: int
+    delay_numerator: int
+    delay_denominator: int
+    dispose_op: DisposeOp
+    blend_op: BlendOp
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'FCTLData':
+        """Additional constructor for the class that allows the object creation from the raw data"""
+
+        length = len(memoryview(data))
+        if length != cls.DATA_LENGTH:
+            raise InvalidFormatException(f'Wrong fcTL length: {length} instead of {cls.DATA_LENGTH}')
+
+        sequence_number, width, height, x_offset, y_offset, delay_numerator, delay_denominator, dispose_op, blend_op = \
+            struct.unpack('>IIIIIHHBB', data)
+        if dispose_op not in DisposeOp or blend_op not in BlendOp:
+            raise InvalidFormatException(f'Wrong fcTL operations: {dispose_op=}, {blend_op=}')
+
+        return cls(sequence_number=sequence_number,
+                   width=width,
+                   height=height,
+                   x_offset=x_offset,
+                   y_offset=y_offset,
+                   delay_numerator=delay_numerator,
+                   delay_denominator=delay_denominator,
+                   dispose_op=DisposeOp(dispose_op),
+                   blend_op=BlendOp(blend_op))
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.fcTL
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('>IIIIIHHBB', *astuple(self))
+
+    def __post_init__(self) -> None:
+        if self.width <= 0 or self.height <= 0:
+            raise InvalidFormatException(f'Wrong frame size: {self.width=}, {self.height=}')
+
+
+@dataclass(slots=True, frozen=True)
+class FDATData(IChunkDataTypeSerializer):
+    """fdAT, the sequence number and the part of the compressed image data of one APNG frame"""
+
+    SEQUENCE_NUMBER_LENGTH: ClassVar[int] = 4
+
+    sequence_number: int
+    compressed_data: Buffer
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'FDATData':
+        """Serializer (additional constructor) that takes bytes, the image data is kept without a copy"""
+
+        view = memoryview(data)
+        if len(view) < cls.SEQUENCE_NUMBER_LENGTH:
+            raise InvalidFormatException(f'Wrong fdAT length: {len(view)}')
+
+        sequence_number, = struct.unpack_from('>I', view)
+        return cls(sequence_number=sequence_number, compressed_data=view[cls.SEQUENCE_NUMBER_LENGTH:])
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.fdAT
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('>I', self.sequence_number) + bytes(self.compressed_data)
+
+
+@dataclass(slots=True, frozen=True)
+class IDATData(IChunkDataTypeSerializer):
+    """IDAT"""
+
+    compressed_data: Buffer
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'IDATData':
+        """Serializer (additional constructor) that takes bytes, the buffer is kept without a copy"""
+
+        return cls(compressed_data=data)
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, bytes_per_pixel: int, options: PNGOptions = PNGOptions()) -> 'IDATData':
+        """Serialize for IDAT binary content from the (height, row_size) packed samples.
+
+        The filter of every scanline is chosen by the filter selection. More than one thread compresses blocks of the
+        scanlines in parallel.
+        """
+
+        scanlines = filter_scanlines(rows, bytes_per_pixel, options.filter_selection)
+
+        if options.threads > 1:
+            return cls(compressed_data=compress_parallel(scanlines, options.level, options.threads, options.strategy))
+
+        return cls(compressed_data=compress(scanlines, options.level, options.strategy))
+
+    def split(self, chunk_size: int = PNGOptions.CHUNK_SIZE) -> list['IDATData']:
+        """Splits the compressed stream into the data of consecutive IDAT chunks of at most chunk_size bytes"""
+
+        if chunk_size <= 0:
+            raise InvalidFormatException(f'Wrong: {chunk_size=}')
+
+        stream = memoryview(self.compressed_data).cast('B')
+        return [IDATData(compressed_data=stream[start:start + chunk_size])
+                for start in range(0, max(len(stream), 1), chunk_size)]
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.IDAT
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.compressed_data)
+
+    @override
+    def to_buffer(self) -> Buffer:
+        return self.compressed_data
+
+
+@dataclass(slots=True, frozen=True)
+class IENDData(IChunkDataTypeSerializer):
+    """IEND"""
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'IENDData':
+        """Additional constructor that serialize the IEND chunk"""
+
+        if len(memoryview(data)) != 0:
+            raise InvalidFormatException("Data must be empty")
+
+        return cls()
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.IEND
+
+    def __bytes__(self) -> bytes:
+        return b''
+
+
+@dataclass(slots=True, frozen=True)
+class NotCriticalData(IChunkDataTypeSerializer):
+    """Other"""
+
+    data: Buffer
+
+    @classmethod
+    def from_bytes(cls, data: Buffer) -> 'NotCriticalData':
+        """Identity additional constructor for that that can be ignored"""
+        return cls(data=data)
+
+    @override
+    def type(self) -> ChunkType:
+        return ChunkType.IEND
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.data)
+
+    @override
+    def to_buffer(self) -> Buffer:
+        return self.data
+
+
+@dataclass(slots=True, frozen=True)
+class PNGChunk[T: IChunkDataTypeSerializer]:
+    """Class representing the whole chunk from the PNG file. (One chunk of many)"""
+
+    HEADER_LENGTH: ClassVar[int] = 8
+    CRC_LENGTH: ClassVar[int] = 4
+
+    length: int
+    chunk_type: ChunkType
+    chunk_data: T
+    crc: int
+
+    @classmethod
+    def from_buffer(cls,
+                    data: memoryview,
+                    offset: int = 0,
+                    verification: CRCVerification = CRCVerification.STRICT) -> tuple['PNGChunk', int]:
+        """Additional constructor that creates the chunk starting at the offset of the binary data.
+
+        The chunk data is a slice of the memoryview, so it is not copied. The checksum is verified at once if the
+        verification policy asks for it. Returns the chunk and the next chunk offset.
+        """
+
+        data_offset = offset + cls.HEADER_LENGTH
+        if data_offset > len(data):
+            raise InvalidFormatException(f'Truncated chunk header at: {offset}')
+
+        length, = struct.unpack_from('>I', data, offset)
+        chunk_type = ChunkType.map_data_to_chunk_type(data[offset + 4:data_offset])
+
+        crc_offset = data_offset + length
+        if crc_offset + cls.CRC_LENGTH > len(data):
+            raise InvalidFormatException(f'Truncated {chunk_type.name} chunk at: {offset}')
+
+        crc, = struct.unpack_from('>I', data, crc_offset)
+        chunk_data = chunk_type.map_chunk_type_to_data_class().from_bytes(data[data_offset:crc_offset])
+
+        chunk = PNGChunk(length=length,
+                         chunk_type=chunk_type,
+                         chunk_data=chunk_data,
+                         crc=crc)
+        if verification.verifies_at_once(chunk_type == ChunkType.IDAT):
+            chunk.verify_crc()
+
+        return chunk, crc_offset + cls.CRC_LENGTH
+
+    @classmethod
+    def from_chunk[U: IChunkDataTypeSerializer](cls, chunk: U) -> 'PNGChunk[U]':
+        """Additional constructor that creates the chunk from chunk binary data."""
+        chunk_data = memoryview(chunk.to_buffer())
+        chunk_length = chunk_data.nbytes
+        chunk_type = chunk.type()
+        chunk_crc = zlib.crc32(chunk_data, zlib.crc32(struct.pack('>I', chunk_type.value)))
+
+        return PNGChunk(length=chunk_length,
+                        chunk_type=chunk_type,
+                        chunk_data=chunk,
+                        crc=chunk_crc)
+
+    def __post_init__(self) -> None:
+        if memoryview(self.chunk_data.to_buffer()).nbytes != self.length:
+            raise InvalidFormatException("Chunk data is wrong")
+
+    def verify_crc(self) -> None:
+        """Raises if the checksum of the chunk type and data does not match the stored one"""
+
+        # The checksum of the type is continued over the data, so they are never concatenated
+        chunk_data = memoryview(self.chunk_data.to_buffer())
+        if self.crc != zlib.crc32(chunk_data, zlib.crc32(struct.pack('>I', self.chunk_type.value))):
+            raise InvalidFormatException(f'CRC check sum of {self.chunk_type.name} chunk is invalid')
+
+    def __bytes__(self) -> bytes:
+        return struct.pack('>II', self.length, self.chunk_type.value) \
+            + bytes(self.chunk_data) \
+            + struct.pack('>I', self.crc)
+
+    def to_file(self, file: BinaryIO) -> None:
+        """Serializes the chunk to a BinaryIO interface, the chunk data is written without a copy"""
+
+        file.write(struct.pack('>II', self.length, self.chunk_type.value))
+        file.write(self.chunk_data.to_buffer())
+        file.write(struct.pack('>I', self.crc))
+
+
+def verify_chunks(chunks: Iterable[PNGChunk]) -> None:
+    """Verifies the checksums of all the chunks, used for the deferred verification"""
+
+    for chunk in chunks:
+        chunk.verify_crc()
+
+
+def iterate_chunks(data: memoryview, verification: CRCVerification = CRCVerification.STRICT) -> Iterator[PNGChunk]:
+    """Walks the chunks that follow the signature by their offsets up to the IEND chunk, every byte is visited once"""
+
+    offset = 0
+    while offset < len(data):
+        chunk, offset = PNGChunk.from_buffer(data, offset, verification)
+        yield chunk
+
+        if chunk.chunk_type == ChunkType.IEND:
+            return
+
+    raise InvalidFormatException('Missing IEND chunk')
@@ -0,0 +1,246 @@
+"""Module providing the PNG scanline filters (https://www.w3.org/TR/png/#9Filters)
+
+Rows filtered with None and Sub do not depend on the other rows, so all of them are reversed at once. Runs of rows
+filtered with Up are a cumulative sum over the rows. Average and Paeth depend on both the left and the upper neighbour,
+so the rows between the first and the last of them are reversed along anti-diagonals (wavefront), where every pixel of
+one anti-diagonal depends only on the two previous anti-diagonals and the whole anti-diagonal is computed at once.
+
+Filtering needs only the raw rows, so every filter is applied to all the rows at once.
+"""
+
+from collections.abc import Callable
+from enum import IntEnum
+from typing import Final, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.codec_options import FilterSelection
+
+
+class FilterType(IntEnum):
+    """Filter type byte that precedes every scanline"""
+
+    NONE = 0
+    SUB = 1
+    UP = 2
+    AVERAGE = 3
+    PAETH = 4
+
+
+def average_predictor(left: np.ndarray, up: np.ndarray, _: np.ndarray) -> np.ndarray:
+    """Returns the rounded down mean of the left and up neighbours without the 8-bit overflow"""
+
+    return (left & up) + ((left ^ up) >> 1)
+
+
+def paeth_predictor(left: np.ndarray, up: np.ndarray, up_left: np.ndarray) -> np.ndarray:
+    """Returns the neighbour closest to left + up - up_left, ties are resolved in the left, up, up_left order"""
+
+    up_diff = np.subtract(up, up_left, dtype=np.int16)
+    left_diff = np.subtract(left, up_left, dtype=np.int16)
+
+    distance_left = np.abs(up_diff)
+    distance_up = np.abs(left_diff)
+    distance_up_left = np.abs(up_diff + left_diff)
+
+    return np.where((distance_left <= distance_up) & (distance_left <= distance_up_left),
+                    left,
+                    np.where(distance_up <= distance_up_left, up, up_left))
+
+
+PREDICTORS: Final[dict[FilterType, Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]]] = {
+    FilterType.NONE: lambda left, up, up_left: np.zeros_like(left),
+    FilterType.SUB: lambda left, up, up_left: left,
+    FilterType.UP: lambda left, up, up_left: up,
+    FilterType.AVERAGE: average_predictor,
+    FilterType.PAETH: paeth_predictor,
+}
+
+
+def predict(left: np.ndarray,
+            up: np.ndarray,
+            up_left: np.ndarray,
+            row_masks: dict[FilterType, np.ndarray]) -> np.ndarray:
+    """Returns the predictor of every pixel for the filter of its row.
+
+    The row_masks map every filter type used by the rows to the mask that is 0xFF for its rows and 0 for the others.
+    Rows that all use the same filter do not need to be masked.
+    """
+
+    if len(row_masks) == 1:
+        filter_type, = row_masks
+        return PREDICTORS[filter_type](left, up, up_left)
+
+    predictor = np.zeros_like(left)
+    for filter_type, row_mask in row_masks.items():
+        predictor |= PREDICTORS[filter_type](left, up, up_left) & row_mask
+
+    return predictor
+
+
+# Paeth is the filter that suits photographic content best when a single filter is used for all the rows
+FIXED_FILTER: Final = FilterType.PAETH
+
+
+def filter_rows(rows: np.ndarray, bytes_per_pixel: int, filter_type: FilterType) -> np.ndarray:
+    """Returns the (height, row_size) raw rows filtered with one filter type, the row above the first one is zero"""
+
+    pixels = rows.reshape(rows.shape[0], -1, bytes_per_pixel)
+
+    left = np.zeros_like(pixels)
+    left[:, 1:] = pixels[:, :-1]
+    up = np.zeros_like(pixels)
+    up[1:] = pixels[:-1]
+    up_left = np.zeros_like(pixels)
+    up_left[1:, 1:] = pixels[:-1, :-1]
+
+    return (pixels - PREDICTORS[filter_type](left, up, up_left)).reshape(rows.shape)
+
+
+def filter_scanlines(rows: np.ndarray,
+                     bytes_per_pixel: int,
+                     selection: FilterSelection = FilterSelection.ADAPTIVE) -> np.ndarray:
+    """Filters the (height, row_size) raw rows and returns the (height, 1 + row_size) scanlines.
+
+    The adaptive selection filters all the rows with every filter type and picks for every row the one with the minimum
+    sum of the absolute differences, where the filtered bytes are taken as signed.
+    """
+
+    scanlines = np.empty((rows.shape[0], 1 + rows.shape[1]), dtype=np.uint8)
+
+    match selection:
+        case FilterSelection.NONE:
+            scanlines[:, 0] = FilterType.NONE
+            scanlines[:, 1:] = rows
+
+        case FilterSelection.FIXED:
+            scanlines[:, 0] = FIXED_FILTER
+            scanlines[:, 1:] = filter_rows(rows, bytes_per_pixel, FIXED_FILTER)
+
+        case FilterSelection.ADAPTIVE:
+            candidates = np.stack([filter_rows(rows, bytes_per_pixel, filter_type) for filter_type in FilterType])
+
+            # The absolute value of the signed byte is the smaller one of the byte and its negation
+            scores = np.minimum(candidates, np.negative(candidates)).sum(axis=2, dtype=np.uint64)
+            best = np.argmin(scores, axis=0)
+
+            scanlines[:, 0] = best
+            scanlines[:, 1:] = candidates[best, np.arange(rows.shape[0])]
+
+    return scanlines
+
+
+# Narrow images are reversed in runs of more rows than their width, so that the number of anti-diagonals stays close to
+# the number of the rows
+MIN_WAVEFRONT_ROWS: Final = 256
+
+
+def unfilter_scanlines(scanlines: np.ndarray,
+                       bytes_per_pixel: int,
+                       previous_row: Optional[np.ndarray] = None) -> np.ndarray:
+    """Reverses the filters of (height, 1 + row_size) scanlines and returns the (height, row_size) raw rows.
+
+    Images with less than 8 bits per pixel are filtered byte by byte, so bytes_per_pixel is 1 for them. Scanlines that
+    continue a band of already reversed rows take the last of them as previous_row, otherwise the row above is zero.
+    """
+
+    height = scanlines.shape[0]
+    filter_types = scanlines[:, 0]
+    if np.any(filter_types > FilterType.PAETH):
+        raise InvalidFormatException(f'Unknown filter type: {filter_types.max()}')
+
+    pixels = scanlines[:, 1:].reshape(height, -1, bytes_per_pixel)
+
+    # The first row of the result is the row above the scanlines, so every reversed row has its predecessor
+    result = np.empty((height + 1, *pixels.shape[1:]), dtype=np.uint8)
+    result[0] = 0 if previous_row is None else previous_row.reshape(pixels.shape[1:])
+
+    none_rows = np.flatnonzero(filter_types == FilterType.NONE)
+    result[none_rows + 1] = pixels[none_rows]
+
+    sub_rows = np.flatnonzero(filter_types == FilterType.SUB)
+    result[sub_rows + 1] = np.cumsum(pixels[sub_rows], axis=1, dtype=np.uint8)
+
+    dependent_rows = np.flatnonzero(filter_types >= FilterType.AVERAGE)
+    first, last = (dependent_rows[0], dependent_rows[-1] + 1) if len(dependent_rows) != 0 else (height, height)
+
+    unfilter_up_runs(result, pixels, filter_types, 0, first)
+    # The skewed buffer of the wavefront grows with the square of its rows, so the rows are reversed in runs of about
+    # the width, which bounds it by twice the size of the scanlines or by a small buffer for the narrow images
+    run_rows = max(pixels.shape[1], MIN_WAVEFRONT_ROWS)
+    for start in range(first, last, run_rows):
+        unfilter_wavefront(result, pixels, filter_types, start, min(last, start + run_rows))
+    unfilter_up_runs(result, pixels, filter_types, last, height)
+
+    return result[1:].reshape(height, -1)
+
+
+def unfilter_up_runs(result: np.ndarray,
+                     pixels: np.ndarray,
+                     filter_types: np.ndarray,
+                     start: int,
+                     stop: int) -> None:
+    """Reverses the runs of Up rows between start and stop, the row preceding every run must be already reversed.
+
+    The result has one more leading row than the pixels, the row above the first of them.
+    """
+
+    up_rows = np.concatenate(([False], filter_types[start:stop] == FilterType.UP, [False]))
+    edges = np.diff(up_rows.astype(np.int8))
+
+    for run_start, run_stop in zip(np.flatnonzero(edges == 1) + start, np.flatnonzero(edges == -1) + start):
+        run = result[run_start + 1:run_stop + 1]
+        np.cumsum(pixels[run_start:run_stop], axis=0, dtype=np.uint8, out=run)
+        run += result[run_start]
+
+
+def skewed_view(skewed: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Returns (height, width) view of the skewed buffer, where the pixel (row, column) is skewed[row + column + 2,
+    row + 1]. The first anti-diagonal index and the first row are reserved for the zero padding and the previous row.
+    """
+
+    diagonal_stride, row_stride, byte_stride = skewed.strides
+
+    return as_strided(skewed[2:, 1:],
+                      shape=(height, width, skewed.shape[2]),
+                      strides=(diagonal_stride + row_stride, diagonal_stride, byte_stride))
+
+
+def unfilter_wavefront(result: np.ndarray,
+                       pixels: np.ndarray,
+                       filter_types: np.ndarray,
+                       start: int,
+                       stop: int) -> None:
+    """Reverses the rows between start and stop with any filters, one anti-diagonal of pixels at a time.
+
+    The rows are skewed first, so that every anti-diagonal is a contiguous row of the buffer and its left, up and
+    up-left neighbours are contiguous slices of the two previous ones.
+    """
+
+    height = stop - start
+    width = pixels.shape[1]
+
+    skewed = np.zeros((height + width + 1, height + 1, pixels.shape[2]), dtype=np.uint8)
+    skewed[1:width + 1, 0] = result[start]
+
+    skewed_view(skewed, height, width)[...] = pixels[start:stop]
+
+    row_masks = {FilterType(filter_type): np.where(filter_types[start:stop] == filter_type, 0xFF, 0)
+                 .astype(np.uint8)[:, np.newaxis]
+                 for filter_type in np.unique(filter_types[start:stop])}
+
+    for diagonal in range(2, height + width + 1):
+        first_row, last_row = max(1, diagonal - width), min(height, diagonal - 1)
+
+        current = skewed[diagonal, first_row:last_row + 1]
+        predictor = predict(skewed[diagonal - 1, first_row:last_row + 1],
+                            skewed[diagonal - 1, first_row - 1:last_row],
+                            skewed[diagonal - 2, first_row - 1:last_row],
+                            {filter_type: row_mask[first_row - 1:last_row]
+                             for filter_type, row_mask in row_masks.items()})
+
+        np.add(current, predictor, out=current)
+
+    result[start + 1:stop + 1] = skewed_view(skewed, height, width)
@@ -0,0 +1,243 @@
+"""Module providing serialization and deserialization for binary PNM formats (https://en.wikipedia.org/wiki/Netpbm)"""
+
+from collections.abc import Buffer
+from dataclasses import dataclass
+from typing import final, BinaryIO, override, ClassVar
+
+import numpy as np
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image, has_16_bit_samples
+from app.io.format_probe import IFormatProbe, ImageInfo
+from app.io.format_reader import IFormatReader, read_buffer
+from app.io.format_writer import IFormatWriter
+from app.io.known_format import KnownFormat
+
+
+def read_header_token(file: BinaryIO) -> bytes:
+    """Reads one whitespace separated token of the PNM header, skips comments and consumes one trailing whitespace"""
+
+    token = bytearray()
+    while True:
+        char = file.read(1)
+        if char == b'':
+            raise InvalidFormatException('Unexpected end of the PNM header')
+
+        if char == PNMHeader.COMMENT and len(token) == 0:
+            file.readline()
+            continue
+
+        if char.isspace():
+            if len(token) != 0:
+                return bytes(token)
+
+            continue
+
+        token += char
+
+
+@dataclass(slots=True, frozen=True)
+class PNMHeader:
+    """Class that represents the textual header of the binary PNM formats"""
+
+    MAGIC_NUMBER_LENGTH: ClassVar[int] = 2
+    MAGIC_NUMBERS: ClassVar[dict[KnownFormat, bytes]] = {
+        KnownFormat.PBM: b'P4',
+        KnownFormat.PGM: b'P5',
+        KnownFormat.PPM: b'P6',
+    }
+    COMMENT: ClassVar[bytes] = b'#'
+    MAX_VALUE_LIMIT: ClassVar[int] = 65535
+
+    data_format: KnownFormat
+    width: int
+    height: int
+    max_value: int
+
+    @classmethod
+    def from_bytes(cls, file: BinaryIO) -> 'PNMHeader':
+        """Additional constructor that parses the header from the start of the binary stream"""
+
+        magic_number = file.read(cls.MAGIC_NUMBER_LENGTH)
+        data_formats = [data_format for data_format, value in cls.MAGIC_NUMBERS.items() if value == magic_number]
+        if len(data_formats) != 1:
+            raise InvalidFormatException(f'Unsupported PNM magic number: {magic_number!r}')
+
+        data_format, = data_formats
+        fields_count = 2 if data_format == KnownFormat.PBM else 3
+
+        tokens = [read_header_token(file) for _ in range(fields_count)]
+        if not all(token.isdigit() for token in tokens):
+            raise InvalidFormatException(f'Invalid PNM header fields: {tokens}')
+
+        width, height, *max_value = (int(token) for token in tokens)
+
+        return cls(data_format=data_format,
+                   width=width,
+                   height=height,
+                   max_value=1 if len(max_value) == 0 else max_value[0])
+
+    def __post_init__(self) -> None:
+        if self.data_format not in self.MAGIC_NUMBERS:
+            raise InvalidFormatException(f'Wrong: {self.data_format=}')
+
+        if self.width <= 0:
+            raise InvalidFormatException(f'Wrong: {self.width=}')
+
+        if self.height <= 0:
+            raise InvalidFormatException(f'Wrong: {self.height=}')
+
+        if not 0 < self.max_value <= self.MAX_VALUE_LIMIT:
+            raise InvalidFormatException(f'Wrong: {self.max_value=}')
+
+    def __bytes__(self) -> bytes:
+        fields = [self.width, self.height] if self.data_format == KnownFormat.PBM \
+            else [self.width, self.height, self.max_value]
+
+        return self.MAGIC_NUMBERS[self.data_format] + b'\n' + b' '.join(b'%d' % value for value in fields) + b'\n'
+
+    def get_channels(self) -> int:
+        """Returns the number of samples stored for every pixel"""
+
+        return 3 if self.data_format == KnownFormat.PPM else 1
+
+    def get_dtype(self) -> np.dtype:
+        """Returns the type of a single sample, samples wider than one byte are stored in the big-endian order"""
+
+        return np.dtype(np.uint8) if self.max_value <= np.iinfo(np.uint8).max else np.dtype('>u2')
+
+    def get_row_size(self) -> int:
+        """Returns the number of bytes that store one row of the image"""
+
+        if self.data_format == KnownFormat.PBM:
+            return (self.width + 7) // 8
+
+        return self.width * self.get_channels() * self.get_dtype().itemsize
+
+    def get_image_data_size(self) -> int:
+        """Returns the number of bytes of the raster that follows the header"""
+
+        return self.get_row_size() * self.height
+
+
+@dataclass(slots=True)
+class PNM:
+    """Class that represents the binary PBM, PGM or PPM file in a structured way"""
+
+    header: PNMHeader
+    image_data: Buffer
+
+    @classmethod
+    def from_bytes(cls, file: BinaryIO) -> 'PNM':
+        """Additional constructor that allows to create this class object from the raw bytes"""
+
+        header = PNMHeader.from_bytes(file)
+        image_data = read_buffer(file, header.get_image_data_size())
+
+        if memoryview(image_data).nbytes < header.get_image_data_size():
+            raise InvalidFormatException(f'Raster too short: {memoryview(image_data).nbytes}')
+
+        return cls(header=header,
+                   image_data=image_data)
+
+    @classmethod
+    def from_ndarray(cls, data: np.ndarray, data_format: KnownFormat) -> 'PNM':
+        """Additional constructor that allows to create this class object from numpy array"""
+
+        image_height, image_width, num_colors = data.shape
+        max_value = np.iinfo(np.uint16 if has_16_bit_samples(data) else np.uint8).max
+        dtype = np.dtype(np.uint8) if max_value <= np.iinfo(np.uint8).max else np.dtype('>u2')
+
+        image_data: np.ndarray
+        match data_format:
+            case KnownFormat.PPM:
+                pixels = np.broadcast_to(data, (image_height, image_width, 3)) if num_colors == 1 else data[:, :, :3]
+                image_data = np.ascontiguousarray(pixels, dtype=dtype)
+
+            case KnownFormat.PGM:
+                image_data = np.ascontiguousarray(cls.to_single_channel(data), dtype=dtype)
+
+            case KnownFormat.PBM:
+                image_data = np.packbits(cls.to_single_channel(data) <= max_value // 2, axis=1)
+                max_value = 1
+
+            case _:
+                raise InvalidFormatException(f'Not a PNM format: {data_format}')
+
+        return cls(header=PNMHeader(data_format=data_format,
+                                    width=image_width,
+                                    height=image_height,
+                                    max_value=int(max_value)),
+                   image_data=image_data)
+
+    @staticmethod
+    def to_single_channel(data: np.ndarray) -> np.ndarray:
+        """Returns the only channel of the grayscale image, colour channels that are all equal are also accepted"""
+
+        if data.shape[-1] != 1 and np.any(data[:, :, 1:3] != data[:, :, :1]):
+            raise InvalidFormatException('PGM and PBM formats require a grayscale image')
+
+        return data[:, :, 0]
+
+    def to_numpy(self) -> np.ndarray:
+        """Converter to a numpy array, the samples of PGM and PPM are returned as a view without copy"""
+
+        if self.header.data_format == KnownFormat.PBM:
+            packed = np.frombuffer(self.image_data,
+                                   dtype=np.uint8,
+                                   count=self.header.get_image_data_size()).reshape(self.header.height,
+                                                                                    self.header.get_row_size())
+
+            # In PBM the bit set means black pixel
+            pixels = (np.unpackbits(packed, axis=1, count=self.header.width) ^ 1) * np.iinfo(np.uint8).max
+            return pixels[:, :, np.newaxis]
+
+        return np.frombuffer(self.image_data,
+                             dtype=self.header.get_dtype(),
+                             count=self.header.height * self.header.width * self.header.get_channels())\
+            .reshape(self.header.height, self.header.width, self.header.get_channels())
+
+    def to_file(self, file: BinaryIO) -> None:
+        """Serializes the object to a BinaryIO interface, the raster is written through a memoryview without copy"""
+
+        file.write(bytes(self.header))
+        file.write(memoryview(self.image_data).cast('B'))
+
+
+@final
+class PNMReader(IFormatReader):     # pylint: disable=too-few-public-methods
+    """Class that deserializes PBM, PGM and PPM formats to Image"""
+
+    @override
+    def read_format(self, file: BinaryIO) -> Image:
+        pnm = PNM.from_bytes(file)
+        return Image(data=pnm.to_numpy())
+
+
+@final
+class PNMProbe(IFormatProbe):   # pylint: disable=too-few-public-methods
+    """Class that reads the image metadata from the textual PNM header"""
+
+    @override
+    def probe(self, file: BinaryIO) -> ImageInfo:
+        header = PNMHeader.from_bytes(file)
+        bits_per_sample = 1 if header.data_format == KnownFormat.PBM else 8 * header.get_dtype().itemsize
+
+        return ImageInfo(data_format=header.data_format,
+                         width=header.width,
+                         height=header.height,
+                         channels=header.get_channels(),
+                         bits_per_pixel=bits_per_sample * header.get_channels())
+
+
+@final
+class PNMWriter(IFormatWriter):     # pylint: disable=too-few-public-methods
+    """Class that serializes Image to one of PBM, PGM or PPM formats"""
+
+    def __init__(self, data_format: KnownFormat) -> None:
+        self.data_format = data_format
+
+    @override
+    def write_format(self, file: BinaryIO, input_image: Image) -> None:
+        pnm = PNM.from_ndarray(input_image.data, self.data_format)
+        pnm.to_file(file)
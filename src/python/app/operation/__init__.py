@@ -1,19 +1,50 @@
-"""Module providing import convenience for operations"""
-
-from app.operation.bgr2rgb import BGR2RGB
-from app.operation.flip import Flip
-from app.operation.grayscale import Grayscale
-from app.operation.histogram_equalization import HistogramEqualization
-from app.operation.identity import Identity
-from app.operation.ioperation import IOperation
-from app.operation.roll import Roll
-from app.operation.rotate90 import Rotate90
-
-__all__ = [BGR2RGB.__name__,
-           Flip.__name__,
-           Grayscale.__name__,
-           HistogramEqualization.__name__,
-           Identity.__name__,
-           IOperation.__name__,
-           Roll.__name__,
-           Rotate90.__name__]
+"""Module providing import convenience for operations
+
+The operation modules are imported on the first access of their class, so importing one operation does not import the
+others and the commandline imports only the selected one.
+"""
+
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from app.operation.bgr2rgb import BGR2RGB
+    from app.operation.flip import Flip
+    from app.operation.grayscale import Grayscale
+    from app.operation.histogram_equalization import HistogramEqualization
+    from app.operation.identity import Identity
+    from app.operation.ioperation import IOperation
+    from app.operation.roll import Roll
+    from app.operation.rotate90 import Rotate90
+    from app.operation.thumbnail import Thumbnail
+
+OPERATION_MODULES: Final = {
+    'BGR2RGB': 'app.operation.bgr2rgb',
+    'Flip': 'app.operation.flip',
+    'Grayscale': 'app.operation.grayscale',
+    'HistogramEqualization': 'app.operation.histogram_equalization',
+    'Identity': 'app.operation.identity',
+    'IOperation': 'app.operation.ioperation',
+    'Roll': 'app.operation.roll',
+    'Rotate90': 'app.operation.rotate90',
+    'Thumbnail': 'app.operation.thumbnail',
+}
+
+__all__ = ['BGR2RGB',
+           'Flip',
+           'Grayscale',
+           'HistogramEqualization',
+           'Identity',
+           'IOperation',
+           'Roll',
+           'Rotate90',
+           'Thumbnail']
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the module of the operation class on its first access"""
+
+    if name not in OPERATION_MODULES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    # The import statement machinery is used instead of importlib, so -X importtime reports the operation module too
+    return getattr(__import__(OPERATION_MODULES[name], fromlist=[name]), name)
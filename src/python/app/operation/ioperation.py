@@ -24,6 +24,13 @@ class IOperation(ABC):
     def parser(cls, parser: ArgumentParser) -> None:
         """Abstract method that initialises subcommand argument parser"""
 
+    def reduction(self, args: Namespace, width: int, height: int) -> int:   # pylint: disable=unused-argument
+        """Returns the factor that the sides of the input of that size may be divided by before the operation without
+        changing its result, the readers that decode reduced images faster use it. Most operations need the full size.
+        """
+
+        return 1
+
     @abstractmethod
     def __call__(self, args: Namespace, input_image: Image) -> Image:
         pass
@@ -0,0 +1,63 @@
+"""Module providing the reduction of the image to the thumbnail size"""
+
+from argparse import ArgumentParser, Namespace
+from typing import final, override
+
+import numpy as np
+
+from app.image.image import Image
+from app.operation.ioperation import IOperation
+
+
+@final
+class Thumbnail(IOperation):
+    """Shrinks the image to fit the width and the height with the same aspect ratio, every output pixel is the mean of
+    the input pixels it covers. Smaller images are kept.
+    """
+
+    @classmethod
+    def name(cls) -> str:
+        return 'thumbnail'
+
+    @classmethod
+    def help(cls) -> str:
+        return 'Shrink the image to fit the size keeping its aspect ratio'
+
+    @classmethod
+    def parser(cls, parser: ArgumentParser) -> None:
+        parser.add_argument('--width',
+                            required=True,
+                            type=int,
+                            help='largest width of the thumbnail in pixels')
+        parser.add_argument('--height',
+                            required=True,
+                            type=int,
+                            help='largest height of the thumbnail in pixels')
+
+    @classmethod
+    def get_size(cls, args: Namespace, width: int, height: int) -> tuple[int, int]:
+        """Returns the width and the height of the thumbnail of the image of that size"""
+
+        scale = min(args.width / width, args.height / height, 1)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    @override
+    def reduction(self, args: Namespace, width: int, height: int) -> int:
+        thumbnail_width, thumbnail_height = self.get_size(args, width, height)
+        return min(width // thumbnail_width, height // thumbnail_height)
+
+    @override
+    def __call__(self, args: Namespace, input_image: Image) -> Image:
+        data = input_image.data
+        height, width = data.shape[:2]
+        thumbnail_width, thumbnail_height = self.get_size(args, width, height)
+        if (thumbnail_width, thumbnail_height) == (width, height):
+            return input_image
+
+        # The boxes of the output pixels start at these rows and columns, they differ in size by one at most
+        rows = np.arange(thumbnail_height) * height // thumbnail_height
+        columns = np.arange(thumbnail_width) * width // thumbnail_width
+        sums = np.add.reduceat(np.add.reduceat(data, rows, axis=0, dtype=np.int64), columns, axis=1)
+        areas = np.outer(np.diff(rows, append=height), np.diff(columns, append=width))
+
+        return Image(data=np.rint(sums / areas[:, :, np.newaxis]).astype(data.dtype))
@@ -0,0 +1,57 @@
+import contextlib
+import os
+import threading
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+from app.command.info import info_command, probe_file
+from app.command.parser import get_parser
+
+
+def test_info_command(resource_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    files = [str(resource_path / '2.bmp'), str(resource_path / '3.jpg')]
+
+    assert info_command(Namespace(files=files)) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        f'{files[0]}\tbmp\t2\t2\t3\t24',
+        f'{files[1]}\tjpeg\t960\t1282\t3\t24',
+    ]
+
+
+def test_info_command_reports_failures(resource_path: Path, tmp_path: Path,
+                                       capsys: pytest.CaptureFixture[str]) -> None:
+    files = [str(resource_path / '4.avif'), str(tmp_path / 'missing.png'), str(resource_path / '2.png')]
+
+    assert info_command(Namespace(files=files)) == 1
+
+    captured = capsys.readouterr()
+    assert captured.out == f'{files[2]}\tpng\t2\t2\t4\t32\n'
+    assert len(captured.err.splitlines()) == 2
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='named pipes are not available')
+def test_probe_file_pipe(resource_path: Path, tmp_path: Path) -> None:
+    path = tmp_path / 'pipe'
+    os.mkfifo(path)
+
+    def write() -> None:
+        # The probe closes the pipe after the headers, before the rest of the image is written
+        with contextlib.suppress(BrokenPipeError), open(path, mode='wb') as pipe:
+            pipe.write((resource_path / '3.png').read_bytes())
+
+    # The probe reads the pipe on from the bytes that the format detection peeked
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    info = probe_file(str(path))
+    writer.join()
+
+    assert (info.width, info.height) == (960, 1282)
+
+
+def test_info_parser() -> None:
+    args = get_parser().parse_args(['info', 'a.png', 'b.bmp'])
+
+    assert args.files == ['a.png', 'b.bmp']
+    assert args.func is info_command
@@ -0,0 +1,96 @@
+import io
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import numpy as np
+import pytest
+
+from app.command import runner
+from app.command.io import MappedInput, map_input
+from app.command.parser import get_parser
+from app.io.bmp import BMPReader
+from app.io.pnm import PNMReader
+
+
+def test_map_input_bmp_view(resource_path: Path) -> None:
+    with open(resource_path / '1.bmp', mode='rb') as file:
+        expected = BMPReader().read_format(file).data
+
+    with map_input(str(resource_path / '1.bmp')) as input_source:
+        result = BMPReader().read_format(input_source).data
+
+        assert np.all(result == expected)
+        assert result.flags.writeable
+        del result
+
+    assert input_source.closed
+
+
+def test_map_input_copy_on_write(tmp_path: Path) -> None:
+    path = tmp_path / 'image.ppm'
+    path.write_bytes(b'P6\n2 1 255\n\x01\x02\x03\x04\x05\x06')
+
+    with map_input(str(path)) as input_source:
+        result = PNMReader().read_format(input_source).data
+        result[...] = 0
+
+        assert np.all(result == 0)
+        del result
+
+    assert path.read_bytes() == b'P6\n2 1 255\n\x01\x02\x03\x04\x05\x06'
+
+
+def test_map_input_view_outlives_block(resource_path: Path) -> None:
+    # The mapping cannot be closed under the views of the images, the caller has to release them
+    with pytest.raises(BufferError):
+        with map_input(str(resource_path / '1.bmp')) as input_source:
+            result = BMPReader().read_format(input_source).data
+
+    assert result.size > 0
+
+
+def test_map_input_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / 'empty'
+    path.write_bytes(b'')
+
+    with map_input(str(path)) as input_source:
+        assert input_source.read() == b''
+
+
+def test_map_input_same_output(resource_path: Path, tmp_path: Path) -> None:
+    path = tmp_path / 'image.bmp'
+    path.write_bytes((resource_path / '1.bmp').read_bytes())
+
+    with map_input(str(path), str(tmp_path / 'output.bmp')) as other_output, \
+            map_input(str(path), str(path)) as same_output:
+        assert isinstance(other_output, MappedInput)
+        assert isinstance(same_output, io.BytesIO)
+
+
+@pytest.mark.parametrize('operation', [['identity'], ['flip', '--horizontal']])
+def test_command_closes_input(resource_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+                              operation: list[str]) -> None:
+    sources = []
+
+    def tracked_input(input_source: str, output_source: Optional[str] = None) -> BinaryIO:
+        sources.append(map_input(input_source, output_source))
+        return sources[-1]
+
+    monkeypatch.setattr(runner, 'map_input', tracked_input)
+    args = get_parser().parse_args(['-i', str(resource_path / '1.bmp'), '-o', str(tmp_path / 'output.bmp'),
+                                    *operation])
+
+    assert args.func(args) == 0
+    assert isinstance(sources[0], MappedInput) and sources[0].closed
+
+
+def test_command_in_place(resource_path: Path, tmp_path: Path) -> None:
+    # The output truncates the input file, so it is read instead of mapped
+    path = tmp_path / 'image.bmp'
+    path.write_bytes((resource_path / '1.bmp').read_bytes())
+
+    args = get_parser().parse_args(['-i', str(path), '-o', str(path), 'identity'])
+
+    assert args.func(args) == 0
+    assert np.array_equal(BMPReader().read_format(io.BytesIO(path.read_bytes())).data,
+                          BMPReader().read_format(io.BytesIO((resource_path / '1.bmp').read_bytes())).data)
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.command.parser import get_parser
+from app.command.registry import available_commands
+
+CODEC_MODULES = ('app.io.apng', 'app.io.bmp', 'app.io.jpeg', 'app.io.png', 'app.io.pnm')
+
+
+def imported_modules(arguments: list[str]) -> set[str]:
+    # A fresh interpreter parses the arguments, the modules imported by the tests before do not count
+    code = f'import sys\nfrom app.command.parser import get_parser\nget_parser().parse_args({arguments!r})\n' \
+           f'print("\\n".join(sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code],
+                            capture_output=True,
+                            text=True,
+                            check=True,
+                            env=os.environ | {'PYTHONPATH': os.pathsep.join(sys.path)})
+
+    return set(result.stdout.split())
+
+
+def operation_modules(modules: set[str]) -> set[str]:
+    return {x for x in modules if x.startswith('app.operation.') and x != 'app.operation.ioperation'}
+
+
+def test_manifest_matches_operations() -> None:
+    for entry in available_commands():
+        operation_class = entry.load()
+
+        assert (entry.name, entry.help) == (operation_class.name(), operation_class.help())
+
+
+def test_parser_imports_no_codec() -> None:
+    modules = imported_modules(['info', 'image.png'])
+
+    assert 'numpy' not in modules
+    assert not modules.intersection(CODEC_MODULES)
+    assert not operation_modules(modules)
+
+
+@pytest.mark.parametrize('operation,module', [
+    (['rotate90', '--rotations', '2'], 'app.operation.rotate90'),
+    (['thumbnail', '--width', '4', '--height', '4'], 'app.operation.thumbnail'),
+])
+def test_parser_imports_selected_operation(operation: list[str], module: str) -> None:
+    modules = imported_modules(['-i', 'image.png', *operation])
+
+    assert operation_modules(modules) == {module}
+    assert not modules.intersection(CODEC_MODULES)
+
+
+def test_parser_help_lists_operations(capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit):
+        get_parser().parse_args(['--help'])
+
+    help_message = capsys.readouterr().out
+    assert all(entry.name in help_message for entry in available_commands())
+
+
+def test_parser_operation_arguments() -> None:
+    # The arguments of the operation are added when it is selected
+    args = get_parser().parse_args(['-i', 'image.png', 'flip', '--horizontal'])
+
+    assert args.horizontal
+    assert callable(args.func)
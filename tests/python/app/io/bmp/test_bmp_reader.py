@@ -1,8 +1,10 @@
 import io
+import struct
 
 import numpy as np
 import pytest
 
+from app.error.invalid_format_exception import InvalidFormatException
 from app.image.image import Image
 from app.io.bmp import BMPReader, BMPWriter
 
@@ -36,4 +38,141 @@ def test_transcoding_from_reader(data: bytes):
     writer = BMPWriter()
     writer.write_format(out_buffer, reader.read_format(in_buffer))
 
-    assert out_buffer.getvalue() == data
\ No newline at end of file
+    assert out_buffer.getvalue() == data
+
+@pytest.mark.parametrize('bottom_up,top_down', [
+    (
+        b'BMF\x00\x00\x00\x00\x00\x00\x006\x00\x00\x00(\x00\x00\x00\x02\x00\x00\x00\x02\x00\x00\x00\x01\x00\x18\x00\x00\x00\x00\x00\x01\x00\x00\x00\xc8\x00\x00\x00\xc8\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\x00\x00\x00\xff\x00\x00\x00\x00\x00\xff\xff\xff\xff\x00\x00',
+        b'BMF\x00\x00\x00\x00\x00\x00\x006\x00\x00\x00(\x00\x00\x00\x02\x00\x00\x00\xfe\xff\xff\xff\x01\x00\x18\x00\x00\x00\x00\x00\x01\x00\x00\x00\xc8\x00\x00\x00\xc8\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xff\xff\xff\x00\x00\xff\x00\x00\x00\xff\x00\x00\x00',
+    ),
+])
+def test_reader_top_down(bottom_up: bytes, top_down: bytes) -> None:
+    reader = BMPReader()
+
+    top_down_data = reader.read_format(io.BytesIO(top_down)).data
+
+    assert np.all(top_down_data == reader.read_format(io.BytesIO(bottom_up)).data)
+    assert top_down_data.strides[0] < 0
+
+
+@pytest.mark.parametrize('data', [
+    b'BMF\x00\x00\x00\x00\x00\x00\x006\x00\x00\x00(\x00\x00\x00\x02\x00\x00\x00\x02\x00\x00\x00\x01\x00\x18\x00\x00\x00\x00\x00\x01\x00\x00\x00\xc8\x00\x00\x00\xc8\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\x00\x00\x00\xff\x00\x00\x00\x00\x00\xff\xff\xff\xff\x00\x00',
+])
+def test_reader_strided_view(data: bytes) -> None:
+    view = BMPReader().read_format(io.BytesIO(data)).data
+    contiguous = BMPReader(contiguous=True).read_format(io.BytesIO(data)).data
+
+    assert not view.flags.c_contiguous
+    assert view.strides == (8, 3, 1)
+    assert contiguous.flags.c_contiguous
+    assert np.all(view == contiguous)
+
+
+def test_reader_truncated_pixel_array() -> None:
+    data = b'BMF\x00\x00\x00\x00\x00\x00\x006\x00\x00\x00(\x00\x00\x00\x02\x00\x00\x00\x02\x00\x00\x00\x01\x00\x18\x00\x00\x00\x00\x00\x01\x00\x00\x00\xc8\x00\x00\x00\xc8\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\x00\x00\x00\xff\x00\x00\x00'
+
+    with pytest.raises(InvalidFormatException):
+        BMPReader().read_format(io.BytesIO(data))
+
+
+def indexed_bmp(width: int, height: int, bits_per_pixel: int, color_table: bytes, rows: list[bytes]) -> bytes:
+    pixel_data = b''.join(rows)
+    offset = 14 + 40 + len(color_table)
+
+    return struct.pack('<HIHHI', 0x4D42, offset + len(pixel_data), 0, 0, offset)\
+        + struct.pack('<IiiHHIIiiII', 40, width, height, 1, bits_per_pixel, 0, len(pixel_data), 2835, 2835,
+                      len(color_table) // 4, 0)\
+        + color_table\
+        + pixel_data
+
+
+@pytest.mark.parametrize('data,expected', [
+    (
+        indexed_bmp(3, 2, 1, b'\x00\x00\x00\x00\xff\xff\xff\x00', [b'\xa0\x00\x00\x00', b'\x40\x00\x00\x00']),
+        np.array([[[255] * 3, [0] * 3, [255] * 3], [[0] * 3, [255] * 3, [0] * 3]], dtype=np.uint8),
+    ),
+    (
+        indexed_bmp(3, 1, 4, b'\x01\x02\x03\x00\x04\x05\x06\x00\x07\x08\x09\x00', [b'\x21\x00\x00\x00']),
+        np.array([[[7, 8, 9], [4, 5, 6], [1, 2, 3]]], dtype=np.uint8),
+    ),
+    (
+        indexed_bmp(2, 2, 8, b'\x01\x02\x03\x00\x04\x05\x06\x00', [b'\x01\x00\x00\x00', b'\x00\x01\x00\x00']),
+        np.array([[[4, 5, 6], [1, 2, 3]], [[1, 2, 3], [4, 5, 6]]], dtype=np.uint8),
+    ),
+])
+def test_reader_indexed(data: bytes, expected: np.ndarray) -> None:
+    result = BMPReader().read_format(io.BytesIO(data)).data
+
+    assert result.shape == expected.shape
+    assert np.all(result == expected)
+
+
+def bitfields_bmp(dib_header_size: int, bits_per_pixel: int, compression: int, masks: tuple[int, ...],
+                  pixels: np.ndarray) -> bytes:
+    height, width = pixels.shape
+    pixel_data = pixels.astype('<u2' if bits_per_pixel == 16 else '<u4').tobytes()
+    packed_masks = struct.pack(f'<{len(masks)}I', *masks)
+    extension = packed_masks.ljust(dib_header_size - 40, b'\x00') if dib_header_size > 40 else b''
+    color_table = packed_masks if dib_header_size == 40 else b''
+    offset = 14 + dib_header_size + len(color_table)
+
+    return struct.pack('<HIHHI', 0x4D42, offset + len(pixel_data), 0, 0, offset)\
+        + struct.pack('<IiiHHIIiiII', dib_header_size, width, height, 1, bits_per_pixel, compression,
+                      len(pixel_data), 2835, 2835, 0, 0)\
+        + extension\
+        + color_table\
+        + pixel_data
+
+
+@pytest.mark.parametrize('data,expected', [
+    (
+        bitfields_bmp(40, 16, 0, (), np.array([[0x7C00, 0x03E0], [0x001F, 0x0000]])),
+        np.array([[[0, 0, 255], [0, 255, 0]], [[255, 0, 0], [0, 0, 0]]], dtype=np.uint8),
+    ),
+    (
+        bitfields_bmp(40, 16, 3, (0xF800, 0x07E0, 0x001F), np.array([[0xF800, 0x8410]])),
+        np.array([[[0, 0, 255], [132, 130, 132]]], dtype=np.uint8),
+    ),
+    (
+        bitfields_bmp(40, 16, 6, (0x0F00, 0x00F0, 0x000F, 0xF000), np.array([[0x1234, 0xF0F0]])),
+        np.array([[[68, 51, 34, 17], [0, 255, 0, 255]]], dtype=np.uint8),
+    ),
+    (
+        bitfields_bmp(56, 32, 3, (0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000), np.array([[0x80030201]])),
+        np.array([[[3, 2, 1, 128]]], dtype=np.uint8),
+    ),
+    (
+        bitfields_bmp(108, 32, 3, (0x00FF0000, 0x0000FF00, 0x000000FF, 0), np.array([[0x80030201]])),
+        np.array([[[1, 2, 3]]], dtype=np.uint8),
+    ),
+    (
+        bitfields_bmp(124, 32, 3, (0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000), np.array([[0x80030201]])),
+        np.array([[[1, 2, 3, 128]]], dtype=np.uint8),
+    ),
+    (
+        bitfields_bmp(52, 32, 3, (0x3FF00000, 0x000FFC00, 0x000003FF), np.array([[0x3FF00000 | 0x000003FF]])),
+        np.array([[[255, 0, 255]]], dtype=np.uint8),
+    ),
+])
+def test_reader_bitfields(data: bytes, expected: np.ndarray) -> None:
+    result = BMPReader().read_format(io.BytesIO(data)).data
+
+    assert result.shape == expected.shape
+    assert np.all(result == expected)
+
+
+def test_reader_bitfields_byte_aligned_view() -> None:
+    data = bitfields_bmp(124, 32, 3, (0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000), np.zeros((2, 3)))
+
+    assert not BMPReader().read_format(io.BytesIO(data)).data.flags.owndata
+
+
+@pytest.mark.parametrize('masks', [
+    (0x0000, 0x07E0, 0x001F),
+    (0x1F800, 0x07E0, 0x001F),
+])
+def test_reader_bitfields_invalid_masks(masks: tuple[int, ...]) -> None:
+    data = bitfields_bmp(40, 16, 3, masks, np.zeros((1, 2)))
+
+    with pytest.raises(InvalidFormatException):
+        BMPReader().read_format(io.BytesIO(data))
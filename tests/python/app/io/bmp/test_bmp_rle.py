@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.bmp import BMPWriter, BMPReader
+from app.io.bmp_rle import decode_rle, encode_rle8
+
+
+@pytest.mark.parametrize('data,width,height,bits_per_pixel,expected', [
+    (
+        # Encoded run, absolute run, end of line, delta, encoded run, end of bitmap
+        b'\x03\x05\x00\x03\x01\x02\x03\x00\x00\x00\x00\x02\x01\x00\x02\x09\x00\x01',
+        6, 2, 8,
+        np.array([[5, 5, 5, 1, 2, 3], [0, 9, 9, 0, 0, 0]], dtype=np.uint8),
+    ),
+    (
+        # Encoded run alternating nibbles, absolute run with padding, end of line, delta, encoded run
+        b'\x03\x12\x00\x03\x34\x50\x00\x00\x02\xab\x00\x02\x01\x00\x01\xcd\x00\x01',
+        6, 2, 4,
+        np.array([[1, 2, 1, 3, 4, 5], [10, 11, 0, 12, 0, 0]], dtype=np.uint8),
+    ),
+    (
+        # Runs longer than the row are clipped
+        b'\x05\x07\x00\x01',
+        3, 1, 8,
+        np.array([[7, 7, 7]], dtype=np.uint8),
+    ),
+])
+def test_decode_rle(data: bytes, width: int, height: int, bits_per_pixel: int, expected: np.ndarray) -> None:
+    assert np.array_equal(decode_rle(data, width, height, bits_per_pixel), expected)
+
+
+@pytest.mark.parametrize('data,bits_per_pixel', [
+    (b'\x00\x05\x01\x02', 8),
+    (b'\x00\x02\x01', 8),
+    (b'\x02\x01\x00\x01', 24),
+])
+def test_decode_rle_invalid(data: bytes, bits_per_pixel: int) -> None:
+    with pytest.raises(InvalidFormatException):
+        decode_rle(data, 4, 1, bits_per_pixel)
+
+
+@pytest.mark.parametrize('shape,colors', [
+    ((1, 1), 1),
+    ((4, 5), 2),
+    ((7, 300), 3),
+    ((8, 600), 1),
+    ((16, 16), 256),
+])
+def test_encode_rle8_roundtrip(shape: tuple[int, int], colors: int) -> None:
+    indices = np.random.default_rng(0).integers(0, colors, shape, dtype=np.uint8)
+
+    encoded = encode_rle8(indices)
+
+    assert encoded[-2:].tobytes() == b'\x00\x01'
+    assert np.array_equal(decode_rle(encoded, shape[1], shape[0], 8), indices)
+
+
+def test_encode_rle8_runs() -> None:
+    indices = np.array([[4, 4, 4, 4, 1, 2, 3], [6, 6, 7, 7, 7, 8, 8]], dtype=np.uint8)
+
+    assert encode_rle8(indices).tobytes() == b'\x04\x04\x00\x03\x01\x02\x03\x00\x00\x00' \
+                                             b'\x02\x06\x03\x07\x02\x08\x00\x01'
+
+
+def test_writer_rle() -> None:
+    data = np.zeros((32, 64, 3), dtype=np.uint8)
+    data[8:24, 16:48] = [10, 20, 30]
+    rle_buffer = io.BytesIO()
+    raw_buffer = io.BytesIO()
+
+    BMPWriter(rle=True).write_format(rle_buffer, Image(data=data))
+    BMPWriter().write_format(raw_buffer, Image(data=data))
+
+    assert len(rle_buffer.getvalue()) < len(raw_buffer.getvalue())
+    assert np.array_equal(BMPReader().read_format(io.BytesIO(rle_buffer.getvalue())).data, data)
@@ -3,8 +3,10 @@ import io
 import numpy as np
 import pytest
 
+from app.error.invalid_format_exception import InvalidFormatException
 from app.image.image import Image
-from app.io.bmp import BMPWriter, BMPReader
+from app.io.bmp import BMP, BMPWriter, BMPReader
+from app.io.png import PNGReader, PNGWriter
 
 
 @pytest.mark.parametrize('data,expected', [
@@ -36,4 +38,83 @@ def test_transcoding_from_writer(data: np.ndarray) -> None:
     writer = BMPWriter()
     writer.write_format(out_buffer, Image(data=data))
 
-    assert np.all(reader.read_format(io.BytesIO(out_buffer.getvalue())).data == data)
\ No newline at end of file
+    assert np.all(reader.read_format(io.BytesIO(out_buffer.getvalue())).data == data)
+
+@pytest.mark.parametrize('shape', [
+    (2, 2, 3),
+    (3, 4, 3),
+    (5, 7, 3),
+])
+def test_writer_matches_bytes(shape: tuple[int, int, int]) -> None:
+    data = np.arange(np.prod(shape), dtype=np.uint8).reshape(shape)
+    out_buffer = io.BytesIO()
+
+    BMPWriter().write_format(out_buffer, Image(data=data))
+
+    assert out_buffer.getvalue() == bytes(BMP.from_ndarray(data))
+
+
+def test_writer_no_padding_shares_memory() -> None:
+    data = np.arange(4 * 8 * 3, dtype=np.uint8).reshape(4, 8, 3)
+
+    assert np.shares_memory(BMP.from_ndarray(data).image_data, data)
+
+
+@pytest.mark.parametrize('shape', [
+    (3, 4, 3),
+    (5, 7, 3),
+])
+def test_transcoding_non_contiguous(shape: tuple[int, int, int]) -> None:
+    data = np.flip(np.arange(np.prod(shape), dtype=np.uint8).reshape(shape), axis=(0, 1))
+    out_buffer = io.BytesIO()
+
+    BMPWriter().write_format(out_buffer, Image(data=data))
+
+    assert np.all(BMPReader().read_format(io.BytesIO(out_buffer.getvalue())).data == data)
+
+
+@pytest.mark.parametrize('data', [
+    np.array([[[255, 0, 0], [0, 255, 0], [0, 0, 255]], [[0, 0, 255], [255, 255, 255], [255, 0, 0]]], dtype=np.uint8),
+    np.repeat(np.arange(35, dtype=np.uint8).reshape(5, 7, 1), 3, axis=2),
+])
+def test_transcoding_palette(data: np.ndarray) -> None:
+    out_buffer = io.BytesIO()
+
+    BMPWriter(palette=True).write_format(out_buffer, Image(data=data))
+    result = out_buffer.getvalue()
+
+    assert result[28] == 8
+    assert np.all(BMPReader().read_format(io.BytesIO(result)).data == data)
+
+
+def test_writer_palette_single_channel() -> None:
+    data = np.arange(12, dtype=np.uint8).reshape(3, 4, 1)
+    out_buffer = io.BytesIO()
+
+    BMPWriter().write_format(out_buffer, Image(data=data))
+
+    assert len(out_buffer.getvalue()) == 14 + 40 + 256 * 4 + 3 * 4
+    assert np.all(BMPReader().read_format(io.BytesIO(out_buffer.getvalue())).data == np.repeat(data, 3, axis=2))
+
+
+def test_writer_palette_too_many_colors() -> None:
+    data = np.arange(300 * 3, dtype=np.uint16).reshape(1, 300, 3).astype(np.uint8)
+    data[0, :, 0] = np.arange(300) % 256
+    data[0, :, 1] = np.arange(300) // 256
+
+    with pytest.raises(InvalidFormatException):
+        BMPWriter(palette=True).write_format(io.BytesIO(), Image(data=data))
+
+
+@pytest.mark.parametrize('channels,palette', [(3, False), (3, True), (1, False)])
+def test_writer_16_bit_png(channels: int, palette: bool) -> None:
+    # The 16-bit PNG samples keep their high bytes, the BMP stores 8 bits per channel
+    data = np.arange(4 * 5 * channels, dtype=np.uint16).reshape(4, 5, channels) * 257 + 128
+    png_buffer = io.BytesIO()
+    PNGWriter().write_format(png_buffer, Image(data=data))
+    out_buffer = io.BytesIO()
+
+    BMPWriter(palette=palette).write_format(out_buffer, PNGReader().read_format(io.BytesIO(png_buffer.getvalue())))
+    result = BMPReader().read_format(io.BytesIO(out_buffer.getvalue())).data
+
+    assert np.all(result == np.repeat(data >> 8, 3 // channels, axis=2))
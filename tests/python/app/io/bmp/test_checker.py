@@ -3,10 +3,15 @@ from typing import BinaryIO
 
 import pytest
 
-from app.io.bmp import BMPChecker
+from app.io.format_checker import BMPChecker, IFormatChecker, SignatureTrie
 from app.io.known_format import KnownFormat
 
 
+def matches(checker: IFormatChecker, file: BinaryIO) -> bool:
+    trie = SignatureTrie([checker])
+    return trie.match(file.read(trie.length)) == checker.type()
+
+
 def test_bmp_checker_type() -> None:
     assert KnownFormat.BMP == BMPChecker().type()
 
@@ -17,9 +22,9 @@ def test_bmp_checker_type() -> None:
     BytesIO(b'BMasjda'),
     BytesIO(b'BMsadjklasjda'),
 ])
-def test_bmp_checker_check_format_true(input_data: BinaryIO) -> None:
+def test_bmp_checker_signature_true(input_data: BinaryIO) -> None:
     checker = BMPChecker()
-    assert checker.check_format(input_data) == True
+    assert matches(checker, input_data)
     assert KnownFormat.BMP == BMPChecker().type()
 
 
@@ -31,31 +36,31 @@ def test_bmp_checker_check_format_true(input_data: BinaryIO) -> None:
     BytesIO(b'asdadasd'),
     BytesIO(b'dasda'),
 ])
-def test_bmp_checker_check_format_false(input_data: BinaryIO) -> None:
+def test_bmp_checker_signature_false(input_data: BinaryIO) -> None:
     checker = BMPChecker()
-    assert checker.check_format(input_data) == False
+    assert not matches(checker, input_data)
     assert KnownFormat.BMP == BMPChecker().type()
 
 
 def test_invalid_bmp_from_png(resource_png) -> None:
     checker = BMPChecker()
-    assert checker.check_format(resource_png) == False
+    assert not matches(checker, resource_png)
     assert KnownFormat.BMP == BMPChecker().type()
 
 
 def test_invalid_bmp_from_jpg(resource_jpg) -> None:
     checker = BMPChecker()
-    assert checker.check_format(resource_jpg) == False
+    assert not matches(checker, resource_jpg)
     assert KnownFormat.BMP == BMPChecker().type()
 
 
 def test_invalid_bmp_from_avif(resource_avif) -> None:
     checker = BMPChecker()
-    assert checker.check_format(resource_avif) == False
+    assert not matches(checker, resource_avif)
     assert KnownFormat.BMP == BMPChecker().type()
 
 
 def test_valid_bmp(resource_bmp) -> None:
     checker = BMPChecker()
-    assert checker.check_format(resource_bmp) == True
+    assert matches(checker, resource_bmp)
     assert KnownFormat.BMP == BMPChecker().type()
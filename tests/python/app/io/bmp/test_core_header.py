@@ -4,7 +4,7 @@ from typing import Optional
 import pytest
 
 from app.error.invalid_format_exception import InvalidFormatException
-from app.io.bmp import DIBInfoHeader, CompressionMethod, DIBOS22Header, DIBCoreHeader, DIBHeaderType
+from app.io.bmp import DIBInfoHeader, CompressionMethod, DIBOS22Header, DIBCoreHeader, DIBHeaderType, DIBBitfieldsHeader
 
 
 @pytest.mark.parametrize("data,expected_header", [
@@ -24,6 +24,24 @@ def test_bmp_header_from_bytes(data: bytes, expected_header: DIBCoreHeader) -> N
     assert len(constructed_obj) == len(expected_header)
 
 
+@pytest.mark.parametrize("dib_header_size,bitfields_header", [
+    (52, DIBBitfieldsHeader(0xF800, 0x07E0, 0x001F)),
+    (56, DIBBitfieldsHeader(0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000)),
+    (108, DIBBitfieldsHeader(0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000, b'BGRs' + bytes(48))),
+    (124, DIBBitfieldsHeader(0x00FF0000, 0x0000FF00, 0x000000FF, 0, b'BGRs' + bytes(64))),
+])
+def test_bmp_header_from_bytes_bitfields(dib_header_size: int, bitfields_header: DIBBitfieldsHeader) -> None:
+    info_header = DIBInfoHeader(CompressionMethod.BI_BITFIELDS.value, 8, 2835, 2835, 0, 0, bitfields_header)
+    expected_header = DIBCoreHeader(dib_header_size, 2, -2, DIBOS22Header(1, 32, info_header))
+    data = bytes(expected_header)
+
+    constructed_obj = DIBCoreHeader.from_bytes(BytesIO(data))
+
+    assert len(data) == dib_header_size
+    assert constructed_obj == expected_header
+    assert constructed_obj.get_channel_masks() == bitfields_header.get_masks()
+
+
 @pytest.mark.parametrize("data", [
     b'\x0e\x00\x00\x00\x02\x00\x00\x00\x02\x00\x00\x00',
     b'\x0d\x00\x00\x00\x04\x00\x00\x00\x02\x00\x00\x00',
@@ -100,3 +118,24 @@ def test_bmp_header_length_no_trailer(dib_header_size: int, image_width: int, im
 ])
 def test_bmp_header_get_bits_per_pixel(dib_header_size: int, image_width: int, image_height: int, trailer: Optional[DIBInfoHeader], expected_length: int) -> None:
     assert DIBCoreHeader(dib_header_size, image_width, image_height, trailer).get_bits_per_pixel() == expected_length
+
+
+@pytest.mark.parametrize('compression', [
+    CompressionMethod.BI_RGB.value,
+    CompressionMethod.BI_BITFIELDS.value,
+])
+def test_bmp_header_top_down(compression: int) -> None:
+    header = DIBCoreHeader(DIBHeaderType.BITMAP_INFO_HEADER.value, 2, -2,
+                           DIBOS22Header(1, 24, DIBInfoHeader(compression, 16, 2835, 2835, 0, 0)))
+
+    assert header.is_top_down()
+
+
+@pytest.mark.parametrize('os22_header', [
+    None,
+    DIBOS22Header(1, 24),
+    DIBOS22Header(1, 8, DIBInfoHeader(CompressionMethod.BI_RLE8.value, 16, 2835, 2835, 0, 0)),
+])
+def test_bmp_header_top_down_invalid(os22_header: Optional[DIBOS22Header]) -> None:
+    with pytest.raises(InvalidFormatException):
+        DIBCoreHeader(DIBHeaderType.BITMAP_INFO_HEADER.value, 2, -2, os22_header)
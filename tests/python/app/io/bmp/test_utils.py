@@ -15,3 +15,13 @@ from app.io.bmp import compute_padding
 ])
 def test_compute_padding(width: int, expected: int) -> None:
     assert compute_padding(width) == expected
+
+
+@pytest.mark.parametrize("width,bytes_per_pixel,expected", [
+    (1, 1, 3),
+    (4, 1, 0),
+    (1, 4, 0),
+    (3, 2, 2),
+])
+def test_compute_padding_bytes_per_pixel(width: int, bytes_per_pixel: int, expected: int) -> None:
+    assert compute_padding(width, bytes_per_pixel) == expected
@@ -0,0 +1,37 @@
+import numpy as np
+
+from app.io.jpeg_dct import DCT_MATRIX, blocks_to_plane, dequantize, inverse_dct, upsample, ycbcr_to_rgb
+
+
+def test_dct_matrix_orthonormal() -> None:
+    assert np.allclose(DCT_MATRIX @ DCT_MATRIX.T, np.eye(8), atol=1e-6)
+
+
+def test_inverse_dct() -> None:
+    coefficients = np.zeros((1, 2, 64), dtype=np.int16)
+    coefficients[0, 0, 0] = -10
+    coefficients[0, 1, 1] = 5
+
+    samples = inverse_dct(dequantize(coefficients, np.full(64, 8, dtype=np.uint16)))
+
+    # The first horizontal frequency decreases from the left to the right column
+    assert np.all(samples[0, 0] == 118)
+    assert np.all(samples[0, 1, :, 0] > samples[0, 1, :, 7])
+    assert np.array_equal(samples[0, 1, 0], samples[0, 1, 7])
+
+
+def test_blocks_to_plane_upsample() -> None:
+    blocks = np.arange(2 * 3 * 8 * 8).reshape(2, 3, 8, 8)
+
+    plane = blocks_to_plane(blocks)
+
+    assert plane.shape == (16, 24)
+    assert plane[9, 17] == blocks[1, 2, 1, 1]
+    assert np.array_equal(upsample(plane, 2, 1)[::2], plane)
+
+
+def test_ycbcr_to_rgb() -> None:
+    planes = [np.array([[0, 255, 128]], dtype=np.uint8), np.full((1, 3), 128, dtype=np.uint8),
+              np.array([[128, 128, 255]], dtype=np.uint8)]
+
+    assert np.array_equal(ycbcr_to_rgb(planes), [[[0, 0, 0], [255, 255, 255], [255, 37, 128]]])
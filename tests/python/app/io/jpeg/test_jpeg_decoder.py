@@ -0,0 +1,408 @@
+import io
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.command.parser import get_parser
+from app.command.runner import get_scaled_reader
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.codec_options import DecodeScale
+from app.io.format_factory import get_reader_from_format
+from app.io.jpeg import JPEGReader
+from app.io.jpeg_decoder import JPEGCoefficients, decode_jpeg, get_frequencies, read_coefficients, scan_blocks, to_rgb
+from app.io.jpeg_encoder import write_coefficients
+from app.io.known_format import KnownFormat
+from app.operation import Identity, Thumbnail
+from app.io.jpeg_segments import FrameHeader, ScanHeader
+from app.io.png import PNGReader
+
+
+def segment(marker: int, data: bytes) -> bytes:
+    return struct.pack('>BBH', 0xFF, marker, len(data) + 2) + data
+
+
+def flat_tables() -> bytes:
+    # Symbols up to 254 are coded by their own 8 bits and symbol 255 by 9 bits, so no code assignment is needed
+    counts = bytes([0] * 7 + [255] + [1] + [0] * 7)
+    return segment(0xC4, b''.join(bytes([table_class << 4]) + counts + bytes(range(256)) for table_class in [0, 1]))
+
+
+def magnitude(value: int) -> tuple[int, int]:
+    size = abs(value).bit_length()
+    return size, value if value >= 0 else value + (1 << size) - 1
+
+
+class ScanEncoder:
+    def __init__(self, scan: ScanHeader, components: int) -> None:
+        self.scan = scan
+        self.bits: list[int] = []
+        self.predictions = [0] * components
+        self.end_of_band_run = 0
+        self.corrections: list[int] = []
+
+    def write(self, value: int, size: int) -> None:
+        self.bits.extend((value >> (size - 1 - i)) & 1 for i in range(size))
+
+    def write_symbol(self, symbol: int) -> None:
+        # Symbol 255 is the only 9-bit code, the others are the 8-bit codes of their values
+        self.write(510 if symbol == 255 else symbol, 9 if symbol == 255 else 8)
+
+    def write_value(self, run: int, value: int) -> None:
+        size, bits = magnitude(value)
+        self.write_symbol(run << 4 | size)
+        self.write(bits, size)
+
+    def flush_end_of_band(self) -> None:
+        if self.end_of_band_run:
+            run = self.end_of_band_run.bit_length() - 1
+            self.write_symbol(run << 4)
+            self.write(self.end_of_band_run & ((1 << run) - 1), run)
+            self.bits.extend(self.corrections)
+            self.end_of_band_run, self.corrections = 0, []
+
+    def to_bytes(self) -> bytes:
+        self.flush_end_of_band()
+        bits = self.bits + [1] * (-len(self.bits) % 8)
+        return np.packbits(np.array(bits, dtype=np.uint8)).tobytes().replace(b'\xff', b'\xff\x00')
+
+    def encode(self, block: np.ndarray, slot: int) -> None:
+        scan = self.scan
+        match (scan.spectral_start == 0, scan.approximation_high == 0):
+            case (True, True):
+                value = int(block[0]) >> scan.approximation_low
+                size, bits = magnitude(value - self.predictions[slot])
+                self.write_symbol(size)
+                self.write(bits, size)
+                self.predictions[slot] = value
+                if scan.spectral_end > 0:
+                    self.encode_band(block[1:])
+
+            case (True, False):
+                self.write(int(block[0]) >> scan.approximation_low & 1, 1)
+
+            case (False, True):
+                band = block[scan.spectral_start:scan.spectral_end + 1]
+                self.encode_band(np.sign(band) * (np.abs(band) >> scan.approximation_low))
+
+            case _:
+                self.encode_refinement(block[scan.spectral_start:scan.spectral_end + 1])
+
+    def encode_band(self, band: np.ndarray) -> None:
+        nonzero = np.flatnonzero(band)
+        if len(nonzero):
+            self.flush_end_of_band()
+
+        run = 0
+        for value in band[:nonzero[-1] + 1 if len(nonzero) else 0].tolist():
+            if value == 0:
+                run += 1
+                continue
+
+            while run > 15:
+                self.write_symbol(0xF0)
+                run -= 16
+
+            self.write_value(run, value)
+            run = 0
+
+        if len(nonzero) == 0 or nonzero[-1] < len(band) - 1:
+            if self.scan.spectral_start == 0:
+                self.write_symbol(0x00)
+            else:
+                self.end_of_band_run += 1
+
+    def encode_refinement(self, band: np.ndarray) -> None:
+        shift = self.scan.approximation_low
+        values = (np.abs(band) >> shift).tolist()
+        last_new = max((i for i, x in enumerate(values) if x == 1), default=-1)
+
+        run = 0
+        corrections: list[int] = []
+        for index, value in enumerate(values):
+            if value == 0:
+                run += 1
+                continue
+
+            while run > 15 and index <= last_new:
+                self.flush_end_of_band()
+                self.write_symbol(0xF0)
+                self.bits.extend(corrections)
+                corrections, run = [], run - 16
+
+            if value > 1:
+                corrections.append(value & 1)
+                continue
+
+            self.flush_end_of_band()
+            self.write_symbol(run << 4 | 1)
+            self.write(int(band[index] > 0), 1)
+            self.bits.extend(corrections)
+            corrections, run = [], 0
+
+        if run > 0 or corrections:
+            self.end_of_band_run += 1
+            self.corrections.extend(corrections)
+
+
+def scan_segment(frame: FrameHeader, components: list[int], band: tuple[int, int], approximation: tuple[int, int],
+                 coefficients: list[np.ndarray], restart_interval: int) -> bytes:
+    header = bytes([len(components)]) + b''.join(bytes([frame.components[x].identifier, 0]) for x in components) \
+        + bytes([band[0], band[1], approximation[0] << 4 | approximation[1]])
+    scan = ScanHeader.from_bytes(header, frame)
+
+    blocks = scan_blocks(frame, scan)
+    blocks_in_mcu = 1 if len(components) == 1 \
+        else sum(frame.components[x].vertical_sampling * frame.components[x].horizontal_sampling for x in components)
+    interval = restart_interval * blocks_in_mcu or len(blocks)
+
+    flat = [coefficients[x].reshape(-1) for x in components]
+    intervals = []
+    for start in range(0, len(blocks), interval):
+        encoder = ScanEncoder(scan, len(components))
+        for slot, offset in blocks[start:start + interval]:
+            encoder.encode(flat[slot][offset:offset + 64], slot)
+        intervals.append(encoder.to_bytes())
+
+    return segment(0xDA, header) + b''.join(x + bytes([0xFF, 0xD0 + i % 8]) for i, x in enumerate(intervals[:-1])) \
+        + intervals[-1]
+
+
+def jpeg_file(frame: FrameHeader, scans: list[tuple[list[int], tuple[int, int], tuple[int, int]]],
+              coefficients: list[np.ndarray], restart_interval: int = 0) -> bytes:
+    frame_data = struct.pack('>BHHB', 8, frame.height, frame.width, len(frame.components)) + b''.join(
+        bytes([x.identifier, x.horizontal_sampling << 4 | x.vertical_sampling, 0]) for x in frame.components)
+
+    return b'\xff\xd8' + segment(0xDB, bytes([0]) + bytes([1] * 64)) + flat_tables() \
+        + (segment(0xDD, struct.pack('>H', restart_interval)) if restart_interval else b'') \
+        + segment(frame.marker, frame_data) \
+        + b''.join(scan_segment(frame, *x, coefficients, restart_interval) for x in scans) + b'\xff\xd9'
+
+
+def random_coefficients(frame: FrameHeader, seed: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    result = []
+    for component in frame.components:
+        rows, columns = frame.get_block_counts(component)
+        height, width = frame.get_component_size(component)
+
+        coefficients = rng.integers(-300, 301, (rows, columns, 64)) * (rng.random((rows, columns, 64)) < 0.3)
+        coefficients[:, :, 0] = rng.integers(-1000, 1001, (rows, columns))
+        coefficients[:, :, 40:] = 0
+
+        # Blocks outside of the component are coded only by the interleaved DC scans
+        coefficients[-(-height // 8):, :, 1:] = 0
+        coefficients[:, -(-width // 8):, 1:] = 0
+        result.append(coefficients.astype(np.int16))
+
+    return result
+
+
+def sample_frame(marker: int) -> FrameHeader:
+    components = bytes([1, 0x22, 0, 2, 0x11, 0, 3, 0x11, 0])
+    return FrameHeader.from_bytes(marker, struct.pack('>BHHB', 8, 20, 44, 3) + components)
+
+
+@pytest.mark.parametrize('restart_interval', [0, 1, 3])
+def test_read_coefficients_sequential(restart_interval: int) -> None:
+    frame = sample_frame(0xC0)
+    coefficients = random_coefficients(frame, restart_interval)
+
+    data = jpeg_file(frame, [([0, 1, 2], (0, 63), (0, 0))], coefficients, restart_interval)
+    result = read_coefficients(data)
+
+    assert result.frame == frame
+    assert all(np.array_equal(x, y) for x, y in zip(result.coefficients, coefficients))
+
+
+@pytest.mark.parametrize('restart_interval', [0, 2])
+def test_read_coefficients_progressive(restart_interval: int) -> None:
+    frame = sample_frame(0xC2)
+    coefficients = random_coefficients(frame, 10 + restart_interval)
+    scans = [
+        ([0, 1, 2], (0, 0), (0, 1)),
+        ([0], (1, 5), (0, 0)),
+        ([0], (6, 63), (0, 2)),
+        ([1], (1, 63), (0, 0)),
+        ([2], (1, 63), (0, 1)),
+        ([0], (6, 63), (2, 1)),
+        ([0, 1, 2], (0, 0), (1, 0)),
+        ([0], (6, 63), (1, 0)),
+        ([2], (1, 63), (1, 0)),
+    ]
+
+    result = read_coefficients(jpeg_file(frame, scans, coefficients, restart_interval))
+
+    assert all(np.array_equal(x, y) for x, y in zip(result.coefficients, coefficients))
+
+
+@pytest.mark.parametrize('scale', list(DecodeScale))
+@pytest.mark.parametrize('marker,scans', [
+    (0xC0, [([0, 1, 2], (0, 63), (0, 0))]),
+    (0xC2, [([0, 1, 2], (0, 0), (0, 0)), ([0], (1, 5), (0, 0)), ([0], (6, 63), (0, 0)), ([1], (1, 63), (0, 1)),
+            ([2], (1, 63), (0, 0)), ([1], (1, 63), (1, 0))]),
+])
+def test_read_coefficients_scale(scale: DecodeScale, marker: int,
+                                 scans: list[tuple[list[int], tuple[int, int], tuple[int, int]]]) -> None:
+    frame = sample_frame(marker)
+    coefficients = random_coefficients(frame, 20)
+    data = jpeg_file(frame, scans, coefficients)
+
+    result = read_coefficients(data, scale)
+    frequencies = get_frequencies(scale)
+
+    # The codes of the higher frequencies are skipped, so the reduced samples are the same as from all of them
+    assert all(np.array_equal(x[..., :frequencies], y[..., :frequencies])
+               for x, y in zip(result.coefficients, coefficients))
+    assert np.array_equal(decode_jpeg(data, scale), to_rgb(read_coefficients(data), scale))
+
+
+@pytest.mark.parametrize('scale', list(DecodeScale))
+def test_read_coefficients_scale_optimized_tables(scale: DecodeScale) -> None:
+    frame = sample_frame(0xC0)
+    rng = np.random.default_rng(3)
+    coefficients = [x // 100 * (rng.random(x.shape) < 0.5) for x in random_coefficients(frame, 30)]
+    for values in coefficients:
+        # Long zero runs and the last coefficient end some blocks without the end of block symbol
+        values[::2, :, 63] = rng.choice([-1, 1], values[::2, :, 63].shape)
+        values[::3, :, 1:30] = 0
+    quantization = [np.ones(64, dtype=np.uint16)] * 3
+    data = write_coefficients(JPEGCoefficients(frame, quantization, coefficients), optimize_huffman=True)
+
+    # The short codes of the optimized tables are stepped over several at a time
+    result = read_coefficients(data, scale)
+    frequencies = get_frequencies(scale)
+
+    assert all(np.array_equal(x[..., :frequencies], y[..., :frequencies])
+               for x, y in zip(result.coefficients, coefficients))
+
+
+@pytest.mark.parametrize('scale,shape', [
+    (DecodeScale.FULL, (1282, 960, 3)),
+    (DecodeScale.HALF, (641, 480, 3)),
+    (DecodeScale.QUARTER, (321, 240, 3)),
+    (DecodeScale.EIGHTH, (161, 120, 3)),
+])
+def test_decode_jpeg_scale(resource_path: Path, scale: DecodeScale, shape: tuple[int, int, int]) -> None:
+    data = (resource_path / '3.jpg').read_bytes()
+    result = decode_jpeg(data, scale)
+
+    # The reduced samples are close to the means of the full samples that they cover
+    reduction = scale.get_reduction()
+    expected = np.pad(decode_jpeg(data), ((0, -1282 % reduction), (0, -960 % reduction), (0, 0)), mode='edge')
+    expected = expected.reshape(shape[0], reduction, shape[1], reduction, 3).mean(axis=(1, 3))
+
+    assert result.shape == shape
+    assert np.mean(np.abs(result - expected)) < 3
+
+
+def test_decode_scale_eighth() -> None:
+    frame = FrameHeader.from_bytes(0xC0, struct.pack('>BHHB', 8, 16, 8, 1) + bytes([1, 0x11, 0]))
+    coefficients = [np.zeros((2, 1, 64), dtype=np.int16)]
+    coefficients[0][:, 0, 0] = [80, -16]
+    coefficients[0][:, 0, 1:5] = 50
+
+    # Every block is one sample of its mean, the AC coefficients do not change it
+    result = decode_jpeg(jpeg_file(frame, [([0], (0, 63), (0, 0))], coefficients), DecodeScale.EIGHTH)
+
+    assert np.array_equal(result[:, :, 0], [[138], [126]])
+
+
+@pytest.mark.parametrize('reduction,scale', [
+    (0, DecodeScale.FULL),
+    (1, DecodeScale.FULL),
+    (3, DecodeScale.HALF),
+    (4, DecodeScale.QUARTER),
+    (8, DecodeScale.EIGHTH),
+    (100, DecodeScale.EIGHTH),
+])
+def test_decode_scale_from_reduction(reduction: int, scale: DecodeScale) -> None:
+    assert DecodeScale.from_reduction(reduction) == scale
+
+
+def test_reader_from_args(resource_path: Path) -> None:
+    reader = get_reader_from_format(KnownFormat.JPEG, get_parser().parse_args(['--decode-scale', '1/4', 'identity']))
+
+    assert isinstance(reader, JPEGReader)
+    assert reader.scale == DecodeScale.QUARTER
+
+    with open(resource_path / '3.jpg', mode='rb') as file:
+        assert reader.read_format(file).data.shape == (321, 240, 3)
+
+
+@pytest.mark.parametrize('operation,arguments,scale', [
+    (Identity(), ['identity'], DecodeScale.FULL),
+    (Thumbnail(), ['thumbnail', '--width', '100', '--height', '100'], DecodeScale.EIGHTH),
+    (Thumbnail(), ['thumbnail', '--width', '300', '--height', '300'], DecodeScale.QUARTER),
+    (Thumbnail(), ['thumbnail', '--width', '2000', '--height', '2000'], DecodeScale.FULL),
+])
+def test_scaled_reader(resource_path: Path, operation: Identity | Thumbnail, arguments: list[str],
+                       scale: DecodeScale) -> None:
+    with open(resource_path / '3.jpg', mode='rb') as file:
+        reader = get_scaled_reader(get_parser().parse_args(arguments), operation, file)
+        assert file.tell() == 0
+
+    assert isinstance(reader, JPEGReader)
+    assert reader.scale == scale
+
+
+def test_scan_blocks() -> None:
+    frame = sample_frame(0xC0)
+    luma = ScanHeader.from_bytes(bytes([1, 1, 0, 0, 63, 0]), frame)
+    interleaved = ScanHeader.from_bytes(bytes([2, 1, 0, 3, 0, 0, 63, 0]), frame)
+
+    # The luma blocks are padded to 4 rows of 6 columns of the 2x3 MCUs, but only 3x6 of them cover the component
+    assert scan_blocks(frame, luma)[:7] == [(0, 64 * x) for x in range(7)]
+    assert len(scan_blocks(frame, luma)) == 18
+    assert scan_blocks(frame, interleaved)[:10] == [(0, 0), (0, 64), (0, 384), (0, 448), (1, 0),
+                                                    (0, 128), (0, 192), (0, 512), (0, 576), (1, 64)]
+
+
+def test_decode_jpeg(resource_path: Path) -> None:
+    result = decode_jpeg((resource_path / '3.jpg').read_bytes())
+
+    with open(resource_path / '3.png', mode='rb') as file:
+        expected = PNGReader().read_format(file).data[:, :, :3]
+
+    # The reference is decoded with the smooth chroma upsampling, the decoder replicates the chroma samples
+    assert result.shape == expected.shape
+    assert np.mean(np.abs(result.astype(np.int16) - expected)) < 1
+
+
+def test_reader_without_fast_backend(resource_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: None)
+    data = (resource_path / '3.jpg').read_bytes()
+
+    assert np.array_equal(JPEGReader().read_format(io.BytesIO(data)).data, decode_jpeg(data))
+
+
+def test_decode_grayscale() -> None:
+    frame = FrameHeader.from_bytes(0xC0, struct.pack('>BHHB', 8, 9, 7, 1) + bytes([1, 0x11, 0]))
+    coefficients = [np.zeros((2, 1, 64), dtype=np.int16)]
+    coefficients[0][1, 0, 0] = 80
+
+    result = decode_jpeg(jpeg_file(frame, [([0], (0, 63), (0, 0))], coefficients))
+
+    assert result.shape == (9, 7, 3)
+    assert np.all(result[:8] == 128)
+    assert np.all(result[8:] == 138)
+
+
+@pytest.mark.parametrize('data,match', [
+    (b'\x89PNG', 'start of image'),
+    (b'\xff\xd8' + segment(0xC3, struct.pack('>BHHB', 8, 8, 8, 1) + bytes([1, 0x11, 0])), 'coding process'),
+    (b'\xff\xd8' + segment(0xC0, struct.pack('>BHHB', 12, 8, 8, 1) + bytes([1, 0x11, 0])), 'precision'),
+    (b'\xff\xd8' + segment(0xC0, struct.pack('>BHHB', 8, 8, 8, 1) + bytes([1, 0x11, 0]))
+     + segment(0xDA, bytes([1, 1, 0, 0, 63, 0])), 'quantization table'),
+    (b'\xff\xd8' + segment(0xDB, bytes([0]) + bytes([1] * 64))
+     + segment(0xC0, struct.pack('>BHHB', 8, 8, 8, 1) + bytes([1, 0x11, 0]))
+     + segment(0xDA, bytes([1, 1, 0, 0, 63, 0])), 'Huffman table'),
+    (b'\xff\xd8' + segment(0xDB, bytes([0]) + bytes([1] * 64)) + flat_tables()
+     + segment(0xC0, struct.pack('>BHHB', 8, 8, 8, 1) + bytes([1, 0x11, 0]))
+     + segment(0xDA, bytes([1, 1, 0, 0, 63, 0])) + b'\xff\x00\xff\x00', 'Invalid DC Huffman code'),
+    (b'\xff\xd8\xff\xe0\x00\x10JFIF', 'segment length'),
+])
+def test_read_coefficients_invalid(data: bytes, match: str) -> None:
+    with pytest.raises(InvalidFormatException, match=match):
+        read_coefficients(data)
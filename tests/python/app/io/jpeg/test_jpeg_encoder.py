@@ -0,0 +1,177 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.command.parser import get_parser
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.bmp import BMPWriter
+from app.io.codec_options import ChromaSubsampling, JPEGOptions
+from app.io.format_factory import get_writer_from_format
+from app.io.jpeg import JPEGReader, JPEGWriter
+from app.io.jpeg_decoder import decode_jpeg, read_coefficients
+from app.io.jpeg_encoder import encode_jpeg
+from app.io.known_format import KnownFormat
+from app.io.png import PNGReader, PNGWriter
+
+
+@pytest.fixture
+def pixels() -> np.ndarray:
+    rows, columns = np.mgrid[0:45, 0:61]
+    gradient = np.stack([rows * 5, columns * 4, (rows + columns) * 2], axis=2)
+
+    return np.clip(gradient + np.random.default_rng(0).integers(-4, 5, gradient.shape), 0, 255).astype(np.uint8)
+
+
+def psnr(result: np.ndarray, expected: np.ndarray) -> float:
+    return float(10 * np.log10(255 ** 2 / np.mean((result.astype(np.float64) - expected) ** 2)))
+
+
+@pytest.mark.parametrize('subsampling,sampling', [('4:4:4', (1, 1)), ('4:2:2', (1, 2)), ('4:2:0', (2, 2))])
+def test_encode_subsampling(pixels: np.ndarray, subsampling: str, sampling: tuple[int, int]) -> None:
+    data = encode_jpeg(pixels, JPEGOptions(subsampling=ChromaSubsampling.from_string(subsampling)))
+    image = read_coefficients(data)
+
+    assert (image.frame.height, image.frame.width) == (45, 61)
+    assert image.frame.get_max_sampling() == sampling
+    assert psnr(decode_jpeg(data), pixels) > 35
+
+
+def test_encode_quality(pixels: np.ndarray) -> None:
+    sizes = [len(encode_jpeg(pixels, JPEGOptions(quality=x))) for x in [10, 50, 90, 100]]
+    qualities = [psnr(decode_jpeg(encode_jpeg(pixels, JPEGOptions(quality=x))), pixels) for x in [10, 50, 90, 100]]
+
+    assert sizes == sorted(sizes)
+    assert qualities == sorted(qualities)
+
+
+def test_encode_optimized_huffman(pixels: np.ndarray) -> None:
+    typical = encode_jpeg(pixels, JPEGOptions(optimize_huffman=False))
+    optimized = encode_jpeg(pixels, JPEGOptions(optimize_huffman=True))
+
+    # The tables change only the entropy coding, so the coefficients are the same
+    assert len(optimized) < len(typical)
+    assert all(np.array_equal(x, y) for x, y in zip(read_coefficients(optimized).coefficients,
+                                                    read_coefficients(typical).coefficients))
+
+
+def test_encode_grayscale(pixels: np.ndarray) -> None:
+    data = encode_jpeg(pixels[:, :, :1], JPEGOptions(quality=95))
+    result = decode_jpeg(data)
+
+    assert len(read_coefficients(data).frame.components) == 1
+    assert np.array_equal(result[:, :, 0], result[:, :, 2])
+    assert psnr(result[:, :, :1], pixels[:, :, :1]) > 40
+
+
+@pytest.mark.parametrize('shape', [(1, 1, 3), (8, 8, 3), (17, 9, 3)])
+def test_encode_sizes(shape: tuple[int, ...]) -> None:
+    pixels = np.full(shape, (200, 100, 50), dtype=np.uint8)
+
+    assert np.all(np.abs(decode_jpeg(encode_jpeg(pixels)).astype(np.int16) - pixels) <= 2)
+
+
+def test_encode_invalid() -> None:
+    with pytest.raises(InvalidFormatException, match='quality'):
+        JPEGOptions(quality=0)
+
+    with pytest.raises(InvalidFormatException, match='channels'):
+        encode_jpeg(np.zeros((8, 8, 2), dtype=np.uint8))
+
+
+def test_writer_without_fast_backend(pixels: np.ndarray, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: None)
+
+    buffer = io.BytesIO()
+    JPEGWriter(JPEGOptions(quality=95)).write_format(buffer, Image(data=pixels))
+    result = JPEGReader().read_format(io.BytesIO(buffer.getvalue())).data
+
+    # The writer takes the top-down RGB pixels of the reader, so the image round trips
+    assert psnr(result, pixels) > 35
+
+
+@pytest.mark.parametrize('channels,expected_channels', [([0], [0, 0, 0]),
+                                                        ([0, 1], [0, 0, 0]),
+                                                        ([0, 1, 2], [0, 1, 2]),
+                                                        ([0, 1, 2, 1], [0, 1, 2])])
+def test_writer_fast_backend_takes_rgb(pixels: np.ndarray, channels: list[int], expected_channels: list[int],
+                                       monkeypatch: pytest.MonkeyPatch) -> None:
+    encoded = []
+
+    class FastBackend:
+        @staticmethod
+        def encode_jpeg(data: np.ndarray, quality: int, subsampling: str, optimize_huffman: bool) -> bytes:
+            encoded.append(data)
+            return encode_jpeg(data, JPEGOptions(quality, ChromaSubsampling.from_string(subsampling), optimize_huffman))
+
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: FastBackend)
+
+    JPEGWriter().write_format(io.BytesIO(), Image(data=pixels[:, :, channels]))
+
+    # The CUDA encoder reads three interleaved channels, so the grayscale is repeated and the alpha is dropped
+    assert encoded[0].shape == (*pixels.shape[:2], 3)
+    assert encoded[0].flags.c_contiguous
+    assert np.array_equal(encoded[0], pixels[:, :, expected_channels])
+
+
+def test_writer_grayscale_without_fast_backend(pixels: np.ndarray, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: None)
+
+    buffer = io.BytesIO()
+    JPEGWriter(JPEGOptions(quality=95)).write_format(buffer, Image(data=pixels[:, :, :1]))
+
+    assert len(read_coefficients(buffer.getvalue()).frame.components) == 1
+    assert psnr(decode_jpeg(buffer.getvalue())[:, :, 0], pixels[:, :, 0]) > 35
+
+
+def test_writer_from_args() -> None:
+    args = get_parser().parse_args(['--jpeg-quality', '75', '--jpeg-subsampling', '4:2:2', '--jpeg-optimize',
+                                    'identity'])
+    writer = get_writer_from_format(KnownFormat.JPEG, args)
+
+    assert isinstance(writer, JPEGWriter)
+    assert writer.options == JPEGOptions(quality=75, subsampling=ChromaSubsampling.YUV422, optimize_huffman=True)
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_writer_16_bit_png(pixels: np.ndarray, fast: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    class FastBackend:
+        @staticmethod
+        def encode_jpeg(data: np.ndarray, quality: int, subsampling: str, optimize_huffman: bool) -> bytes:
+            return encode_jpeg(data, JPEGOptions(quality, ChromaSubsampling.from_string(subsampling), optimize_huffman))
+
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: FastBackend if fast else None)
+    png_buffer = io.BytesIO()
+    PNGWriter().write_format(png_buffer, Image(data=pixels.astype(np.uint16) * 257))
+
+    buffer = io.BytesIO()
+    JPEGWriter(JPEGOptions(quality=95)).write_format(buffer, PNGReader().read_format(io.BytesIO(png_buffer.getvalue())))
+
+    # The JPEG stores 8-bit samples, so the 16-bit ones are reduced to their high bytes
+    assert psnr(decode_jpeg(buffer.getvalue()), pixels) > 35
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_command_bmp_to_jpeg(tmp_path: Path, fast: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    class FastBackend:
+        @staticmethod
+        def encode_jpeg(data: np.ndarray, quality: int, subsampling: str, optimize_huffman: bool) -> bytes:
+            return encode_jpeg(data, JPEGOptions(quality, ChromaSubsampling.from_string(subsampling), optimize_huffman))
+
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: FastBackend if fast else None)
+    # Red, green, blue and white quadrants from the top left, the bitmap stores them bottom-up BGR
+    expected = np.zeros((16, 16, 3), dtype=np.uint8)
+    expected[:8, :8] = [255, 0, 0]
+    expected[:8, 8:] = [0, 255, 0]
+    expected[8:, :8] = [0, 0, 255]
+    expected[8:, 8:] = 255
+    with open(tmp_path / 'image.bmp', mode='wb') as file:
+        BMPWriter().write_format(file, Image(data=np.ascontiguousarray(expected[::-1, :, ::-1])))
+
+    args = get_parser().parse_args(['-i', str(tmp_path / 'image.bmp'), '-o', str(tmp_path / 'image.jpg'),
+                                    '--output-format', 'jpeg', 'identity'])
+
+    assert args.func(args) == 0
+    assert psnr(decode_jpeg((tmp_path / 'image.jpg').read_bytes()), expected) > 30
@@ -0,0 +1,74 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.jpeg_segments import LUMINANCE_QUANTIZATION, FrameHeader, HuffmanTable, QuantizationTable
+
+
+def test_huffman_lookup() -> None:
+    # Codes 00, 01, 100 and 101 of the symbols 5, 6, 7 and 8
+    table, = HuffmanTable.from_segment(bytes([0x10, 0, 2, 2] + [0] * 13 + [5, 6, 7, 8]))
+    lookup = table.build_lookup()
+
+    assert (table.table_class, table.identifier) == (HuffmanTable.AC_CLASS, 0)
+    assert lookup[0b00 << 14] == 2 << 8 | 5
+    assert lookup[(0b01 << 14) + 100] == 2 << 8 | 6
+    assert lookup[0b101 << 13] == 3 << 8 | 8
+    assert lookup[0b110 << 13] == 0
+
+
+@pytest.mark.parametrize('data', [
+    bytes([0x00, 3] + [0] * 15 + [1, 2, 3]),
+    bytes([0x20, 1] + [0] * 15 + [1]),
+    bytes([0x00, 1] + [0] * 15),
+])
+def test_huffman_table_invalid(data: bytes) -> None:
+    with pytest.raises(InvalidFormatException):
+        HuffmanTable.from_segment(data)
+
+
+def test_quantization_tables() -> None:
+    data = bytes([0x00] + [2] * 64) + bytes([0x11]) + struct.pack('>64H', *range(1, 65))
+    tables = QuantizationTable.from_segment(data)
+
+    assert [x.identifier for x in tables] == [0, 1]
+    assert np.array_equal(tables[0].values, [2] * 64)
+    assert np.array_equal(tables[1].values, np.arange(1, 65))
+
+
+def test_frame_header_sizes() -> None:
+    components = bytes([1, 0x21, 0, 2, 0x11, 1, 3, 0x11, 1])
+    frame = FrameHeader.from_bytes(0xC2, struct.pack('>BHHB', 8, 17, 33, 3) + components)
+
+    assert frame.is_progressive()
+    assert frame.get_max_sampling() == (1, 2)
+    assert frame.get_mcu_counts() == (3, 3)
+    assert frame.get_component_size(frame.components[1]) == (17, 17)
+    assert frame.get_block_counts(frame.components[0]) == (3, 6)
+
+
+def test_huffman_from_frequencies() -> None:
+    frequencies = np.zeros(256, dtype=np.int64)
+    frequencies[:40] = 2 ** np.arange(40, dtype=np.int64)
+
+    table = HuffmanTable.from_frequencies(HuffmanTable.AC_CLASS, 1, frequencies)
+    codes, lengths = table.get_codes()
+
+    # Lengths are limited to 16 bits, the codes are prefix free and the all ones code is not used
+    words = sorted(format(codes[x], f'0{lengths[x]}b') for x in range(40))
+    assert sorted(table.symbols) == list(range(40))
+    assert lengths[:40].max() == HuffmanTable.MAX_CODE_LENGTH
+    assert lengths[39] == 1
+    assert all(not y.startswith(x) for x, y in zip(words, words[1:]))
+    assert '1' * 16 not in words
+    assert HuffmanTable.from_segment(bytes(table)) == [table]
+
+
+def test_quantization_from_quality() -> None:
+    table = QuantizationTable.from_quality(0, LUMINANCE_QUANTIZATION, 50)
+
+    assert np.array_equal(table.values[:3], [16, 11, 12])
+    assert np.all(QuantizationTable.from_quality(0, LUMINANCE_QUANTIZATION, 100).values == 1)
+    assert np.all(QuantizationTable.from_quality(0, LUMINANCE_QUANTIZATION, 1).values == 255)
@@ -0,0 +1,191 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.command.parser import get_parser
+from app.io.codec_options import ChromaSubsampling, JPEGOptions
+from app.io.jpeg_decoder import decode_jpeg, read_coefficients
+from app.io.jpeg_encoder import encode_jpeg, write_coefficients
+from app.io.jpeg_transform import JPEGTransform
+
+INVERSE_TRANSFORMS = {JPEGTransform.ROTATE_90: JPEGTransform.ROTATE_270,
+                      JPEGTransform.ROTATE_270: JPEGTransform.ROTATE_90}
+
+
+def encode_sample(height: int, width: int, subsampling: ChromaSubsampling) -> bytes:
+    rows, columns = np.mgrid[0:height, 0:width]
+    pixels = np.stack([rows * 5, columns * 4, rows * columns], axis=2) % 256
+
+    return encode_jpeg(pixels.astype(np.uint8), JPEGOptions(quality=80, subsampling=subsampling))
+
+
+def transform_samples(samples: np.ndarray, transform: JPEGTransform) -> np.ndarray:
+    if transform.is_transposed():
+        samples = samples.transpose(1, 0, 2)
+
+    vertical, horizontal = transform.is_mirrored()
+    if vertical:
+        samples = samples[::-1]
+
+    if horizontal:
+        samples = samples[:, ::-1]
+
+    return samples
+
+
+@pytest.mark.parametrize('subsampling', list(ChromaSubsampling))
+@pytest.mark.parametrize('transform', list(JPEGTransform))
+def test_transform_samples(subsampling: ChromaSubsampling, transform: JPEGTransform) -> None:
+    data = encode_sample(32, 48, subsampling)
+    result = write_coefficients(transform.apply(read_coefficients(data)))
+
+    # The transformed coefficients are the coefficients of the transformed samples, up to the float rounding of the DCT
+    expected = transform_samples(decode_jpeg(data), transform).astype(np.int16)
+    assert np.all(np.abs(decode_jpeg(result) - expected) <= 1)
+
+
+@pytest.mark.parametrize('transform', list(JPEGTransform))
+def test_transform_lossless(transform: JPEGTransform) -> None:
+    image = read_coefficients(encode_sample(48, 64, ChromaSubsampling.YUV422))
+    result = INVERSE_TRANSFORMS.get(transform, transform).apply(read_coefficients(write_coefficients(
+        transform.apply(image))))
+
+    assert result.frame == image.frame
+    assert all(np.array_equal(x, y) for x, y in zip(result.quantization, image.quantization))
+    assert all(np.array_equal(x, y) for x, y in zip(result.coefficients, image.coefficients))
+
+
+def test_transform_frame() -> None:
+    image = JPEGTransform.ROTATE_90.apply(read_coefficients(encode_sample(16, 40, ChromaSubsampling.YUV422)))
+
+    assert (image.frame.height, image.frame.width) == (40, 16)
+    assert [(x.vertical_sampling, x.horizontal_sampling) for x in image.frame.components] == [(2, 1), (1, 1), (1, 1)]
+    assert [x.shape for x in image.coefficients] == [(6, 2, 64), (3, 2, 64), (3, 2, 64)]
+
+
+@pytest.mark.parametrize('transform,perfect', [
+    (JPEGTransform.NONE, True),
+    (JPEGTransform.ROTATE_90, True),
+    (JPEGTransform.ROTATE_180, False),
+    (JPEGTransform.ROTATE_270, False),
+    (JPEGTransform.FLIP_HORIZONTAL, False),
+    (JPEGTransform.FLIP_VERTICAL, True),
+])
+def test_transform_is_perfect(transform: JPEGTransform, perfect: bool) -> None:
+    # The MCU of 4:2:0 is 16x16 samples, only the height is whole MCUs
+    frame = read_coefficients(encode_sample(32, 40, ChromaSubsampling.YUV420)).frame
+
+    assert transform.is_perfect(frame) == perfect
+
+
+@pytest.mark.parametrize('rotations,transform', [
+    (0, JPEGTransform.NONE),
+    (1, JPEGTransform.ROTATE_90),
+    (2, JPEGTransform.ROTATE_180),
+    (-1, JPEGTransform.ROTATE_270),
+    (5, JPEGTransform.ROTATE_90),
+])
+def test_transform_from_rotations(rotations: int, transform: JPEGTransform) -> None:
+    assert JPEGTransform.from_rotations(rotations) == transform
+
+
+@pytest.mark.parametrize('operation,transform', [
+    (['rotate90'], JPEGTransform.ROTATE_270),
+    (['rotate90', '--rotations', '2'], JPEGTransform.ROTATE_180),
+    (['rotate90', '--rotations', '-1'], JPEGTransform.ROTATE_90),
+    (['flip', '--horizontal'], JPEGTransform.FLIP_HORIZONTAL),
+    (['flip', '--vertical'], JPEGTransform.FLIP_VERTICAL),
+])
+def test_transform_command(operation: list[str], transform: JPEGTransform, tmp_path: Path) -> None:
+    input_path, output_path = tmp_path / 'input.jpg', tmp_path / 'output.jpg'
+    input_path.write_bytes(encode_sample(32, 48, ChromaSubsampling.YUV420))
+
+    run_command(input_path, output_path, ['--jpeg-quality', '10', *operation])
+
+    expected = transform.apply(read_coefficients(input_path.read_bytes()))
+    result = read_coefficients(output_path.read_bytes())
+
+    # The quality option does not apply, the quantization tables of the input are kept
+    assert all(np.array_equal(x, y) for x, y in zip(result.quantization, expected.quantization))
+    assert all(np.array_equal(x, y) for x, y in zip(result.coefficients, expected.coefficients))
+
+
+def test_transform_command_not_perfect(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: None)
+
+    input_path, output_path = tmp_path / 'input.jpg', tmp_path / 'output.jpg'
+    input_path.write_bytes(encode_sample(30, 48, ChromaSubsampling.YUV420))
+
+    args = get_parser().parse_args(['-i', str(input_path), '-o', str(output_path), '--jpeg-quality', '10',
+                                    'flip', '--vertical'])
+    assert args.func(args) == 0
+
+    # The height is not whole MCUs, so the samples are flipped and encoded again with the quality option
+    result = read_coefficients(output_path.read_bytes())
+    assert (result.frame.height, result.frame.width) == (30, 48)
+    assert not np.array_equal(result.quantization[0], read_coefficients(input_path.read_bytes()).quantization[0])
+
+
+def marked_sample(height: int, width: int) -> bytes:
+    # The smooth gradient is coded with small errors and the white block in the top-left corner shows the orientation
+    rows, columns = np.mgrid[0:height, 0:width]
+    pixels = np.stack([rows * 255 // height, columns * 255 // width, np.full_like(rows, 128)], axis=2)
+    pixels[:8, :8] = 255
+
+    return encode_jpeg(pixels.astype(np.uint8), JPEGOptions(quality=95))
+
+
+def run_command(input_path: Path, output_path: Path, arguments: list[str]) -> np.ndarray:
+    args = get_parser().parse_args(['-i', str(input_path), '-o', str(output_path), *arguments])
+    assert args.func(args) == 0
+
+    return decode_jpeg(output_path.read_bytes())
+
+
+def marked_corner(pixels: np.ndarray) -> tuple[bool, bool]:
+    row, column = np.unravel_index(np.argmax(pixels.astype(np.int16).sum(axis=2)), pixels.shape[:2])
+    return bool(row >= pixels.shape[0] // 2), bool(column >= pixels.shape[1] // 2)
+
+
+TRANSFORM_OPERATIONS = [
+    ['rotate90'],
+    ['rotate90', '--rotations', '2'],
+    ['rotate90', '--rotations', '3'],
+    ['rotate90', '--rotations', '-1'],
+    ['flip', '--horizontal'],
+    ['flip', '--vertical'],
+]
+
+
+@pytest.mark.parametrize('operation', TRANSFORM_OPERATIONS)
+def test_transform_command_matches_samples(operation: list[str], tmp_path: Path,
+                                           monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: None)
+    input_path = tmp_path / 'input.jpg'
+    input_path.write_bytes(marked_sample(32, 48))
+
+    lossless = run_command(input_path, tmp_path / 'lossless.jpg', ['--jpeg-quality', '95', *operation])
+
+    # The image that is not whole MCUs falls back to the operation on the samples, the result must be the same
+    monkeypatch.setattr(JPEGTransform, 'is_perfect', lambda self, frame: False)
+    samples = run_command(input_path, tmp_path / 'samples.jpg', ['--jpeg-quality', '95', *operation])
+
+    assert lossless.shape == samples.shape
+    assert np.mean(np.abs(lossless.astype(np.int16) - samples)) < 2
+    assert marked_corner(lossless) == marked_corner(samples)
+
+
+@pytest.mark.parametrize('operation', TRANSFORM_OPERATIONS)
+def test_transform_command_orientation(operation: list[str], tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('app.io.jpeg.load_fast_backend', lambda: None)
+    aligned_path, unaligned_path = tmp_path / 'aligned.jpg', tmp_path / 'unaligned.jpg'
+    aligned_path.write_bytes(marked_sample(32, 48))
+    unaligned_path.write_bytes(marked_sample(30, 44))
+
+    # The lossless transform of the whole MCUs and the fallback put the marked block into the same corner
+    aligned = run_command(aligned_path, tmp_path / 'aligned_output.jpg', operation)
+    unaligned = run_command(unaligned_path, tmp_path / 'unaligned_output.jpg', operation)
+
+    assert marked_corner(aligned) == marked_corner(unaligned)
+    assert marked_corner(aligned) != (False, False)
@@ -0,0 +1,169 @@
+import io
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.command.parser import get_parser
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.codec_options import PNGOptions
+from app.io.apng import APNGReader, APNGWriter, Animation, AnimationFrame, blend_over, is_animated
+from app.io.png import PNGReader, PNGWriter
+
+from png_helpers import chunk
+
+
+def compressed(pixels: np.ndarray) -> bytes:
+    return zlib.compress(b''.join(b'\x00' + row.tobytes() for row in pixels))
+
+
+def frame_control(sequence_number: int, region: tuple[int, int, int, int], dispose_op: int, blend_op: int) -> bytes:
+    x_offset, y_offset, width, height = region
+    return chunk(b'fcTL', struct.pack('>IIIIIHHBB', sequence_number, width, height, x_offset, y_offset, 1, 10,
+                                      dispose_op, blend_op))
+
+
+@pytest.fixture
+def frames() -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    full, source, over = (rng.integers(0, 256, shape, dtype=np.uint8) for shape in [(4, 4, 4), (2, 2, 4), (2, 2, 4)])
+    over[:, :, 3] = 128
+
+    return [full, source, over]
+
+
+def animated_png(frames: list[np.ndarray], second_sequence_number: int = 2, second_offset: int = 1) -> bytes:
+    full, source, over = frames
+
+    # The default image precedes the first fcTL chunk, so it is not a part of the animation
+    return b'\x89PNG\r\n\x1a\n' \
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', 4, 4, 8, 6, 0, 0, 0)) \
+        + chunk(b'acTL', struct.pack('>II', 3, 2)) \
+        + chunk(b'IDAT', compressed(np.full((4, 4, 4), 255, dtype=np.uint8))) \
+        + frame_control(0, (0, 0, 4, 4), 1, 0) \
+        + chunk(b'fdAT', struct.pack('>I', 1) + compressed(full)) \
+        + frame_control(second_sequence_number, (second_offset, second_offset, 2, 2), 2, 0) \
+        + chunk(b'fdAT', struct.pack('>I', second_sequence_number + 1) + compressed(source)) \
+        + frame_control(second_sequence_number + 2, (0, 0, 2, 2), 0, 1) \
+        + chunk(b'fdAT', struct.pack('>I', second_sequence_number + 3) + compressed(over)) \
+        + chunk(b'IEND', b'')
+
+
+def test_read_animation(frames: list[np.ndarray]) -> None:
+    full, source, over = frames
+
+    animation = APNGReader().read_animation(io.BytesIO(animated_png(frames)))
+    result = [frame.image.data.copy() for frame in animation.frames]
+
+    # The first frame is disposed to the background and the second one to the previous canvas, so the third frame is
+    # blended over the transparent pixels
+    second = np.zeros((4, 4, 4), dtype=np.uint8)
+    second[1:3, 1:3] = source
+    third = np.zeros((4, 4, 4), dtype=np.uint8)
+    third[:2, :2] = over
+
+    assert (animation.num_frames, animation.num_plays) == (3, 2)
+    assert len(result) == 3
+    assert np.array_equal(result[0], full)
+    assert np.array_equal(result[1], second)
+    assert np.array_equal(result[2], third)
+
+
+def test_blend_over() -> None:
+    target = np.array([[[200, 100, 0, 255], [10, 20, 30, 255], [1, 2, 3, 0], [100, 100, 100, 255]]], dtype=np.uint8)
+    source = np.array([[[0, 0, 0, 255], [250, 220, 130, 0], [50, 60, 70, 51], [200, 0, 50, 51]]], dtype=np.uint8)
+
+    blend_over(target, source)
+
+    assert np.array_equal(target, [[[0, 0, 0, 255], [10, 20, 30, 255], [50, 60, 70, 51], [120, 80, 90, 255]]])
+
+
+@pytest.mark.parametrize('second_sequence_number,second_offset,match', [
+    (3, 1, 'sequence number'),
+    (2, 3, 'outside of the canvas'),
+])
+def test_read_animation_invalid(frames: list[np.ndarray], second_sequence_number: int, second_offset: int,
+                                match: str) -> None:
+    animation = APNGReader().read_animation(io.BytesIO(animated_png(frames, second_sequence_number, second_offset)))
+
+    with pytest.raises(InvalidFormatException, match=match):
+        list(animation.frames)
+
+
+def test_read_animation_not_animated() -> None:
+    buffer = io.BytesIO()
+    PNGWriter().write_format(buffer, Image(data=np.zeros((2, 2, 3), dtype=np.uint8)))
+
+    assert not is_animated(buffer)
+    with pytest.raises(InvalidFormatException, match='acTL'):
+        APNGReader().read_animation(buffer)
+
+
+def test_is_animated_resets_stream(frames: list[np.ndarray]) -> None:
+    file = io.BytesIO(animated_png(frames))
+
+    assert is_animated(file)
+    assert file.tell() == 0
+
+
+@pytest.mark.parametrize('channels,dtype', [(1, np.uint8), (3, np.uint8), (4, np.uint8), (4, np.uint16)])
+def test_write_animation(channels: int, dtype: type) -> None:
+    rng = np.random.default_rng(channels)
+    images = [rng.integers(0, np.iinfo(dtype).max, (9, 7, channels), dtype=dtype) for _ in range(5)]
+    animation = Animation(num_frames=5,
+                          num_plays=0,
+                          frames=iter(AnimationFrame(Image(data=x), 1, 25 + i) for i, x in enumerate(images)))
+
+    buffer = io.BytesIO()
+    APNGWriter(PNGOptions(chunk_size=50)).write_animation(buffer, animation)
+    result = APNGReader().read_animation(io.BytesIO(buffer.getvalue()))
+    decoded = [(frame.image.data.copy(), frame.delay_denominator) for frame in result.frames]
+
+    colors = [0, 0, 0] if channels == 1 else [0, 1, 2]
+    assert result.num_frames == 5
+    assert [delay for _, delay in decoded] == [25, 26, 27, 28, 29]
+    assert all(np.array_equal(data[:, :, :3], image[:, :, colors]) for (data, _), image in zip(decoded, images))
+    assert np.array_equal(PNGReader().read_format(io.BytesIO(buffer.getvalue())).data, images[0][:, :, :3])
+
+
+def test_write_animation_frames_mismatch() -> None:
+    images = [np.zeros((2, 2, 3), dtype=np.uint8), np.zeros((2, 3, 3), dtype=np.uint8)]
+    animation = Animation(num_frames=2, num_plays=0, frames=iter(AnimationFrame(Image(data=x), 1, 10) for x in images))
+
+    with pytest.raises(InvalidFormatException, match='does not match'):
+        APNGWriter().write_animation(io.BytesIO(), animation)
+
+
+@pytest.mark.parametrize('num_frames,match', [(3, '2 instead of 3'), (1, 'more than 1')])
+def test_write_animation_frames_count(num_frames: int, match: str) -> None:
+    images = [np.full((2, 2, 3), x, dtype=np.uint8) for x in range(2)]
+    animation = Animation(num_frames=num_frames,
+                          num_plays=0,
+                          frames=iter(AnimationFrame(Image(data=x), 1, 10) for x in images))
+
+    buffer = io.BytesIO()
+    with pytest.raises(InvalidFormatException, match=match):
+        APNGWriter().write_animation(buffer, animation)
+
+    # The output ends without the IEND chunk and without the frames past the acTL count
+    assert b'IEND' not in buffer.getvalue()
+    assert buffer.getvalue().count(b'fcTL') == min(num_frames, 2)
+
+
+def test_animation_command(frames: list[np.ndarray], tmp_path: Path) -> None:
+    input_path, output_path = tmp_path / 'input.png', tmp_path / 'output.png'
+    input_path.write_bytes(animated_png(frames))
+
+    args = get_parser().parse_args(['-i', str(input_path), '-o', str(output_path), 'flip', '--horizontal'])
+    assert args.func(args) == 0
+
+    expected = [frame.image.data[:, ::-1].copy()
+                for frame in APNGReader().read_animation(io.BytesIO(input_path.read_bytes())).frames]
+    with open(output_path, mode='rb') as file:
+        result = [frame.image.data.copy() for frame in APNGReader().read_animation(file).frames]
+
+    assert len(result) == 3
+    assert all(np.array_equal(x, y) for x, y in zip(result, expected))
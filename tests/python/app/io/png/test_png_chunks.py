@@ -0,0 +1,157 @@
+import io
+
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.codec_options import CRCVerification, PNGOptions
+from app.io.png import PNG, PNGReader, PNGWriter
+from app.io.png_chunks import ChunkType, IDATData, PLTEData
+
+from png_helpers import chunk
+
+
+def split_idat(png: bytes, chunk_size: int) -> bytes:
+    parsed = PNG.from_file(io.BytesIO(png))
+    compressed = b''.join(bytes(x.chunk_data) for x in parsed.chunks if x.chunk_type == ChunkType.IDAT)
+
+    return png[:8 + 25] \
+        + b''.join(chunk(b'IDAT', compressed[i:i + chunk_size]) for i in range(0, len(compressed), chunk_size)) \
+        + chunk(b'IEND', b'')
+
+
+@pytest.fixture
+def image_png() -> tuple[np.ndarray, bytes]:
+    data = np.random.default_rng(0).integers(0, 256, (40, 30, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    PNGWriter().write_format(buffer, Image(data=data))
+
+    return data, buffer.getvalue()
+
+
+def test_many_idat_chunks(image_png: tuple[np.ndarray, bytes]) -> None:
+    data, png = image_png
+    split = split_idat(png, 7)
+
+    parsed = PNG.from_file(io.BytesIO(split))
+    idat_chunks = [x for x in parsed.chunks if x.chunk_type == ChunkType.IDAT]
+
+    assert len(idat_chunks) > 100
+    assert all(isinstance(x.chunk_data.compressed_data, memoryview) for x in idat_chunks)
+    assert np.array_equal(PNGReader().read_format(io.BytesIO(split)).data, data)
+
+
+def test_chunks_roundtrip(image_png: tuple[np.ndarray, bytes]) -> None:
+    _, png = image_png
+    split = split_idat(png, 100)
+    buffer = io.BytesIO()
+
+    PNG.from_file(io.BytesIO(split)).to_file(buffer)
+
+    assert buffer.getvalue() == split
+
+
+def test_trailing_data_after_end(image_png: tuple[np.ndarray, bytes]) -> None:
+    data, png = image_png
+
+    assert np.array_equal(PNGReader().read_format(io.BytesIO(png + b'garbage')).data, data)
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda png: png[:45] + bytes([png[45] ^ 1]) + png[46:],
+    lambda png: png[:40] + bytes([png[40] ^ 1]) + png[41:],
+    lambda png: png[:-20],
+    lambda png: png[:-12],
+    lambda png: png[:8] + chunk(b'IEND', b''),
+])
+def test_invalid_chunks(image_png: tuple[np.ndarray, bytes], corrupt) -> None:
+    _, png = image_png
+
+    with pytest.raises(InvalidFormatException):
+        PNG.from_file(io.BytesIO(corrupt(png)))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 100, 1 << 16])
+def test_writer_chunk_size(image_png: tuple[np.ndarray, bytes], chunk_size: int) -> None:
+    data, _ = image_png
+    buffer = io.BytesIO()
+    PNGWriter(PNGOptions(chunk_size=chunk_size)).write_format(buffer, Image(data=data))
+
+    parsed = PNG.from_file(io.BytesIO(buffer.getvalue()))
+    lengths = [x.length for x in parsed.chunks if x.chunk_type == ChunkType.IDAT]
+
+    assert max(lengths) <= chunk_size
+    assert len(lengths) == -(-sum(lengths) // chunk_size)
+    assert np.array_equal(parsed.to_numpy(), data)
+
+
+def test_split_wrong_chunk_size() -> None:
+    with pytest.raises(InvalidFormatException):
+        IDATData(compressed_data=b'data').split(0)
+
+
+@pytest.mark.parametrize('options', [
+    {'level': -2},
+    {'level': 10},
+    {'threads': 0},
+    {'chunk_size': 0},
+])
+def test_wrong_options(options: dict[str, int]) -> None:
+    with pytest.raises(InvalidFormatException):
+        PNGOptions(**options)
+
+
+@pytest.mark.parametrize('entries', [1, 3, 256])
+def test_palette_entries(entries: int) -> None:
+    palette = PLTEData.from_bytes(bytes(range(3 * entries)) if entries < 86 else bytes(3 * entries))
+
+    assert palette.palette_entries.shape == (entries, 3)
+
+
+@pytest.mark.parametrize('size', [0, 4, 3 * 257])
+def test_wrong_palette_entries(size: int) -> None:
+    with pytest.raises(InvalidFormatException):
+        PLTEData.from_bytes(bytes(size))
+
+
+def corrupt_idat_crc(png: bytes) -> bytes:
+    # The stored checksum of the last IDAT chunk precedes the 12 bytes of the IEND chunk
+    return png[:-16] + bytes([png[-16] ^ 1]) + png[-15:]
+
+
+def corrupt_text_crc(png: bytes) -> bytes:
+    text = chunk(b'tEXt', b'Comment\x00text')
+    return png[:8 + 25] + text[:-1] + bytes([text[-1] ^ 1]) + png[8 + 25:]
+
+
+@pytest.mark.parametrize('corrupt,verification,fails', [
+    (corrupt_idat_crc, CRCVerification.STRICT, True),
+    (corrupt_idat_crc, CRCVerification.IDAT_ONLY, True),
+    (corrupt_idat_crc, CRCVerification.DEFERRED, True),
+    (corrupt_idat_crc, CRCVerification.OFF, False),
+    (corrupt_text_crc, CRCVerification.STRICT, True),
+    (corrupt_text_crc, CRCVerification.IDAT_ONLY, False),
+    (corrupt_text_crc, CRCVerification.DEFERRED, True),
+    (corrupt_text_crc, CRCVerification.OFF, False),
+])
+@pytest.mark.parametrize('streaming', [False, True])
+def test_crc_verification(image_png: tuple[np.ndarray, bytes],
+                          corrupt,
+                          verification: CRCVerification,
+                          fails: bool,
+                          streaming: bool) -> None:
+    data, png = image_png
+    reader = PNGReader(verification)
+
+    def read() -> np.ndarray:
+        if streaming:
+            return np.concatenate(list(reader.read_row_bands(io.BytesIO(corrupt(png)), 7)))
+
+        return reader.read_format(io.BytesIO(corrupt(png))).data
+
+    if fails:
+        with pytest.raises(InvalidFormatException, match='CRC'):
+            read()
+    else:
+        assert np.array_equal(read(), data)
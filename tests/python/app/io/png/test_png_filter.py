@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.codec_options import FilterSelection
+from app.io.png_filter import FilterType, filter_rows, filter_scanlines, unfilter_scanlines
+
+
+def unfilter_reference(scanlines: np.ndarray, bytes_per_pixel: int) -> np.ndarray:
+    result = np.zeros((scanlines.shape[0], scanlines.shape[1] - 1), dtype=np.int64)
+
+    for row, scanline in enumerate(scanlines.astype(np.int64)):
+        for column, value in enumerate(scanline[1:]):
+            left = result[row, column - bytes_per_pixel] if column >= bytes_per_pixel else 0
+            up = result[row - 1, column] if row > 0 else 0
+            up_left = result[row - 1, column - bytes_per_pixel] if row > 0 and column >= bytes_per_pixel else 0
+
+            match scanline[0]:
+                case FilterType.NONE:
+                    predictor = 0
+                case FilterType.SUB:
+                    predictor = left
+                case FilterType.UP:
+                    predictor = up
+                case FilterType.AVERAGE:
+                    predictor = (left + up) // 2
+                case _:
+                    estimate = left + up - up_left
+                    distances = [abs(estimate - left), abs(estimate - up), abs(estimate - up_left)]
+                    predictor = [left, up, up_left][distances.index(min(distances))]
+
+            result[row, column] = (value + predictor) % 256
+
+    return result.astype(np.uint8)
+
+
+@pytest.mark.parametrize('height,width,bytes_per_pixel', [
+    (1, 1, 1),
+    (1, 7, 3),
+    (6, 1, 4),
+    (9, 5, 1),
+    (8, 6, 3),
+    (5, 9, 4),
+])
+@pytest.mark.parametrize('filter_types', [
+    [FilterType.NONE],
+    [FilterType.SUB],
+    [FilterType.UP],
+    [FilterType.AVERAGE],
+    [FilterType.PAETH],
+    list(FilterType),
+    [FilterType.UP, FilterType.SUB, FilterType.PAETH, FilterType.UP, FilterType.UP],
+])
+def test_unfilter_scanlines(height: int, width: int, bytes_per_pixel: int, filter_types: list[FilterType]) -> None:
+    rng = np.random.default_rng(height * width * bytes_per_pixel)
+    scanlines = rng.integers(0, 256, (height, 1 + width * bytes_per_pixel), dtype=np.uint8)
+    scanlines[:, 0] = np.resize(filter_types, height)
+
+    result = unfilter_scanlines(scanlines, bytes_per_pixel)
+
+    assert np.array_equal(result, unfilter_reference(scanlines, bytes_per_pixel))
+
+
+@pytest.mark.parametrize('width', [1, 3])
+def test_unfilter_scanlines_wavefront_runs(width: int) -> None:
+    # The rows of the narrow images are reversed in several runs of the wavefront
+    rng = np.random.default_rng(width)
+    scanlines = rng.integers(0, 256, (600, 1 + width * 3), dtype=np.uint8)
+    scanlines[:, 0] = rng.integers(FilterType.NONE, FilterType.PAETH + 1, 600)
+
+    assert np.array_equal(unfilter_scanlines(scanlines, 3), unfilter_reference(scanlines, 3))
+
+
+def test_unfilter_scanlines_unknown_filter() -> None:
+    with pytest.raises(InvalidFormatException):
+        unfilter_scanlines(np.array([[5, 1, 2, 3]], dtype=np.uint8), 3)
+
+
+@pytest.mark.parametrize('split', [1, 3, 7])
+@pytest.mark.parametrize('filter_types', [
+    [FilterType.UP],
+    [FilterType.AVERAGE],
+    [FilterType.PAETH],
+    list(FilterType),
+])
+def test_unfilter_scanlines_previous_row(split: int, filter_types: list[FilterType]) -> None:
+    rng = np.random.default_rng(split)
+    scanlines = rng.integers(0, 256, (8, 1 + 5 * 3), dtype=np.uint8)
+    scanlines[:, 0] = np.resize(filter_types, 8)
+
+    first = unfilter_scanlines(scanlines[:split], 3)
+    second = unfilter_scanlines(scanlines[split:], 3, first[-1])
+
+    assert np.array_equal(np.concatenate((first, second)), unfilter_reference(scanlines, 3))
+
+
+@pytest.mark.parametrize('selection', list(FilterSelection))
+@pytest.mark.parametrize('bytes_per_pixel', [1, 3, 4])
+def test_filter_scanlines_roundtrip(selection: FilterSelection, bytes_per_pixel: int) -> None:
+    rows = np.random.default_rng(bytes_per_pixel).integers(0, 256, (7, 5 * bytes_per_pixel), dtype=np.uint8)
+
+    scanlines = filter_scanlines(rows, bytes_per_pixel, selection)
+
+    assert np.array_equal(unfilter_scanlines(scanlines, bytes_per_pixel), rows)
+
+
+def signed_sums(filtered: np.ndarray) -> np.ndarray:
+    return np.abs(filtered.view(np.int8).astype(np.int64)).sum(axis=1)
+
+
+def test_filter_scanlines_adaptive_minimum() -> None:
+    gradient = (np.add.outer(np.arange(6), np.arange(12)) * 10).astype(np.uint8)
+    rows = np.concatenate((gradient, np.random.default_rng(0).integers(0, 256, (3, 12), dtype=np.uint8)))
+
+    scanlines = filter_scanlines(rows, 3)
+
+    for filter_type in FilterType:
+        assert np.all(signed_sums(scanlines[:, 1:]) <= signed_sums(filter_rows(rows, 3, filter_type)))
+
+    assert np.all(scanlines[1:6, 0] != FilterType.NONE)
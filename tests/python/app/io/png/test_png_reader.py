@@ -0,0 +1,409 @@
+import io
+import struct
+import zlib
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.command.parser import get_parser
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.bmp import BMPReader
+from app.io.codec_options import CompressionStrategy, FilterSelection, PNGOptions
+from app.io.png import PNG, PNGReader, PNGWriter, compressed_size, encode_image, interlaced_bands, optimize_options
+from app.io.png_chunks import IHDRData
+from app.io.png_filter import filter_scanlines
+
+from png_helpers import chunk
+
+
+@pytest.mark.parametrize('name', ['1', '2', '3'])
+def test_reader_matches_bmp(resource_path: Path, name: str) -> None:
+    with open(resource_path / f'{name}.png', mode='rb') as file:
+        png_data = PNGReader().read_format(file).data
+
+    with open(resource_path / f'{name}.bmp', mode='rb') as file:
+        bmp_data = BMPReader().read_format(file).data
+
+    # BMP stores the rows bottom-up and the channels in the BGR order
+    assert np.array_equal(png_data, np.flip(bmp_data[:, :, ::-1], axis=0))
+
+
+@pytest.mark.parametrize('name,shape', [
+    ('3_cat', (960, 960, 3)),
+    ('4', (900, 900, 3)),
+])
+def test_reader_filtered(resource_path: Path, name: str, shape: tuple[int, int, int]) -> None:
+    with open(resource_path / f'{name}.png', mode='rb') as file:
+        data = PNGReader().read_format(file).data
+
+    assert data.shape == shape
+
+
+def filtered_png(data: np.ndarray, filter_types: list[int], chunk_size: int, stored_rows: int = -1) -> bytes:
+    height, width, channels = data.shape
+    scanlines = np.zeros((height, 1 + width * channels), dtype=np.uint8)
+    scanlines[:, 0] = np.resize(filter_types, height)
+    scanlines[:, 1:] = data.reshape(height, -1)
+
+    # Only Up filtered rows are encoded for real, the other rows are stored as differences to zero predictions
+    up_rows = scanlines[:, 0] == 2
+    up_rows[0] = False
+    scanlines[:, 0] = np.where(up_rows, 2, 0)
+    scanlines[1:, 1:][up_rows[1:]] -= data.reshape(height, -1)[:-1][up_rows[1:]]
+
+    compressed = zlib.compress(scanlines[:stored_rows if stored_rows >= 0 else height].tobytes())
+    header = struct.pack('>IIBBBBB', width, height, 8, {1: 0, 3: 2, 4: 6}[channels], 0, 0, 0)
+
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) \
+        + b''.join(chunk(b'IDAT', compressed[i:i + chunk_size]) for i in range(0, len(compressed), chunk_size)) \
+        + chunk(b'IEND', b'')
+
+
+@pytest.fixture
+def image_data() -> np.ndarray:
+    return np.random.default_rng(1).integers(0, 256, (37, 11, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('band_height', [1, 4, 36, 37, 100])
+@pytest.mark.parametrize('chunk_size', [5, 10000])
+def test_read_row_bands(image_data: np.ndarray, band_height: int, chunk_size: int) -> None:
+    png = filtered_png(image_data, [0, 2, 2, 2, 0], chunk_size)
+
+    bands = list(PNGReader().read_row_bands(io.BytesIO(png), band_height))
+
+    assert all(len(band) <= band_height for band in bands)
+    assert np.array_equal(np.concatenate(bands), image_data)
+
+
+def test_to_numpy_out(resource_path: Path) -> None:
+    with open(resource_path / '3_cat.png', mode='rb') as file:
+        png = PNG.from_file(file)
+
+    out = np.zeros((960, 960, 3), dtype=np.uint8)
+    result = png.to_numpy(out=out)
+
+    assert result is out
+    assert np.array_equal(out, png.to_numpy())
+    assert np.array_equal(np.concatenate(list(png.iterate_row_bands(band_height=100)))[:, :, :3], out)
+
+
+def test_to_numpy_out_wrong_shape(image_data: np.ndarray) -> None:
+    png = PNG.from_file(io.BytesIO(filtered_png(image_data, [0], 100)))
+
+    with pytest.raises(InvalidFormatException):
+        png.to_numpy(out=np.empty((37, 11, 4), dtype=np.uint8))
+
+
+def test_read_row_bands_truncated(image_data: np.ndarray) -> None:
+    png = filtered_png(image_data, [0], 100, stored_rows=30)
+
+    bands = PNGReader().read_row_bands(io.BytesIO(png), 8)
+
+    with pytest.raises(InvalidFormatException, match='too short'):
+        list(bands)
+
+
+@pytest.mark.parametrize('selection', list(FilterSelection))
+def test_writer_filter_selection(resource_path: Path, selection: FilterSelection) -> None:
+    with open(resource_path / '3_cat.png', mode='rb') as file:
+        data = PNGReader().read_format(file).data
+
+    buffer = io.BytesIO()
+    PNGWriter(PNGOptions(filter_selection=selection)).write_format(buffer, Image(data=data))
+    buffer.seek(0)
+
+    assert np.array_equal(PNGReader().read_format(buffer).data, data)
+
+
+@pytest.mark.parametrize('threads', [2, 5])
+def test_writer_threads(resource_path: Path, threads: int) -> None:
+    with open(resource_path / '3_cat.png', mode='rb') as file:
+        data = PNGReader().read_format(file).data
+
+    buffer = io.BytesIO()
+    PNGWriter(PNGOptions(threads=threads)).write_format(buffer, Image(data=data))
+    buffer.seek(0)
+
+    assert np.array_equal(PNGReader().read_format(buffer).data, data)
+
+
+@pytest.mark.parametrize('channels,alpha,color_type,expected_channels', [
+    (1, None, 0, 1),
+    (3, None, 2, 3),
+    (3, 255, 2, 3),
+    (3, 100, 6, 3),
+    (1, 100, 4, 1),
+    (1, 255, 0, 1),
+])
+def test_writer_color_type(image_data: np.ndarray,
+                           channels: int,
+                           alpha: int | None,
+                           color_type: int,
+                           expected_channels: int) -> None:
+    data = image_data[:, :, :channels]
+    if alpha is not None:
+        data = np.concatenate((data, np.full_like(image_data[:, :, :1], alpha)), axis=2)
+
+    buffer = io.BytesIO()
+    PNGWriter().write_format(buffer, Image(data=data))
+    png = PNG.from_file(io.BytesIO(buffer.getvalue()))
+
+    assert png.i_header.chunk_data.color_type == color_type
+    assert np.array_equal(png.to_numpy(), data[:, :, :expected_channels])
+
+
+def test_writer_equal_channels_gray(image_data: np.ndarray) -> None:
+    data = np.repeat(image_data[:, :, :1], 3, axis=2)
+
+    buffer = io.BytesIO()
+    PNGWriter().write_format(buffer, Image(data=data))
+    png = PNG.from_file(io.BytesIO(buffer.getvalue()))
+
+    assert png.i_header.chunk_data.color_type == 0
+    assert np.array_equal(png.to_numpy(), data[:, :, :1])
+
+
+@pytest.mark.parametrize('level', [0, 9])
+@pytest.mark.parametrize('strategy', list(CompressionStrategy))
+def test_writer_level_strategy(image_data: np.ndarray, level: int, strategy: CompressionStrategy) -> None:
+    buffer = io.BytesIO()
+    PNGWriter(PNGOptions(level=level, strategy=strategy)).write_format(buffer, Image(data=image_data))
+    buffer.seek(0)
+
+    assert np.array_equal(PNGReader().read_format(buffer).data, image_data)
+
+
+def test_optimize_options(image_data: np.ndarray) -> None:
+    i_header, rows, _ = encode_image(image_data)
+    bytes_per_pixel = i_header.get_bytes_per_pixel()
+
+    options, size = optimize_options(rows, bytes_per_pixel, PNGOptions(threads=3, chunk_size=100))
+
+    assert options.threads == 3 and options.chunk_size == 100
+    assert size == compressed_size(rows, bytes_per_pixel, options)
+    assert size <= compressed_size(rows, bytes_per_pixel, PNGOptions())
+
+
+def test_writer_optimize(image_data: np.ndarray, capsys: pytest.CaptureFixture[str],
+                         monkeypatch: pytest.MonkeyPatch) -> None:
+    encoded = []
+    monkeypatch.setattr('app.io.png.encode_image', lambda *args: encoded.append(args) or encode_image(*args))
+    buffer = io.BytesIO()
+    writer = PNGWriter(optimize=True)
+    writer.write_format(buffer, Image(data=image_data))
+    buffer.seek(0)
+
+    assert np.array_equal(PNGReader().read_format(buffer).data, image_data)
+    assert len(encoded) == 1 and writer.report is not None
+    assert writer.report.size == compressed_size(encode_image(image_data)[1], 3, writer.report.options)
+    assert capsys.readouterr().err == ''
+
+
+def test_command_optimize(resource_path: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    args = get_parser().parse_args(['-i', str(resource_path / '1.png'), '-o', str(tmp_path / 'output.png'),
+                                    '--optimize', 'identity'])
+
+    assert args.func(args) == 0
+    assert capsys.readouterr().err.startswith('PNG optimize: filter=')
+
+
+def interlaced_png(data: np.ndarray) -> bytes:
+    height, width, channels = data.shape
+    passes = [(0, 0, 8, 8), (0, 4, 8, 8), (4, 0, 8, 4), (0, 2, 4, 4), (2, 0, 4, 2), (0, 1, 2, 2), (1, 0, 2, 1)]
+
+    stream = b''
+    for row_start, column_start, row_step, column_step in passes:
+        reduced = np.ascontiguousarray(data[row_start::row_step, column_start::column_step],
+                                       dtype=data.dtype.newbyteorder('>'))
+        if reduced.size != 0:
+            rows = reduced.view(np.uint8).reshape(len(reduced), -1)
+            stream += filter_scanlines(rows, channels * data.dtype.itemsize).tobytes()
+
+    header = struct.pack('>IIBBBBB', width, height, 8 * data.dtype.itemsize, {1: 0, 3: 2, 4: 6}[channels], 0, 0, 1)
+
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(stream)) + chunk(b'IEND', b'')
+
+
+@pytest.mark.parametrize('name', ['1', '2', '3', '3_cat', '4'])
+def test_reader_interlaced(resource_path: Path, name: str) -> None:
+    with open(resource_path / f'{name}.png', mode='rb') as file:
+        data = PNGReader().read_format(file).data
+
+    interlaced = PNGReader().read_format(io.BytesIO(interlaced_png(data))).data
+
+    assert np.array_equal(interlaced, data)
+
+
+@pytest.mark.parametrize('height,width', [(1, 1), (1, 9), (7, 1), (3, 5), (9, 10), (16, 16)])
+def test_reader_interlaced_small(height: int, width: int) -> None:
+    data = np.random.default_rng(height * width).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+    png = interlaced_png(data)
+    bands = list(PNGReader().read_row_bands(io.BytesIO(png), 1))
+
+    assert np.array_equal(PNGReader().read_format(io.BytesIO(png)).data, data)
+    assert np.array_equal(np.concatenate(bands), data)
+
+
+@pytest.mark.parametrize('band_height', [1, 2, 5, 100])
+def test_reader_interlaced_bands(image_data: np.ndarray, band_height: int) -> None:
+    png = interlaced_png(image_data)
+
+    # Every pass is reversed in bands of its rows, the last row of a band is the row above the next one
+    result = np.concatenate(list(PNGReader().read_row_bands(io.BytesIO(png), band_height)))
+
+    assert np.array_equal(result, image_data)
+
+
+@pytest.mark.parametrize('band_height', [1, 3, None])
+def test_interlaced_bands(image_data: np.ndarray, band_height: int | None) -> None:
+    i_header = replace(IHDRData.from_numpy(image_data), interlace_method=IHDRData.WITH_INTERLACE_ADAM7)
+    covered = np.zeros(image_data.shape[:2], dtype=np.int64)
+
+    bands = list(interlaced_bands(i_header, band_height))
+    for index, _, rows, columns in bands:
+        covered[index] += 1
+        assert covered[index].shape == (rows, columns)
+
+    assert np.all(covered == 1)
+    assert all(rows <= (band_height or len(image_data)) for _, _, rows, _ in bands)
+
+
+def test_reader_interlaced_truncated(image_data: np.ndarray) -> None:
+    png = interlaced_png(image_data)
+    parsed = PNG.from_file(io.BytesIO(png))
+    compressed = zlib.compress(zlib.decompress(bytes(parsed.chunks[0].chunk_data))[:-10])
+
+    with pytest.raises(InvalidFormatException, match='too short'):
+        PNGReader().read_format(io.BytesIO(png[:33] + chunk(b'IDAT', compressed) + chunk(b'IEND', b'')))
+
+
+def gray_png(samples: np.ndarray, bit_depth: int) -> bytes:
+    height, width = samples.shape
+    bits = np.unpackbits(samples[:, :, np.newaxis], axis=2)[:, :, 8 - bit_depth:].reshape(height, -1)
+    rows = np.packbits(bits, axis=1)
+
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, 0, 0, 0, 0)
+    stream = zlib.compress(filter_scanlines(rows, 1).tobytes())
+
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', stream) + chunk(b'IEND', b'')
+
+
+@pytest.mark.parametrize('bit_depth,scale', [(1, 255), (2, 85), (4, 17)])
+@pytest.mark.parametrize('width', [1, 7, 8, 13])
+def test_reader_sub_byte_gray(bit_depth: int, scale: int, width: int) -> None:
+    samples = np.random.default_rng(width).integers(0, 1 << bit_depth, (9, width), dtype=np.uint8)
+
+    data = PNGReader().read_format(io.BytesIO(gray_png(samples, bit_depth))).data
+
+    assert data.dtype == np.uint8
+    assert np.array_equal(data, samples[:, :, np.newaxis] * scale)
+
+
+@pytest.mark.parametrize('channels', [1, 3, 4])
+def test_writer_16_bit(channels: int) -> None:
+    data = np.random.default_rng(channels).integers(0, 1 << 16, (21, 10, channels), dtype=np.uint16)
+
+    buffer = io.BytesIO()
+    PNGWriter().write_format(buffer, Image(data=data))
+    png = PNG.from_file(io.BytesIO(buffer.getvalue()))
+    result = png.to_numpy()
+
+    assert png.i_header.chunk_data.bit_depth == 16
+    assert result.dtype == np.uint16
+    assert np.array_equal(result, data[:, :, :3])
+
+
+def test_reader_16_bit_interlaced() -> None:
+    data = np.random.default_rng(0).integers(0, 1 << 16, (11, 10, 3), dtype=np.uint16)
+
+    result = PNGReader().read_format(io.BytesIO(interlaced_png(data))).data
+
+    assert result.dtype == np.uint16
+    assert np.array_equal(result, data)
+
+
+def indexed_png(indices: np.ndarray, bit_depth: int, palette: np.ndarray, alpha: bytes = b'') -> bytes:
+    height, width = indices.shape
+    bits = np.unpackbits(indices[:, :, np.newaxis], axis=2)[:, :, 8 - bit_depth:].reshape(height, -1)
+    rows = np.packbits(bits, axis=1)
+
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, 3, 0, 0, 0)
+    transparency = chunk(b'tRNS', alpha) if alpha else b''
+    stream = zlib.compress(filter_scanlines(rows, 1).tobytes())
+
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'PLTE', palette.tobytes()) + transparency + \
+        chunk(b'IDAT', stream) + chunk(b'IEND', b'')
+
+
+@pytest.mark.parametrize('bit_depth', [1, 2, 4, 8])
+@pytest.mark.parametrize('width', [1, 7, 13])
+def test_reader_indexed(bit_depth: int, width: int) -> None:
+    rng = np.random.default_rng(bit_depth)
+    palette = rng.integers(0, 256, (1 << bit_depth, 3), dtype=np.uint8)
+    indices = rng.integers(0, 1 << bit_depth, (9, width), dtype=np.uint8)
+
+    data = PNGReader().read_format(io.BytesIO(indexed_png(indices, bit_depth, palette))).data
+
+    assert np.array_equal(data, palette[indices])
+
+
+def test_reader_indexed_transparency() -> None:
+    palette = np.array([[10, 20, 30], [40, 50, 60], [70, 80, 90]], dtype=np.uint8)
+    indices = np.array([[0, 1, 2], [2, 1, 0]], dtype=np.uint8)
+
+    bands = list(PNGReader().read_row_bands(io.BytesIO(indexed_png(indices, 2, palette, b'\x00\x80')), 1))
+
+    expected = np.array([[10, 20, 30, 0], [40, 50, 60, 128], [70, 80, 90, 255]], dtype=np.uint8)[indices]
+    assert np.array_equal(np.concatenate(bands), expected)
+
+
+def test_to_numpy_indexed_transparency() -> None:
+    palette = np.array([[10, 20, 30], [40, 50, 60], [70, 80, 90]], dtype=np.uint8)
+    indices = np.array([[0, 1, 2], [2, 1, 0]], dtype=np.uint8)
+    png = indexed_png(indices, 2, palette, b'\x00\x80')
+
+    # The alpha of the palette is kept, unlike the alpha channel of the RGBA images
+    result = PNGReader().read_format(io.BytesIO(png)).data
+
+    expected = np.array([[10, 20, 30, 0], [40, 50, 60, 128], [70, 80, 90, 255]], dtype=np.uint8)[indices]
+    assert np.array_equal(result, expected)
+    assert np.array_equal(PNG.from_file(io.BytesIO(png)).to_numpy(np.empty((2, 3, 4), dtype=np.uint8)), expected)
+
+
+def test_reader_indexed_missing_palette() -> None:
+    png = indexed_png(np.zeros((2, 2), dtype=np.uint8), 8, np.zeros((1, 3), dtype=np.uint8))
+    plte_start = png.index(b'PLTE') - 4
+
+    with pytest.raises(InvalidFormatException, match='Missing PLTE'):
+        PNGReader().read_format(io.BytesIO(png[:plte_start] + png[plte_start + 15:]))
+
+
+@pytest.mark.parametrize('colors,bit_depth', [(2, 1), (3, 2), (16, 4), (17, 8), (256, 8)])
+@pytest.mark.parametrize('channels', [1, 3, 4])
+def test_writer_palette(colors: int, bit_depth: int, channels: int) -> None:
+    rng = np.random.default_rng(colors)
+    entries = rng.integers(0, 256, (colors, channels), dtype=np.uint8)
+    entries[:, 0] = rng.permutation(256)[:colors]
+    data = entries[np.arange(17 * 11).reshape(17, 11) % colors]
+
+    buffer = io.BytesIO()
+    PNGWriter(PNGOptions(palette=True)).write_format(buffer, Image(data=data))
+    png = PNG.from_file(io.BytesIO(buffer.getvalue()))
+    bands = list(png.iterate_row_bands())
+
+    assert png.i_header.chunk_data.color_type == 3
+    assert png.i_header.chunk_data.bit_depth == bit_depth
+    assert np.array_equal(np.concatenate(bands), np.repeat(data, 3, axis=2) if channels == 1 else data)
+
+
+def test_writer_palette_too_many_colors() -> None:
+    data = np.zeros((1, 257, 3), dtype=np.uint8)
+    data[0, :, 0] = np.arange(257) % 256
+    data[0, :, 1] = np.arange(257) // 256
+
+    with pytest.raises(InvalidFormatException, match='Too many colors'):
+        PNGWriter(PNGOptions(palette=True)).write_format(io.BytesIO(), Image(data=data))
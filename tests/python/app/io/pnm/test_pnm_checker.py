@@ -0,0 +1,27 @@
+from io import BytesIO
+
+import pytest
+
+from app.io.known_format import KnownFormat
+from app.io.format_factory import determine_format
+from app.io.format_checker import PBMChecker, PGMChecker, PPMChecker, SignatureTrie
+
+
+@pytest.mark.parametrize('input_data,expected', [
+    (b'P4\n1 1\n\x00', KnownFormat.PBM),
+    (b'P5\n1 1 255\n\x00', KnownFormat.PGM),
+    (b'P6\n1 1 255\n\x00\x00\x00', KnownFormat.PPM),
+])
+def test_determine_format(input_data: bytes, expected: KnownFormat) -> None:
+    assert determine_format(BytesIO(input_data)) == expected
+
+
+@pytest.mark.parametrize('input_data', [
+    b'',
+    b'P',
+    b'P1\n1 1\n0',
+    b'P3\n1 1 255\n0 0 0',
+    b'BM',
+])
+def test_checkers_false(input_data: bytes) -> None:
+    assert SignatureTrie([PBMChecker(), PGMChecker(), PPMChecker()]).match(input_data) is None
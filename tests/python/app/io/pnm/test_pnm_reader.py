@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.io.known_format import KnownFormat
+from app.io.pnm import PNMReader, PNMHeader
+
+
+@pytest.mark.parametrize('data,expected', [
+    (
+        b'P6\n2 2\n255\n\xff\x00\x00\x00\xff\x00\x00\x00\xff\xff\xff\xff',
+        np.array([[[255, 0, 0], [0, 255, 0]], [[0, 0, 255], [255, 255, 255]]], dtype=np.uint8),
+    ),
+    (
+        b'P5\n# comment\n3 1 255\n\x01\x02\x03',
+        np.array([[[1], [2], [3]]], dtype=np.uint8),
+    ),
+    (
+        b'P5 2 1 65535\n\x01\x00\xff\xff',
+        np.array([[[256], [65535]]], dtype=np.uint16),
+    ),
+    (
+        b'P4\n10 2\n\xa0\x40\x00\x80',
+        np.array([[[0], [255], [0], [255], [255], [255], [255], [255], [255], [0]],
+                  [[255], [255], [255], [255], [255], [255], [255], [255], [0], [255]]], dtype=np.uint8),
+    ),
+])
+def test_reader(data: bytes, expected: np.ndarray) -> None:
+    result = PNMReader().read_format(io.BytesIO(data)).data
+
+    assert result.shape == expected.shape
+    assert np.all(result == expected)
+
+
+@pytest.mark.parametrize('data,expected', [
+    (b'P4\n10 2\n', PNMHeader(KnownFormat.PBM, 10, 2, 1)),
+    (b'P5\t3\r\n1 # comment\n255\n', PNMHeader(KnownFormat.PGM, 3, 1, 255)),
+    (b'P6\n640 480\n65535\n', PNMHeader(KnownFormat.PPM, 640, 480, 65535)),
+])
+def test_header_from_bytes(data: bytes, expected: PNMHeader) -> None:
+    buffer = io.BytesIO(data)
+
+    assert PNMHeader.from_bytes(buffer) == expected
+    assert buffer.tell() == len(data)
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'P3\n2 2\n255\n',
+    b'P6\n2 2\n',
+    b'P6\n2 x\n255\n',
+    b'P6\n0 2\n255\n',
+    b'P6\n2 2\n65536\n',
+    b'P6\n2 2\n255\n\x00\x00',
+])
+def test_reader_invalid(data: bytes) -> None:
+    with pytest.raises(InvalidFormatException):
+        PNMReader().read_format(io.BytesIO(data))
@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.format_reader import IFormatReader
+from app.io.format_writer import IFormatWriter
+from app.io.known_format import KnownFormat
+from app.io.png import PNGReader, PNGWriter
+from app.io.pnm import PNMReader, PNMWriter
+
+
+@pytest.mark.parametrize('data,data_format,expected', [
+    (
+        np.array([[[255, 0, 0], [0, 255, 0]], [[0, 0, 255], [255, 255, 255]]], dtype=np.uint8),
+        KnownFormat.PPM,
+        b'P6\n2 2 255\n\xff\x00\x00\x00\xff\x00\x00\x00\xff\xff\xff\xff',
+    ),
+    (
+        np.array([[[1, 1, 1], [2, 2, 2], [3, 3, 3]]], dtype=np.uint8),
+        KnownFormat.PGM,
+        b'P5\n3 1 255\n\x01\x02\x03',
+    ),
+    (
+        np.array([[[256], [65535]]], dtype=np.uint16),
+        KnownFormat.PGM,
+        b'P5\n2 1 65535\n\x01\x00\xff\xff',
+    ),
+    (
+        np.array([[[0], [255], [0], [255], [255], [255], [255], [255], [255], [255]]], dtype=np.uint8),
+        KnownFormat.PBM,
+        b'P4\n10 1\n\xa0\x00',
+    ),
+])
+def test_writer(data: np.ndarray, data_format: KnownFormat, expected: bytes) -> None:
+    buffer = io.BytesIO()
+    PNMWriter(data_format).write_format(buffer, Image(data=data))
+
+    assert buffer.getvalue() == expected
+
+
+@pytest.mark.parametrize('data_format', [
+    KnownFormat.PGM,
+    KnownFormat.PBM,
+])
+def test_writer_rejects_colour(data_format: KnownFormat) -> None:
+    data = np.array([[[255, 0, 0], [0, 255, 0]]], dtype=np.uint8)
+
+    with pytest.raises(InvalidFormatException):
+        PNMWriter(data_format).write_format(io.BytesIO(), Image(data=data))
+
+
+@pytest.mark.parametrize('data_format,channels', [
+    (KnownFormat.PPM, 3),
+    (KnownFormat.PGM, 1),
+])
+def test_transcoding_from_writer(data_format: KnownFormat, channels: int) -> None:
+    data = np.arange(5 * 7 * channels, dtype=np.uint8).reshape(5, 7, channels)
+    out_buffer = io.BytesIO()
+
+    PNMWriter(data_format).write_format(out_buffer, Image(data=data))
+
+    assert np.all(PNMReader().read_format(io.BytesIO(out_buffer.getvalue())).data == data)
+
+
+@pytest.mark.parametrize('writer,reader', [
+    (PNMWriter(KnownFormat.PGM), PNMReader()),
+    (PNGWriter(), PNGReader()),
+])
+def test_transcoding_16_bit(writer: IFormatWriter, reader: IFormatReader) -> None:
+    # The PGM samples are read as big-endian, the writers have to keep all of their 16 bits
+    data = np.array([[[256], [65535], [1]], [[4660], [0], [43981]]], dtype=np.uint16)
+    in_buffer = io.BytesIO()
+    PNMWriter(KnownFormat.PGM).write_format(in_buffer, Image(data=data))
+    out_buffer = io.BytesIO()
+
+    writer.write_format(out_buffer, PNMReader().read_format(io.BytesIO(in_buffer.getvalue())))
+    result = reader.read_format(io.BytesIO(out_buffer.getvalue())).data
+
+    assert np.all(result == data)
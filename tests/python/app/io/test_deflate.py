@@ -0,0 +1,42 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from app.io.deflate import adler32_combine, compress_parallel
+
+
+@pytest.mark.parametrize('split', [0, 1, 1000, 70000, 100000])
+def test_adler32_combine(split: int) -> None:
+    data = np.random.default_rng(split).integers(0, 256, 100000, dtype=np.uint8).tobytes()
+
+    combined = adler32_combine(zlib.adler32(data[:split]), zlib.adler32(data[split:]), len(data) - split)
+
+    assert combined == zlib.adler32(data)
+
+
+@pytest.mark.parametrize('level', [zlib.Z_DEFAULT_COMPRESSION, 0, 1, 5, 6, 9])
+@pytest.mark.parametrize('size,block_size', [
+    (0, 1000),
+    (1, 1000),
+    (1000, 1000),
+    (250000, 7000),
+    (250000, 1 << 17),
+])
+def test_compress_parallel(level: int, size: int, block_size: int) -> None:
+    rng = np.random.default_rng(size)
+    data = np.repeat(rng.integers(0, 16, size // 8 + 1, dtype=np.uint8), 8)[:size].tobytes()
+
+    compressed = compress_parallel(data, level, 4, block_size=block_size)
+
+    assert zlib.decompress(compressed) == data
+
+
+def test_compress_parallel_dictionary() -> None:
+    # The second block repeats the first one, so it is compressed to back-references into the dictionary
+    block = np.random.default_rng(0).integers(0, 256, 10000, dtype=np.uint8).tobytes()
+
+    compressed = compress_parallel(block * 2, 6, 2, block_size=len(block))
+
+    assert len(compressed) < len(block) + 1000
+    assert zlib.decompress(compressed) == block * 2
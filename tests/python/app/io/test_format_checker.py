@@ -0,0 +1,108 @@
+import io
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.error.unknown_format_exception import UnknownFormatException
+from app.io.format_checker import BMPChecker, IFormatChecker, JPEGChecker, SignatureTrie, peek_stream
+from app.io.format_factory import determine_format, get_available_formats, get_signature_trie, sniff_format
+from app.io.known_format import KnownFormat
+
+
+@pytest.mark.parametrize('name,expected', [
+    ('1.bmp', KnownFormat.BMP),
+    ('1.png', KnownFormat.PNG),
+    ('3_cat.png', KnownFormat.PNG),
+    ('3.jpg', KnownFormat.JPEG),
+])
+def test_determine_format(resource_path: Path, name: str, expected: KnownFormat) -> None:
+    with open(resource_path / name, mode='rb') as file:
+        file.read(5)
+        assert determine_format(file) == expected
+        assert file.tell() == 0
+
+
+@pytest.mark.parametrize('header', [b'', b'\xff\xd8', b'GIF89a', b'P1\n'])
+def test_determine_format_unknown(header: bytes) -> None:
+    with pytest.raises(UnknownFormatException):
+        determine_format(io.BytesIO(header))
+
+
+def test_signature_trie_matches_checkers(resource_avif: io.BufferedReader) -> None:
+    trie = get_signature_trie()
+
+    # Every signature of every checker is matched to its own format, also with any bytes after it
+    for checker in get_available_formats():
+        for signature in checker.signatures():
+            assert trie.match(signature) == checker.type()
+            assert trie.match(signature + b'\x00' * 4) == checker.type()
+            assert trie.match(signature[:-1]) in {None, checker.type()}
+
+    assert trie.match(resource_avif.read(trie.length)) is None
+    assert trie.length == max(len(x) for x in JPEGChecker().signatures())
+    assert get_signature_trie() is trie
+
+
+class ConflictingChecker(IFormatChecker):
+    def signatures(self) -> tuple[bytes, ...]:
+        return b'BM', b'BMP!'
+
+    def type(self) -> KnownFormat:
+        return KnownFormat.PNG
+
+
+def test_signature_trie_order() -> None:
+    # The first checker keeps the signature that both checkers have, like the checkers tried one by one
+    assert SignatureTrie([BMPChecker(), ConflictingChecker()]).match(b'BM..') == KnownFormat.BMP
+    assert SignatureTrie([ConflictingChecker(), BMPChecker()]).match(b'BM..') == KnownFormat.PNG
+
+    # The longer signature wins
+    assert SignatureTrie([BMPChecker(), ConflictingChecker()]).match(b'BMP!') == KnownFormat.PNG
+    assert SignatureTrie([BMPChecker(), ConflictingChecker()]).match(b'BMP') == KnownFormat.BMP
+
+
+def read_pipe(data: bytes) -> io.BufferedReader:
+    read_descriptor, write_descriptor = os.pipe()
+
+    def write() -> None:
+        # The data is written in small pieces, so the reads of the pipe return less than they asked for
+        with open(write_descriptor, mode='wb', buffering=0) as pipe:
+            for start in range(0, len(data), 3):
+                pipe.write(data[start:start + 3])
+
+    threading.Thread(target=write, daemon=True).start()
+    return open(read_descriptor, mode='rb', buffering=0)
+
+
+def test_sniff_format_pipe(resource_path: Path) -> None:
+    data = (resource_path / '1.png').read_bytes()
+
+    with read_pipe(data) as pipe:
+        assert not pipe.seekable()
+        data_format, stream = sniff_format(pipe)
+
+        assert data_format == KnownFormat.PNG
+        assert stream.read(4) == data[:4]
+        assert stream.read() == data[4:]
+
+
+@pytest.mark.parametrize('data', [b'', b'BM', b'0123456789abcdef'])
+def test_peek_stream_pipe(data: bytes) -> None:
+    with read_pipe(data) as pipe:
+        header, stream = peek_stream(pipe, 12)
+
+        assert header == data[:12]
+        assert stream.read() == data
+
+
+def test_peek_stream_seekable() -> None:
+    file = io.BytesIO(b'0123456789')
+    file.seek(4)
+
+    header, stream = peek_stream(file, 3)
+
+    assert header == b'012'
+    assert stream is file
+    assert file.tell() == 0
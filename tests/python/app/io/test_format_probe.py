@@ -0,0 +1,96 @@
+import io
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.error.invalid_format_exception import InvalidFormatException
+from app.image.image import Image
+from app.io.bmp import BMPProbe, BMPWriter
+from app.io.format_factory import determine_format, get_probe_from_format, get_reader_from_format
+from app.io.format_probe import ImageInfo
+from app.io.jpeg import JPEGProbe
+from app.io.known_format import KnownFormat
+from app.io.png import PNGProbe
+from app.io.pnm import PNMProbe
+
+
+@pytest.mark.parametrize('name', ['1.bmp', '2.bmp', '3.bmp', '1.png', '2.png', '3.png', '3_cat.png', '4.png'])
+def test_probe_matches_reader(resource_path: Path, name: str) -> None:
+    with open(resource_path / name, mode='rb') as file:
+        data_format = determine_format(file)
+        info = get_probe_from_format(data_format).probe(file)
+        file.seek(0)
+        data = get_reader_from_format(data_format).read_format(file).data
+
+    assert (info.height, info.width) == data.shape[:2]
+
+
+def test_probe_jpeg(resource_path: Path) -> None:
+    with open(resource_path / '3.jpg', mode='rb') as file:
+        info = JPEGProbe().probe(file)
+
+    assert info == ImageInfo(KnownFormat.JPEG, 960, 1282, 3, 24)
+
+
+@pytest.mark.parametrize('data,expected', [
+    (
+        b'\xff\xd8\xff\xe0\x00\x04\x00\x00\xff\xff\xd0\xff\xc2\x00\x0b\x08\x00\x02\x00\x03\x01',
+        ImageInfo(KnownFormat.JPEG, 3, 2, 1, 8),
+    ),
+    (
+        b'\xff\xd8\xff\xdb\x00\x02\xff\xc0\x00\x11\x0c\x01\x00\x00\x80\x03',
+        ImageInfo(KnownFormat.JPEG, 128, 256, 3, 36),
+    ),
+])
+def test_probe_jpeg_segments(data: bytes, expected: ImageInfo) -> None:
+    assert JPEGProbe().probe(io.BytesIO(data)) == expected
+
+
+@pytest.mark.parametrize('data', [
+    b'\xff\xd9',
+    b'\xff\xd8\xff\xda\x00\x02',
+    b'\xff\xd8\xff\xe0\x00\x02\xff\xd9',
+    b'\xff\xd8\xff\xc0\x00\x11\x08\x00',
+    b'\xff\xd8\x00',
+])
+def test_probe_jpeg_invalid(data: bytes) -> None:
+    with pytest.raises(InvalidFormatException):
+        JPEGProbe().probe(io.BytesIO(data))
+
+
+@pytest.mark.parametrize('color_type,bit_depth,channels,bits_per_pixel', [
+    (0, 1, 1, 1),
+    (2, 16, 3, 48),
+    (3, 4, 3, 4),
+    (4, 8, 2, 16),
+    (6, 8, 4, 32),
+])
+def test_probe_png(color_type: int, bit_depth: int, channels: int, bits_per_pixel: int) -> None:
+    data = b'\x89PNG\r\n\x1a\n' + struct.pack('>II', 13, 0x49484452) \
+        + struct.pack('>IIBBBBB', 5, 7, bit_depth, color_type, 0, 0, 0)
+
+    assert PNGProbe().probe(io.BytesIO(data)) == ImageInfo(KnownFormat.PNG, 5, 7, channels, bits_per_pixel)
+
+
+def test_probe_png_without_header() -> None:
+    with pytest.raises(InvalidFormatException):
+        PNGProbe().probe(io.BytesIO(b'\x89PNG\r\n\x1a\n\x00\x00\x00\x00IEND'))
+
+
+@pytest.mark.parametrize('data,expected', [
+    (b'P4\n9 2\n', ImageInfo(KnownFormat.PBM, 9, 2, 1, 1)),
+    (b'P5 3 4 65535\n', ImageInfo(KnownFormat.PGM, 3, 4, 1, 16)),
+    (b'P6\n# comment\n5 6\n255\n', ImageInfo(KnownFormat.PPM, 5, 6, 3, 24)),
+])
+def test_probe_pnm(data: bytes, expected: ImageInfo) -> None:
+    assert PNMProbe().probe(io.BytesIO(data)) == expected
+
+
+def test_probe_bmp_reads_headers_only() -> None:
+    buffer = io.BytesIO()
+    BMPWriter(palette=True).write_format(buffer, Image(data=np.zeros((3, 5, 3), dtype=np.uint8)))
+    headers = buffer.getvalue()[:14 + 40]
+
+    assert BMPProbe().probe(io.BytesIO(headers)) == ImageInfo(KnownFormat.BMP, 5, 3, 3, 8)
@@ -6,6 +6,7 @@ from app.operation.bgr2rgb import BGR2RGB
 from app.operation.flip import Flip
 from app.operation.grayscale import Grayscale
 from app.operation.rotate90 import Rotate90
+from app.operation.thumbnail import Thumbnail
 
 
 def test_bgr2rgb():
@@ -81,3 +82,37 @@ def test_rotate90():
         expected_output = np.rot90(input_image.data, rotation)
         output_image = Rotate90()(args=Namespace(rotations=rotation), input_image=input_image)
         assert (expected_output == output_image.data).all()
+
+
+def test_thumbnail():
+    input_image = Image(np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3))
+
+    output_image = Thumbnail()(args=Namespace(width=3, height=3), input_image=input_image)
+
+    # Every output pixel is the mean of a 2x2 box of the input
+    expected_output = input_image.data.reshape(2, 2, 3, 2, 3).mean(axis=(1, 3))
+    assert output_image.data.dtype == np.uint8
+    assert (output_image.data == np.rint(expected_output)).all()
+
+
+def test_thumbnail_uneven_boxes():
+    input_image = Image(np.full((7, 5, 1), 1000, dtype=np.uint16))
+
+    output_image = Thumbnail()(args=Namespace(width=2, height=4), input_image=input_image)
+
+    assert output_image.data.shape == (3, 2, 1)
+    assert (output_image.data == 1000).all()
+
+
+def test_thumbnail_smaller_image():
+    input_image = Image(np.zeros((4, 6, 3), dtype=np.uint8))
+
+    assert Thumbnail()(args=Namespace(width=10, height=10), input_image=input_image) is input_image
+
+
+def test_thumbnail_reduction():
+    args = Namespace(width=100, height=100)
+
+    assert Thumbnail().reduction(args, 960, 1282) == 12
+    assert Thumbnail().reduction(args, 50, 50) == 1
+    assert Rotate90().reduction(args, 960, 1282) == 1